@@ -0,0 +1,267 @@
+"""
+Buffered bulk inserts for append-only tables (the audit trails).
+
+Rows are queued once the surrounding transaction commits, so a batch never
+holds a change that was rolled back. They are buffered in process and
+inserted with one ``bulk_create`` per batch: when the buffer reaches
+``batch_size``, every ``flush_seconds`` from a background thread, and at
+interpreter exit.
+
+Every queued row is first appended to a journal file of its process under
+BUFFERED_WRITE_JOURNAL_DIR, and a journal is only removed once its rows are
+in the database. A process killed before its rows were flushed (SIGKILL, OOM)
+leaves its journals behind; the next writer of the same kind claims and
+replays them when it starts its flush thread. Rows are inserted with
+``ignore_conflicts`` on a key set before they are journaled (a UUID primary
+key, or the writer's ``replay_key`` for database-assigned ones), so replaying
+a batch that was written just before the kill does not duplicate it. Journals
+are not fsynced: they survive a killed process, not a crashed machine.
+
+A writer is only known to be gone by its PID, so the journal directory must
+belong to one host: processes of another host (or a container with its own
+PID namespace) could be taken for dead, or a dead one for alive.
+
+While the database is unreachable, rows stay buffered for the next flush, up
+to ``max_buffered``; beyond that the oldest are dropped, and each flush logs
+how many were dropped since the last one.
+"""
+import atexit
+import logging
+import os
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.core import serializers
+from django.db import IntegrityError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class BufferedBulkWriter:
+    """
+    Subclasses set ``name`` (thread and journal prefix), implement
+    ``get_model`` and queue rows with ``queue``. Models with a primary key
+    assigned by the database need a unique ``replay_key`` field set in Python.
+    """
+    name = 'buffered-writes'
+    replay_key = None
+
+    def __init__(self, batch_size, flush_seconds, max_buffered):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self.journal_dir = getattr(settings, 'BUFFERED_WRITE_JOURNAL_DIR', '')
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Journals: the one rows are appended to, and closed ones not yet written
+        self._token = uuid.uuid4().hex[:8]
+        self._journal = None
+        self._journal_seq = 0
+        self._segments = []
+        self._dropped = 0
+        atexit.register(self.flush)
+
+    def get_model(self):
+        raise NotImplementedError
+
+    def write_one(self, row):
+        """
+        Insert one row of a batch that failed an integrity check; returns
+        whether it was written.
+        """
+        try:
+            with transaction.atomic():
+                row.save(force_insert=True)
+            return True
+        except IntegrityError as e:
+            if self.replayed(row):
+                return False  # Replayed from a journal after it was written
+            logger.warning(f"Dropped {self.name} row: {str(e)}")
+            return False
+
+    # ----- queueing -----
+
+    def queue(self, row):
+        """Queue ``row`` for insertion once the current transaction commits."""
+        transaction.on_commit(lambda: self._append(row))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _append(self, row):
+        line = serializers.serialize('jsonl', [row])
+        with self._lock:
+            self._write_journal(line)
+            self._buffer.append(row)
+            self._trim()
+            full = len(self._buffer) >= self.batch_size
+            self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _trim(self):
+        """Drop the oldest rows beyond ``max_buffered`` (called with the lock held)."""
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self._dropped += excess
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"{self.name}: could not recover journals: {str(e)}")
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    # ----- writing -----
+
+    def flush(self):
+        """Write all buffered rows; returns the number written."""
+        model = self.get_model()
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                self._rotate_journal()
+                segments, self._segments = self._segments, []
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                logger.error(
+                    f"{self.name}: dropped {dropped} unwritten rows, the buffer is capped at {self.max_buffered}"
+                )
+            if not rows:
+                self._remove(segments)
+                return 0
+            try:
+                try:
+                    model.objects.bulk_create(
+                        rows, batch_size=self.batch_size, ignore_conflicts=self._replay_key(model) is not None
+                    )
+                    written = len(rows)
+                except IntegrityError:
+                    # One bad row (e.g. a referenced row deleted since) fails the whole batch
+                    written = sum(self.write_one(row) for row in rows)
+            except Exception as e:
+                # Keep the rows (and their journals) for the next flush rather than losing them
+                logger.error(f"Failed to write {len(rows)} {self.name} rows: {str(e)}")
+                with self._lock:
+                    self._buffer[:0] = rows
+                    self._segments[:0] = segments
+                    self._trim()
+                return 0
+            self._remove(segments)
+            return written
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def replayed(self, row):
+        """Whether ``row`` is already in the database (a journal replayed after its flush)."""
+        key = self._replay_key(type(row))
+        return key is not None and type(row).objects.filter(**{key: getattr(row, key)}).exists()
+
+    def _replay_key(self, model):
+        """
+        Field that makes a replayed insert detectable: the primary key when it
+        is set in Python (UUIDs), else ``replay_key``.
+        """
+        if not model._meta.pk.get_internal_type().endswith('AutoField'):
+            return 'pk'
+        return self.replay_key
+
+    # ----- journal -----
+
+    def _journal_path(self, pid, token, suffix):
+        return os.path.join(self.journal_dir, f"{self.name}.{pid}.{token}.{suffix}.jsonl")
+
+    def _write_journal(self, line):
+        if not self.journal_dir:
+            return
+        try:
+            if self._journal is None:
+                os.makedirs(self.journal_dir, exist_ok=True)
+                path = self._journal_path(os.getpid(), self._token, self._journal_seq)
+                self._journal = (path, os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600))
+            os.write(self._journal[1], line.encode('utf-8'))
+        except OSError as e:
+            logger.error(f"{self.name}: could not journal a row, it is kept in memory only: {str(e)}")
+
+    def _rotate_journal(self):
+        """Close the current journal so the rows taken for a flush map to whole files."""
+        if self._journal is not None:
+            path, fd = self._journal
+            os.close(fd)
+            self._segments.append(path)
+            self._journal = None
+            self._journal_seq += 1
+
+    def _remove(self, paths):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def recover(self):
+        """
+        Claim the journals of writers of this kind whose process is gone and
+        queue their rows; returns the number of rows recovered.
+        """
+        if not self.journal_dir or not os.path.isdir(self.journal_dir):
+            return 0
+        pattern = re.compile(rf"^{re.escape(self.name)}\.(\d+)\.([0-9a-f]+)\.")
+        pid = os.getpid()
+        recovered = 0
+        for filename in sorted(os.listdir(self.journal_dir)):
+            match = pattern.match(filename)
+            if not match or match.group(2) == self._token:
+                continue
+            owner = int(match.group(1))
+            # Same pid with another token is an earlier life of this process id
+            if owner != pid and _process_alive(owner):
+                continue
+            claimed = self._journal_path(pid, self._token, f"recovered-{uuid.uuid4().hex[:8]}")
+            try:
+                os.rename(os.path.join(self.journal_dir, filename), claimed)
+            except FileNotFoundError:
+                continue  # Claimed by another process first
+            rows = []
+            with open(claimed, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        rows.extend(item.object for item in serializers.deserialize('jsonl', line, ignorenonexistent=True))
+                    except serializers.base.DeserializationError:
+                        # The process was killed in the middle of this line
+                        logger.warning(f"{self.name}: skipped a truncated row in {claimed}")
+            with self._lock:
+                self._buffer[:0] = rows
+                self._segments.insert(0, claimed)
+                self._trim()
+            recovered += len(rows)
+        if recovered:
+            logger.warning(f"{self.name}: recovered {recovered} rows from journals of exited processes")
+            self._wakeup.set()
+        return recovered
@@ -0,0 +1,178 @@
+"""
+Shared image handling for the clinical imaging apps (dentistry, dermatology,
+pathology, cosmetology, retinopathy).
+
+- ``probe`` reads dimensions, format, mode and DPI from the file header; PIL
+  opens images lazily, so no pixel data is decoded.
+- ``open_downscaled`` decodes straight to a reduced size: JPEG is decoded at
+  1/2, 1/4 or 1/8 scale by the DCT ``draft`` mode, other formats are shrunk
+  with ``reduce`` before the final resampling, so a 20-50 MP radiograph never
+  exists as a full-resolution RGB array.
+- ``analysis_tensor`` returns the normalized float32 array models work on,
+  cached in process by content hash so re-analysing the same upload is free.
+
+Every function accepts raw bytes, a path, or a file-like object (Django
+uploads included); file-like sources are rewound afterwards.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageOps
+
+ImageInfo = namedtuple('ImageInfo', ['width', 'height', 'format', 'mode', 'dpi', 'frames', 'compression'])
+
+# Modes holding more than 8 bits per sample (16-bit radiographs, float TIFFs)
+HIGH_DEPTH_MODES = {'I', 'I;16', 'I;16B', 'I;16L', 'I;16N', 'F'}
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    _rewind(source)
+    return Image.open(source)
+
+
+def content_hash(source, algorithm='sha256'):
+    """Hex digest of the encoded image, computed in chunks for files."""
+    if algorithm == 'sha256' and getattr(source, 'sha256', None):
+        # Hashed while the upload was streamed in (backend/uploads.py)
+        return source.sha256
+    digest = hashlib.new(algorithm)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+        return digest.hexdigest()
+    if isinstance(source, str):
+        with open(source, 'rb') as image_file:
+            for chunk in iter(lambda: image_file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    _rewind(source)
+    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+        digest.update(chunk)
+    _rewind(source)
+    return digest.hexdigest()
+
+
+def probe(source):
+    """Image header information without decoding pixels."""
+    try:
+        with _open(source) as img:
+            dpi = img.info.get('dpi')
+            return ImageInfo(
+                width=img.width,
+                height=img.height,
+                format=img.format,
+                mode=img.mode,
+                dpi=tuple(float(value) for value in dpi) if dpi else None,
+                frames=getattr(img, 'n_frames', 1),
+                compression=img.info.get('compression', ''),
+            )
+    finally:
+        _rewind(source)
+
+
+def _normalize_mode(img, mode):
+    if img.mode in HIGH_DEPTH_MODES:
+        # Stretch to 8 bits instead of letting convert() clip everything above 255
+        array = np.asarray(img, dtype=np.float32)
+        peak = float(array.max()) or 1.0
+        img = Image.fromarray((array * (255.0 / peak)).astype(np.uint8), 'L')
+    if mode and img.mode != mode:
+        img = img.convert(mode)
+    return img
+
+
+def open_downscaled(source, max_size, mode=None, exif_orientation=True):
+    """
+    Decode an image no larger than ``max_size`` (width, height), keeping the
+    aspect ratio. ``mode`` converts the result, e.g. 'RGB' or 'L'.
+    """
+    try:
+        with _open(source) as img:
+            if img.format == 'JPEG':
+                # Let the JPEG decoder do the scaling (and grayscale conversion)
+                img.draft(mode if mode in ('L', 'RGB') else None, (max_size[0] * 2, max_size[1] * 2))
+            orientation = img.getexif().get(0x0112) if exif_orientation else None
+            # reduce() has no 16-bit path; resampling those directly avoids a full-size copy
+            reducing_gap = None if img.mode.startswith('I;16') else 2.0
+            img.thumbnail(max_size, Image.LANCZOS, reducing_gap=reducing_gap)
+            img.load()
+            if orientation and orientation != 1:
+                img = ImageOps.exif_transpose(img)
+            return _normalize_mode(img, mode)
+    finally:
+        _rewind(source)
+
+
+def save_thumbnail(source, output, size=(300, 300), format='JPEG', quality=85):
+    """Write a thumbnail of ``source`` to a path or file-like ``output``."""
+    thumbnail = open_downscaled(source, size, mode='RGB' if format == 'JPEG' else None)
+    thumbnail.save(output, format, quality=quality)
+    return thumbnail.size
+
+
+class _TensorCache:
+    """Thread-safe LRU of analysis tensors bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            tensor = self._items.get(key)
+            if tensor is not None:
+                self._items.move_to_end(key)
+            return tensor
+
+    def put(self, key, tensor):
+        if tensor.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._items[key] = tensor
+            self._bytes += tensor.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_tensor_cache = _TensorCache(getattr(settings, 'IMAGING_TENSOR_CACHE_MB', 64) * 1024 * 1024)
+
+
+def analysis_tensor(source, size=None, mode='RGB', digest=None):
+    """
+    Float32 array in [0, 1] of the image fitted into ``size`` (defaults to
+    IMAGING_ANALYSIS_SIZE square), shaped (h, w) for 'L' or (h, w, 3) for
+    'RGB'. Results are cached by content hash and returned read-only.
+    """
+    if size is None:
+        edge = getattr(settings, 'IMAGING_ANALYSIS_SIZE', 512)
+        size = (edge, edge)
+    digest = digest or content_hash(source)
+    key = (digest, tuple(size), mode)
+    tensor = _tensor_cache.get(key)
+    if tensor is None:
+        img = open_downscaled(source, size, mode=mode)
+        tensor = np.asarray(img, dtype=np.float32) / 255.0
+        tensor.setflags(write=False)
+        _tensor_cache.put(key, tensor)
+    return tensor
@@ -0,0 +1,176 @@
+"""
+Background rendering of report artifacts (PDF/JSON) shared by the clinical apps.
+
+Requests only enqueue: a render task runs in a spawn process pool, builds the
+report from the database and writes the artifact to default storage (local
+disk or S3). Artifact names are derived from the report identity and a
+version of its source data, so a render is idempotent - an artifact that
+already exists is never rebuilt, and a changed source gets a new name instead
+of overwriting a file a client may be downloading.
+
+``artifact_response`` streams stored artifacts with ETag and single byte-range
+support, so large PDFs can be resumed or previewed page by page.
+"""
+import hashlib
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def artifact_key(*parts):
+    """Stable hex key for the given identity/version parts."""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def store_artifact(name, payload):
+    """
+    Write ``payload`` under ``name`` unless it already exists; returns its size.
+    Concurrent renders of the same artifact produce identical bytes, so the
+    loser of a race just drops its copy.
+    """
+    if default_storage.exists(name):
+        return default_storage.size(name)
+    saved = default_storage.save(name, ContentFile(payload))
+    if saved != name:
+        default_storage.delete(saved)
+    return len(payload)
+
+
+def _init_worker():
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def run_render_task(task_path, args):
+    """Process pool entry point: run the render task at ``task_path``."""
+    from django.db import close_old_connections
+    try:
+        return import_string(task_path)(*args)
+    finally:
+        close_old_connections()
+
+
+class ReportRenderingService:
+    def __init__(self):
+        self.max_workers = getattr(settings, 'REPORT_RENDER_WORKERS', 2)
+        self.prefix = getattr(settings, 'REPORT_ARTIFACT_PREFIX', 'report_artifacts')
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already holds DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def artifact_name(self, kind, key, extension):
+        return f"{self.prefix}/{kind}/{key[:2]}/{key}.{extension}"
+
+    def exists(self, name):
+        return default_storage.exists(name)
+
+    def submit(self, job_key, task_path, *args):
+        """
+        Queue ``task_path(*args)`` unless a job with ``job_key`` is already
+        queued or running; returns its future.
+        """
+        with self._lock:
+            future = self._jobs.get(job_key)
+            if future is not None and not future.done():
+                return future
+        future = self._get_executor().submit(run_render_task, task_path, args)
+        with self._lock:
+            self._jobs[job_key] = future
+        logger.info(f"Queued report render {job_key}")
+        return future
+
+    def job_error(self, job_key):
+        """
+        The exception of a finished, failed job (reported once, then forgotten
+        so the next request can retry); None otherwise.
+        """
+        with self._lock:
+            future = self._jobs.get(job_key)
+            if future is None or not future.done():
+                return None
+            self._jobs.pop(job_key)
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Report render {job_key} failed: {str(error)}")
+        return error
+
+    def artifact_response(self, request, name, content_type, filename, etag, inline=False):
+        """Stream a stored artifact, honouring If-None-Match and single byte ranges."""
+        etag = f'"{etag}"'
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponse(status=304)
+        else:
+            size = default_storage.size(name)
+            match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+            if_range = request.META.get('HTTP_IF_RANGE')
+            if match and any(match.groups()) and (not if_range or if_range == etag):
+                start, end = match.groups()
+                if start:
+                    start, end = int(start), min(int(end), size - 1) if end else size - 1
+                else:
+                    start, end = max(size - int(end), 0), size - 1
+                if start >= size or start > end:
+                    response = HttpResponse(status=416)
+                    response['Content-Range'] = f"bytes */{size}"
+                    return response
+                artifact = default_storage.open(name, 'rb')
+                artifact.seek(start)
+                response = StreamingHttpResponse(
+                    self._read_range(artifact, end - start + 1), status=206, content_type=content_type
+                )
+                response['Content-Range'] = f"bytes {start}-{end}/{size}"
+                response['Content-Length'] = str(end - start + 1)
+            else:
+                response = FileResponse(
+                    default_storage.open(name, 'rb'), content_type=content_type,
+                    as_attachment=not inline, filename=filename,
+                )
+                response['Content-Length'] = str(size)
+            disposition = 'inline' if inline else 'attachment'
+            response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        return response
+
+    @staticmethod
+    def _read_range(artifact, length):
+        try:
+            while length > 0:
+                chunk = artifact.read(min(STREAM_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+        finally:
+            artifact.close()
+
+
+report_renderer = ReportRenderingService()
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third-party apps
     "rest_framework",
     "rest_framework_simplejwt",
@@ -209,6 +210,142 @@ REST_FRAMEWORK = {
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Caches - a shared Redis cache is used when REDIS_URL is set
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    "llm": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "llm",
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "llm-responses",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))},
+    },
+}
+
+# OpenAI response cache
+LLM_CACHE_ALIAS = "llm"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+
+# Map-reduce MCQ generation over full documents
+MCQ_PIPELINE_CHUNK_TOKENS = int(os.getenv("MCQ_PIPELINE_CHUNK_TOKENS", "3000"))
+MCQ_PIPELINE_QUESTIONS_PER_REQUEST = int(os.getenv("MCQ_PIPELINE_QUESTIONS_PER_REQUEST", "6"))
+MCQ_PIPELINE_MAX_WORKERS = int(os.getenv("MCQ_PIPELINE_MAX_WORKERS", "4"))
+MCQ_PIPELINE_REQUESTS_PER_MINUTE = int(os.getenv("MCQ_PIPELINE_REQUESTS_PER_MINUTE", "60"))
+
+# PDF text extraction (cached by content hash; large PDFs are split across a process pool)
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(BASE_DIR, "media", "pdf_text_cache"))
+PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "100"))
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Columnar per-sample variant store (dna_sequencing)
+VARIANT_STORE_DIR = os.getenv("VARIANT_STORE_DIR", os.path.join(BASE_DIR, "media", "variant_store"))
+VARIANT_IMPORT_CHUNK_SIZE = int(os.getenv("VARIANT_IMPORT_CHUNK_SIZE", "100000"))
+# BED/GFF3 region files (genes.bed, transcripts.gff3, pharmacogenes.bed, ...) for variant annotation
+GENOMIC_ANNOTATION_DIR = os.getenv("GENOMIC_ANNOTATION_DIR", os.path.join(BASE_DIR, "media", "genomic_annotation"))
+# Generated genomic reports, cached per (sample, pipeline version, database version)
+GENOMIC_REPORT_CACHE_DIR = os.getenv("GENOMIC_REPORT_CACHE_DIR", os.path.join(BASE_DIR, "media", "genomic_reports"))
+GENOMIC_REPORT_PIPELINE_VERSION = os.getenv("GENOMIC_REPORT_PIPELINE_VERSION", "AI-Genomics v4.2.1")
+GENOMIC_REPORT_DATABASE_VERSION = os.getenv("GENOMIC_REPORT_DATABASE_VERSION", "2025-09-01")
+# Batch AI genomics jobs ("local" process pool or "celery"); per-model limits as "deepvariant=2,multiomics=1"
+GENOMICS_BATCH_BACKEND = os.getenv("GENOMICS_BATCH_BACKEND", "local")
+GENOMICS_BATCH_WORKERS = int(os.getenv("GENOMICS_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+GENOMICS_BATCH_DEFAULT_CONCURRENCY = int(os.getenv("GENOMICS_BATCH_DEFAULT_CONCURRENCY", "2"))
+GENOMICS_BATCH_MODEL_CONCURRENCY = os.getenv("GENOMICS_BATCH_MODEL_CONCURRENCY", "multiomics=1")
+GENOMICS_BATCH_ITEM_TIMEOUT = int(os.getenv("GENOMICS_BATCH_ITEM_TIMEOUT", "3600"))
+GENOMICS_BATCH_RESULTS_PREFIX = os.getenv("GENOMICS_BATCH_RESULTS_PREFIX", "genomics_batches")
+
+# Shared clinical image pipeline (backend/imaging.py): analysis tensor edge and in-process tensor cache budget
+IMAGING_ANALYSIS_SIZE = int(os.getenv("IMAGING_ANALYSIS_SIZE", "512"))
+IMAGING_TENSOR_CACHE_MB = int(os.getenv("IMAGING_TENSOR_CACHE_MB", "64"))
+
+# Shared upload pipeline (backend/uploads.py): uploads are SHA-256 hashed while streamed and
+# stored once per content in default storage
+FILE_UPLOAD_HANDLERS = [
+    "backend.uploads.HashingMemoryFileUploadHandler",
+    "backend.uploads.HashingTemporaryFileUploadHandler",
+]
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_BLOB_PREFIX = os.getenv("UPLOAD_BLOB_PREFIX", "blobs")
+
+# Deep Zoom tile pyramids for digital pathology slides (tiles written to default storage)
+PATHOLOGY_TILE_SIZE = int(os.getenv("PATHOLOGY_TILE_SIZE", "256"))
+PATHOLOGY_TILE_FORMAT = os.getenv("PATHOLOGY_TILE_FORMAT", "jpeg")
+PATHOLOGY_TILE_QUALITY = int(os.getenv("PATHOLOGY_TILE_QUALITY", "85"))
+PATHOLOGY_TILE_PREFIX = os.getenv("PATHOLOGY_TILE_PREFIX", "pathology_tiles")
+PATHOLOGY_TILE_CACHE_MB = int(os.getenv("PATHOLOGY_TILE_CACHE_MB", "128"))
+PATHOLOGY_TILER_WORKERS = int(os.getenv("PATHOLOGY_TILER_WORKERS", str(min(4, os.cpu_count() or 1))))
+PATHOLOGY_TILER_BLOCK_LEVELS = int(os.getenv("PATHOLOGY_TILER_BLOCK_LEVELS", "3"))
+# Largest compressed (non-OpenSlide, non-raw) slide decoded into memory for tiling
+PATHOLOGY_TILER_MAX_DECODE_PIXELS = int(os.getenv("PATHOLOGY_TILER_MAX_DECODE_PIXELS", "100000000"))
+
+# Background report rendering (backend/report_rendering.py): PDF/JSON artifacts in default storage
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+REPORT_ARTIFACT_PREFIX = os.getenv("REPORT_ARTIFACT_PREFIX", "report_artifacts")
+# Report access audit events are buffered and inserted in batches
+REPORT_ACCESS_LOG_BATCH_SIZE = int(os.getenv("REPORT_ACCESS_LOG_BATCH_SIZE", "100"))
+REPORT_ACCESS_LOG_FLUSH_SECONDS = float(os.getenv("REPORT_ACCESS_LOG_FLUSH_SECONDS", "2"))
+REPORT_ACCESS_LOG_MAX_BUFFERED = int(os.getenv("REPORT_ACCESS_LOG_MAX_BUFFERED", "50000"))
+# Buffered audit writes (backend/buffered_writes.py) are journaled here until written,
+# so a killed process loses none; use a persistent volume, or "" to disable. Journals
+# are claimed by checking whether their writer's PID is alive, so each host needs its
+# own directory: never share one between hosts or containers with separate PID spaces
+BUFFERED_WRITE_JOURNAL_DIR = os.getenv("BUFFERED_WRITE_JOURNAL_DIR", "/var/lib/backend/write_journal")
+# Bed capacity used by the admission census until Ward rows are configured
+HOSPITAL_BED_CAPACITY = int(os.getenv("HOSPITAL_BED_CAPACITY", "200"))
+HOSPITAL_PATIENTS_PER_NURSE = int(os.getenv("HOSPITAL_PATIENTS_PER_NURSE", "5"))
+# Admission forecasting (refreshed by run_admission_forecasts)
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "365"))
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "14"))
+FORECAST_SEASON_DAYS = int(os.getenv("FORECAST_SEASON_DAYS", "7"))
+
+# Dr. Max chatbot session store ("memory", "sqlite" or "redis")
+CHATBOT_SESSION_STORE = os.getenv("CHATBOT_SESSION_STORE", "memory")
+CHATBOT_REDIS_URL = os.getenv("CHATBOT_REDIS_URL", os.getenv("REDIS_URL", ""))
+CHATBOT_SQLITE_PATH = os.getenv("CHATBOT_SQLITE_PATH", "")
+CHATBOT_MAX_MESSAGES_PER_ROOM = int(os.getenv("CHATBOT_MAX_MESSAGES_PER_ROOM", "200"))
+CHATBOT_MAX_ROOMS = int(os.getenv("CHATBOT_MAX_ROOMS", "1000"))
+CHATBOT_ROOM_TTL_SECONDS = int(os.getenv("CHATBOT_ROOM_TTL_SECONDS", "86400"))
+
+# Site-specific radiology dictation rules (JSON), merged over the built-in rule sets and hot-reloaded
+RADIOLOGY_TERMINOLOGY_RULES_FILE = os.getenv("RADIOLOGY_TERMINOLOGY_RULES_FILE", "")
+
+# Incremental dictation session state (use a shared cache alias when running several workers)
+RADIOLOGY_DICTATION_CACHE_ALIAS = os.getenv("RADIOLOGY_DICTATION_CACHE_ALIAS", "default")
+RADIOLOGY_DICTATION_SESSION_TTL_SECONDS = int(os.getenv("RADIOLOGY_DICTATION_SESSION_TTL_SECONDS", "3600"))
+
+# Compiled Netflix permission scopes (use a shared cache alias when running several workers;
+# with a per-process cache, role changes reach other workers within the timeout)
+NETFLIX_SCOPE_CACHE_ALIAS = os.getenv("NETFLIX_SCOPE_CACHE_ALIAS", "default")
+NETFLIX_SCOPE_CACHE_SECONDS = int(os.getenv("NETFLIX_SCOPE_CACHE_SECONDS", "300"))
+# Playback progress heartbeats are coalesced per (profile, title, episode) and upserted in batches
+NETFLIX_PROGRESS_BATCH_SIZE = int(os.getenv("NETFLIX_PROGRESS_BATCH_SIZE", "500"))
+NETFLIX_PROGRESS_FLUSH_SECONDS = float(os.getenv("NETFLIX_PROGRESS_FLUSH_SECONDS", "60"))
+# Precomputed home rows (netflix/home_rows.py, refresh_home_rows)
+NETFLIX_HOME_ROW_SIZE = int(os.getenv("NETFLIX_HOME_ROW_SIZE", "30"))
+NETFLIX_HOME_NEIGHBORS = int(os.getenv("NETFLIX_HOME_NEIGHBORS", "50"))
+NETFLIX_HOME_POPULAR_DAYS = int(os.getenv("NETFLIX_HOME_POPULAR_DAYS", "30"))
+NETFLIX_HOME_SIMILARITY_SECONDS = int(os.getenv("NETFLIX_HOME_SIMILARITY_SECONDS", "21600"))
+# Catalog search (netflix/search.py): largest keyset page, and the pg_trgm word
+# similarity a misspelled query needs to match a title name
+NETFLIX_SEARCH_MAX_PAGE_SIZE = int(os.getenv("NETFLIX_SEARCH_MAX_PAGE_SIZE", "100"))
+NETFLIX_SEARCH_FUZZY_THRESHOLD = float(os.getenv("NETFLIX_SEARCH_FUZZY_THRESHOLD", "0.4"))
+# Content audit entries from signal handlers are buffered and inserted in batches
+NETFLIX_AUDIT_LOG_BATCH_SIZE = int(os.getenv("NETFLIX_AUDIT_LOG_BATCH_SIZE", "200"))
+NETFLIX_AUDIT_LOG_FLUSH_SECONDS = float(os.getenv("NETFLIX_AUDIT_LOG_FLUSH_SECONDS", "2"))
+NETFLIX_AUDIT_LOG_MAX_BUFFERED = int(os.getenv("NETFLIX_AUDIT_LOG_MAX_BUFFERED", "50000"))
+# Bulk catalog operations (netflix/bulk.py) commit this many titles per transaction and
+# run as background jobs on this many threads per process
+NETFLIX_BULK_CHUNK_SIZE = int(os.getenv("NETFLIX_BULK_CHUNK_SIZE", "1000"))
+NETFLIX_BULK_WORKERS = int(os.getenv("NETFLIX_BULK_WORKERS", "1"))
+# Queued or running bulk jobs idle this long are treated as lost with their process and requeued
+NETFLIX_BULK_JOB_STALE_SECONDS = int(os.getenv("NETFLIX_BULK_JOB_STALE_SECONDS", "900"))
+
 # Google reCAPTCHA Settings
 RECAPTCHA_SITE_KEY = os.getenv("RECAPTCHA_SITE_KEY")
 RECAPTCHA_SECRET_KEY = os.getenv("RECAPTCHA_SECRET_KEY")
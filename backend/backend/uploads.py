@@ -0,0 +1,252 @@
+"""
+Shared upload pipeline for the clinical apps.
+
+- The hashing upload handlers (FILE_UPLOAD_HANDLERS) feed every chunk of a
+  multipart upload to SHA-256 while Django parses the request, so uploads
+  arrive with ``upload.sha256`` already set and are never read again just to
+  hash them. Chunks are UPLOAD_CHUNK_SIZE bytes; files above
+  FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk, so memory per upload stays
+  bounded whatever the file size.
+- ``ContentAddressedStorage`` stores each distinct content once under
+  ``<UPLOAD_BLOB_PREFIX>/ab/cd/<sha256><ext>`` and records it in StoredBlob.
+  Saving content that is already stored (the same DICOM, slide or photo
+  uploaded again, from any department) returns the stored name; no storage
+  write happens. FileFields opt in with ``storage=blob_storage``.
+
+Reference counts belong to the rows, not to storage calls: the
+``track_blob_references`` signals add a reference when a saved row starts
+pointing at a blob and release it when the row is deleted or points
+elsewhere, so clearing a file, or saving the same content again, changes the
+count at most once. Blobs that reach zero references are kept until
+``purge_unreferenced_blobs`` removes them after a grace period, so a
+concurrent re-upload of the same content can still revive them.
+"""
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import Storage, storages
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from backend import imaging
+
+logger = logging.getLogger(__name__)
+
+
+class _HashingMixin:
+    """Hash the chunks this handler consumes; attach the digest to the finished file."""
+    chunk_size = getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 * 1024)
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler claims a file by raising StopFutureHandlers
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed_on = super().receive_data_chunk(raw_data, start)
+        if passed_on is None:
+            # This handler kept the chunk, so it is the one producing the file
+            self.digest.update(raw_data)
+        return passed_on
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        if upload is not None:
+            upload.sha256 = self.digest.hexdigest()
+        return upload
+
+
+class HashingMemoryFileUploadHandler(_HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(_HashingMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def upload_sha256(source):
+    """SHA-256 of an upload: the digest computed while streaming it, else hashed in chunks."""
+    return getattr(source, 'sha256', None) or imaging.content_hash(source, 'sha256')
+
+
+class ContentAddressedStorage(Storage):
+    """Deduplicating storage over the default storage, keyed by SHA-256."""
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix or getattr(settings, 'UPLOAD_BLOB_PREFIX', 'blobs')
+
+    @property
+    def backend(self):
+        return storages['default']
+
+    def blob_name(self, digest, extension):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def _touch(self, digest):
+        """
+        Mark a stored blob as just used, so a purge running now skips it;
+        returns its name, or None if not stored.
+        """
+        from hospital.models import StoredBlob
+
+        with transaction.atomic():
+            if not StoredBlob.objects.filter(sha256=digest).update(last_referenced_at=timezone.now()):
+                return None
+            return StoredBlob.objects.filter(sha256=digest).values_list('name', flat=True).get()
+
+    def save(self, name, content, max_length=None):
+        """
+        Store ``content`` unless identical content is already stored; returns
+        the blob name. ``name`` only contributes its extension.
+        """
+        from hospital.models import StoredBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            from django.core.files import File
+            content = File(content, name)
+        digest = upload_sha256(content)
+        existing = self._touch(digest)
+        if existing is not None:
+            logger.info(f"Deduplicated upload {name} as {existing}")
+            return existing
+
+        blob_name = self.blob_name(digest, os.path.splitext(name)[1].lower()[:16])
+        content.seek(0)
+        if not self.backend.exists(blob_name):
+            saved = self.backend.save(blob_name, content, max_length=max_length)
+            if saved != blob_name:
+                # Written concurrently under the same name; identical bytes, keep one
+                self.backend.delete(saved)
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(
+                    sha256=digest, name=blob_name, size=content.size, ref_count=0,
+                    content_type=getattr(content, 'content_type', '') or '',
+                )
+            return blob_name
+        except IntegrityError:
+            # Another upload of the same content registered it first
+            existing = self._touch(digest)
+            if existing is not None and existing != blob_name:
+                self.backend.delete(blob_name)
+            return existing or blob_name
+
+    def acquire(self, name):
+        """Add one reference to the blob ``name``; returns False for files that are not blobs."""
+        from hospital.models import StoredBlob
+
+        return bool(StoredBlob.objects.filter(name=name).update(
+            ref_count=F('ref_count') + 1, last_referenced_at=timezone.now()
+        ))
+
+    def release(self, name):
+        """Drop one reference to the blob ``name``; returns False for files that are not blobs."""
+        from hospital.models import StoredBlob
+
+        return bool(StoredBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, last_referenced_at=timezone.now()
+        )) or StoredBlob.objects.filter(name=name).exists()
+
+    def delete(self, name):
+        from hospital.models import StoredBlob
+
+        # A blob is released by the row that referenced it (track_blob_references),
+        # once that row is saved without it or deleted
+        if not StoredBlob.objects.filter(name=name).exists():
+            # Files stored before the field moved to blob storage
+            self.backend.delete(name)
+
+    def purge(self, older_than):
+        """Delete blobs unreferenced since ``older_than``; returns (blobs, bytes) removed."""
+        from hospital.models import StoredBlob
+
+        removed = freed = 0
+        candidates = StoredBlob.objects.filter(
+            ref_count=0, last_referenced_at__lt=older_than
+        ).values_list('pk', flat=True)
+        for pk in list(candidates):
+            with transaction.atomic():
+                # Locked, so a concurrent upload of the same content waits and then re-stores it
+                blob = StoredBlob.objects.select_for_update().filter(
+                    pk=pk, ref_count=0, last_referenced_at__lt=older_than
+                ).first()
+                if blob is None:
+                    continue
+                self.backend.delete(blob.name)
+                blob.delete()
+            removed += 1
+            freed += blob.size
+        return removed, freed
+
+    # Reads go straight to the underlying storage
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+_blob_storage = ContentAddressedStorage()
+
+
+def blob_storage():
+    """Callable for ``FileField(storage=...)``, so migrations reference it by path."""
+    return _blob_storage
+
+
+def track_blob_references(model, *field_names):
+    """
+    Count the blob references held by ``field_names`` of ``model``: a saved
+    row acquires the blobs it newly points at and releases the ones it no
+    longer points at, and a deleted row releases all of its blobs.
+    """
+    def release_later(names):
+        names = [name for name in names if name]
+        if names:
+            transaction.on_commit(lambda: [_blob_storage.release(name) for name in names])
+
+    def remember(sender, instance, **kwargs):
+        stored = None
+        if not instance._state.adding and instance.pk is not None:
+            stored = sender.objects.filter(pk=instance.pk).values(*field_names).first()
+        instance._stored_blob_names = stored or dict.fromkeys(field_names)
+
+    def saved(sender, instance, **kwargs):
+        previous = instance.__dict__.pop('_stored_blob_names', None)
+        if previous is None:
+            return
+        changed = [field for field in field_names if (previous[field] or '') != (getattr(instance, field).name or '')]
+        # Acquired in the saving transaction, released only once it commits
+        for field in changed:
+            if getattr(instance, field).name:
+                _blob_storage.acquire(getattr(instance, field).name)
+        release_later(previous[field] for field in changed)
+
+    def deleted(sender, instance, **kwargs):
+        release_later(getattr(instance, field).name for field in field_names)
+
+    pre_save.connect(remember, sender=model, weak=False, dispatch_uid=f'blob_remember_{model._meta.label}')
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=f'blob_replaced_{model._meta.label}')
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'blob_deleted_{model._meta.label}')
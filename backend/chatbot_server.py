@@ -19,6 +19,7 @@ import django
 django.setup()
 
 from secureneat.services.openai_service import openai_service
+from secureneat.services.chat_session_store import get_chat_session_store
 
 # Configure logging
 logging.basicConfig(
@@ -28,15 +29,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class DrMaxChatBot:
-    def __init__(self):
-        self.connected_clients = set()
-        self.chat_rooms = {}  # roomId -> list of messages
-        
+    def __init__(self, session_store=None):
+        self.session_store = session_store or get_chat_session_store()
+        self.room_clients = {}  # roomId -> set of websockets connected to this process
+        self.room_listeners = {}  # roomId -> task relaying messages from other processes
+
+    @property
+    def connected_clients(self):
+        return set().union(*self.room_clients.values())
+
+    def client_key(self, websocket):
+        """Identify a websocket across chatbot processes sharing a session store"""
+        return f"{self.session_store.node_id}:{id(websocket)}"
+
     async def register_client(self, websocket, user_id, room_id):
         """Register a new client connection"""
-        self.connected_clients.add(websocket)
         websocket.user_id = user_id
         websocket.room_id = room_id
+        self.room_clients.setdefault(room_id, set()).add(websocket)
+        if room_id not in self.room_listeners:
+            self.room_listeners[room_id] = asyncio.create_task(self.relay_room_messages(room_id))
         
         logger.info(f"Client {user_id} connected to room {room_id}")
         
@@ -48,23 +60,50 @@ class DrMaxChatBot:
         }))
         
         # Send chat history if available
-        if room_id in self.chat_rooms:
+        history = await self.session_store.get_history(room_id)
+        if history:
             await websocket.send(json.dumps({
                 "type": "history",
-                "messages": self.chat_rooms[room_id]
+                "messages": history
             }))
 
     async def unregister_client(self, websocket):
         """Unregister a client connection"""
-        self.connected_clients.discard(websocket)
+        room_id = getattr(websocket, 'room_id', None)
+        clients = self.room_clients.get(room_id)
+        if clients is not None:
+            clients.discard(websocket)
+            if not clients:
+                del self.room_clients[room_id]
+                listener = self.room_listeners.pop(room_id, None)
+                if listener:
+                    listener.cancel()
         if hasattr(websocket, 'user_id'):
             logger.info(f"Client {websocket.user_id} disconnected")
 
+    async def relay_room_messages(self, room_id):
+        """Forward messages stored in a room to every other client watching it"""
+        try:
+            async for event in self.session_store.subscribe(room_id):
+                payload = json.dumps({"type": "room_message", "message": event["message"]})
+                for client in list(self.room_clients.get(room_id, ())):
+                    if self.client_key(client) == event.get("origin"):
+                        continue
+                    try:
+                        await client.send(payload)
+                    except websockets.exceptions.ConnectionClosed:
+                        pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Room listener for {room_id} stopped: {e}")
+            self.room_listeners.pop(room_id, None)
+
     async def handle_message(self, websocket, message_data):
         """Handle incoming message from client"""
         try:
             message_type = message_data.get("type")
-            room_id = message_data.get("roomId")
+            room_id = message_data.get("roomId") or getattr(websocket, 'room_id', None)
             
             if message_type == "message":
                 await self.handle_chat_message(websocket, message_data)
@@ -83,26 +122,18 @@ class DrMaxChatBot:
     async def handle_chat_message(self, websocket, message_data):
         """Handle chat message and generate AI response"""
         user_message = message_data.get("message", "").strip()
-        room_id = message_data.get("roomId")
+        room_id = message_data.get("roomId") or websocket.room_id
         user_id = message_data.get("userId")
         
         if not user_message:
             return
             
         # Store user message
-        if room_id not in self.chat_rooms:
-            self.chat_rooms[room_id] = []
-            
-        user_msg = {
-            "id": f"user_{len(self.chat_rooms[room_id])}",
-            "content": user_message,
-            "sender": "user",
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        self.chat_rooms[room_id].append(user_msg)
+        origin = self.client_key(websocket)
+        user_msg = await self.session_store.append_message(room_id, "user", user_message, origin=origin)
         
         # Generate unique message ID for streaming response
-        message_id = f"bot_{len(self.chat_rooms[room_id])}"
+        message_id = f"bot_reply_{user_msg['id']}"
         
         # Start AI response
         await websocket.send(json.dumps({
@@ -120,13 +151,8 @@ class DrMaxChatBot:
             await self.stream_response(websocket, message_id, ai_response)
             
             # Store bot response
-            bot_msg = {
-                "id": message_id,
-                "content": ai_response,
-                "sender": "bot", 
-                "timestamp": asyncio.get_event_loop().time()
-            }
-            self.chat_rooms[room_id].append(bot_msg)
+            await self.session_store.append_message(room_id, "bot", ai_response, origin=origin,
+                                                    message_id=message_id)
             
         except Exception as e:
             logger.error(f"Error generating AI response: {e}")
@@ -171,8 +197,7 @@ class DrMaxChatBot:
 
     async def handle_new_chat(self, websocket, room_id):
         """Handle new chat request"""
-        if room_id in self.chat_rooms:
-            del self.chat_rooms[room_id]
+        await self.session_store.clear_room(room_id)
             
         await websocket.send(json.dumps({
             "type": "status",
@@ -258,6 +283,8 @@ async def main():
         server.close()
         await server.wait_closed()
         logger.info("👋 Dr. Max AI Chatbot Server stopped")
+    finally:
+        await chatbot.session_store.close()
 
 if __name__ == "__main__":
     try:
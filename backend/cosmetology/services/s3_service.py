@@ -13,6 +13,7 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from botocore.exceptions import ClientError, NoCredentialsError
+from backend import imaging
 import logging
 
 logger = logging.getLogger(__name__)
@@ -271,6 +272,19 @@ class CosmetologyS3Service:
                 'status': 'uploaded'
             }
             
+            if (file_obj.content_type or '').startswith('image/'):
+                # Dimensions from the header only; skin photos are not decoded on upload
+                try:
+                    image_info = imaging.probe(file_obj)
+                    file_metadata['image'] = {
+                        'width': image_info.width,
+                        'height': image_info.height,
+                        'format': image_info.format,
+                        'dpi': image_info.dpi
+                    }
+                except Exception as e:
+                    logger.warning(f"Could not read image header for {original_name}: {e}")
+            
             # Save file metadata
             metadata_key = f"{file_path}metadata/{file_id}.json"
             self._upload_json_to_s3(metadata_key, file_metadata)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:52
+
+import backend.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dentistry', '0005_dentistryanalysis_analyzed_by_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cancerdetectionimage',
+            name='original_image',
+            field=models.FileField(storage=backend.uploads.blob_storage, upload_to='cancer_detection/original/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='dentalaianalysis',
+            name='input_image',
+            field=models.FileField(blank=True, null=True, storage=backend.uploads.blob_storage, upload_to='dental_ai_input/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='dentalxray',
+            name='image_file',
+            field=models.FileField(storage=backend.uploads.blob_storage, upload_to='dental_xrays/%Y/%m/'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import uuid
 
+from backend.uploads import blob_storage, track_blob_references
+
 class Patient(models.Model):
     """Extended patient model for dental care"""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dental_patient')
@@ -220,7 +222,7 @@ class DentalXray(models.Model):
     
     xray_type = models.CharField(max_length=20, choices=XRAY_TYPE)
     tooth_region = models.CharField(max_length=50, blank=True)
-    image_file = models.FileField(upload_to='dental_xrays/%Y/%m/')
+    image_file = models.FileField(upload_to='dental_xrays/%Y/%m/', storage=blob_storage)
     
     findings = models.TextField()
     diagnosis = models.TextField(blank=True)
@@ -409,7 +411,7 @@ class CancerDetectionImage(models.Model):
     cancer_detection = models.ForeignKey(CancerDetection, on_delete=models.CASCADE, related_name='images')
     
     image_type = models.CharField(max_length=20, choices=IMAGE_TYPE_CHOICES)
-    original_image = models.FileField(upload_to='cancer_detection/original/%Y/%m/')
+    original_image = models.FileField(upload_to='cancer_detection/original/%Y/%m/', storage=blob_storage)
     processed_image = models.FileField(upload_to='cancer_detection/processed/%Y/%m/', null=True, blank=True)
     thumbnail = models.FileField(upload_to='cancer_detection/thumbnails/%Y/%m/', null=True, blank=True)
     
@@ -693,7 +695,7 @@ class DentalAIAnalysis(models.Model):
     dentist = models.ForeignKey(Dentist, on_delete=models.CASCADE, related_name='ai_analyses')
     
     analysis_type = models.CharField(max_length=30, choices=ANALYSIS_TYPE)
-    input_image = models.FileField(upload_to='dental_ai_input/%Y/%m/', null=True, blank=True)
+    input_image = models.FileField(upload_to='dental_ai_input/%Y/%m/', storage=blob_storage, null=True, blank=True)
     processed_image = models.FileField(upload_to='dental_ai_output/%Y/%m/', null=True, blank=True)
     
     # AI Analysis Results
@@ -1026,3 +1028,9 @@ class DentistryAnalysis(models.Model):
     class Meta:
         db_table = 'dentistry_s3_analyses'
         ordering = ['-created_at']
+
+
+# Uploaded images are stored once per content; their blob references go with the rows
+track_blob_references(DentalXray, 'image_file')
+track_blob_references(CancerDetectionImage, 'original_image')
+track_blob_references(DentalAIAnalysis, 'input_image')
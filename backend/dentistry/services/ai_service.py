@@ -1,7 +1,5 @@
 import cv2
 import numpy as np
-from PIL import Image
-import io
 import base64
 import json
 from typing import Dict, List, Tuple, Optional
@@ -10,6 +8,8 @@ import random
 import hashlib
 import logging
 
+from backend import imaging
+
 # Set up logging for cancer detection
 logger = logging.getLogger(__name__)
 
@@ -564,11 +564,12 @@ class DentalAIService:
         
         # Mock image processing
         try:
-            image = Image.open(io.BytesIO(image_data))
-            image_array = np.array(image)
+            # Dimensions come from the header; the model input is a small grayscale tensor
+            image_info = imaging.probe(image_data)
+            image_array = imaging.analysis_tensor(image_data, mode='L')
             
             # Simulate AI processing
-            analysis_results = self._process_xray_image(image_array, analysis_type)
+            analysis_results = self._process_xray_image(image_array, analysis_type, image_info)
             
             processing_time = (datetime.now() - processing_start).total_seconds()
             analysis_results['processing_time'] = processing_time
@@ -582,14 +583,16 @@ class DentalAIService:
                 'success': False
             }
     
-    def _process_xray_image(self, image_array: np.ndarray, analysis_type: str) -> Dict:
+    def _process_xray_image(self, image_array: np.ndarray, analysis_type: str,
+                            image_info: Optional[imaging.ImageInfo] = None) -> Dict:
         """Process X-ray image and generate mock AI analysis"""
         
         # Mock comprehensive dental analysis
         base_analysis = {
             'success': True,
             'image_quality': random.choice(['excellent', 'good', 'fair']),
-            'image_dimensions': image_array.shape[:2],
+            'image_dimensions': (image_info.height, image_info.width) if image_info else image_array.shape[:2],
+            'analysis_dimensions': image_array.shape[:2],
             'detected_structures': {
                 'teeth_count': random.randint(24, 32),
                 'visible_roots': random.randint(20, 32),
@@ -6,6 +6,7 @@ import os
 import io
 from datetime import datetime, timezone
 from django.conf import settings
+from django.db.models import Count, Max
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
@@ -22,6 +23,11 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 import base64
 import json
 
+from backend.report_rendering import report_renderer, artifact_key, store_artifact
+
+# Bump when the report layout changes so existing PDFs are re-rendered
+ARTIFACT_VERSION = '1'
+
 
 class CancerDetectionReportGenerator:
     """Comprehensive Cancer Detection Report Generator"""
@@ -242,12 +248,10 @@ class CancerDetectionReportGenerator:
             ['Patient Name:', patient.user.get_full_name()],
             ['Patient ID:', patient.patient_id],
             ['Date of Birth:', patient.date_of_birth.strftime("%B %d, %Y") if patient.date_of_birth else 'Not Available'],
-            ['Gender:', patient.gender.title() if patient.gender else 'Not Specified'],
             ['Phone:', patient.phone or 'Not Available'],
             ['Email:', patient.user.email or 'Not Available'],
-            ['Address:', patient.address or 'Not Available'],
-            ['Emergency Contact:', patient.emergency_contact_name or 'Not Available'],
-            ['Emergency Phone:', patient.emergency_contact_phone or 'Not Available']
+            ['Emergency Contact:', patient.emergency_contact or 'Not Available'],
+            ['Emergency Phone:', patient.emergency_phone or 'Not Available']
         ]
         
         patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
@@ -780,3 +784,35 @@ class CancerDetectionReportGenerator:
                 "Annual screening recommended",
                 "Contact if any concerning symptoms develop"
             ]
+
+
+def report_artifact(cancer_detection):
+    """
+    (artifact name, key) of the PDF report for the detection's current data.
+    The key changes whenever the detection, its images or its
+    acknowledgments change.
+    """
+    images = cancer_detection.images.aggregate(
+        count=Count('id'), uploaded=Max('uploaded_at'), analyzed=Max('analyzed_at')
+    )
+    acknowledgments = cancer_detection.cancerdetectionacknowledgment_set.aggregate(
+        count=Count('id'), last=Max('acknowledged_at')
+    )
+    key = artifact_key(
+        'cancer_detection', cancer_detection.detection_id, cancer_detection.updated_at.isoformat(),
+        images['count'], images['uploaded'], images['analyzed'],
+        acknowledgments['count'], acknowledgments['last'], ARTIFACT_VERSION,
+    )
+    return report_renderer.artifact_name('cancer_reports', key, 'pdf'), key
+
+
+def render_cancer_report(detection_pk, name):
+    """Render task (runs in a render worker): build the PDF and store it as ``name``."""
+    from ..models import CancerDetection
+
+    if report_renderer.exists(name):
+        return name
+    detection = CancerDetection.objects.select_related('patient__user', 'dentist__user').get(pk=detection_pk)
+    pdf_buffer = CancerDetectionReportGenerator().generate_comprehensive_report(detection)
+    store_artifact(name, pdf_buffer.getvalue())
+    return name
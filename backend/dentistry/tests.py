@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from hospital.models import StoredBlob
+
+from .models import DentalXray, Dentist, Patient
+
+
+class BlobReferenceCountTests(TestCase):
+    """Rows sharing one deduplicated upload each hold exactly one reference."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        User = get_user_model()
+        self.patient = Patient.objects.create(
+            user=User.objects.create(username='blob-patient', email='blob-patient@example.com'),
+            patient_id='BLOB-P1', date_of_birth=date(1990, 1, 1), phone='1', emergency_contact='x', emergency_phone='1',
+        )
+        self.dentist = Dentist.objects.create(
+            user=User.objects.create(username='blob-dentist', email='blob-dentist@example.com'),
+            license_number='BLOB-D1', education='DDS', clinic_address='x',
+        )
+
+    def xray(self, content=b'same image bytes'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return DentalXray.objects.create(
+                patient=self.patient, dentist=self.dentist, xray_type='bitewing', findings='',
+                image_file=ContentFile(content, name='scan.png'),
+            )
+
+    def ref_count(self, name):
+        return StoredBlob.objects.get(name=name).ref_count
+
+    def test_shared_upload_is_stored_once(self):
+        first, second = self.xray(), self.xray()
+        self.assertEqual(first.image_file.name, second.image_file.name)
+        self.assertEqual(self.ref_count(first.image_file.name), 2)
+
+    def test_clearing_a_file_releases_one_reference(self):
+        first, second = self.xray(), self.xray()
+        name = first.image_file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image_file.delete(save=True)
+        self.assertEqual(self.ref_count(name), 1)
+        self.assertTrue(second.image_file.storage.exists(name))
+
+    def test_saving_the_same_content_again_keeps_the_count(self):
+        first = self.xray()
+        name = first.image_file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image_file.save('again.png', ContentFile(b'same image bytes'), save=True)
+        self.assertEqual(first.image_file.name, name)
+        self.assertEqual(self.ref_count(name), 1)
+
+    def test_replacing_and_deleting_release_references(self):
+        first = self.xray()
+        old = first.image_file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image_file.save('new.png', ContentFile(b'other image bytes'), save=True)
+        new = first.image_file.name
+        self.assertEqual((self.ref_count(old), self.ref_count(new)), (0, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.ref_count(new), 0)
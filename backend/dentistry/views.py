@@ -2,14 +2,15 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Count, Sum, Q
+from django.urls import reverse
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 import random
-import base64
 
 from subscriptions.permissions import SuperAdminPermission, SubscriptionOrSuperAdminPermission
-from .services.cancer_report_generator import CancerDetectionReportGenerator
+from .services.cancer_report_generator import report_artifact
+from backend.report_rendering import report_renderer
 
 from .models import (
     Patient, Dentist, DentalHistory, Appointment, Treatment,
@@ -617,55 +618,54 @@ class CancerDetectionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    @action(detail=True, methods=['get'])
-    def generate_pdf_report(self, request, pk=None):
-        """Generate comprehensive PDF report for cancer detection"""
+    def _queue_pdf_report(self, detection):
+        """
+        Queue the PDF for the detection's current data unless it is already
+        rendered; returns (name, key, status, error) with status ready/rendering/failed
+        """
+        name, key = report_artifact(detection)
+        if report_renderer.exists(name):
+            return name, key, 'ready', None
+        error = report_renderer.job_error(name)
+        if error is not None:
+            return name, key, 'failed', error
+        report_renderer.submit(
+            name, 'dentistry.services.cancer_report_generator.render_cancer_report', detection.pk, name
+        )
+        return name, key, 'rendering', None
+
+    def _pdf_report_response(self, request, inline):
         detection = self.get_object()
-        
-        try:
-            # Generate the PDF report
-            report_generator = CancerDetectionReportGenerator()
-            pdf_buffer = report_generator.generate_comprehensive_report(detection)
-            
-            # Create response with PDF
-            response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
+        name, key, report_status, error = self._queue_pdf_report(detection)
+        if report_status == 'ready':
             filename = f"Cancer_Detection_Report_{detection.detection_id}_{detection.detected_at.strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
-            
-        except Exception as e:
+            return report_renderer.artifact_response(
+                request, name, 'application/pdf', filename, etag=key, inline=inline
+            )
+        if error is not None:
             return Response(
-                {'error': f'Failed to generate PDF report: {str(e)}'}, 
+                {'error': f'Failed to generate PDF report: {str(error)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        return Response(
+            {'detection_id': str(detection.detection_id), 'status': 'rendering'},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Retry-After': '2'}
+        )
+
+    @action(detail=True, methods=['get'])
+    def generate_pdf_report(self, request, pk=None):
+        """Download the comprehensive PDF report (202 while it is rendered in the background)"""
+        return self._pdf_report_response(request, inline=False)
 
     @action(detail=True, methods=['get'])
     def preview_pdf_report(self, request, pk=None):
-        """Preview PDF report in browser"""
-        detection = self.get_object()
-        
-        try:
-            # Generate the PDF report
-            report_generator = CancerDetectionReportGenerator()
-            pdf_buffer = report_generator.generate_comprehensive_report(detection)
-            
-            # Create response for inline viewing
-            response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-            filename = f"Cancer_Detection_Report_{detection.detection_id}_{detection.detected_at.strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'inline; filename="{filename}"'
-            
-            return response
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to generate PDF report: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """Preview PDF report in browser (202 while it is rendered in the background)"""
+        return self._pdf_report_response(request, inline=True)
 
     @action(detail=False, methods=['post'])
     def bulk_generate_reports(self, request):
-        """Generate PDF reports for multiple cancer detections"""
+        """Queue PDF reports for multiple cancer detections; download each from its download_url"""
         detection_ids = request.data.get('detection_ids', [])
         
         if not detection_ids:
@@ -676,21 +676,22 @@ class CancerDetectionViewSet(viewsets.ModelViewSet):
         
         try:
             reports = []
-            report_generator = CancerDetectionReportGenerator()
             
             for detection_id in detection_ids:
                 try:
-                    detection = CancerDetection.objects.get(detection_id=detection_id)
-                    pdf_buffer = report_generator.generate_comprehensive_report(detection)
-                    
-                    # Convert to base64 for JSON response
-                    pdf_b64 = base64.b64encode(pdf_buffer.getvalue()).decode('utf-8')
+                    detection = CancerDetection.objects.select_related('patient__user').get(detection_id=detection_id)
+                    _, _, report_status, error = self._queue_pdf_report(detection)
+                    if error is not None:
+                        raise error
                     filename = f"Cancer_Detection_Report_{detection.detection_id}_{detection.detected_at.strftime('%Y%m%d')}.pdf"
                     
                     reports.append({
                         'detection_id': str(detection.detection_id),
                         'filename': filename,
-                        'pdf_data': pdf_b64,
+                        'status': report_status,
+                        'download_url': request.build_absolute_uri(
+                            reverse('dentistry:cancer-detection-generate-pdf-report', args=[detection.pk])
+                        ),
                         'patient_name': detection.patient.user.get_full_name(),
                         'detection_date': detection.detected_at.isoformat()
                     })
@@ -709,7 +710,7 @@ class CancerDetectionViewSet(viewsets.ModelViewSet):
             return Response({
                 'reports': reports,
                 'total_requested': len(detection_ids),
-                'successful': len([r for r in reports if 'pdf_data' in r]),
+                'successful': len([r for r in reports if 'download_url' in r]),
                 'failed': len([r for r in reports if 'error' in r])
             })
             
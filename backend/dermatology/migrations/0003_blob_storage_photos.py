@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:52
+
+import backend.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dermatology', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='skinphoto',
+            name='image_file',
+            field=models.ImageField(storage=backend.uploads.blob_storage, upload_to='dermatology/photos/%Y/%m/%d/'),
+        ),
+    ]
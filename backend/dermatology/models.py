@@ -4,6 +4,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import uuid
 
+from backend.uploads import blob_storage, track_blob_references
+
 User = get_user_model()
 
 
@@ -317,7 +319,7 @@ class SkinPhoto(models.Model):
     photo_type = models.CharField(max_length=20, choices=PHOTO_TYPES)
     anatomical_region = models.CharField(max_length=20, choices=ANATOMICAL_REGIONS)
     specific_location = models.CharField(max_length=200, blank=True)
-    image_file = models.ImageField(upload_to='dermatology/photos/%Y/%m/%d/')
+    image_file = models.ImageField(upload_to='dermatology/photos/%Y/%m/%d/', storage=blob_storage)
     thumbnail = models.ImageField(upload_to='dermatology/thumbnails/%Y/%m/%d/', blank=True)
     description = models.TextField(blank=True)
     magnification = models.CharField(max_length=50, blank=True)
@@ -574,3 +576,7 @@ class AIAnalysis(models.Model):
 
     def __str__(self):
         return f"AI {self.analysis_type} - {self.confidence_level} confidence"
+
+
+# Photos are stored once per content; their blob references go with the rows
+track_blob_references(SkinPhoto, 'image_file')
@@ -12,6 +12,7 @@ from decimal import Decimal
 from django.conf import settings
 from django.utils import timezone
 from ..models import SkinPhoto, AIAnalysis
+from backend import imaging
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,6 +68,15 @@ class DermatologyAIService:
             else:
                 raise ValueError(f"Unsupported analysis type: {analysis_type}")
             
+            image_info = self._probe_photo(skin_photo)
+            if image_info:
+                results.setdefault('feature_analysis', {})['image'] = {
+                    'width': image_info.width,
+                    'height': image_info.height,
+                    'format': image_info.format,
+                    'dpi': image_info.dpi
+                }
+            
             processing_time = time.time() - start_time
             
             # Create and save AI analysis record
@@ -102,6 +112,15 @@ class DermatologyAIService:
             logger.error(f"AI analysis failed for photo {skin_photo.id}: {str(e)}")
             raise
     
+    def _probe_photo(self, skin_photo: SkinPhoto):
+        """Read photo dimensions and format from the file header (no decode)"""
+        try:
+            with skin_photo.image_file.open('rb') as image_file:
+                return imaging.probe(image_file)
+        except Exception as e:
+            logger.warning(f"Could not read image header for photo {skin_photo.id}: {str(e)}")
+            return None
+    
     def _analyze_lesion_detection(self, skin_photo: SkinPhoto) -> Dict[str, Any]:
         """
         Detect and analyze skin lesions
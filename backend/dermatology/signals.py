@@ -1,9 +1,16 @@
+from django.core.files.base import ContentFile
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
+from backend import imaging
 from .models import DermatologyConsultation, DiagnosticProcedure, TreatmentPlan, SkinPhoto
+import io
+import logging
+import os
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 @receiver(pre_save, sender=DermatologyConsultation)
 def generate_consultation_number(sender, instance, **kwargs):
@@ -77,5 +84,19 @@ def skin_photo_uploaded(sender, instance, created, **kwargs):
     """Handle new skin photo upload"""
     if created:
         # Could trigger automatic AI analysis request
-        # Could generate thumbnail if not provided
-        pass
+        if instance.image_file and not instance.thumbnail:
+            generate_skin_photo_thumbnail(instance)
+
+
+def generate_skin_photo_thumbnail(photo, size=(300, 300)):
+    """Store a JPEG thumbnail decoded at reduced size from the photo"""
+    try:
+        output = io.BytesIO()
+        with photo.image_file.open('rb') as image_file:
+            imaging.save_thumbnail(image_file, output, size, 'JPEG', quality=85)
+        name = f"{os.path.splitext(os.path.basename(photo.image_file.name))[0]}_thumb.jpg"
+        photo.thumbnail.save(name, ContentFile(output.getvalue()), save=False)
+        # Avoid re-triggering post_save by using update instead of save
+        SkinPhoto.objects.filter(id=photo.id).update(thumbnail=photo.thumbnail.name)
+    except Exception as e:
+        logger.warning(f"Could not generate thumbnail for skin photo {photo.id}: {str(e)}")
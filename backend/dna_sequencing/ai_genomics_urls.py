@@ -26,6 +26,14 @@ urlpatterns = [
          ai_genomics_views.batch_ai_analysis, 
          name='batch_ai_analysis'),
     
+    path('api/ai-genomics/batch/<str:batch_id>/', 
+         ai_genomics_views.get_batch_ai_progress, 
+         name='batch_ai_progress'),
+    
+    path('api/ai-genomics/batch/<str:batch_id>/items/<int:item_id>/', 
+         ai_genomics_views.get_batch_ai_item_result, 
+         name='batch_ai_item_result'),
+    
     # Dashboard Data
     path('api/ai-genomics/dashboard/', 
          ai_genomics_views.get_ai_genomics_dashboard, 
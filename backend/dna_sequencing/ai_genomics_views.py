@@ -15,6 +15,7 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.urls import reverse
 import json
 import logging
 import numpy as np
@@ -22,6 +23,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any
 import random
 
+from .models import GenomicsBatchJob, GenomicsBatchItem
+from .services.batch_scheduler import batch_scheduler
+
 logger = logging.getLogger(__name__)
 
 class AIGenomicsProcessor:
@@ -262,6 +266,19 @@ class AIGenomicsProcessor:
         }
 
 
+    @classmethod
+    def run_model(cls, model_type: str, sample_size_gb: float = 30.0) -> Dict:
+        """Run the analysis for one model on one sample"""
+        runners = {
+            'deepvariant': cls.simulate_deepvariant_analysis,
+            'gatk': cls.simulate_gatk_analysis,
+            'longread': cls.simulate_longread_analysis,
+            'pharmaco': cls.simulate_pharmaco_analysis,
+            'multiomics': cls.simulate_multiomics_analysis,
+        }
+        return runners.get(model_type, cls.simulate_deepvariant_analysis)(sample_size_gb)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AIGenomicsAPI(View):
     """
@@ -312,20 +329,7 @@ class AIGenomicsAPI(View):
                 }, status=400)
             
             # Simulate analysis based on model type
-            processor = AIGenomicsProcessor()
-            
-            if model_type == 'deepvariant':
-                results = processor.simulate_deepvariant_analysis(sample_size)
-            elif model_type == 'gatk':
-                results = processor.simulate_gatk_analysis(sample_size)
-            elif model_type == 'longread':
-                results = processor.simulate_longread_analysis(sample_size)
-            elif model_type == 'pharmaco':
-                results = processor.simulate_pharmaco_analysis(sample_size)
-            elif model_type == 'multiomics':
-                results = processor.simulate_multiomics_analysis(sample_size)
-            else:
-                results = processor.simulate_deepvariant_analysis(sample_size)
+            results = AIGenomicsProcessor.run_model(model_type, sample_size)
             
             # Add metadata
             results.update({
@@ -420,11 +424,15 @@ def get_ai_model_comparison(request):
 @require_http_methods(["POST"])
 @csrf_exempt
 def batch_ai_analysis(request):
-    """Run batch AI analysis on multiple samples"""
+    """
+    Submit batch AI analysis of multiple samples. The work runs in the
+    background; poll the returned progress URL for status and partial results.
+    Resubmitting with the same batch_id only requeues items not yet completed.
+    """
     try:
         data = json.loads(request.body)
         samples = data.get('samples', [])
-        models = data.get('models', ['deepvariant'])
+        models = [model for model in data.get('models', ['deepvariant']) if model in AIGenomicsProcessor.AI_MODELS]
         
         if not samples:
             return JsonResponse({
@@ -432,48 +440,27 @@ def batch_ai_analysis(request):
                 'status': 'error'
             }, status=400)
         
-        batch_results = []
-        total_processing_time = 0
+        if not models:
+            return JsonResponse({
+                'error': 'No valid models provided',
+                'available_models': list(AIGenomicsProcessor.AI_MODELS.keys()),
+                'status': 'error'
+            }, status=400)
         
-        for sample in samples:
-            sample_id = sample.get('id', f"sample_{len(batch_results) + 1}")
-            sample_size = sample.get('size_gb', 30.0)
-            
-            sample_results = {
-                'sample_id': sample_id,
-                'analyses': {}
-            }
-            
-            for model in models:
-                if model in AIGenomicsProcessor.AI_MODELS:
-                    processor = AIGenomicsProcessor()
-                    
-                    if model == 'deepvariant':
-                        result = processor.simulate_deepvariant_analysis(sample_size)
-                    elif model == 'gatk':
-                        result = processor.simulate_gatk_analysis(sample_size)
-                    elif model == 'longread':
-                        result = processor.simulate_longread_analysis(sample_size)
-                    elif model == 'pharmaco':
-                        result = processor.simulate_pharmaco_analysis(sample_size)
-                    elif model == 'multiomics':
-                        result = processor.simulate_multiomics_analysis(sample_size)
-                    
-                    sample_results['analyses'][model] = result
-                    processing_time = AIGenomicsProcessor.AI_MODELS[model]['processing_time_per_gb'] * sample_size
-                    total_processing_time += processing_time
-            
-            batch_results.append(sample_results)
+        user = request.user if getattr(request, 'user', None) and request.user.is_authenticated else None
+        job, queued, skipped = batch_scheduler.submit(samples, models, batch_id=data.get('batch_id'), user=user)
         
+        logger.info(f"Genomics batch {job.batch_id} submitted: {len(queued)} items queued, {skipped} already completed")
+        
+        progress = batch_scheduler.progress(job)
+        progress['job_status'] = progress.pop('status')
         return JsonResponse({
             'status': 'success',
-            'batch_id': f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'total_samples': len(samples),
-            'models_used': models,
-            'estimated_total_time': f"{total_processing_time:.1f} hours",
-            'results': batch_results,
-            'completed_at': datetime.now().isoformat()
-        })
+            **progress,
+            'queued_items': len(queued),
+            'skipped_completed_items': skipped,
+            'progress_url': reverse('dna_sequencing:ai_genomics:batch_ai_progress', args=[job.batch_id]),
+        }, status=202)
         
     except json.JSONDecodeError:
         return JsonResponse({
@@ -489,6 +476,85 @@ def batch_ai_analysis(request):
         }, status=500)
 
 
+@require_http_methods(["GET"])
+def get_batch_ai_progress(request, batch_id):
+    """Batch progress with per-item status; ?include_results=true adds the completed results"""
+    try:
+        job = GenomicsBatchJob.objects.filter(batch_id=batch_id).first()
+        if job is None:
+            return JsonResponse({
+                'error': f'Batch {batch_id} not found',
+                'status': 'error'
+            }, status=404)
+        
+        include_results = request.GET.get('include_results', 'false').lower() == 'true'
+        items = []
+        for item in job.items.all():
+            entry = {
+                'item_id': item.id,
+                'sample_id': item.sample_id,
+                'model': item.model,
+                'status': item.status,
+                'attempts': item.attempts,
+                'summary': item.result_summary,
+                'error': item.error or None,
+                'started_at': item.started_at.isoformat() if item.started_at else None,
+                'finished_at': item.finished_at.isoformat() if item.finished_at else None,
+            }
+            if include_results and item.status == 'completed':
+                entry['result'] = batch_scheduler.read_result(item)
+            items.append(entry)
+        
+        progress = batch_scheduler.progress(job)
+        progress['job_status'] = progress.pop('status')
+        return JsonResponse({
+            'status': 'success',
+            **progress,
+            'items': items
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch progress error: {str(e)}")
+        return JsonResponse({
+            'error': f'Failed to retrieve batch progress: {str(e)}',
+            'status': 'error'
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_batch_ai_item_result(request, batch_id, item_id):
+    """Full stored result of one completed batch item"""
+    try:
+        item = GenomicsBatchItem.objects.select_related('job').filter(job__batch_id=batch_id, pk=item_id).first()
+        if item is None:
+            return JsonResponse({
+                'error': 'Batch item not found',
+                'status': 'error'
+            }, status=404)
+        
+        if item.status != 'completed':
+            return JsonResponse({
+                'error': f'Item is {item.status}',
+                'item_status': item.status,
+                'status': 'error'
+            }, status=409)
+        
+        return JsonResponse({
+            'status': 'success',
+            'batch_id': batch_id,
+            'sample_id': item.sample_id,
+            'model': item.model,
+            'result': batch_scheduler.read_result(item)
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch item result error: {str(e)}")
+        return JsonResponse({
+            'error': f'Failed to retrieve batch item result: {str(e)}',
+            'status': 'error'
+        }, status=500)
+
+
 @require_http_methods(["GET"])
 def get_ai_genomics_dashboard(request):
     """Get AI genomics dashboard data"""
@@ -12,12 +12,18 @@ This module provides comprehensive genomic analysis reports with:
 """
 
 import os
+import gzip
 import json
+import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
+from urllib.parse import urlencode
 from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.vary import vary_on_headers
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 import numpy as np
@@ -25,6 +31,9 @@ import random
 from dataclasses import dataclass
 from enum import Enum
 
+from .services.annotation import annotation_engine
+from .services.report_cache import genomic_report_cache
+
 logger = logging.getLogger(__name__)
 
 class ClinicalSignificance(Enum):
@@ -123,12 +132,76 @@ class AIGenomicReportGenerator:
         }
     }
     
+    # Gene-level interpretation rules (looked up by the gene a variant is annotated with)
+    GENE_RULES = {
+        'BRCA1': {
+            'clinical_action': {
+                'pathogenic': 'Enhanced breast and ovarian cancer screening, consider prophylactic surgery'
+            },
+            'surveillance': [
+                'Annual breast MRI starting age 25-30',
+                'Clinical breast exam every 6 months',
+                'Consider prophylactic mastectomy',
+                'Transvaginal ultrasound and CA-125 testing'
+            ],
+            'risk_adjustments': [
+                ('cancer_risks', 'breast_cancer', 72),
+                ('cancer_risks', 'ovarian_cancer', 44)
+            ],
+            'risk_factor': ('cancer_risks', 'breast_cancer', 'BRCA1 pathogenic variant')
+        },
+        'MSH2': {
+            'clinical_action': {
+                'pathogenic': 'Enhanced colorectal cancer screening, consider family testing',
+                'likely_pathogenic': 'Enhanced colorectal cancer screening, consider family testing'
+            },
+            'surveillance': [
+                'Colonoscopy every 1-2 years starting age 20-25',
+                'Annual endometrial biopsy for women',
+                'Consider prophylactic hysterectomy',
+                'Upper endoscopy every 3-5 years'
+            ],
+            'risk_adjustments': [
+                ('cancer_risks', 'colorectal_cancer', 64)
+            ],
+            'risk_factor': ('cancer_risks', 'colorectal_cancer', 'MSH2 variant')
+        }
+    }
+    
+    # Pharmacogene interpretation rules
+    PHARMACOGENE_RULES = {
+        'CYP2D6': {
+            'metabolizer_status': 'Poor metabolizer',
+            'drug_recommendations': [
+                'Avoid codeine and tramadol',
+                'Consider alternative analgesics',
+                'Monitor for reduced efficacy of prodrugs'
+            ],
+            'dosing_adjustments': [
+                {
+                    'drug_class': 'Opioid analgesics',
+                    'recommendation': 'Use alternative agents',
+                    'rationale': 'CYP2D6 poor metabolizer - reduced conversion of prodrugs'
+                }
+            ]
+        }
+    }
+    
     @classmethod
     def generate_comprehensive_report(cls, sample_data: Dict) -> Dict:
-        """Generate comprehensive AI-powered genomic report"""
+        """
+        Generate comprehensive AI-powered genomic report. The output depends only
+        on the sample data and the pipeline version, so it can be cached.
+        """
+        pipeline_version = genomic_report_cache.pipeline_version
+        database_version = genomic_report_cache.database_version
+        seed = hashlib.sha256(f"{sample_data.get('sample_id')}|{pipeline_version}".encode('utf-8')).hexdigest()
+        rng = random.Random(seed)
         
         # Simulate AI analysis
-        variants = cls._simulate_variant_calling(sample_data)
+        variants = cls._simulate_variant_calling(sample_data, rng)
+        # Gene and pharmacogene regions from the interval index (no-op without region files)
+        annotation_engine.annotate_records(variants)
         clinical_findings = cls._analyze_clinical_significance(variants)
         risk_assessment = cls._calculate_disease_risks(clinical_findings)
         pharmacogenomics = cls._analyze_drug_responses(variants)
@@ -136,13 +209,15 @@ class AIGenomicReportGenerator:
         
         report = {
             'report_metadata': {
-                'report_id': f"AI-RPT-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+                # Named after the cache key, so rebuilding the same inputs yields the same id
+                'report_id': f"AI-RPT-{genomic_report_cache.cache_key(sample_data)[:16].upper()}",
                 'patient_id': sample_data.get('patient_id', 'UNKNOWN'),
                 'sample_id': sample_data.get('sample_id', 'UNKNOWN'),
                 'report_type': ReportType.COMPREHENSIVE.value,
                 'generated_date': datetime.now().isoformat(),
                 'ai_models_used': list(cls.REPORT_CONFIG['ai_models'].keys()),
-                'analysis_pipeline': 'AI-Genomics v4.2.1',
+                'analysis_pipeline': pipeline_version,
+                'database_version': database_version,
                 'reference_genome': 'GRCh38/hg38',
                 'sequencing_technology': sample_data.get('technology', 'Illumina NovaSeq'),
                 'coverage': f"{sample_data.get('coverage', 45)}x"
@@ -158,15 +233,7 @@ class AIGenomicReportGenerator:
                 'het_hom_ratio': 1.6
             },
             
-            'variant_summary': {
-                'total_variants_called': len(variants),
-                'snvs': len([v for v in variants if len(v['reference']) == 1 and len(v['alternate']) == 1]),
-                'indels': len([v for v in variants if len(v['reference']) != len(v['alternate'])]),
-                'pathogenic_variants': len([v for v in variants if v['clinical_significance'] == 'pathogenic']),
-                'likely_pathogenic_variants': len([v for v in variants if v['clinical_significance'] == 'likely_pathogenic']),
-                'vus_variants': len([v for v in variants if v['clinical_significance'] == 'vus']),
-                'pharmacogenomic_variants': len([v for v in variants if v.get('pharmacogenomic', False)])
-            },
+            'variant_summary': cls._summarize_variants(variants),
             
             'clinical_findings': clinical_findings,
             'disease_risk_assessment': risk_assessment,
@@ -182,14 +249,47 @@ class AIGenomicReportGenerator:
                     'interpretation': 'Multi-model AI ensemble'
                 },
                 'databases_referenced': cls.REPORT_CONFIG['clinical_databases'],
-                'last_database_update': '2025-09-01'
+                'last_database_update': database_version
             }
         }
         
         return report
     
     @classmethod
-    def _simulate_variant_calling(cls, sample_data: Dict) -> List[Dict]:
+    def _summarize_variants(cls, variants: List[Dict]) -> Dict:
+        """Variant summary counts in a single pass"""
+        summary = {
+            'total_variants_called': len(variants),
+            'snvs': 0,
+            'indels': 0,
+            'pathogenic_variants': 0,
+            'likely_pathogenic_variants': 0,
+            'vus_variants': 0,
+            'pharmacogenomic_variants': 0
+        }
+        significance_keys = {
+            'pathogenic': 'pathogenic_variants',
+            'likely_pathogenic': 'likely_pathogenic_variants',
+            'vus': 'vus_variants'
+        }
+        
+        for variant in variants:
+            ref_length = len(variant['reference'])
+            alt_length = len(variant['alternate'])
+            if ref_length == 1 and alt_length == 1:
+                summary['snvs'] += 1
+            elif ref_length != alt_length:
+                summary['indels'] += 1
+            key = significance_keys.get(variant['clinical_significance'])
+            if key:
+                summary[key] += 1
+            if variant.get('pharmacogenomic', False):
+                summary['pharmacogenomic_variants'] += 1
+        
+        return summary
+    
+    @classmethod
+    def _simulate_variant_calling(cls, sample_data: Dict, rng: Optional[random.Random] = None) -> List[Dict]:
         """Simulate AI-powered variant calling"""
         variants = []
         
@@ -267,32 +367,33 @@ class AIGenomicReportGenerator:
         
         # Add more simulated variants
         for i in range(50):
-            variants.append(cls._generate_random_variant())
+            variants.append(cls._generate_random_variant(rng))
         
         return variants
     
     @classmethod
-    def _generate_random_variant(cls) -> Dict:
+    def _generate_random_variant(cls, rng: Optional[random.Random] = None) -> Dict:
         """Generate random variant for simulation"""
+        rng = rng or random
         chromosomes = [str(i) for i in range(1, 23)] + ['X', 'Y']
         genes = ['APOE', 'LDLR', 'PCSK9', 'ABCG8', 'NPC1L1', 'HMGCR', 'CETP']
         consequences = ['missense_variant', 'synonymous_variant', 'intron_variant', '3_prime_UTR_variant']
         
         return {
-            'chromosome': random.choice(chromosomes),
-            'position': random.randint(1000000, 200000000),
-            'reference': random.choice(['A', 'T', 'G', 'C']),
-            'alternate': random.choice(['A', 'T', 'G', 'C']),
-            'gene': random.choice(genes),
-            'transcript': f"NM_{random.randint(100000, 999999)}.{random.randint(1, 9)}",
-            'hgvs_c': f"c.{random.randint(1, 5000)}G>A",
-            'hgvs_p': f"p.Arg{random.randint(1, 1000)}His",
-            'consequence': random.choice(consequences),
-            'clinical_significance': random.choice(['benign', 'likely_benign', 'vus']),
-            'frequency': random.uniform(0.001, 0.5),
-            'quality_score': random.uniform(85, 99.9),
-            'depth': random.randint(30, 100),
-            'allele_frequency': random.uniform(0.3, 0.7),
+            'chromosome': rng.choice(chromosomes),
+            'position': rng.randint(1000000, 200000000),
+            'reference': rng.choice(['A', 'T', 'G', 'C']),
+            'alternate': rng.choice(['A', 'T', 'G', 'C']),
+            'gene': rng.choice(genes),
+            'transcript': f"NM_{rng.randint(100000, 999999)}.{rng.randint(1, 9)}",
+            'hgvs_c': f"c.{rng.randint(1, 5000)}G>A",
+            'hgvs_p': f"p.Arg{rng.randint(1, 1000)}His",
+            'consequence': rng.choice(consequences),
+            'clinical_significance': rng.choice(['benign', 'likely_benign', 'vus']),
+            'frequency': rng.uniform(0.001, 0.5),
+            'quality_score': rng.uniform(85, 99.9),
+            'depth': rng.randint(30, 100),
+            'allele_frequency': rng.uniform(0.3, 0.7),
             'pharmacogenomic': False
         }
     
@@ -324,13 +425,11 @@ class AIGenomicReportGenerator:
     @classmethod
     def _determine_clinical_action(cls, variant: Dict) -> str:
         """Determine clinical action based on variant"""
-        gene = variant['gene']
-        significance = variant['clinical_significance']
+        rule = cls.GENE_RULES.get(variant['gene'], {})
+        action = rule.get('clinical_action', {}).get(variant['clinical_significance'])
         
-        if gene == 'BRCA1' and significance == 'pathogenic':
-            return 'Enhanced breast and ovarian cancer screening, consider prophylactic surgery'
-        elif gene == 'MSH2' and significance in ['pathogenic', 'likely_pathogenic']:
-            return 'Enhanced colorectal cancer screening, consider family testing'
+        if action:
+            return action
         elif variant.get('pharmacogenomic'):
             return 'Medication dosing adjustment, consider alternative drugs'
         else:
@@ -339,24 +438,8 @@ class AIGenomicReportGenerator:
     @classmethod
     def _get_surveillance_recommendations(cls, variant: Dict) -> List[str]:
         """Get surveillance recommendations"""
-        gene = variant['gene']
-        
-        if gene == 'BRCA1':
-            return [
-                'Annual breast MRI starting age 25-30',
-                'Clinical breast exam every 6 months',
-                'Consider prophylactic mastectomy',
-                'Transvaginal ultrasound and CA-125 testing'
-            ]
-        elif gene == 'MSH2':
-            return [
-                'Colonoscopy every 1-2 years starting age 20-25',
-                'Annual endometrial biopsy for women',
-                'Consider prophylactic hysterectomy',
-                'Upper endoscopy every 3-5 years'
-            ]
-        else:
-            return ['Regular follow-up with genetic counselor']
+        rule = cls.GENE_RULES.get(variant['gene'], {})
+        return list(rule.get('surveillance', ['Regular follow-up with genetic counselor']))
     
     @classmethod
     def _calculate_disease_risks(cls, clinical_findings: List[Dict]) -> Dict:
@@ -401,17 +484,13 @@ class AIGenomicReportGenerator:
         
         # Adjust risks based on findings
         for finding in clinical_findings:
-            gene = finding['gene']
-            penetrance = finding['penetrance']
+            rule = cls.GENE_RULES.get(finding['gene'], {})
             
-            if gene == 'BRCA1':
-                risks['cancer_risks']['breast_cancer']['adjusted_risk'] = 72
-                risks['cancer_risks']['ovarian_cancer']['adjusted_risk'] = 44
-                risks['cancer_risks']['breast_cancer']['risk_factors'].append(f"BRCA1 pathogenic variant (penetrance: {penetrance:.0%})")
-                
-            elif gene == 'MSH2':
-                risks['cancer_risks']['colorectal_cancer']['adjusted_risk'] = 64
-                risks['cancer_risks']['colorectal_cancer']['risk_factors'].append(f"MSH2 variant (penetrance: {penetrance:.0%})")
+            for category, condition, adjusted_risk in rule.get('risk_adjustments', []):
+                risks[category][condition]['adjusted_risk'] = adjusted_risk
+            if 'risk_factor' in rule:
+                category, condition, description = rule['risk_factor']
+                risks[category][condition]['risk_factors'].append(f"{description} (penetrance: {finding['penetrance']:.0%})")
         
         return risks
     
@@ -429,19 +508,12 @@ class AIGenomicReportGenerator:
         
         for variant in pharmaco_variants:
             gene = variant['gene']
+            rule = cls.PHARMACOGENE_RULES.get(gene)
             
-            if gene == 'CYP2D6':
-                pharmaco_profile['drug_metabolizer_status']['CYP2D6'] = 'Poor metabolizer'
-                pharmaco_profile['drug_recommendations'].extend([
-                    'Avoid codeine and tramadol',
-                    'Consider alternative analgesics',
-                    'Monitor for reduced efficacy of prodrugs'
-                ])
-                pharmaco_profile['dosing_adjustments'].append({
-                    'drug_class': 'Opioid analgesics',
-                    'recommendation': 'Use alternative agents',
-                    'rationale': 'CYP2D6 poor metabolizer - reduced conversion of prodrugs'
-                })
+            if rule:
+                pharmaco_profile['drug_metabolizer_status'][gene] = rule['metabolizer_status']
+                pharmaco_profile['drug_recommendations'].extend(rule['drug_recommendations'])
+                pharmaco_profile['dosing_adjustments'].extend(dict(adjustment) for adjustment in rule['dosing_adjustments'])
         
         return pharmaco_profile
     
@@ -463,7 +535,8 @@ class AIGenomicReportGenerator:
         # High-risk recommendations
         for risk_category, risks in risk_assessment.items():
             for condition, risk_data in risks.items():
-                if risk_data['adjusted_risk'] > risk_data['lifetime_risk'] * 2:
+                # Only risks with a genetic adjustment can be elevated
+                if risk_data.get('adjusted_risk', risk_data['lifetime_risk']) > risk_data['lifetime_risk'] * 2:
                     recommendations['surveillance_plan'].append(f"Enhanced {condition.replace('_', ' ')} screening")
         
         recommendations['follow_up_timeline'] = {
@@ -476,14 +549,39 @@ class AIGenomicReportGenerator:
         return recommendations
 
 # API Views
+def _report_sample_data(sample_id, options) -> Dict:
+    """
+    Normalized report inputs, so the same request always maps to the same
+    cache key. Only comprehensive reports are generated, so report_type is
+    not an input.
+    """
+    coverage = options.get('coverage', 45)
+    try:
+        coverage = float(coverage)
+        coverage = int(coverage) if coverage.is_integer() else coverage
+    except (TypeError, ValueError):
+        pass
+    
+    default_patient = int(hashlib.sha256(str(sample_id).encode('utf-8')).hexdigest()[:8], 16) % 900000 + 100000
+    return {
+        'sample_id': sample_id,
+        'patient_id': options.get('patient_id') or f"P{default_patient}",
+        'coverage': coverage,
+        'technology': options.get('technology', 'Illumina NovaSeq 6000'),
+    }
+
+
+def _report_query(sample_data) -> str:
+    return urlencode({field: value for field, value in sample_data.items() if field != 'sample_id'})
+
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def generate_ai_genomic_report(request):
-    """Generate AI-powered genomic report"""
+    """Generate AI-powered genomic report (served from the report cache when already built)"""
     try:
         data = json.loads(request.body)
         sample_id = data.get('sample_id')
-        report_type = data.get('report_type', ReportType.COMPREHENSIVE.value)
         
         # Validate input
         if not sample_id:
@@ -492,24 +590,26 @@ def generate_ai_genomic_report(request):
                 'error': 'Sample ID is required'
             }, status=400)
         
-        # Generate report
-        sample_data = {
-            'sample_id': sample_id,
-            'patient_id': data.get('patient_id', f"P{random.randint(100000, 999999)}"),
-            'coverage': data.get('coverage', 45),
-            'technology': data.get('technology', 'Illumina NovaSeq 6000')
-        }
-        
-        report = AIGenomicReportGenerator.generate_comprehensive_report(sample_data)
+        sample_data = _report_sample_data(sample_id, data)
+        key, payload, built = genomic_report_cache.get_or_build(
+            sample_data, AIGenomicReportGenerator.generate_comprehensive_report
+        )
+        report = genomic_report_cache.decode(payload)
         
-        logger.info(f"Generated AI genomic report for sample {sample_id}")
+        if built:
+            logger.info(f"Generated AI genomic report for sample {sample_id}")
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'report': report,
-            'generation_time': datetime.now().isoformat(),
+            'report_key': key,
+            'cached': not built,
+            'report_url': f"{reverse('dna_sequencing:ai_report', args=[sample_id])}?{_report_query(sample_data)}",
+            'generation_time': report['report_metadata']['generated_date'],
             'ai_models_used': AIGenomicReportGenerator.REPORT_CONFIG['ai_models']
         })
+        response['ETag'] = f'"{key}"'
+        return response
         
     except json.JSONDecodeError:
         return JsonResponse({
@@ -523,6 +623,48 @@ def generate_ai_genomic_report(request):
             'error': 'Failed to generate report'
         }, status=500)
 
+
+def _accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def _report_etag(request, sample_id):
+    # The gzip and identity bodies differ, so each encoding has its own tag
+    key = genomic_report_cache.cache_key(_report_sample_data(sample_id, request.GET))
+    return f"{key}-gz" if _accepts_gzip(request) else key
+
+
+@require_http_methods(["GET"])
+@vary_on_headers('Accept-Encoding')
+@condition(etag_func=_report_etag)
+def get_ai_genomic_report(request, sample_id):
+    """
+    Cached genomic report document. Supports If-None-Match (304 when the
+    report is unchanged) and is sent gzip-encoded as stored when the client
+    accepts it.
+    """
+    try:
+        sample_data = _report_sample_data(sample_id, request.GET)
+        key, payload, built = genomic_report_cache.get_or_build(
+            sample_data, AIGenomicReportGenerator.generate_comprehensive_report
+        )
+        
+        if _accepts_gzip(request):
+            response = HttpResponse(payload, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(payload), content_type='application/json')
+        patch_cache_control(response, private=True, no_cache=True)
+        response['X-Report-Cache'] = 'miss' if built else 'hit'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error retrieving AI genomic report: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Failed to retrieve report'
+        }, status=500)
+
 @require_http_methods(["GET"])
 def get_ai_report_templates(request):
     """Get available AI report templates"""
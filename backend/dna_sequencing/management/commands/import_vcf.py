@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+
+from dna_sequencing.services.variant_store import variant_store
+
+
+class Command(BaseCommand):
+    help = 'Import a VCF or bgzipped VCF file into the columnar variant store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sample_id', help='Sample identifier to store the variants under')
+        parser.add_argument('path', help='Path to a .vcf or .vcf.gz file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        started = time.time()
+        try:
+            with open(path, 'rb') as vcf_file:
+                table = variant_store.import_vcf(options['sample_id'], vcf_file, source=os.path.basename(path))
+        except ValueError as e:
+            raise CommandError(f'Import failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(table)} variants for {options['sample_id']} in {time.time() - started:.1f}s "
+            f"({os.path.getsize(path) / 1e6:.1f} MB file, {table.nbytes / 1e6:.1f} MB columnar)"
+        ))
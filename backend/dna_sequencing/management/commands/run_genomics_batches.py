@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from concurrent.futures import wait
+import time
+
+from dna_sequencing.models import GenomicsBatchJob, GenomicsBatchItem
+from dna_sequencing.services.batch_scheduler import batch_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Dispatch pending (and stale running) batch AI genomics items, e.g. after a server restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-id', help='Only process this batch')
+        parser.add_argument('--continuous', action='store_true', help='Keep polling for new pending items')
+        parser.add_argument('--interval', type=int, default=10, help='Polling interval in seconds (with --continuous)')
+
+    def handle(self, *args, **options):
+        job = None
+        if options['batch_id']:
+            job = GenomicsBatchJob.objects.filter(batch_id=options['batch_id']).first()
+            if job is None:
+                raise CommandError(f"Batch not found: {options['batch_id']}")
+
+        while True:
+            batch_scheduler.recover_stale(job)
+            pending = GenomicsBatchItem.objects.filter(status='pending')
+            if job is not None:
+                pending = pending.filter(job=job)
+            item_ids = list(pending.values_list('id', flat=True))
+
+            if item_ids:
+                started = time.time()
+                futures = batch_scheduler.dispatch(item_ids)
+                wait(futures)
+                failed = GenomicsBatchItem.objects.filter(pk__in=item_ids, status='failed').count()
+                message = f"Processed {len(item_ids)} items in {time.time() - started:.1f}s ({failed} failed)"
+                if batch_scheduler.backend == 'celery':
+                    message = f"Queued {len(item_ids)} items on Celery"
+                self.stdout.write(self.style.SUCCESS(message))
+            elif not options['continuous']:
+                self.stdout.write('No pending batch items')
+
+            if not options['continuous']:
+                break
+            time.sleep(options['interval'])
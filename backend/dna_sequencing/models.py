@@ -0,0 +1,70 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class GenomicsBatchJob(models.Model):
+    """A submitted batch of sample x model AI genomics analyses"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('partial', 'Completed with failures'),
+        ('failed', 'Failed'),
+    ]
+
+    batch_id = models.CharField(max_length=100, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='genomics_batch_jobs')
+    models_requested = models.JSONField(default=list)
+    total_samples = models.PositiveIntegerField(default=0)
+    total_items = models.PositiveIntegerField(default=0)
+    estimated_total_hours = models.FloatField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.batch_id} ({self.status})"
+
+
+class GenomicsBatchItem(models.Model):
+    """One sample x model analysis within a batch"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.ForeignKey(GenomicsBatchJob, on_delete=models.CASCADE, related_name='items')
+    sample_id = models.CharField(max_length=100)
+    model = models.CharField(max_length=50)
+    sample_size_gb = models.FloatField(default=30.0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+
+    # Full results live in file storage; a few headline numbers are kept inline
+    result_path = models.CharField(max_length=500, blank=True)
+    result_summary = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        unique_together = ['job', 'sample_id', 'model']
+        indexes = [
+            models.Index(fields=['job', 'status'], name='genomics_item_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job.batch_id}: {self.sample_id} / {self.model} ({self.status})"
@@ -0,0 +1 @@
+# DNA sequencing services module
@@ -0,0 +1,16 @@
+"""
+Process pool entry point for batch genomics analyses.
+
+Spawned workers start from a fresh interpreter, so Django is set up once per
+worker before the processor is imported. Workers only compute and return the
+analysis result; all database writes stay in the parent.
+"""
+
+
+def run_analysis(model, sample_size_gb):
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    from ..ai_genomics_views import AIGenomicsProcessor
+    return AIGenomicsProcessor.run_model(model, sample_size_gb)
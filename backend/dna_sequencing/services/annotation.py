@@ -0,0 +1,330 @@
+"""
+Interval-indexed variant annotation.
+
+Gene, transcript and pharmacogene regions are loaded from local BED / GFF3
+files in ``GENOMIC_ANNOTATION_DIR``; the file name (without extensions) is
+the region kind, e.g. ``genes.bed``, ``transcripts.gff3.gz`` or
+``pharmacogenes.bed``.
+
+Per chromosome, the interval boundaries split the axis into elementary
+segments, and each segment stores (CSR style) the intervals covering it. A
+position is located with one ``searchsorted`` over the boundaries, so a whole
+sample is annotated with a handful of vectorized operations per chromosome and
+region queries are logarithmic in the number of intervals.
+
+Coordinates are held 0-based half-open; BED already is, GFF and VCF positions
+are converted on the way in.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Earlier kinds win when several regions overlap a variant
+KIND_PRIORITY = ['pharmacogenes', 'genes', 'transcripts']
+GFF_FEATURES = {'gene', 'mRNA', 'transcript'}
+ANNOTATION_EXTENSIONS = ('.bed', '.bed.gz', '.gff', '.gff.gz', '.gff3', '.gff3.gz')
+
+
+def normalize_chrom(chrom):
+    chrom = str(chrom)
+    if chrom[:3].lower() == 'chr':
+        chrom = chrom[3:]
+    return 'MT' if chrom == 'M' else chrom
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _kind_for(path):
+    name = os.path.basename(path)
+    for extension in ANNOTATION_EXTENSIONS:
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+def read_bed(path):
+    """Yield (chrom, start, end, name) from a BED file."""
+    with _open_text(path) as bed:
+        for line in bed:
+            if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                continue
+            fields = line.rstrip('\r\n').split('\t')
+            name = fields[3] if len(fields) > 3 else f"{fields[0]}:{fields[1]}-{fields[2]}"
+            yield fields[0], int(fields[1]), int(fields[2]), name
+
+
+def read_gff(path):
+    """Yield (chrom, start, end, name) for gene/transcript features of a GFF3 file."""
+    with _open_text(path) as gff:
+        for line in gff:
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) < 9 or fields[2] not in GFF_FEATURES:
+                continue
+            attributes = dict(item.split('=', 1) for item in fields[8].split(';') if '=' in item)
+            name = (attributes.get('gene_name') or attributes.get('Name')
+                    or attributes.get('gene') or attributes.get('ID') or '.')
+            yield fields[0], int(fields[3]) - 1, int(fields[4]), name
+
+
+class IntervalIndex:
+    """Intervals on one chromosome, split into elementary segments."""
+
+    def __init__(self, starts, ends, ids, ranks):
+        self.bounds = np.unique(np.concatenate([starts, ends]))
+        segment_count = max(len(self.bounds) - 1, 0)
+
+        first = np.searchsorted(self.bounds, starts)
+        last = np.searchsorted(self.bounds, ends)
+        spans = last - first
+        # (segment, interval) pairs for every segment an interval covers
+        segments = np.repeat(first - np.cumsum(spans) + spans, spans) + np.arange(spans.sum())
+        members = np.repeat(ids, spans)
+        member_ranks = np.repeat(ranks, spans)
+        order = np.lexsort((member_ranks, segments))
+        self.members = members[order]
+        self.indptr = np.zeros(segment_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(segments, minlength=segment_count), out=self.indptr[1:])
+
+    def locate(self, positions):
+        """Segment of every 0-based position, or -1 when outside all intervals."""
+        segments = np.searchsorted(self.bounds, positions, side='right') - 1
+        segments[(segments < 0) | (segments >= len(self.indptr) - 1)] = -1
+        return segments
+
+    def first_hits(self, positions):
+        """Highest-priority interval id covering each position (-1 if none) and the overlap counts."""
+        segments = self.locate(positions)
+        inside = segments >= 0
+        counts = np.zeros(len(positions), dtype=np.int32)
+        counts[inside] = self.indptr[segments[inside] + 1] - self.indptr[segments[inside]]
+        hits = np.full(len(positions), -1, dtype=np.int64)
+        covered = counts > 0
+        hits[covered] = self.members[self.indptr[segments[covered]]]
+        return hits, counts
+
+    def query(self, start, end):
+        """Ids of intervals overlapping [start, end)."""
+        if end <= start or len(self.indptr) < 2:
+            return np.zeros(0, dtype=np.int64)
+        first = max(np.searchsorted(self.bounds, start, side='right') - 1, 0)
+        last = min(np.searchsorted(self.bounds, end, side='left'), len(self.indptr) - 1)
+        if last <= first:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(self.members[self.indptr[first]:self.indptr[last]])
+
+
+class AnnotationEngine:
+    def __init__(self, source_dir=None):
+        self.source_dir = source_dir
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._built = None
+        self._extra = []
+
+    def _source_dir(self):
+        if self.source_dir is None:
+            self.source_dir = getattr(settings, 'GENOMIC_ANNOTATION_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'genomic_annotation')
+        return self.source_dir
+
+    def _source_files(self):
+        source_dir = self._source_dir()
+        if not os.path.isdir(source_dir):
+            return []
+        return sorted(os.path.join(source_dir, name) for name in os.listdir(source_dir)
+                      if name.endswith(ANNOTATION_EXTENSIONS))
+
+    def _current_fingerprint(self):
+        files = self._source_files()
+        return tuple((path, os.path.getmtime(path)) for path in files), len(self._extra)
+
+    def add_regions(self, kind, regions):
+        """Register regions programmatically: iterable of (chrom, start, end, name), 0-based half-open."""
+        with self._lock:
+            self._extra.append((kind, list(regions)))
+
+    def _build(self):
+        chroms, starts, ends, name_ids, kind_ids = [], [], [], [], []
+        names, name_index, kinds = [], {}, []
+
+        def add(kind, regions):
+            if kind not in kinds:
+                kinds.append(kind)
+            kind_id = kinds.index(kind)
+            for chrom, start, end, name in regions:
+                if name not in name_index:
+                    name_index[name] = len(names)
+                    names.append(name)
+                chroms.append(normalize_chrom(chrom))
+                starts.append(start)
+                ends.append(end)
+                name_ids.append(name_index[name])
+                kind_ids.append(kind_id)
+
+        for path in self._source_files():
+            reader = read_gff if '.gff' in os.path.basename(path) else read_bed
+            add(_kind_for(path), reader(path))
+        for kind, regions in self._extra:
+            add(kind, regions)
+
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        name_ids = np.asarray(name_ids, dtype=np.int64)
+        kind_ids = np.asarray(kind_ids, dtype=np.int64)
+        chroms = np.asarray(chroms, dtype=object)
+        kind_rank = np.asarray([KIND_PRIORITY.index(kind) if kind in KIND_PRIORITY else len(KIND_PRIORITY)
+                                for kind in kinds], dtype=np.int64)
+
+        indexes = {}
+        for chrom in np.unique(chroms) if len(chroms) else []:
+            ids = np.flatnonzero(chroms == chrom)
+            indexes[chrom] = IntervalIndex(starts[ids], ends[ids], ids, kind_rank[kind_ids[ids]])
+
+        name_regions = {}
+        for interval_id, name_id in enumerate(name_ids.tolist()):
+            name_regions.setdefault(names[name_id].upper(), []).append(interval_id)
+
+        logger.info(f"Built annotation index: {len(starts)} regions, {len(names)} names, {len(indexes)} chromosomes")
+        return {
+            'indexes': indexes,
+            'chroms': chroms,
+            'starts': starts,
+            'ends': ends,
+            'name_ids': name_ids,
+            'kind_ids': kind_ids,
+            'names': names,
+            'kinds': kinds,
+            'name_regions': name_regions,
+        }
+
+    def get(self):
+        fingerprint = self._current_fingerprint()
+        built = self._built
+        if built is None or fingerprint != self._fingerprint:
+            with self._lock:
+                if self._built is None or fingerprint != self._fingerprint:
+                    self._built = self._build()
+                    self._fingerprint = fingerprint
+                built = self._built
+        return built
+
+    def version(self):
+        """Short digest of the region sources, for keying anything derived from annotations."""
+        return hashlib.sha1(repr(self._current_fingerprint()).encode('utf-8')).hexdigest()[:12]
+
+    def _describe(self, index, interval_id):
+        return {
+            'name': index['names'][index['name_ids'][interval_id]],
+            'kind': index['kinds'][index['kind_ids'][interval_id]],
+            'chromosome': index['chroms'][interval_id],
+            'start': int(index['starts'][interval_id]),
+            'end': int(index['ends'][interval_id]),
+        }
+
+    # ----- bulk annotation -----
+
+    def annotate_positions(self, chrom, positions):
+        """
+        Annotate 1-based (VCF) positions on one chromosome. Returns arrays of the
+        best region id (-1 if none) and of the number of overlapping regions.
+        """
+        index = self.get()
+        positions = np.asarray(positions, dtype=np.int64)
+        interval_index = index['indexes'].get(normalize_chrom(chrom))
+        if interval_index is None:
+            return np.full(len(positions), -1, dtype=np.int64), np.zeros(len(positions), dtype=np.int32)
+        return interval_index.first_hits(positions - 1)
+
+    def annotate_table(self, table):
+        """
+        Vectorized annotation of a columnar VariantTable. Returns per-row arrays:
+        ``gene`` (region name id, -1 if none), ``kind`` (kind id), ``overlaps``
+        and ``pharmacogene`` plus the ``names``/``kinds`` lookup lists.
+        """
+        index = self.get()
+        rows = len(table)
+        hits = np.full(rows, -1, dtype=np.int64)
+        overlaps = np.zeros(rows, dtype=np.int32)
+        codes = np.asarray(table.codes('chrom'))
+        positions = np.asarray(table.column('pos'), dtype=np.int64)
+        for code, chrom in enumerate(table.categories('chrom')):
+            rows_on_chrom = np.flatnonzero(codes == code)
+            if len(rows_on_chrom):
+                hits[rows_on_chrom], overlaps[rows_on_chrom] = self.annotate_positions(chrom, positions[rows_on_chrom])
+        return self._annotation_arrays(index, hits, overlaps)
+
+    def _annotation_arrays(self, index, hits, overlaps):
+        found = hits >= 0
+        gene = np.full(len(hits), -1, dtype=np.int64)
+        kind = np.full(len(hits), -1, dtype=np.int64)
+        gene[found] = index['name_ids'][hits[found]]
+        kind[found] = index['kind_ids'][hits[found]]
+        pharmacogene = np.zeros(len(hits), dtype=bool)
+        if 'pharmacogenes' in index['kinds']:
+            pharmacogene = kind == index['kinds'].index('pharmacogenes')
+        return {
+            'gene': gene,
+            'kind': kind,
+            'overlaps': overlaps,
+            'pharmacogene': pharmacogene,
+            'names': index['names'],
+            'kinds': index['kinds'],
+        }
+
+    def annotate_records(self, variants):
+        """
+        Annotate variant dicts in place: fills ``gene`` when missing, sets
+        ``region_kind`` and flags variants in pharmacogene regions as
+        ``pharmacogenomic``. Variants are grouped per chromosome and annotated
+        in vectorized batches.
+        """
+        index = self.get()
+        if not variants or not index['indexes']:
+            return variants
+        by_chrom = {}
+        for row, variant in enumerate(variants):
+            by_chrom.setdefault(normalize_chrom(variant.get('chromosome', '')), []).append(row)
+        for chrom, rows in by_chrom.items():
+            positions = [int(variants[row].get('position', 0)) for row in rows]
+            hits, overlaps = self.annotate_positions(chrom, positions)
+            annotation = self._annotation_arrays(index, hits, overlaps)
+            for row, gene, kind, pharmacogene in zip(rows, annotation['gene'].tolist(), annotation['kind'].tolist(),
+                                                      annotation['pharmacogene'].tolist()):
+                if gene < 0:
+                    continue
+                variant = variants[row]
+                if not variant.get('gene'):
+                    variant['gene'] = index['names'][gene]
+                variant['region_kind'] = index['kinds'][kind]
+                if pharmacogene:
+                    variant['pharmacogenomic'] = True
+        return variants
+
+    # ----- region queries -----
+
+    def regions_for_name(self, name):
+        index = self.get()
+        return [self._describe(index, interval_id) for interval_id in index['name_regions'].get(name.upper(), [])]
+
+    def regions_overlapping(self, chrom, start, end):
+        """Regions overlapping 1-based inclusive [start, end]."""
+        index = self.get()
+        interval_index = index['indexes'].get(normalize_chrom(chrom))
+        if interval_index is None:
+            return []
+        return [self._describe(index, interval_id) for interval_id in interval_index.query(start - 1, end).tolist()]
+
+
+annotation_engine = AnnotationEngine()
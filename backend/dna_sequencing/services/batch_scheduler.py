@@ -0,0 +1,310 @@
+"""
+Batch AI genomics job scheduler.
+
+A batch submission is persisted as a GenomicsBatchJob with one
+GenomicsBatchItem per sample x model. Items are dispatched to per-model lanes
+whose size caps how many analyses of that model run at once; each lane hands
+the computation to a shared process pool. Full results are written to file
+storage as gzipped JSON, the item row keeps the path and a few headline
+numbers, so progress and partial results can be read while the batch runs.
+
+With GENOMICS_BATCH_BACKEND = "celery" items are sent as Celery tasks instead,
+routed to one queue per model (``genomics.<model>``); per-model concurrency is
+then the concurrency of the workers consuming each queue.
+
+Submitting the same batch id again is idempotent: completed items are kept,
+failed and missing items are (re)queued.
+"""
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from ..models import GenomicsBatchJob, GenomicsBatchItem
+from .analysis_worker import run_analysis
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = [
+    'variants_called', 'high_confidence', 'accuracy_score', 'filtered_variants', 'pass_variants',
+    'structural_variants', 'drug_interactions', 'integrated_pathways', 'disease_associations',
+    'processing_time',
+]
+
+
+def parse_concurrency(value):
+    """Parse "deepvariant=2,multiomics=1" into {'deepvariant': 2, 'multiomics': 1}."""
+    if isinstance(value, dict):
+        return {model: int(limit) for model, limit in value.items()}
+    limits = {}
+    for part in (value or '').split(','):
+        if '=' in part:
+            model, limit = part.split('=', 1)
+            limits[model.strip()] = max(1, int(limit))
+    return limits
+
+
+def summarize_result(result):
+    return {field: result[field] for field in SUMMARY_FIELDS if field in result}
+
+
+class GenomicsBatchScheduler:
+    def __init__(self):
+        self.backend = getattr(settings, 'GENOMICS_BATCH_BACKEND', 'local')
+        self.max_workers = getattr(settings, 'GENOMICS_BATCH_WORKERS', min(4, os.cpu_count() or 1))
+        self.default_concurrency = getattr(settings, 'GENOMICS_BATCH_DEFAULT_CONCURRENCY', 2)
+        self.model_concurrency = parse_concurrency(getattr(settings, 'GENOMICS_BATCH_MODEL_CONCURRENCY', ''))
+        self.item_timeout = getattr(settings, 'GENOMICS_BATCH_ITEM_TIMEOUT', 3600)
+        self.results_prefix = getattr(settings, 'GENOMICS_BATCH_RESULTS_PREFIX', 'genomics_batches')
+        self._executor = None
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    # ----- executors -----
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already holds DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _discard_executor(self, executor, terminate=False):
+        """
+        Drop a pool so the next item starts a fresh one. With ``terminate`` its
+        workers are killed and reaped first: a running analysis cannot be
+        cancelled, so that is the only way to get a timed-out item's CPU back.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        processes = list((executor._processes or {}).values()) if terminate else []
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_lane(self, model):
+        with self._lock:
+            lane = self._lanes.get(model)
+            if lane is None:
+                limit = self.model_concurrency.get(model, self.default_concurrency)
+                lane = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"genomics-{model}")
+                self._lanes[model] = lane
+            return lane
+
+    # ----- submission -----
+
+    def submit(self, samples, models, batch_id=None, user=None):
+        """
+        Persist a batch and dispatch its outstanding items. Returns
+        (job, queued_item_ids, skipped_count) where skipped items were already
+        completed by an earlier submission of the same batch id.
+        """
+        from ..ai_genomics_views import AIGenomicsProcessor
+
+        batch_id = batch_id or f"batch_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        entries = []
+        for index, sample in enumerate(samples):
+            sample_id = str(sample.get('id', f"sample_{index + 1}"))
+            sample_size = float(sample.get('size_gb', 30.0))
+            for model in models:
+                entries.append((sample_id, model, sample_size))
+        estimated_hours = sum(
+            AIGenomicsProcessor.AI_MODELS[model]['processing_time_per_gb'] * size for _, model, size in entries
+        )
+
+        with transaction.atomic():
+            job, created = GenomicsBatchJob.objects.get_or_create(batch_id=batch_id, defaults={
+                'submitted_by': user,
+                'models_requested': list(models),
+                'total_samples': len(samples),
+            })
+            GenomicsBatchItem.objects.bulk_create([
+                GenomicsBatchItem(job=job, sample_id=sample_id, model=model, sample_size_gb=size)
+                for sample_id, model, size in entries
+            ], ignore_conflicts=True)
+            GenomicsBatchItem.objects.filter(job=job, status='failed').update(status='pending', error='')
+            if not created:
+                job.models_requested = sorted(set(job.models_requested) | set(models))
+            job.total_items = job.items.count()
+            job.total_samples = job.items.values('sample_id').distinct().count()
+            job.estimated_total_hours = round(max(job.estimated_total_hours, estimated_hours), 2)
+            if job.status in ('completed', 'partial', 'failed') and job.items.exclude(status='completed').exists():
+                job.status = 'queued'
+                job.finished_at = None
+            job.save()
+
+        self.recover_stale(job)
+        queued = list(job.items.filter(status='pending').values_list('id', flat=True))
+        skipped = job.items.filter(status='completed').count()
+        transaction.on_commit(lambda: self.dispatch(queued))
+        if not queued:
+            self.refresh_job(job.pk)
+            job.refresh_from_db()
+        return job, queued, skipped
+
+    def recover_stale(self, job=None):
+        """Send items stuck in "running" past the item timeout back to pending."""
+        cutoff = timezone.now() - timedelta(seconds=self.item_timeout)
+        stale = GenomicsBatchItem.objects.filter(status='running', started_at__lt=cutoff)
+        if job is not None:
+            stale = stale.filter(job=job)
+        recovered = stale.update(status='pending', error='Timed out; requeued')
+        if recovered:
+            logger.warning(f"Requeued {recovered} stale genomics batch items")
+        return recovered
+
+    def dispatch(self, item_ids):
+        """Hand pending items to the configured backend."""
+        items = GenomicsBatchItem.objects.filter(pk__in=item_ids, status='pending').values_list('pk', 'model')
+        futures = []
+        for item_id, model in items:
+            if self.backend == 'celery':
+                from ..tasks import run_genomics_batch_item
+                run_genomics_batch_item.apply_async(args=[item_id], queue=f"genomics.{model}")
+            else:
+                futures.append(self._get_lane(model).submit(self._run_in_lane, item_id))
+        return futures
+
+    # ----- execution -----
+
+    def _run_in_lane(self, item_id):
+        try:
+            self.execute_item(item_id, runner=self._run_in_pool)
+        finally:
+            close_old_connections()
+
+    def _run_in_pool(self, model, sample_size_gb):
+        """
+        Run one analysis in the shared pool. On timeout the pool is recycled
+        before the lane slot is released; analyses of other items that were
+        running in it are retried once on the new pool.
+        """
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                future = executor.submit(run_analysis, model, sample_size_gb)
+            except RuntimeError:
+                # Recycled by another lane between getting and using it
+                self._discard_executor(executor)
+                continue
+            try:
+                return future.result(timeout=self.item_timeout)
+            except FutureTimeoutError:
+                self._discard_executor(executor, terminate=True)
+                raise TimeoutError(f"{model} analysis exceeded {self.item_timeout}s")
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+                logger.warning(f"Genomics pool was recycled under a {model} analysis; retrying on a new pool")
+        raise BrokenProcessPool('Genomics analysis pool unavailable')
+
+    def execute_item(self, item_id, runner=run_analysis):
+        """Claim a pending item, run it and record the outcome. Returns False if it was not pending."""
+        now = timezone.now()
+        claimed = GenomicsBatchItem.objects.filter(pk=item_id, status='pending').update(
+            status='running', started_at=now, finished_at=None, attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            return False
+        item = GenomicsBatchItem.objects.select_related('job').get(pk=item_id)
+        GenomicsBatchJob.objects.filter(pk=item.job_id, status='queued').update(status='running')
+        GenomicsBatchJob.objects.filter(pk=item.job_id, started_at__isnull=True).update(started_at=now)
+
+        try:
+            result = runner(item.model, item.sample_size_gb)
+            result.update({
+                'sample_id': item.sample_id,
+                'sample_size_gb': item.sample_size_gb,
+                'batch_id': item.job.batch_id,
+                'completed_at': timezone.now().isoformat(),
+            })
+            path = self.write_result(item, result)
+            GenomicsBatchItem.objects.filter(pk=item_id).update(
+                status='completed', result_path=path, result_summary=summarize_result(result),
+                error='', finished_at=timezone.now(),
+            )
+        except Exception as e:
+            logger.error(f"Genomics batch item {item_id} ({item.model}) failed: {str(e)}")
+            GenomicsBatchItem.objects.filter(pk=item_id).update(
+                status='failed', error=str(e), finished_at=timezone.now(),
+            )
+        self.refresh_job(item.job_id)
+        return True
+
+    def refresh_job(self, job_id):
+        """Close the job once none of its items are pending or running."""
+        counts = dict(GenomicsBatchItem.objects.filter(job_id=job_id)
+                      .values_list('status').annotate(n=Count('id')))
+        if counts.get('pending') or counts.get('running'):
+            return
+        if not counts.get('failed'):
+            status = 'completed'
+        elif counts.get('completed'):
+            status = 'partial'
+        else:
+            status = 'failed'
+        GenomicsBatchJob.objects.filter(pk=job_id).exclude(status=status).update(
+            status=status, finished_at=timezone.now(),
+        )
+
+    # ----- results -----
+
+    def result_path(self, item):
+        name = get_valid_filename(f"{item.sample_id}__{item.model}.json.gz")
+        return f"{self.results_prefix}/{get_valid_filename(item.job.batch_id)}/{name}"
+
+    def write_result(self, item, result):
+        path = self.result_path(item)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        payload = gzip.compress(json.dumps(result).encode('utf-8'))
+        return default_storage.save(path, ContentFile(payload))
+
+    def read_result(self, item):
+        if not item.result_path:
+            return None
+        with default_storage.open(item.result_path, 'rb') as stored:
+            return json.loads(gzip.decompress(stored.read()).decode('utf-8'))
+
+    def progress(self, job):
+        counts = dict(job.items.values_list('status').annotate(n=Count('id')))
+        total = job.total_items or sum(counts.values())
+        done = counts.get('completed', 0) + counts.get('failed', 0)
+        return {
+            'batch_id': job.batch_id,
+            'status': job.status,
+            'total_samples': job.total_samples,
+            'total_items': total,
+            'models_used': job.models_requested,
+            'counts': {status: counts.get(status, 0) for status, _ in GenomicsBatchItem.STATUS_CHOICES},
+            'progress_percent': round(done * 100.0 / total, 1) if total else 100.0,
+            'estimated_total_time': f"{job.estimated_total_hours:.1f} hours",
+            'created_at': job.created_at.isoformat(),
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+
+batch_scheduler = GenomicsBatchScheduler()
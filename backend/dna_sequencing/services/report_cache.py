@@ -0,0 +1,112 @@
+"""
+Content-addressed cache of generated genomic reports.
+
+A report is a pure function of its inputs: the sample and request options,
+the analysis pipeline version, the clinical database version and the
+annotation sources. The SHA-256 of those inputs is the cache key and the
+report's ETag. Reports are built once per key and stored gzipped under
+``GENOMIC_REPORT_CACHE_DIR``; reopening a report is a file read, and a client
+holding the ETag gets a 304 without even that.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+from .annotation import annotation_engine
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ('sample_id', 'patient_id', 'coverage', 'technology')
+
+
+class GenomicReportCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._building = {}
+
+    @property
+    def pipeline_version(self):
+        return getattr(settings, 'GENOMIC_REPORT_PIPELINE_VERSION', 'AI-Genomics v4.2.1')
+
+    @property
+    def database_version(self):
+        return getattr(settings, 'GENOMIC_REPORT_DATABASE_VERSION', '2025-09-01')
+
+    def _cache_dir(self):
+        if self.cache_dir is None:
+            self.cache_dir = getattr(settings, 'GENOMIC_REPORT_CACHE_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'genomic_reports')
+        return self.cache_dir
+
+    def cache_key(self, sample_data):
+        inputs = {field: sample_data.get(field) for field in KEY_FIELDS}
+        inputs.update({
+            'pipeline': self.pipeline_version,
+            'database': self.database_version,
+            'annotation': annotation_engine.version(),
+        })
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._cache_dir(), key[:2], f"{key}.json.gz")
+
+    def get_compressed(self, key):
+        try:
+            with open(self._path(key), 'rb') as cached:
+                return cached.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, report):
+        payload = gzip.compress(json.dumps(report).encode('utf-8'))
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return payload
+
+    def get_or_build(self, sample_data, builder):
+        """
+        Return (key, gzipped report JSON, built) for the sample, running
+        ``builder(sample_data)`` only when no report is cached for the key.
+        Concurrent requests for the same key share one build.
+        """
+        key = self.cache_key(sample_data)
+        payload = self.get_compressed(key)
+        if payload is not None:
+            return key, payload, False
+
+        with self._lock:
+            key_lock = self._building.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                payload = self.get_compressed(key)
+                if payload is not None:
+                    return key, payload, False
+                report = builder(sample_data)
+                report['report_metadata']['report_key'] = key
+                payload = self.put(key, report)
+                logger.info(f"Built genomic report {key[:12]} for sample {sample_data.get('sample_id')}")
+                return key, payload, True
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    @staticmethod
+    def decode(payload):
+        return json.loads(gzip.decompress(payload).decode('utf-8'))
+
+
+genomic_report_cache = GenomicReportCache()
@@ -0,0 +1,646 @@
+"""
+Columnar per-sample variant store.
+
+A sample's variants are kept as one NumPy array per column instead of a list
+of dicts:
+
+- numeric columns (position, quality, depth, allele frequency) as fixed-width
+  arrays
+- low-cardinality text (chromosome, filter, gene, consequence, impact,
+  clinical significance) as categorical codes plus a category list
+- free text (ID, REF, ALT) as one UTF-8 buffer plus offsets, Arrow style
+
+On disk every column is a ``.npy`` file under ``VARIANT_STORE_DIR/<sample>/``
+next to a ``meta.json`` with the categories, and tables are memory-mapped when
+loaded, so opening a sample costs almost nothing and resident memory stays a
+small multiple of the file size.
+
+VCF (plain or bgzip) is imported in chunks of rows and exported as a stream
+of text blocks suitable for ``StreamingHttpResponse``.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+
+from .annotation import annotation_engine, normalize_chrom
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+
+NUMERIC_COLUMNS = {
+    'pos': np.uint32,
+    'qual': np.float32,
+    'depth': np.int32,
+    'allele_frequency': np.float32,
+}
+CATEGORICAL_COLUMNS = ['chrom', 'filter', 'gene', 'consequence', 'impact', 'clinical_significance']
+STRING_COLUMNS = ['id', 'ref', 'alt']
+
+# Field order of a parsed row, as produced by parse_vcf_line
+ROW_FIELDS = ['chrom', 'pos', 'id', 'ref', 'alt', 'qual', 'filter',
+              'gene', 'consequence', 'impact', 'clinical_significance', 'depth', 'allele_frequency']
+
+CSV_HEADER = ['Chromosome', 'Position', 'Ref', 'Alt', 'Gene', 'Impact',
+              'Clinical_Significance', 'Quality', 'Coverage', 'dbSNP_ID']
+
+# INFO keys written on export, with their VCF header definitions
+EXPORT_INFO_HEADER = [
+    ('GENE', '1', 'String', 'Gene symbol'),
+    ('IMPACT', '1', 'String', 'Predicted impact'),
+    ('CONSEQUENCE', '1', 'String', 'Predicted consequence'),
+    ('CLNSIG', '.', 'String', 'Clinical significance'),
+    ('DP', '1', 'Integer', 'Read depth'),
+    ('AF', 'A', 'Float', 'Allele frequency'),
+]
+
+SAMPLE_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+
+def _smallest_code_dtype(size):
+    if size <= np.iinfo(np.uint8).max:
+        return np.uint8
+    if size <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.int32
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _int_or_missing(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def parse_info(info):
+    """Pick the annotation fields the store keeps out of a VCF INFO column."""
+    gene = consequence = impact = significance = ''
+    depth = -1
+    allele_frequency = np.nan
+    if info and info != '.':
+        for item in info.split(';'):
+            key, _, value = item.partition('=')
+            if key == 'GENE':
+                gene = value
+            elif key == 'IMPACT':
+                impact = value
+            elif key in ('CONSEQUENCE', 'CSQ_TYPE'):
+                consequence = value
+            elif key == 'CLNSIG':
+                significance = value
+            elif key == 'DP':
+                depth = _int_or_missing(value)
+            elif key == 'AF':
+                allele_frequency = _float_or_nan(value.split(',', 1)[0])
+            elif key == 'ANN' and value:
+                # SnpEff: Allele|Annotation|Annotation_Impact|Gene_Name|...
+                parts = value.split(',', 1)[0].split('|')
+                if len(parts) > 3:
+                    consequence = consequence or parts[1]
+                    impact = impact or parts[2]
+                    gene = gene or parts[3]
+    return gene, consequence, impact, significance, depth, allele_frequency
+
+
+def parse_vcf_line(line):
+    fields = line.rstrip('\r\n').split('\t', 8)
+    if len(fields) < 8:
+        raise ValueError(f"Malformed VCF record: {line[:80]!r}")
+    chrom, pos, variant_id, ref, alt, qual, filter_value, info = fields[:8]
+    gene, consequence, impact, significance, depth, allele_frequency = parse_info(info)
+    return (chrom, int(pos), variant_id, ref, alt, _float_or_nan(qual), filter_value,
+            gene, consequence, impact, significance, depth, allele_frequency)
+
+
+def merge_regions(regions):
+    """
+    Merge ``(chrom, start, end)`` regions (1-based inclusive) that overlap or
+    touch on the same chromosome, so a query over them sees each variant once.
+    """
+    merged = []
+    for chrom, start, end in sorted(regions, key=lambda region: (normalize_chrom(region[0]), region[1])):
+        if merged and normalize_chrom(merged[-1][0]) == normalize_chrom(chrom) and start <= merged[-1][2] + 1:
+            merged[-1][2] = max(merged[-1][2], end)
+        else:
+            merged.append([chrom, start, end])
+    return [tuple(region) for region in merged]
+
+
+def open_text_stream(fileobj):
+    """Text stream over a plain or gzip/bgzip compressed binary file object."""
+    if isinstance(fileobj, (str, os.PathLike)):
+        fileobj = open(fileobj, 'rb')
+    buffered = fileobj if hasattr(fileobj, 'peek') else io.BufferedReader(fileobj)
+    if buffered.peek(2)[:2] == b'\x1f\x8b':
+        # bgzip files are concatenated gzip members, which GzipFile reads transparently
+        buffered = gzip.GzipFile(fileobj=buffered)
+    return io.TextIOWrapper(buffered, encoding='utf-8', errors='replace', newline='')
+
+
+class VCFReader:
+    """Chunked VCF reader; ``header`` is filled in as soon as iteration starts."""
+
+    def __init__(self, fileobj, chunk_size=100000):
+        self.stream = open_text_stream(fileobj)
+        self.chunk_size = chunk_size
+        self.header = []
+        self.samples = []
+
+    def chunks(self):
+        rows = []
+        for line in self.stream:
+            if line.startswith('##'):
+                self.header.append(line.rstrip('\r\n'))
+                continue
+            if line.startswith('#'):
+                self.samples = line.rstrip('\r\n').split('\t')[9:]
+                continue
+            if not line.strip():
+                continue
+            rows.append(parse_vcf_line(line))
+            if len(rows) >= self.chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+class _CategoricalBuilder:
+    def __init__(self):
+        self.index = {}
+        self.chunks = []
+
+    def add(self, values):
+        index = self.index
+        codes = [index.setdefault(value, len(index)) for value in values]
+        self.chunks.append(np.asarray(codes, dtype=np.int32))
+
+    def finish(self):
+        codes = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.int32)
+        return codes.astype(_smallest_code_dtype(len(self.index))), list(self.index)
+
+
+class _StringBuilder:
+    def __init__(self):
+        self.data = []
+        self.lengths = []
+
+    def add(self, values):
+        encoded = [value.encode('utf-8') for value in values]
+        self.data.append(b''.join(encoded))
+        self.lengths.append(np.fromiter((len(item) for item in encoded), dtype=np.int64, count=len(encoded)))
+
+    def finish(self):
+        data = np.frombuffer(b''.join(self.data), dtype=np.uint8)
+        lengths = np.concatenate(self.lengths) if self.lengths else np.zeros(0, dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] <= np.iinfo(np.uint32).max:
+            offsets = offsets.astype(np.uint32)
+        return data, offsets
+
+
+class VariantTableBuilder:
+    """Accumulates parsed rows chunk by chunk into columnar arrays."""
+
+    def __init__(self):
+        self.numeric = {name: [] for name in NUMERIC_COLUMNS}
+        self.categorical = {name: _CategoricalBuilder() for name in CATEGORICAL_COLUMNS}
+        self.strings = {name: _StringBuilder() for name in STRING_COLUMNS}
+        self.rows = 0
+
+    def add_rows(self, rows):
+        if not rows:
+            return
+        columns = dict(zip(ROW_FIELDS, zip(*rows)))
+        for name, dtype in NUMERIC_COLUMNS.items():
+            self.numeric[name].append(np.asarray(columns[name], dtype=dtype))
+        for name, builder in self.categorical.items():
+            builder.add(columns[name])
+        for name, builder in self.strings.items():
+            builder.add(columns[name])
+        self.rows += len(rows)
+
+    def finish(self, header=None, source=None):
+        numeric = {
+            name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=NUMERIC_COLUMNS[name])
+            for name, chunks in self.numeric.items()
+        }
+        categorical = {name: builder.finish() for name, builder in self.categorical.items()}
+        strings = {name: builder.finish() for name, builder in self.strings.items()}
+        meta = {
+            'version': STORE_FORMAT_VERSION,
+            'rows': self.rows,
+            'header': header or [],
+            'source': source,
+            'created_at': datetime.now().isoformat(),
+        }
+        return VariantTable(numeric, categorical, strings, meta)
+
+
+class VariantTable:
+    def __init__(self, numeric, categorical, strings, meta, order=None, sorted_positions=None, chrom_offsets=None):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.strings = strings
+        self.meta = meta
+        self._order = order
+        self._sorted_positions = sorted_positions
+        self._chrom_offsets = chrom_offsets
+
+    def __len__(self):
+        return int(self.meta['rows'])
+
+    @property
+    def nbytes(self):
+        total = sum(array.nbytes for array in self.numeric.values())
+        total += sum(codes.nbytes for codes, _ in self.categorical.values())
+        total += sum(data.nbytes + offsets.nbytes for data, offsets in self.strings.values())
+        return total
+
+    # ----- column access -----
+
+    def column(self, name):
+        return self.numeric[name]
+
+    def codes(self, name):
+        return self.categorical[name][0]
+
+    def categories(self, name):
+        return self.categorical[name][1]
+
+    def decoded(self, name, start=0, stop=None):
+        """Decoded values of a categorical or string column for rows [start, stop)."""
+        stop = len(self) if stop is None else stop
+        if name in self.categorical:
+            codes, categories = self.categorical[name]
+            lookup = np.asarray(categories, dtype=object)
+            return lookup[codes[start:stop]].tolist()
+        data, offsets = self.strings[name]
+        window = offsets[start:stop + 1].astype(np.int64)
+        if not len(window):
+            return []
+        blob = data[window[0]:window[-1]].tobytes()
+        base = window[0]
+        return [blob[begin - base:end - base].decode('utf-8')
+                for begin, end in zip(window[:-1].tolist(), window[1:].tolist())]
+
+    def category_counts(self, name, mask=None):
+        codes, categories = self.categorical[name]
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes, minlength=len(categories))
+        return {category: int(count) for category, count in zip(categories, counts) if count}
+
+    def iter_blocks(self, block_rows=20000, start=0, stop=None):
+        """Yield ``(start, stop, columns)`` where columns maps names to decoded lists."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for block_start in range(start, stop, block_rows):
+            block_stop = min(block_start + block_rows, stop)
+            columns = {name: self.numeric[name][block_start:block_stop].tolist() for name in NUMERIC_COLUMNS}
+            for name in CATEGORICAL_COLUMNS + STRING_COLUMNS:
+                columns[name] = self.decoded(name, block_start, block_stop)
+            yield block_start, block_stop, columns
+
+    def take(self, name, rows):
+        """Values of any column at row indices ``rows``."""
+        if name in self.numeric:
+            return self.numeric[name][rows].tolist()
+        if name in self.categorical:
+            codes, categories = self.categorical[name]
+            return np.asarray(categories, dtype=object)[codes[rows]].tolist()
+        data, offsets = self.strings[name]
+        begins, ends = offsets[rows].tolist(), offsets[rows + 1].tolist()
+        return [data[begin:end].tobytes().decode('utf-8') for begin, end in zip(begins, ends)]
+
+    @staticmethod
+    def _records(columns):
+        """Decoded columns as dicts, in the layout the export and report code uses."""
+        records = []
+        for row in zip(*(columns[name] for name in ROW_FIELDS)):
+            values = dict(zip(ROW_FIELDS, row))
+            records.append({
+                'chromosome': values['chrom'],
+                'position': values['pos'],
+                'dbsnp_id': values['id'],
+                'ref': values['ref'],
+                'alt': values['alt'],
+                'quality': None if np.isnan(values['qual']) else values['qual'],
+                'filter': values['filter'],
+                'gene': values['gene'],
+                'consequence': values['consequence'],
+                'impact': values['impact'],
+                'clinical_significance': values['clinical_significance'],
+                'coverage': None if values['depth'] < 0 else values['depth'],
+                'allele_frequency': None if np.isnan(values['allele_frequency']) else values['allele_frequency'],
+            })
+        return records
+
+    def to_records(self, start=0, stop=None):
+        """Rows [start, stop) as dicts."""
+        records = []
+        for _, _, columns in self.iter_blocks(start=start, stop=stop):
+            records.extend(self._records(columns))
+        return records
+
+    @property
+    def order(self):
+        """Row indices sorted by (chromosome code, position), for region queries."""
+        if self._order is None:
+            self._order = np.lexsort((self.numeric['pos'], self.categorical['chrom'][0]))
+        return self._order
+
+    @property
+    def sorted_positions(self):
+        """POS in ``order``, so a region is found by binary search alone."""
+        if self._sorted_positions is None:
+            self._sorted_positions = np.asarray(self.numeric['pos'])[self.order]
+        return self._sorted_positions
+
+    @property
+    def chrom_offsets(self):
+        """Where each chromosome code's rows start and end in ``order``."""
+        if self._chrom_offsets is None:
+            counts = np.bincount(self.codes('chrom'), minlength=len(self.categories('chrom')))
+            self._chrom_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return self._chrom_offsets
+
+    def rows_in_region(self, chrom, start, end):
+        """Row indices of variants on ``chrom`` with start <= POS <= end, in position order."""
+        categories = self.categories('chrom')
+        wanted = normalize_chrom(chrom)
+        codes = [code for code, name in enumerate(categories) if normalize_chrom(name) == wanted]
+        if not codes:
+            return np.zeros(0, dtype=np.int64)
+        order, positions, offsets = self.order, self.sorted_positions, self.chrom_offsets
+        rows = []
+        for code in codes:
+            lo, hi = int(offsets[code]), int(offsets[code + 1])
+            first = lo + int(np.searchsorted(positions[lo:hi], start, side='left'))
+            last = lo + int(np.searchsorted(positions[lo:hi], end, side='right'))
+            rows.append(np.asarray(order[first:last], dtype=np.int64))
+        return np.concatenate(rows)
+
+    def take_records(self, rows):
+        """Records for specific row indices (e.g. the result of a region query)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return self._records({name: self.take(name, rows) for name in ROW_FIELDS})
+
+    # ----- persistence -----
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        meta = dict(self.meta)
+        meta['categories'] = {}
+        for name, array in self.numeric.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        for name, (codes, categories) in self.categorical.items():
+            np.save(os.path.join(tmp_path, f"{name}.codes.npy"), codes)
+            meta['categories'][name] = categories
+        for name, (data, offsets) in self.strings.items():
+            np.save(os.path.join(tmp_path, f"{name}.data.npy"), data)
+            np.save(os.path.join(tmp_path, f"{name}.offsets.npy"), offsets)
+        order = self.order
+        np.save(os.path.join(tmp_path, 'order.npy'), order.astype(np.int32 if len(order) < 2 ** 31 else np.int64))
+        np.save(os.path.join(tmp_path, 'order.pos.npy'), self.sorted_positions)
+        np.save(os.path.join(tmp_path, 'order.chrom_offsets.npy'), self.chrom_offsets)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        categories = meta.pop('categories')
+        numeric = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in NUMERIC_COLUMNS}
+        categorical = {
+            name: (np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode=mode), categories[name])
+            for name in CATEGORICAL_COLUMNS
+        }
+        strings = {
+            name: (np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode=mode),
+                   np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mode))
+            for name in STRING_COLUMNS
+        }
+        # Region index; stores written before it existed rebuild it on first use
+        index = {}
+        for name in ('order', 'order.pos', 'order.chrom_offsets'):
+            index_path = os.path.join(path, f"{name}.npy")
+            index[name] = np.load(index_path, mmap_mode=mode) if os.path.exists(index_path) else None
+        return cls(numeric, categorical, strings, meta, index['order'], index['order.pos'], index['order.chrom_offsets'])
+
+
+# ----- writers -----
+
+def _format_float(value):
+    return '.' if value != value else f"{value:g}"
+
+
+def iter_vcf_text(table, block_rows=20000):
+    """VCF text in blocks of rows; the first block is the header."""
+    info_lines = [f'##INFO=<ID={key},Number={number},Type={kind},Description="{description}">'
+                  for key, number, kind, description in EXPORT_INFO_HEADER]
+    # The source's INFO definitions describe fields the export does not write
+    header = [line for line in table.meta.get('header', [])
+              if not line.startswith(('##fileformat', '##fileDate', '##source', '##INFO='))]
+    lines = [
+        '##fileformat=VCFv4.2',
+        f'##fileDate={datetime.now().strftime("%Y%m%d")}',
+        '##source=GenomeAnalysisExport',
+    ] + info_lines + header + ['#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO']
+    yield '\n'.join(lines) + '\n'
+
+    for _, _, columns in table.iter_blocks(block_rows):
+        out = []
+        for (chrom, pos, variant_id, ref, alt, qual, filter_value, gene, consequence, impact,
+             significance, depth, allele_frequency) in zip(*(columns[name] for name in ROW_FIELDS)):
+            info = []
+            if gene:
+                info.append(f"GENE={gene}")
+            if impact:
+                info.append(f"IMPACT={impact}")
+            if consequence:
+                info.append(f"CONSEQUENCE={consequence}")
+            if significance:
+                info.append(f"CLNSIG={significance}")
+            if depth >= 0:
+                info.append(f"DP={depth}")
+            if allele_frequency == allele_frequency:
+                info.append(f"AF={allele_frequency:g}")
+            out.append(f"{chrom}\t{pos}\t{variant_id or '.'}\t{ref}\t{alt}\t{_format_float(qual)}\t"
+                       f"{filter_value or '.'}\t{';'.join(info) or '.'}\n")
+        yield ''.join(out)
+
+
+def iter_csv_text(table, block_rows=20000):
+    """CSV text in blocks of rows, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+
+    for _, _, columns in table.iter_blocks(block_rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerows(
+            (chrom, pos, ref, alt, gene, impact, significance,
+             '' if qual != qual else f"{qual:g}", '' if depth < 0 else depth,
+             '' if variant_id == '.' else variant_id)
+            for chrom, pos, ref, alt, gene, impact, significance, qual, depth, variant_id in zip(
+                columns['chrom'], columns['pos'], columns['ref'], columns['alt'], columns['gene'],
+                columns['impact'], columns['clinical_significance'], columns['qual'], columns['depth'],
+                columns['id'],
+            )
+        )
+        yield buffer.getvalue()
+
+
+# ----- store -----
+
+class VariantStore:
+    def __init__(self, root=None):
+        self.root = root or getattr(settings, 'VARIANT_STORE_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'variant_store')
+        self.chunk_size = getattr(settings, 'VARIANT_IMPORT_CHUNK_SIZE', 100000)
+
+    def sample_path(self, sample_id):
+        if not SAMPLE_ID_RE.match(str(sample_id)):
+            raise ValueError(f"Invalid sample id: {sample_id!r}")
+        return os.path.join(self.root, str(sample_id))
+
+    def exists(self, sample_id):
+        try:
+            return os.path.exists(os.path.join(self.sample_path(sample_id), 'meta.json'))
+        except ValueError:
+            return False
+
+    def import_vcf(self, sample_id, fileobj, source=None):
+        """Stream a VCF (plain or bgzip) into the store and return the saved table."""
+        path = self.sample_path(sample_id)
+        reader = VCFReader(fileobj, chunk_size=self.chunk_size)
+        builder = VariantTableBuilder()
+        for rows in reader.chunks():
+            builder.add_rows(rows)
+        table = builder.finish(header=reader.header, source=source)
+        os.makedirs(self.root, exist_ok=True)
+        table.save(path)
+        logger.info(f"Imported {len(table)} variants for sample {sample_id} ({table.nbytes / 1e6:.1f} MB columnar)")
+        return self.load(sample_id)
+
+    def save_records(self, sample_id, records, source=None):
+        """Store variants given as dicts (e.g. simulated calls) in columnar form."""
+        builder = VariantTableBuilder()
+        rows = []
+        for record in records:
+            rows.append((
+                str(record.get('chromosome', '')),
+                int(record.get('position', 0)),
+                record.get('dbsnp_id') or '.',
+                record.get('ref', record.get('reference', '')),
+                record.get('alt', record.get('alternate', '')),
+                _float_or_nan(record.get('quality', record.get('quality_score'))),
+                record.get('filter', 'PASS'),
+                record.get('gene', '') or '',
+                record.get('consequence', '') or '',
+                record.get('impact', '') or '',
+                record.get('clinical_significance', '') or '',
+                _int_or_missing(record.get('coverage', record.get('depth'))),
+                _float_or_nan(record.get('allele_frequency')),
+            ))
+            if len(rows) >= self.chunk_size:
+                builder.add_rows(rows)
+                rows = []
+        builder.add_rows(rows)
+        table = builder.finish(source=source)
+        os.makedirs(self.root, exist_ok=True)
+        table.save(self.sample_path(sample_id))
+        return self.load(sample_id)
+
+    def load(self, sample_id):
+        return VariantTable.load(self.sample_path(sample_id))
+
+    def delete(self, sample_id):
+        shutil.rmtree(self.sample_path(sample_id), ignore_errors=True)
+
+    def annotate(self, sample_id, engine=None):
+        """Bulk-annotate a stored sample against the region index and persist the result."""
+        engine = engine or annotation_engine
+        path = self.sample_path(sample_id)
+        annotation = engine.annotate_table(self.load(sample_id))
+        np.savez(os.path.join(path, 'annotation.npz'),
+                 gene=annotation['gene'].astype(np.int32),
+                 kind=annotation['kind'].astype(np.int16),
+                 overlaps=annotation['overlaps'],
+                 pharmacogene=annotation['pharmacogene'])
+        with open(os.path.join(path, 'annotation.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump({'names': annotation['names'], 'kinds': annotation['kinds'],
+                       'annotated_at': datetime.now().isoformat()}, meta_file)
+        return self.annotation_summary(sample_id)
+
+    def annotation_summary(self, sample_id):
+        path = self.sample_path(sample_id)
+        if not os.path.exists(os.path.join(path, 'annotation.json')):
+            return None
+        with open(os.path.join(path, 'annotation.json'), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        with np.load(os.path.join(path, 'annotation.npz')) as arrays:
+            gene = arrays['gene']
+            pharmacogene = arrays['pharmacogene']
+        annotated = gene >= 0
+        counts = np.bincount(gene[annotated], minlength=len(meta['names']))
+        top = np.argsort(-counts, kind='stable')[:50]
+        return {
+            'annotated_variants': int(annotated.sum()),
+            'pharmacogene_variants': int(pharmacogene.sum()),
+            'genes_hit': int((counts > 0).sum()),
+            'top_genes': {meta['names'][i]: int(counts[i]) for i in top.tolist() if counts[i]},
+            'annotated_at': meta['annotated_at'],
+        }
+
+    def variants_in_region(self, sample_id, chrom, start, end, limit=1000):
+        return self.variants_in_regions(sample_id, [(chrom, start, end)], limit=limit)
+
+    def variants_in_regions(self, sample_id, regions, limit=1000):
+        """Count and first ``limit`` records of variants in any of ``regions``, each variant once."""
+        table = self.load(sample_id)
+        rows = [table.rows_in_region(chrom, start, end) for chrom, start, end in merge_regions(regions)]
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        return len(rows), table.take_records(rows[:limit])
+
+    def summary(self, sample_id):
+        table = self.load(sample_id)
+        return {
+            'sample_id': sample_id,
+            'total_variants': len(table),
+            'chromosomes': table.category_counts('chrom'),
+            'clinical_significance': table.category_counts('clinical_significance'),
+            'impact': table.category_counts('impact'),
+            'columnar_bytes': table.nbytes,
+            'imported_at': table.meta.get('created_at'),
+            'source': table.meta.get('source'),
+            'annotation': self.annotation_summary(sample_id),
+        }
+
+
+variant_store = VariantStore()
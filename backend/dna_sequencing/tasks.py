@@ -0,0 +1,14 @@
+"""
+Celery tasks for the DNA sequencing app.
+
+Only used when GENOMICS_BATCH_BACKEND = "celery"; the scheduler routes each
+item to the ``genomics.<model>`` queue.
+"""
+from celery import shared_task
+
+from .services.batch_scheduler import batch_scheduler
+
+
+@shared_task(name='dna_sequencing.run_genomics_batch_item', acks_late=True)
+def run_genomics_batch_item(item_id):
+    return batch_scheduler.execute_item(item_id)
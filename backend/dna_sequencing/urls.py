@@ -7,7 +7,7 @@ Main URL routing for DNA sequencing application
 
 from django.urls import path, include
 from . import views
-from .ai_report_generator import generate_ai_genomic_report, get_ai_report_templates
+from .ai_report_generator import generate_ai_genomic_report, get_ai_genomic_report, get_ai_report_templates
 
 app_name = 'dna_sequencing'
 
@@ -24,9 +24,17 @@ urlpatterns = [
     path('api/export/vcf/', views.export_vcf_report, name='export_vcf'),
     path('api/export/json/', views.export_json_report, name='export_json'),
     
+    # Columnar variant store
+    path('api/variants/import/', views.import_variants, name='import_variants'),
+    path('api/variants/<str:sample_id>/', views.get_variant_summary, name='variant_summary'),
+    path('api/variants/<str:sample_id>/annotate/', views.annotate_stored_variants, name='annotate_variants'),
+    path('api/variants/<str:sample_id>/region/', views.get_region_variants, name='region_variants'),
+    path('api/variants/<str:sample_id>/export/<str:export_format>/', views.export_stored_variants, name='export_stored_variants'),
+    
     # AI-Powered Report Generation
     path('api/reports/ai-generate/', generate_ai_genomic_report, name='ai_generate_report'),
     path('api/reports/templates/', get_ai_report_templates, name='ai_report_templates'),
+    path('api/reports/ai-generate/<str:sample_id>/', get_ai_genomic_report, name='ai_report'),
     
     # AI Genomics Laboratory endpoints
     path('', include('dna_sequencing.ai_genomics_urls')),
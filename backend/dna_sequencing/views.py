@@ -5,7 +5,7 @@
 Main views for DNA sequencing dashboard and analysis
 """
 
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
@@ -13,6 +13,9 @@ import random
 from datetime import datetime, timedelta
 import logging
 
+from .services.annotation import annotation_engine
+from .services.variant_store import iter_csv_text, iter_vcf_text, variant_store
+
 logger = logging.getLogger(__name__)
 
 @require_http_methods(["GET"])
@@ -263,10 +266,13 @@ def export_csv_report(request):
         sample_id = data.get('sample_id', 'unknown')
         export_data = data.get('data', {})
         
-        csv_content = generate_csv_from_data(export_data)
+        if not export_data.get('variants') and variant_store.exists(sample_id):
+            # Stored samples are streamed straight from the columnar store
+            content = iter_csv_text(variant_store.load(sample_id))
+        else:
+            content = _iter_lines(iter_csv_lines_from_data(export_data))
         
-        from django.http import HttpResponse
-        response = HttpResponse(csv_content, content_type='text/csv')
+        response = StreamingHttpResponse(content, content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{sample_id}_variants.csv"'
         return response
         
@@ -284,10 +290,12 @@ def export_vcf_report(request):
         sample_id = data.get('sample_id', 'unknown')
         export_data = data.get('data', {})
         
-        vcf_content = generate_vcf_from_data(export_data)
+        if not export_data.get('variants') and variant_store.exists(sample_id):
+            content = iter_vcf_text(variant_store.load(sample_id))
+        else:
+            content = _iter_lines(iter_vcf_lines_from_data(export_data))
         
-        from django.http import HttpResponse
-        response = HttpResponse(vcf_content, content_type='text/plain')
+        response = StreamingHttpResponse(content, content_type='text/plain')
         response['Content-Disposition'] = f'attachment; filename="{sample_id}_variants.vcf"'
         return response
         
@@ -319,26 +327,20 @@ def export_json_report(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def generate_csv_from_data(data):
-    """Generate CSV content from analysis data"""
-    csv_lines = []
-    
+def iter_csv_lines_from_data(data):
+    """CSV lines for variants posted as a list of dicts"""
     if 'variants' in data and data['variants']:
-        csv_lines.append('Chromosome,Position,Ref,Alt,Gene,Impact,Clinical_Significance,Quality,Coverage,dbSNP_ID')
+        yield 'Chromosome,Position,Ref,Alt,Gene,Impact,Clinical_Significance,Quality,Coverage,dbSNP_ID'
         for variant in data['variants']:
-            csv_lines.append(f"{variant.get('chromosome', '')},{variant.get('position', '')},{variant.get('ref', '')},{variant.get('alt', '')},{variant.get('gene', '')},{variant.get('impact', '')},{variant.get('clinical_significance', '')},{variant.get('quality', '')},{variant.get('coverage', '')},{variant.get('dbsnp_id', '')}")
-    
-    return '\n'.join(csv_lines)
+            yield f"{variant.get('chromosome', '')},{variant.get('position', '')},{variant.get('ref', '')},{variant.get('alt', '')},{variant.get('gene', '')},{variant.get('impact', '')},{variant.get('clinical_significance', '')},{variant.get('quality', '')},{variant.get('coverage', '')},{variant.get('dbsnp_id', '')}"
 
 
-def generate_vcf_from_data(data):
-    """Generate VCF content from analysis data"""
-    vcf_lines = [
-        '##fileformat=VCFv4.2',
-        f'##fileDate={datetime.now().strftime("%Y%m%d")}',
-        '##source=GenomeAnalysisExport',
-        '#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO'
-    ]
+def iter_vcf_lines_from_data(data):
+    """VCF lines for variants posted as a list of dicts"""
+    yield '##fileformat=VCFv4.2'
+    yield f'##fileDate={datetime.now().strftime("%Y%m%d")}'
+    yield '##source=GenomeAnalysisExport'
+    yield '#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO'
     
     if 'variants' in data and data['variants']:
         for variant in data['variants']:
@@ -351,6 +353,154 @@ def generate_vcf_from_data(data):
             filter_col = 'PASS'
             info = f"GENE={variant.get('gene', '')};IMPACT={variant.get('impact', '')}"
             
-            vcf_lines.append(f"{chrom}\t{pos}\t{id_col}\t{ref}\t{alt}\t{qual}\t{filter_col}\t{info}")
+            yield f"{chrom}\t{pos}\t{id_col}\t{ref}\t{alt}\t{qual}\t{filter_col}\t{info}"
+
+
+def _iter_lines(lines, block_size=5000):
+    """Group lines into newline-terminated blocks for streaming responses"""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) >= block_size:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
+
+
+def generate_csv_from_data(data):
+    """Generate CSV content from analysis data"""
+    return '\n'.join(iter_csv_lines_from_data(data))
+
+
+def generate_vcf_from_data(data):
+    """Generate VCF content from analysis data"""
+    return '\n'.join(iter_vcf_lines_from_data(data))
+
+
+# Columnar variant store endpoints
+@csrf_exempt
+@require_http_methods(["POST"])
+def import_variants(request):
+    """Import a VCF (plain or bgzip) upload into the columnar variant store"""
+    try:
+        sample_id = request.POST.get('sample_id')
+        upload = request.FILES.get('file')
+        
+        if not sample_id or upload is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Missing required fields: sample_id, file'
+            }, status=400)
+        
+        # Large uploads are spooled to a temporary file by Django and parsed in chunks
+        variant_store.import_vcf(sample_id, upload.file, source=upload.name)
+        
+        return JsonResponse({
+            'success': True,
+            'message': f'Variants imported for sample {sample_id}',
+            'summary': variant_store.summary(sample_id)
+        }, status=201)
+        
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Invalid VCF: {str(e)}'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Variant import error: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'message': f'Failed to import variants: {str(e)}'
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_variant_summary(request, sample_id):
+    """Counts for a stored sample, computed from the categorical columns"""
+    if not variant_store.exists(sample_id):
+        return JsonResponse({'error': 'Sample not found', 'status': 'error'}, status=404)
+    try:
+        return JsonResponse({
+            'status': 'success',
+            'data': variant_store.summary(sample_id)
+        })
+    except Exception as e:
+        logger.error(f"Variant summary error: {str(e)}")
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def annotate_stored_variants(request, sample_id):
+    """Bulk-annotate a stored sample against the gene/transcript/pharmacogene regions"""
+    if not variant_store.exists(sample_id):
+        return JsonResponse({'error': 'Sample not found', 'status': 'error'}, status=404)
+    try:
+        return JsonResponse({
+            'status': 'success',
+            'data': variant_store.annotate(sample_id)
+        })
+    except Exception as e:
+        logger.error(f"Variant annotation error: {str(e)}")
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+
+
+@require_http_methods(["GET"])
+def get_region_variants(request, sample_id):
+    """Variants of a stored sample in a gene (?gene=) or region (?chrom=&start=&end=)"""
+    if not variant_store.exists(sample_id):
+        return JsonResponse({'error': 'Sample not found', 'status': 'error'}, status=404)
+    try:
+        limit = min(int(request.GET.get('limit', 1000)), 10000)
+        gene = request.GET.get('gene')
+        if gene:
+            regions = annotation_engine.regions_for_name(gene)
+            if not regions:
+                return JsonResponse({'error': f'Unknown gene or region name: {gene}', 'status': 'error'}, status=404)
+        else:
+            chrom = request.GET.get('chrom')
+            if not chrom:
+                return JsonResponse({'error': 'Provide gene or chrom/start/end', 'status': 'error'}, status=400)
+            regions = [{
+                'name': None,
+                'chromosome': chrom,
+                # Region bounds are 1-based inclusive in the API
+                'start': int(request.GET.get('start', 1)) - 1,
+                'end': int(request.GET.get('end', 2 ** 31 - 1)),
+            }]
+        
+        # A gene's regions (transcripts, exons) overlap; each variant is counted once
+        total, variants = variant_store.variants_in_regions(
+            sample_id, [(region['chromosome'], region['start'] + 1, region['end']) for region in regions], limit=limit
+        )
+        
+        return JsonResponse({
+            'status': 'success',
+            'regions': regions,
+            'total_count': total,
+            'variants': variants,
+            'truncated': total > len(variants)
+        })
+    except ValueError:
+        return JsonResponse({'error': 'Invalid region parameters', 'status': 'error'}, status=400)
+    except Exception as e:
+        logger.error(f"Region query error: {str(e)}")
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+
+
+@require_http_methods(["GET"])
+def export_stored_variants(request, sample_id, export_format):
+    """Stream a stored sample as VCF or CSV"""
+    if export_format not in ('vcf', 'csv'):
+        return JsonResponse({'error': 'Unsupported export format', 'status': 'error'}, status=400)
+    if not variant_store.exists(sample_id):
+        return JsonResponse({'error': 'Sample not found', 'status': 'error'}, status=404)
     
-    return '\n'.join(vcf_lines)
+    table = variant_store.load(sample_id)
+    if export_format == 'vcf':
+        response = StreamingHttpResponse(iter_vcf_text(table), content_type='text/plain')
+    else:
+        response = StreamingHttpResponse(iter_csv_text(table), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{sample_id}_variants.{export_format}"'
+    return response
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HomeopathyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'homeopathy'
+
+    def ready(self):
+        import homeopathy.signals
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:59
+
+import re
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Value
+
+
+def populate_search_vectors(apps, schema_editor):
+    # Mirrors homeopathy.services.remedy_search.build_search_vector at the time of this migration
+    HomeopathyRemedy = apps.get_model('homeopathy', 'HomeopathyRemedy')
+    sources = [
+        ('A', ['name', 'latin_name', 'common_name']),
+        ('B', ['keynotes']),
+        ('C', ['mental_symptoms', 'physical_symptoms', 'indications']),
+    ]
+    for remedy in HomeopathyRemedy.objects.all():
+        vector = None
+        for weight, attributes in sources:
+            terms = []
+            for attribute in attributes:
+                value = getattr(remedy, attribute) or ''
+                for item in (value if isinstance(value, list) else [value]):
+                    terms.extend(sorted(set(re.findall(r'\w+', str(item).lower()))))
+            part = SearchVector(Value(' '.join(terms)), config='simple', weight=weight)
+            vector = part if vector is None else vector + part
+        HomeopathyRemedy.objects.filter(pk=remedy.pk).update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homeopathy', '0002_homeopathycase_homeopathyinstitution_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='homeopathyremedy',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='homeopathyremedy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='remedy_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='homeopathyremedy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='remedy_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='homeopathyremedy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['latin_name'], name='remedy_latin_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='homeopathyremedy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['common_name'], name='remedy_common_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
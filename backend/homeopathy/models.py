@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 User = get_user_model()
@@ -127,11 +129,20 @@ class HomeopathyRemedy(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Weighted 'simple' tsvector over names and symptom rubrics (maintained by services.remedy_search)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    
     def __str__(self):
         return self.name
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='remedy_search_vector_gin'),
+            GinIndex(fields=['name'], name='remedy_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['latin_name'], name='remedy_latin_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['common_name'], name='remedy_common_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 class HomeopathyDiagnosis(models.Model):
     """AI-powered diagnosis session"""
@@ -19,7 +19,7 @@ class HomeopathyPatientSerializer(serializers.ModelSerializer):
 class HomeopathyRemedySerializer(serializers.ModelSerializer):
     class Meta:
         model = HomeopathyRemedy
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['created_at', 'updated_at']
 
 class HomeopathyRemedyListSerializer(serializers.ModelSerializer):
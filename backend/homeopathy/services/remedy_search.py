@@ -0,0 +1,110 @@
+"""
+Relevance-ranked remedy search across names and symptom rubrics.
+
+Each remedy carries a ``search_vector`` built with the 'simple' text search
+configuration from the same word tokens repertorization uses (see
+``repertory_index.tokenize``), weighted names (A) > keynotes (B) >
+mental/physical symptoms and indications (C). Queries combine that GIN-indexed
+vector, prefix matching on the last typed word for typeahead, and pg_trgm
+similarity on the name columns for misspelled remedy names.
+"""
+import logging
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.core.paginator import Paginator
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from ..models import HomeopathyRemedy
+from .repertory_index import WORD_RE, tokenize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'simple'
+
+# (weight, remedy attributes) - list attributes are the JSON symptom rubrics
+WEIGHTED_SOURCES = [
+    ('A', ['name', 'latin_name', 'common_name']),
+    ('B', ['keynotes']),
+    ('C', ['mental_symptoms', 'physical_symptoms', 'indications']),
+]
+
+
+def remedy_document(remedy, attributes):
+    """Space-joined repertory tokens for the given remedy attributes."""
+    terms = []
+    for attribute in attributes:
+        value = getattr(remedy, attribute) or ''
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            terms.extend(sorted(tokenize(item)))
+    return ' '.join(terms)
+
+
+def build_search_vector(remedy):
+    vector = None
+    for weight, attributes in WEIGHTED_SOURCES:
+        part = SearchVector(Value(remedy_document(remedy, attributes)), config=SEARCH_CONFIG, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class RemedySearchService:
+    def update_search_vector(self, remedy):
+        HomeopathyRemedy.objects.filter(pk=remedy.pk).update(search_vector=build_search_vector(remedy))
+
+    def rebuild(self):
+        count = 0
+        for remedy in HomeopathyRemedy.objects.all().iterator():
+            self.update_search_vector(remedy)
+            count += 1
+        return count
+
+    def build_query(self, query_text):
+        """
+        Every word is optional (OR) so partial symptom descriptions still rank;
+        the final word also matches as a prefix for typeahead.
+        """
+        # Tokens in typing order, so the prefix applies to the word being typed
+        words = list(dict.fromkeys(WORD_RE.findall(query_text.lower())))
+        if not words:
+            return None
+        terms = words[:-1] + [f"{words[-1]}:*"]
+        return SearchQuery(' | '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+    def search(self, query_text, page=1, page_size=20):
+        query_text = (query_text or '').strip()
+        search_query = self.build_query(query_text)
+        if search_query is None:
+            return [], None
+
+        name_similarity = Greatest(
+            TrigramSimilarity('name', query_text),
+            TrigramSimilarity('latin_name', query_text),
+            TrigramSimilarity('common_name', query_text),
+        )
+        queryset = (
+            HomeopathyRemedy.objects
+            .only('id', 'name', 'latin_name', 'common_name', 'miasm')
+            .annotate(rank=Coalesce(SearchRank(F('search_vector'), search_query), 0.0) + name_similarity)
+            .filter(
+                Q(search_vector=search_query)
+                | Q(name__istartswith=query_text)
+                | Q(name__trigram_similar=query_text)
+                | Q(latin_name__trigram_similar=query_text)
+                | Q(common_name__trigram_similar=query_text)
+            )
+            .order_by('-rank', 'name')
+        )
+        paginator = Paginator(queryset, page_size)
+        page_obj = paginator.get_page(page)
+        return list(page_obj), {
+            'current_page': page_obj.number,
+            'total_pages': paginator.num_pages,
+            'total_count': paginator.count,
+            'has_next': page_obj.has_next(),
+            'has_previous': page_obj.has_previous(),
+        }
+
+
+remedy_search = RemedySearchService()
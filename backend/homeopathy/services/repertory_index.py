@@ -0,0 +1,216 @@
+"""
+Precomputed repertory index for homeopathic remedy scoring.
+
+Every keynote, mental and physical symptom of every remedy becomes a row in a
+sparse symptom x term matrix. A patient case is tokenized once into a term x
+field matrix, so one sparse product yields the word overlap of every symptom
+with every patient field. The scoring rules are the ones repertorization has
+always used:
+
+- a symptom matches a patient field when they share at least two words
+- keynote vs ``primary_symptoms``: 15 points per matching keynote
+- mental symptom vs each mental field: 10 points per matching (symptom, field)
+- physical symptom vs each physical field: 8 points per matching (symptom, field)
+- constitution listed in the remedy's ``constitution_affinity``: 20 points
+
+The index is rebuilt lazily whenever the remedy table changes.
+"""
+import logging
+import re
+import threading
+
+import numpy as np
+from scipy import sparse
+from django.db.models import Count, Max
+
+from ..models import HomeopathyRemedy
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+
+KEYNOTE_FIELDS = ['primary_symptoms']
+MENTAL_FIELDS = ['mental_state', 'emotional_pattern', 'fears', 'anxieties', 'mood']
+PHYSICAL_FIELDS = ['appetite', 'thirst', 'sleep', 'dreams', 'thermals', 'perspiration']
+
+# (remedy attribute, patient fields, points per match, label used in matching_symptoms)
+RUBRICS = [
+    ('keynotes', KEYNOTE_FIELDS, 15, 'Keynote'),
+    ('mental_symptoms', MENTAL_FIELDS, 10, 'Mental'),
+    ('physical_symptoms', PHYSICAL_FIELDS, 8, 'Physical'),
+]
+CONSTITUTION_POINTS = 20
+MIN_SHARED_WORDS = 2
+
+
+def tokenize(text):
+    """Lower-cased set of word tokens; the tokenization used for all remedy matching."""
+    if not text:
+        return set()
+    return set(WORD_RE.findall(str(text).lower()))
+
+
+class _Rubric:
+    """Sparse matrices for one rubric (keynotes, mental or physical symptoms)."""
+
+    def __init__(self, label, fields, points, symptoms, symptom_terms, symptom_remedy, vocabulary, n_remedies):
+        self.label = label
+        self.fields = fields
+        self.points = points
+        self.symptoms = symptoms
+        rows = np.repeat(np.arange(len(symptom_terms)), [len(terms) for terms in symptom_terms])
+        cols = [vocabulary[term] for terms in symptom_terms for term in terms]
+        self.symptom_term = sparse.csr_matrix(
+            (np.ones(len(cols), dtype=np.int32), (rows, np.asarray(cols, dtype=np.int64))),
+            shape=(len(symptom_terms), len(vocabulary)),
+        )
+        self.symptom_remedy = np.asarray(symptom_remedy, dtype=np.int64)
+        # remedy x symptom incidence, used to sum per-symptom matches into remedy scores
+        self.remedy_symptom = sparse.csr_matrix(
+            (np.ones(len(symptom_remedy), dtype=np.int32),
+             (self.symptom_remedy, np.arange(len(symptom_remedy)))),
+            shape=(n_remedies, len(symptom_remedy)),
+        )
+
+    def match_counts(self, field_terms, vocabulary):
+        """Number of patient fields each symptom matches (>= MIN_SHARED_WORDS shared words)."""
+        cols, rows = [], []
+        for column, field in enumerate(self.fields):
+            for term in field_terms.get(field, ()):
+                index = vocabulary.get(term)
+                if index is not None:
+                    rows.append(index)
+                    cols.append(column)
+        if not rows or not self.symptoms:
+            return np.zeros(len(self.symptoms), dtype=np.int32)
+        term_field = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(self.symptom_term.shape[1], len(self.fields)),
+        )
+        overlaps = (self.symptom_term @ term_field).toarray()
+        return (overlaps >= MIN_SHARED_WORDS).sum(axis=1).astype(np.int32)
+
+
+class RepertoryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._built = None
+
+    def invalidate(self):
+        self._fingerprint = None
+
+    def _current_fingerprint(self):
+        stats = HomeopathyRemedy.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        return stats['count'], stats['updated']
+
+    def _build(self):
+        remedies = list(HomeopathyRemedy.objects.only(
+            'id', 'name', 'miasm', 'common_potencies', 'keynotes',
+            'mental_symptoms', 'physical_symptoms', 'constitution_affinity'
+        ).order_by('name'))
+
+        vocabulary = {}
+        rubrics = []
+        for attribute, fields, points, label in RUBRICS:
+            symptoms, symptom_terms, symptom_remedy = [], [], []
+            for remedy_index, remedy in enumerate(remedies):
+                for symptom in getattr(remedy, attribute) or []:
+                    terms = tokenize(symptom)
+                    for term in terms:
+                        vocabulary.setdefault(term, len(vocabulary))
+                    symptoms.append(symptom)
+                    symptom_terms.append(terms)
+                    symptom_remedy.append(remedy_index)
+            rubrics.append((label, fields, points, symptoms, symptom_terms, symptom_remedy))
+
+        built_rubrics = [
+            _Rubric(label, fields, points, symptoms, terms, owners, vocabulary, len(remedies))
+            for label, fields, points, symptoms, terms, owners in rubrics
+        ]
+
+        constitutions = {}
+        for remedy_index, remedy in enumerate(remedies):
+            for constitution in remedy.constitution_affinity or []:
+                constitutions.setdefault(constitution, np.zeros(len(remedies), dtype=bool))[remedy_index] = True
+
+        logger.info(f"Built repertory index: {len(remedies)} remedies, {len(vocabulary)} terms")
+        return {
+            'remedies': remedies,
+            'vocabulary': vocabulary,
+            'rubrics': built_rubrics,
+            'constitutions': constitutions,
+        }
+
+    def get(self):
+        fingerprint = self._current_fingerprint()
+        built = self._built
+        if built is None or fingerprint != self._fingerprint:
+            with self._lock:
+                if self._built is None or fingerprint != self._fingerprint:
+                    self._built = self._build()
+                    self._fingerprint = fingerprint
+                built = self._built
+        return built
+
+    def score(self, data, constitution, top_k=5, min_score=20):
+        """
+        Score every remedy against a patient case and return the ``top_k``
+        remedies scoring above ``min_score``, best first. Ties keep remedy name
+        order. Each hit is a dict with the remedy, its per-rubric scores and the
+        list of matching symptoms.
+        """
+        index = self.get()
+        remedies = index['remedies']
+        if not remedies:
+            return []
+
+        field_terms = {}
+        for _, fields, _, _ in RUBRICS:
+            for field in fields:
+                field_terms[field] = tokenize(data.get(field, ''))
+
+        rubric_scores = []
+        rubric_counts = []
+        for rubric in index['rubrics']:
+            counts = rubric.match_counts(field_terms, index['vocabulary'])
+            rubric_counts.append(counts)
+            rubric_scores.append(rubric.points * (rubric.remedy_symptom @ counts))
+
+        affinity = index['constitutions'].get(constitution)
+        constitutional = (affinity * CONSTITUTION_POINTS).astype(np.int64) if affinity is not None \
+            else np.zeros(len(remedies), dtype=np.int64)
+
+        total = sum(rubric_scores) + constitutional
+        candidates = np.flatnonzero(total > min_score)
+        if not len(candidates):
+            return []
+        if len(candidates) > top_k:
+            # Partition on the k-th best score, keeping every tie so name order decides
+            kth = np.partition(total[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+            candidates = candidates[total[candidates] >= kth]
+        ordered = candidates[np.argsort(-total[candidates], kind='stable')][:top_k]
+
+        hits = []
+        for remedy_index in ordered:
+            matching_symptoms = []
+            for rubric, counts in zip(index['rubrics'], rubric_counts):
+                for symptom_index in np.flatnonzero((rubric.symptom_remedy == remedy_index) & (counts > 0)):
+                    matching_symptoms.extend(
+                        [f"{rubric.label}: {rubric.symptoms[symptom_index]}"] * int(counts[symptom_index])
+                    )
+            if constitutional[remedy_index]:
+                matching_symptoms.append(f"Constitutional match: {constitution}")
+            hits.append({
+                'remedy': remedies[remedy_index],
+                'keynote_score': int(rubric_scores[0][remedy_index]),
+                'mental_score': int(rubric_scores[1][remedy_index]),
+                'physical_score': int(rubric_scores[2][remedy_index]),
+                'constitutional_score': int(constitutional[remedy_index]),
+                'total_score': int(total[remedy_index]),
+                'matching_symptoms': matching_symptoms,
+            })
+        return hits
+
+
+repertory_index = RepertoryIndex()
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import HomeopathyRemedy
+from .services.remedy_search import remedy_search
+from .services.repertory_index import repertory_index
+
+
+@receiver(post_save, sender=HomeopathyRemedy)
+def refresh_remedy_indexes(sender, instance, **kwargs):
+    """Keep the remedy search vector and repertory index in step with edits"""
+    remedy_search.update_search_vector(instance)
+    repertory_index.invalidate()
+
+
+@receiver(post_delete, sender=HomeopathyRemedy)
+def drop_remedy_from_repertory(sender, instance, **kwargs):
+    repertory_index.invalidate()
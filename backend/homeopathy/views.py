@@ -10,6 +10,8 @@ import re
 import json
 
 from .models import HomeopathyPatient, HomeopathyRemedy, HomeopathyDiagnosis, HomeopathyRemedySuggestion
+from .services.repertory_index import repertory_index
+from .services.remedy_search import remedy_search
 from .serializers import (
     HomeopathyPatientSerializer, HomeopathyRemedySerializer, 
     HomeopathyDiagnosisSerializer, DiagnosisCreateSerializer,
@@ -125,26 +127,24 @@ class AIAnalysisView(APIView):
     def perform_ai_analysis(self, diagnosis, data):
         """AI analysis engine for homeopathic diagnosis"""
         
-        # Get all remedies for analysis
-        remedies = HomeopathyRemedy.objects.all()
-        remedy_scores = []
-        
-        # Analyze each remedy
-        for remedy in remedies:
-            score_data = self.analyze_remedy_match(remedy, data)
-            if score_data['total_score'] > 20:  # Minimum threshold
-                remedy_scores.append(score_data)
-        
-        # Sort by total score
-        remedy_scores.sort(key=lambda x: x['total_score'], reverse=True)
-        
-        # Take top 5 remedies
-        top_remedies = remedy_scores[:5]
-        
         # Determine constitution and miasm
         suggested_constitution = self.determine_constitution(data)
         suggested_miasm = self.determine_miasm(data)
         
+        # Score all remedies against the case in one pass over the repertory index
+        top_remedies = []
+        for score_data in repertory_index.score(data, suggested_constitution, top_k=5, min_score=20):
+            remedy = score_data['remedy']
+            score_data['reasoning'] = self.generate_remedy_reasoning(
+                remedy, score_data['keynote_score'], score_data['mental_score'],
+                score_data['physical_score'], score_data['constitutional_score']
+            )
+            potency_freq = self.suggest_potency_frequency(remedy, data)
+            score_data['suggested_potency'] = potency_freq['potency']
+            score_data['suggested_frequency'] = potency_freq['frequency']
+            score_data['duration'] = potency_freq['duration']
+            top_remedies.append(score_data)
+        
         # Calculate overall confidence
         ai_confidence = self.calculate_confidence(data, top_remedies)
         
@@ -182,86 +182,6 @@ class AIAnalysisView(APIView):
             ]
         }
     
-    def analyze_remedy_match(self, remedy, data):
-        """Analyze how well a remedy matches the patient's symptoms"""
-        
-        # Initialize scores
-        keynote_score = 0
-        mental_score = 0
-        physical_score = 0
-        constitutional_score = 0
-        matching_symptoms = []
-        
-        # Analyze keynotes
-        if remedy.keynotes:
-            for keynote in remedy.keynotes:
-                if self.symptom_matches(keynote, data.get('primary_symptoms', '')):
-                    keynote_score += 15
-                    matching_symptoms.append(f"Keynote: {keynote}")
-        
-        # Analyze mental symptoms
-        if remedy.mental_symptoms:
-            mental_fields = ['mental_state', 'emotional_pattern', 'fears', 'anxieties', 'mood']
-            for mental_symptom in remedy.mental_symptoms:
-                for field in mental_fields:
-                    if self.symptom_matches(mental_symptom, data.get(field, '')):
-                        mental_score += 10
-                        matching_symptoms.append(f"Mental: {mental_symptom}")
-        
-        # Analyze physical symptoms
-        if remedy.physical_symptoms:
-            physical_fields = ['appetite', 'thirst', 'sleep', 'dreams', 'thermals', 'perspiration']
-            for physical_symptom in remedy.physical_symptoms:
-                for field in physical_fields:
-                    if self.symptom_matches(physical_symptom, data.get(field, '')):
-                        physical_score += 8
-                        matching_symptoms.append(f"Physical: {physical_symptom}")
-        
-        # Constitutional analysis
-        if remedy.constitution_affinity:
-            patient_constitution = self.determine_constitution(data)
-            if patient_constitution in remedy.constitution_affinity:
-                constitutional_score += 20
-                matching_symptoms.append(f"Constitutional match: {patient_constitution}")
-        
-        # Calculate total score
-        total_score = keynote_score + mental_score + physical_score + constitutional_score
-        
-        # Generate reasoning
-        reasoning = self.generate_remedy_reasoning(
-            remedy, keynote_score, mental_score, physical_score, constitutional_score
-        )
-        
-        # Suggest potency and frequency
-        potency_freq = self.suggest_potency_frequency(remedy, data)
-        
-        return {
-            'remedy': remedy,
-            'keynote_score': keynote_score,
-            'mental_score': mental_score,
-            'physical_score': physical_score,
-            'constitutional_score': constitutional_score,
-            'total_score': total_score,
-            'matching_symptoms': matching_symptoms,
-            'reasoning': reasoning,
-            'suggested_potency': potency_freq['potency'],
-            'suggested_frequency': potency_freq['frequency'],
-            'duration': potency_freq['duration']
-        }
-    
-    def symptom_matches(self, remedy_symptom, patient_data):
-        """Check if remedy symptom matches patient data using fuzzy matching"""
-        if not patient_data or not remedy_symptom:
-            return False
-        
-        # Convert to lowercase for comparison
-        remedy_words = set(re.findall(r'\w+', remedy_symptom.lower()))
-        patient_words = set(re.findall(r'\w+', patient_data.lower()))
-        
-        # Check for word overlap
-        overlap = remedy_words.intersection(patient_words)
-        return len(overlap) >= 2  # At least 2 matching words
-    
     def determine_constitution(self, data):
         """Determine constitutional type based on symptoms"""
         constitution_indicators = {
@@ -481,20 +401,22 @@ class RemedySearchView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Search remedies by name or symptoms"""
+        """Search remedies by name or symptoms, ranked by relevance"""
         query = request.GET.get('q', '')
         
         if not query:
             return Response({'remedies': []})
         
-        remedies = HomeopathyRemedy.objects.filter(
-            Q(name__icontains=query) |
-            Q(latin_name__icontains=query) |
-            Q(common_name__icontains=query)
-        )[:10]
+        try:
+            page = int(request.GET.get('page', 1))
+            page_size = min(max(int(request.GET.get('page_size', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        remedies, pagination = remedy_search.search(query, page, page_size)
         
         serializer = HomeopathyRemedyListSerializer(remedies, many=True)
-        return Response({'remedies': serializer.data})
+        return Response({'remedies': serializer.data, 'pagination': pagination})
 
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+
+from backend.uploads import blob_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored upload blobs that no file field has referenced for a grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced blobs this long so re-uploads can reuse them')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(hours=options['grace_hours'])
+        removed, freed = blob_storage().purge(older_than)
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {removed} unreferenced blobs ({freed / (1024 * 1024):.1f} MB)"
+        ))
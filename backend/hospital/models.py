@@ -493,4 +493,25 @@ class UserCreationQuota(models.Model):
             self.current_patients = 0
             self.current_pharmacists = 0
             self.last_reset = now
-            self.save()
\ No newline at end of file
+            self.save()
+
+class StoredBlob(models.Model):
+    """
+    One stored copy of uploaded content, shared by every file field that
+    references the same bytes (see backend/uploads.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name of the content")
+    size = models.BigIntegerField(default=0)
+    content_type = models.CharField(max_length=200, blank=True)
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'last_referenced_at'], name='stored_blob_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
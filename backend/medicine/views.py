@@ -1872,17 +1872,20 @@ class RetinopathyAIViewSet(viewsets.ViewSet):
             
             # Advanced AI Processing Simulation with realistic medical analysis
             import time
-            import base64
-            from io import BytesIO
-            from PIL import Image
-            import hashlib
+            from backend import imaging
+            from backend.uploads import upload_sha256
+            
+            # Header-only check that the upload is a readable image
+            try:
+                image_info = imaging.probe(image_file)
+            except Exception:
+                return Response({'error': 'Uploaded file is not a readable image'}, status=400)
             
             # Simulate advanced AI processing time (longer for more sophisticated analysis)
             time.sleep(3)  # Simulate deep learning processing
             
             # Generate deterministic results based on image characteristics
-            image_hash = hashlib.md5(image_file.read()).hexdigest()
-            image_file.seek(0)  # Reset file pointer
+            image_hash = upload_sha256(image_file)
             random.seed(int(image_hash[:8], 16))  # Deterministic randomness based on image
             
             # Advanced AI Analysis with Generative AI Insights
@@ -1961,6 +1964,12 @@ class RetinopathyAIViewSet(viewsets.ViewSet):
                 'eye': eye,
                 'image_url': '/api/placeholder/400/400',
                 'annotated_image_url': '/api/placeholder/400/400',
+                'image_metadata': {
+                    'width': image_info.width,
+                    'height': image_info.height,
+                    'format': image_info.format,
+                    'color_mode': image_info.mode
+                },
                 'analysis_date': timezone.now().isoformat(),
                 'ai_diagnosis': ai_diagnosis,
                 'severity': severity,
@@ -6,7 +6,8 @@ from django.utils.safestring import mark_safe
 from .models import (
     Genre, Title, Season, Episode, Asset, UserProfile, UserEntitlements,
     Device, Watchlist, PlaybackHistory, Rating, ManualPayment, Invoice,
-    ContentAuditLog, EnhancedRole, UserRoleAssignment
+    ContentAuditLog, EnhancedRole, UserRoleAssignment, HomeRow, HomeRowBuild,
+    BulkCatalogJob
 )
 
 
@@ -231,6 +232,43 @@ class RatingAdmin(admin.ModelAdmin):
     title_name.short_description = 'Title'
 
 
+@admin.register(HomeRow)
+class HomeRowAdmin(admin.ModelAdmin):
+    list_display = ('key', 'kind', 'label', 'item_count', 'computed_at')
+    list_filter = ('kind',)
+    search_fields = ('key', 'profile__user__email', 'genre__name')
+    readonly_fields = ('key', 'kind', 'profile', 'genre', 'label', 'items', 'context', 'computed_at')
+    
+    def item_count(self, obj):
+        return len(obj.items)
+    item_count.short_description = 'Items'
+    
+    def has_add_permission(self, request):
+        return False  # Rows are built by refresh_home_rows
+
+
+@admin.register(HomeRowBuild)
+class HomeRowBuildAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'full', 'profiles', 'rows', 'seconds')
+    list_filter = ('full',)
+    readonly_fields = ('full', 'started_at', 'seconds', 'profiles', 'rows')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BulkCatalogJob)
+class BulkCatalogJobAdmin(admin.ModelAdmin):
+    list_display = ('action', 'status', 'processed', 'total', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('action', 'status')
+    readonly_fields = ('action', 'tags', 'requested_by', 'request_context', 'status', 'total', 'processed',
+                       'result', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at')
+    exclude = ('title_ids',)
+    
+    def has_add_permission(self, request):
+        return False  # Jobs are queued through the bulk operations endpoint
+
+
 @admin.register(ManualPayment)
 class ManualPaymentAdmin(admin.ModelAdmin):
     list_display = ('user_email', 'amount_display', 'method', 'date_received', 'verified', 'recorded_by')
@@ -357,8 +395,8 @@ class EnhancedRoleAdmin(admin.ModelAdmin):
 
 @admin.register(UserRoleAssignment)
 class UserRoleAssignmentAdmin(admin.ModelAdmin):
-    list_display = ('user_email', 'role_name', 'assigned_by', 'assigned_at')
-    list_filter = ('role__role_type', 'assigned_at')
+    list_display = ('user_email', 'role_name', 'assigned_by', 'assigned_at', 'is_active', 'expires_at')
+    list_filter = ('role__role_type', 'is_active', 'assigned_at')
     search_fields = ('user__email', 'role__name')
     readonly_fields = ('assigned_at',)
     
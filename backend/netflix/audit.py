@@ -0,0 +1,81 @@
+"""
+Batched writer for the content audit trail.
+
+Signal handlers record one ContentAuditLog entry per save; instead of an
+INSERT inside every save, entries are inserted in batches of
+NETFLIX_AUDIT_LOG_BATCH_SIZE, at least every NETFLIX_AUDIT_LOG_FLUSH_SECONDS,
+through the journaled buffered writer in backend/buffered_writes.py: entries
+of a committed change survive the process being killed before the flush.
+Entries keep the time they were recorded, not the time they were written.
+
+Entries are queued only once the surrounding transaction commits, so the
+trail never shows a change that was rolled back. Bulk catalog operations
+(netflix/bulk.py) do not go through the buffer: they insert their entries in
+the transaction that makes the change.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from backend.buffered_writes import BufferedBulkWriter
+
+logger = logging.getLogger(__name__)
+
+
+def request_context(request):
+    """ip_address, user_agent and request_path of an audit entry made for ``request``."""
+    if request is None:
+        return {}
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    return {
+        'ip_address': forwarded_for.split(',')[0].strip() if forwarded_for else request.META.get('REMOTE_ADDR'),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        'request_path': request.path[:500],
+    }
+
+
+class ContentAuditLogWriter(BufferedBulkWriter):
+    name = 'content-audit-log'
+
+    def __init__(self):
+        super().__init__(
+            batch_size=getattr(settings, 'NETFLIX_AUDIT_LOG_BATCH_SIZE', 200),
+            flush_seconds=getattr(settings, 'NETFLIX_AUDIT_LOG_FLUSH_SECONDS', 2.0),
+            max_buffered=getattr(settings, 'NETFLIX_AUDIT_LOG_MAX_BUFFERED', 50000),
+        )
+
+    def get_model(self):
+        from .models import ContentAuditLog
+        return ContentAuditLog
+
+    def record(self, action, entity_type, entity_id, entity_name='', actor_user=None, **fields):
+        """Queue one audit entry (ContentAuditLog fields); written with the next batch."""
+        self.queue(self.get_model()(
+            actor_user_id=getattr(actor_user, 'pk', None),
+            action=action,
+            entity_type=entity_type,
+            entity_id=str(entity_id),
+            entity_name=entity_name[:200],
+            timestamp=timezone.now(),
+            **fields,
+        ))
+
+    def write_one(self, entry):
+        # An actor deleted since the entry was recorded fails the whole batch;
+        # such entries are kept without their actor
+        try:
+            with transaction.atomic():
+                entry.save(force_insert=True)
+            return True
+        except IntegrityError:
+            if self.replayed(entry):
+                return False  # Replayed from a journal after it was written
+            logger.warning(f"Audit entry for {entry.entity_type} {entry.entity_id} lost its actor")
+            entry.actor_user_id = None
+            entry.save(force_insert=True)
+            return True
+
+
+content_audit_log = ContentAuditLogWriter()
@@ -0,0 +1,264 @@
+"""
+Bulk catalog operations.
+
+Publish, unpublish, delete, tag and untag run over any number of titles in
+chunks of NETFLIX_BULK_CHUNK_SIZE titles, one transaction per chunk. A chunk
+locks its titles, changes the ones not already in the target state with
+set-based statements, and inserts one ContentAuditLog entry per changed title
+with ``bulk_create`` in the same transaction: every committed change has its
+audit entry, and a failure leaves each chunk either done or untouched. Tag
+changes recompute the chunk's search vectors.
+
+While an operation runs on a thread, the per-object signal handlers for
+title deletion audit and episode search upkeep stand down; the engine does
+that work once per chunk instead. Progress is logged every ten chunks and
+passed to an optional callback after each one.
+
+Requests do not run operations themselves: ``submit`` records a
+BulkCatalogJob and runs it on a background thread, which stores the number
+of processed titles after every chunk, so clients poll the job instead of
+holding a request open for the whole run. A job is claimed atomically before
+it runs, so dispatching it twice runs it once. Jobs lost with their process
+(restart, deploy, worker recycling) stay queued or stop updating; they are
+requeued once idle for NETFLIX_BULK_JOB_STALE_SECONDS, on the next submit or
+by ``run_bulk_catalog_jobs``. Rerunning a job is safe: titles already in the
+target state count as unchanged.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Func, JSONField, Value
+from django.utils import timezone
+
+from .models import BulkCatalogJob, ContentAuditLog, Title
+from .search import catalog_search
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('publish', 'unpublish', 'delete', 'tag', 'untag')
+TARGET_VISIBILITY = {'publish': 'PUBLIC', 'unpublish': 'PRIVATE'}
+SNAPSHOT_FIELDS = ('name', 'type', 'visibility')
+PROGRESS_LOG_CHUNKS = 10
+
+
+class BulkOperationError(Exception):
+    """A chunk failed; ``result`` covers the chunks committed before it."""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+class BulkCatalogOperations:
+    def __init__(self):
+        self.chunk_size = getattr(settings, 'NETFLIX_BULK_CHUNK_SIZE', 1000)
+        self.workers = getattr(settings, 'NETFLIX_BULK_WORKERS', 1)
+        self.stale_seconds = getattr(settings, 'NETFLIX_BULK_JOB_STALE_SECONDS', 900)
+        self._state = threading.local()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def active(self):
+        """True while a bulk operation runs on this thread."""
+        return getattr(self._state, 'active', False)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-catalog')
+            return self._executor
+
+    def submit(self, action, title_ids, user=None, tags=None, context=None):
+        """Record a BulkCatalogJob and run it in the background once the current transaction commits."""
+        title_ids = [str(title_id) for title_id in dict.fromkeys(title_ids)]
+        job = BulkCatalogJob.objects.create(
+            action=action, title_ids=title_ids, tags=list(dict.fromkeys(tags or [])),
+            requested_by=user, request_context=context or {}, total=len(title_ids),
+        )
+        stale = self.recover_stale()
+        transaction.on_commit(lambda: self.dispatch([job.pk, *stale]))
+        return job
+
+    def recover_stale(self):
+        """
+        Requeue jobs that stopped making progress: queued ones never picked up
+        and running ones whose process went away. Returns their ids.
+        """
+        cutoff = timezone.now() - timedelta(seconds=self.stale_seconds)
+        stale = list(BulkCatalogJob.objects.filter(
+            status__in=['queued', 'running'], updated_at__lt=cutoff
+        ).values_list('pk', flat=True))
+        if stale:
+            BulkCatalogJob.objects.filter(pk__in=stale, updated_at__lt=cutoff).update(
+                status='queued', updated_at=timezone.now()
+            )
+            logger.warning(f"Requeued {len(stale)} stalled bulk catalog jobs")
+        return stale
+
+    def dispatch(self, job_ids):
+        """Run jobs on the background threads; returns their futures."""
+        executor = self._get_executor()
+        return [executor.submit(self.run_job, job_id) for job_id in job_ids]
+
+    def run_job(self, job_id):
+        """
+        Claim a queued job and run it, recording progress after each chunk and
+        the outcome. Returns False if the job was not queued.
+        """
+        try:
+            now = timezone.now()
+            if not BulkCatalogJob.objects.filter(pk=job_id, status='queued').update(
+                status='running', processed=0, error='', started_at=now, updated_at=now
+            ):
+                return False
+            job = BulkCatalogJob.objects.get(pk=job_id)
+
+            def progress(done, total):
+                BulkCatalogJob.objects.filter(pk=job.pk).update(processed=done, updated_at=timezone.now())
+
+            try:
+                result = self.run(job.action, job.title_ids, user=job.requested_by, tags=job.tags,
+                                  context=job.request_context, progress=progress)
+                outcome = {'status': 'completed', 'result': result}
+            except (BulkOperationError, ValueError) as e:
+                outcome = {'status': 'failed', 'error': str(e), 'result': getattr(e, 'result', {})}
+            BulkCatalogJob.objects.filter(pk=job.pk).update(
+                finished_at=timezone.now(), updated_at=timezone.now(), **outcome
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Bulk catalog job {job_id} failed: {str(e)}")
+            BulkCatalogJob.objects.filter(pk=job_id).update(
+                status='failed', error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+            )
+            return True
+        finally:
+            close_old_connections()
+
+    def run(self, action, title_ids, user=None, tags=None, context=None, progress=None):
+        """
+        Apply ``action`` to ``title_ids``; ``progress(done, total)`` is called
+        after each chunk and ``context`` (ip_address, user_agent,
+        request_path) goes into every audit entry. Returns counts of changed,
+        unchanged (already in the target state) and missing titles. Raises
+        BulkOperationError when a chunk fails, after the chunks before it have
+        committed.
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown bulk action: {action}")
+        if action in ('tag', 'untag') and not tags:
+            raise ValueError(f"{action} needs at least one tag")
+
+        title_ids = list(dict.fromkeys(title_ids))
+        tags = list(dict.fromkeys(tags or []))
+        total = len(title_ids)
+        context = {'actor_user_id': getattr(user, 'pk', None), **(context or {})}
+        result = {'action': action, 'requested': total, 'changed': 0, 'unchanged': 0, 'missing': 0, 'chunks': 0}
+        started = time.perf_counter()
+        self._state.active = True
+        try:
+            for start in range(0, total, self.chunk_size):
+                chunk = title_ids[start:start + self.chunk_size]
+                try:
+                    with transaction.atomic():
+                        found, changed = self._apply(action, chunk, tags, context)
+                except Exception as e:
+                    result['seconds'] = round(time.perf_counter() - started, 3)
+                    logger.error(f"Bulk {action} failed after {start} of {total} titles: {str(e)}")
+                    raise BulkOperationError(f"{action} failed after {start} of {total} titles: {str(e)}", result) from e
+
+                result['chunks'] += 1
+                result['changed'] += changed
+                result['unchanged'] += found - changed
+                result['missing'] += len(chunk) - found
+                if result['chunks'] % PROGRESS_LOG_CHUNKS == 0:
+                    logger.info(f"Bulk {action}: {start + len(chunk)}/{total} titles, {result['changed']} changed")
+                if progress:
+                    progress(start + len(chunk), total)
+        finally:
+            self._state.active = False
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Bulk {action} of {total} titles done in {result['seconds']}s: {result['changed']} changed")
+        return result
+
+    def _apply(self, action, title_ids, tags, context):
+        """One chunk inside its transaction; returns (titles found, titles changed)."""
+        titles = list(
+            Title.objects.select_for_update().filter(pk__in=title_ids).only('id', 'tags', *SNAPSHOT_FIELDS)
+        )
+        now = timezone.now()
+
+        if action == 'delete':
+            ContentAuditLog.objects.bulk_create([
+                self._entry('DELETE', title, context, now, old_values=self._snapshot(title)) for title in titles
+            ])
+            Title.objects.filter(pk__in=[title.pk for title in titles]).delete()
+            return len(titles), len(titles)
+
+        if action in TARGET_VISIBILITY:
+            visibility = TARGET_VISIBILITY[action]
+            changed = [title for title in titles if title.visibility != visibility]
+            Title.objects.filter(pk__in=[title.pk for title in changed]).update(
+                visibility=visibility, updated_by_id=context['actor_user_id'], updated_at=now
+            )
+            entries = [
+                self._entry('UPDATE', title, context, now,
+                            old_values={'visibility': title.visibility}, new_values={'visibility': visibility})
+                for title in changed
+            ]
+        else:
+            changed, entries, groups = [], [], defaultdict(list)
+            for title in titles:
+                current = title.tags or []
+                if action == 'tag':
+                    delta = [tag for tag in tags if tag not in current]
+                    updated = current + delta
+                else:
+                    delta = [tag for tag in current if tag in tags]
+                    updated = [tag for tag in current if tag not in tags]
+                if not delta:
+                    continue
+                entries.append(self._entry('UPDATE', title, context, now,
+                                           old_values={'tags': current}, new_values={'tags': updated}))
+                groups[tuple(delta)].append(title.pk)
+                changed.append(title)
+            # One UPDATE per distinct set of tags to append (at most one per subset
+            # of ``tags``); untag removes them all with one (jsonb - text[])
+            if action == 'tag':
+                for delta, title_ids in groups.items():
+                    self._update_tags(title_ids, '||', Value(list(delta), output_field=JSONField()), context, now)
+            elif changed:
+                self._update_tags([title.pk for title in changed], '-', Value(list(tags)), context, now)
+            # Tags are part of the search vector
+            catalog_search.reindex([title.pk for title in changed])
+
+        ContentAuditLog.objects.bulk_create(entries)
+        return len(titles), len(changed)
+
+    @staticmethod
+    def _update_tags(title_ids, operator, operand, context, now):
+        """Set ``tags = tags <operator> operand`` on ``title_ids`` in one statement."""
+        Title.objects.filter(pk__in=title_ids).update(
+            tags=Func(F('tags'), operand, template='%(expressions)s', arg_joiner=f' {operator} ', output_field=JSONField()),
+            updated_by_id=context['actor_user_id'], updated_at=now,
+        )
+
+    @staticmethod
+    def _snapshot(title):
+        return {field: getattr(title, field) for field in SNAPSHOT_FIELDS}
+
+    @staticmethod
+    def _entry(action, title, context, now, **values):
+        return ContentAuditLog(
+            action=action, entity_type='title', entity_id=str(title.pk), entity_name=title.name[:200],
+            timestamp=now, **context, **values,
+        )
+
+
+bulk_catalog = BulkCatalogOperations()
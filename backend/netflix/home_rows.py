@@ -0,0 +1,458 @@
+"""
+Precomputed home page rows for Netflix profiles.
+
+The home page is served from HomeRow: ready-to-serve rows of title cards
+(TitleListSerializer data) stored under unique keys (``profile:<id>:<kind>``,
+``genre:<id>:popular``, ``popular``, ``new_releases``), so a request reads its
+rows by key and computes nothing. ``refresh_home_rows`` builds them:
+
+- recommended: item-item collaborative filtering. Ratings and plays form a
+  sparse profile x title matrix of interest weights. The cosine similarity of
+  its columns is shrunk towards zero for titles with few co-viewers and pruned
+  to the NETFLIX_HOME_NEIGHBORS nearest titles, then one sparse product per
+  batch of profiles scores every title. Short lists are filled from the
+  profile's favourite genres, then from overall popularity.
+- continue watching: the latest play of each title, if it is unfinished.
+- popular / popular in genre: distinct viewers and ratings over the last
+  NETFLIX_HOME_POPULAR_DAYS, weighted by a damped average rating.
+- new releases: the newest public titles.
+
+Runs are incremental: only profiles that rated, played or were created since
+the previous run (HomeRowBuild) are recomputed, against the similarity matrix
+kept in memory for NETFLIX_HOME_SIMILARITY_SECONDS. A catalog change (a title
+or asset created, edited or deleted) makes the next run a full rebuild, so
+cards are never stale for longer than one run. Playback progress still in the
+write buffer (netflix/progress.py) is overlaid on continue watching at read
+time.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Q, Sum, Value, When
+from django.utils import timezone
+
+from .progress import playback_progress
+
+logger = logging.getLogger(__name__)
+
+PROFILE_BATCH = 1000
+CARD_BATCH = 2000
+SHRINKAGE = 10  # co-viewers at which a similarity keeps half its weight
+RATING_PRIOR = 5  # the damped average adds this many ratings at the global mean
+TOP_GENRES = 3
+
+
+def profile_row_key(profile_id, kind):
+    return f'profile:{profile_id}:{kind}'
+
+
+def genre_row_key(genre_id):
+    return f'genre:{genre_id}:popular'
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def interest(stars=None, progress=None):
+    """Interest of a profile in a title: from its rating if rated (0 for 1-2 stars), else from play progress."""
+    if stars is not None:
+        return 0.0 if stars <= 2 else (stars - 2) / 3
+    return 0.5 + 0.5 * min(float(progress or 0), 100.0) / 100
+
+
+class SimilarityModel:
+    """Pruned item-item cosine similarity over profile interest weights."""
+
+    def __init__(self, weights, neighbors):
+        self.titles = sorted({title_id for row in weights.values() for title_id in row}, key=str)
+        self.index = {title_id: position for position, title_id in enumerate(self.titles)}
+        self.built_at = time.monotonic()
+
+        matrix = self.matrix(weights.values())
+        if not self.titles:
+            self.similarity = sparse.csr_matrix((0, 0), dtype=np.float32)
+            return
+        binary = matrix.copy()
+        binary.data[:] = 1
+        co_viewers = (binary.T @ binary).tocsr()
+        co_viewers.data = co_viewers.data / (co_viewers.data + SHRINKAGE)
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+        norms[norms == 0] = 1
+        normalized = (matrix @ sparse.diags(1 / norms)).tocsr()
+        similarity = (normalized.T @ normalized).multiply(co_viewers).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        self.similarity = self._prune(similarity, neighbors)
+
+    @staticmethod
+    def _prune(matrix, k):
+        """Keep the ``k`` largest entries of every row."""
+        keep = np.zeros(len(matrix.data), dtype=bool)
+        for row in range(matrix.shape[0]):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            if end - start <= k:
+                keep[start:end] = True
+            else:
+                keep[start + np.argpartition(matrix.data[start:end], -k)[-k:]] = True
+        pruned = matrix.copy()
+        pruned.data[~keep] = 0
+        pruned.eliminate_zeros()
+        return pruned
+
+    def matrix(self, rows):
+        """CSR matrix of ``rows`` ({title_id: weight} each); titles unknown to the model are dropped."""
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for title_id, weight in row.items():
+                column = self.index.get(title_id)
+                if column is not None:
+                    indices.append(column)
+                    data.append(weight)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(indptr) - 1, len(self.titles)),
+        )
+
+    def scores(self, rows):
+        """Similarity-weighted scores of every title for each of ``rows``."""
+        return (self.matrix(rows) @ self.similarity).tocsr()
+
+
+class HomeRowBuilder:
+    def __init__(self):
+        self.row_size = getattr(settings, 'NETFLIX_HOME_ROW_SIZE', 30)
+        self.neighbors = getattr(settings, 'NETFLIX_HOME_NEIGHBORS', 50)
+        self.popular_days = getattr(settings, 'NETFLIX_HOME_POPULAR_DAYS', 30)
+        self.similarity_seconds = getattr(settings, 'NETFLIX_HOME_SIMILARITY_SECONDS', 6 * 3600)
+        self._model = None
+
+    # Inputs
+
+    def interests(self, profile_ids=None):
+        """({profile_id: {title_id: weight > 0}}, {profile_id: titles rated or played})"""
+        from .models import PlaybackHistory, Rating
+
+        plays, ratings = PlaybackHistory.objects.all(), Rating.objects.all()
+        if profile_ids is not None:
+            plays, ratings = plays.filter(profile_id__in=profile_ids), ratings.filter(profile_id__in=profile_ids)
+        progress = plays.values('profile_id', 'title_id').annotate(progress=Max(Case(
+            When(completed=True, then=Value(100)), default=F('completed_percent'),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        ))).order_by()
+
+        weights, seen = defaultdict(dict), defaultdict(set)
+        for profile_id, title_id, value in progress.values_list('profile_id', 'title_id', 'progress'):
+            weights[profile_id][title_id] = interest(progress=value)
+            seen[profile_id].add(title_id)
+        # A rating overrides what plays suggest
+        for profile_id, title_id, stars in ratings.values_list('profile_id', 'title_id', 'stars'):
+            weights[profile_id][title_id] = interest(stars=stars)
+            seen[profile_id].add(title_id)
+        return {
+            profile_id: {title_id: weight for title_id, weight in row.items() if weight > 0}
+            for profile_id, row in weights.items()
+        }, seen
+
+    def catalog(self):
+        """(public title ids, {title_id: [genre_id]}, {genre_id: name})"""
+        from .models import Genre, Title
+
+        public = set(Title.objects.filter(visibility='PUBLIC').values_list('id', flat=True))
+        title_genres = defaultdict(list)
+        for title_id, genre_id in Title.genres.through.objects.filter(
+            title__visibility='PUBLIC'
+        ).values_list('title_id', 'genre_id'):
+            title_genres[title_id].append(genre_id)
+        return public, title_genres, dict(Genre.objects.values_list('id', 'name'))
+
+    def popularity(self, public):
+        """Public titles ranked by recent viewers and ratings, weighted by damped average rating."""
+        from .models import PlaybackHistory, Rating
+
+        since = timezone.now() - timedelta(days=self.popular_days)
+        viewers = dict(PlaybackHistory.objects.filter(updated_at__gte=since).values('title_id').annotate(
+            n=Count('profile_id', distinct=True)
+        ).order_by().values_list('title_id', 'n'))
+        ratings = list(Rating.objects.values('title_id').annotate(
+            n=Count('id'), total=Sum('stars'), recent=Count('id', filter=Q(created_at__gte=since))
+        ).order_by().values_list('title_id', 'n', 'total', 'recent'))
+
+        rated = sum(n for _, n, _, _ in ratings)
+        mean = sum(total for _, _, total, _ in ratings) / rated if rated else 3.0
+        quality = {title_id: (RATING_PRIOR * mean + total) / (RATING_PRIOR + n) for title_id, n, total, _ in ratings}
+        engagement = defaultdict(int, viewers)
+        for title_id, _, _, recent in ratings:
+            engagement[title_id] += recent
+
+        # Titles without recent activity still rank by quality, behind every active title
+        scores = {
+            title_id: (engagement[title_id] + 1e-3) * quality.get(title_id, mean) / 5
+            for title_id in set(engagement) | set(quality) if title_id in public
+        }
+        return sorted(scores, key=scores.get, reverse=True)
+
+    def cards(self, title_ids):
+        """{title_id: TitleListSerializer data} for the public titles among ``title_ids``."""
+        from .models import Title
+        from .serializers import TitleListSerializer
+
+        cards = {}
+        for chunk in _chunks(title_ids, CARD_BATCH):
+            titles = list(Title.objects.filter(id__in=chunk, visibility='PUBLIC').prefetch_related('genres'))
+            cards.update(zip((title.id for title in titles), TitleListSerializer(titles, many=True).data))
+        return cards
+
+    def changed_profiles(self, since):
+        """Profiles created, or that rated or played anything, since ``since``."""
+        from .models import PlaybackHistory, Rating, UserProfile
+
+        changed = set(UserProfile.objects.filter(created_at__gte=since).values_list('id', flat=True))
+        changed.update(Rating.objects.filter(updated_at__gte=since).values_list('profile_id', flat=True))
+        changed.update(PlaybackHistory.objects.filter(updated_at__gte=since).values_list('profile_id', flat=True))
+        return changed
+
+    def catalog_changed(self, since):
+        from .models import ContentAuditLog, Title
+
+        return Title.objects.filter(updated_at__gte=since).exists() or ContentAuditLog.objects.filter(
+            action__in=['CREATE', 'UPDATE', 'DELETE'], timestamp__gte=since, entity_type__in=['title', 'asset']
+        ).exists()
+
+    # Row contents
+
+    def recommended(self, profile_ids, weights, seen, public):
+        """{profile_id: [(title_id, score)]} from the similarity model, best first."""
+        picks = {}
+        scores = self._model.scores([weights.get(profile_id, {}) for profile_id in profile_ids])
+        for row, profile_id in enumerate(profile_ids):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            columns, values = scores.indices[start:end], scores.data[start:end]
+            chosen, excluded = [], seen.get(profile_id, set())
+            for position in np.argsort(-values):
+                title_id = self._model.titles[columns[position]]
+                if title_id in public and title_id not in excluded:
+                    chosen.append((title_id, float(values[position])))
+                    if len(chosen) == self.row_size:
+                        break
+            picks[profile_id] = chosen
+        return picks
+
+    def continue_watching(self, profile_ids):
+        """{profile_id: [(title_id, progress)]} newest first: the latest play of each title, if unfinished."""
+        from .models import PlaybackHistory
+
+        items, latest = defaultdict(list), set()
+        for row in PlaybackHistory.objects.filter(
+            profile_id__in=profile_ids, title__visibility='PUBLIC'
+        ).order_by('profile_id', '-updated_at').values(
+            'profile_id', 'title_id', 'episode_id', 'episode__season__number', 'episode__number',
+            'episode__name', 'position_seconds', 'duration_seconds', 'completed_percent', 'completed', 'updated_at',
+        ):
+            if (row['profile_id'], row['title_id']) in latest:
+                continue
+            latest.add((row['profile_id'], row['title_id']))
+            if row['completed'] or not row['position_seconds'] or len(items[row['profile_id']]) >= self.row_size:
+                continue
+            items[row['profile_id']].append((row['title_id'], self._progress(row, row['episode_id'] and {
+                'id': row['episode_id'], 'season': row['episode__season__number'],
+                'number': row['episode__number'], 'name': row['episode__name'],
+            })))
+        return items
+
+    @staticmethod
+    def _progress(values, episode):
+        return {
+            'episode': episode and {**episode, 'id': str(episode['id'])},
+            'position_seconds': values['position_seconds'],
+            'duration_seconds': values['duration_seconds'],
+            'completed_percent': float(values['completed_percent'] or 0),
+            'updated_at': values['updated_at'].isoformat(),
+        }
+
+    # Build
+
+    def run(self, full=False):
+        """Recompute global rows and the rows of changed (or, with ``full``, all) profiles."""
+        from .models import HomeRow, HomeRowBuild, Title, UserProfile
+
+        started, clock = timezone.now(), time.perf_counter()
+        last = HomeRowBuild.objects.first()
+        full = full or last is None or self.catalog_changed(last.started_at)
+        if full:
+            profile_ids = list(UserProfile.objects.values_list('id', flat=True))
+        else:
+            # Buffered heartbeats are stamped when received but written up to one flush interval later
+            profile_ids = list(self.changed_profiles(
+                last.started_at - timedelta(seconds=playback_progress.flush_seconds)
+            ))
+
+        everyone = None
+        if full or self._model is None or time.monotonic() - self._model.built_at > self.similarity_seconds:
+            everyone = self.interests()
+            self._model = SimilarityModel(everyone[0], self.neighbors)
+
+        public, title_genres, genre_names = self.catalog()
+        popular = self.popularity(public)
+        by_genre = defaultdict(list)
+        for title_id in popular:
+            for genre_id in title_genres.get(title_id, ()):
+                by_genre[genre_id].append(title_id)
+        new_releases = list(Title.objects.filter(visibility='PUBLIC').order_by('-created_at').values_list(
+            'id', flat=True
+        )[:self.row_size])
+
+        cards = self.cards(set(popular[:self.row_size]) | set(new_releases) | {
+            title_id for titles in by_genre.values() for title_id in titles[:self.row_size]
+        })
+
+        def items(title_ids, scores=None):
+            return [
+                {'title': cards[title_id], **({'score': round(scores[title_id], 4)} if scores else {})}
+                for title_id in title_ids if title_id in cards
+            ]
+
+        rows = [
+            HomeRow(key='popular', kind='popular', label='Popular Now',
+                    items=items(popular[:self.row_size]), computed_at=started),
+            HomeRow(key='new_releases', kind='new_releases', label='New Releases',
+                    items=items(new_releases), computed_at=started),
+        ]
+        rows.extend(
+            HomeRow(key=genre_row_key(genre_id), kind='genre_popular', genre_id=genre_id,
+                    label=f'Popular in {name}', items=items(by_genre[genre_id][:self.row_size]),
+                    computed_at=started)
+            for genre_id, name in genre_names.items()
+        )
+        self._save(rows)
+        written = len(rows)
+
+        for batch in _chunks(profile_ids, PROFILE_BATCH):
+            if everyone is not None:
+                weights, seen = everyone
+            else:
+                weights, seen = self.interests(batch)
+            recommended = self.recommended(batch, weights, seen, public)
+            progress = self.continue_watching(batch)
+            cards.update(self.cards((
+                {title_id for picks in recommended.values() for title_id, _ in picks}
+                | {title_id for entries in progress.values() for title_id, _ in entries}
+            ) - cards.keys()))
+
+            rows = []
+            for profile_id in batch:
+                profile_weights, excluded = weights.get(profile_id, {}), seen.get(profile_id, set())
+                genres = defaultdict(float)
+                for title_id, weight in profile_weights.items():
+                    for genre_id in title_genres.get(title_id, ()):
+                        genres[genre_id] += weight
+                top_genres = sorted(genres, key=genres.get, reverse=True)[:TOP_GENRES]
+
+                picks = dict(recommended[profile_id])
+                # Too little history: fill from the profile's genres, then from overall popularity
+                for title_id in chain(*(by_genre[genre_id] for genre_id in top_genres), popular):
+                    if len(picks) >= self.row_size:
+                        break
+                    if title_id not in excluded and title_id not in picks:
+                        picks[title_id] = 0.0
+
+                rows.append(HomeRow(
+                    key=profile_row_key(profile_id, 'recommended'), kind='recommended', profile_id=profile_id,
+                    label='Recommended for You', items=items(picks, picks), computed_at=started,
+                    context={'genres': top_genres},
+                ))
+                rows.append(HomeRow(
+                    key=profile_row_key(profile_id, 'continue_watching'), kind='continue_watching',
+                    profile_id=profile_id, label='Continue Watching', computed_at=started,
+                    items=[
+                        {'title': cards[title_id], **values}
+                        for title_id, values in progress.get(profile_id, []) if title_id in cards
+                    ],
+                ))
+            self._save(rows)
+            written += len(rows)
+
+        elapsed = time.perf_counter() - clock
+        HomeRowBuild.objects.create(
+            full=full, started_at=started, seconds=elapsed, profiles=len(profile_ids), rows=written
+        )
+        logger.info(f"Built {written} home rows for {len(profile_ids)} profiles in {elapsed:.2f}s (full={full})")
+        return {'full': full, 'profiles': len(profile_ids), 'rows': written, 'seconds': round(elapsed, 2)}
+
+    # Serving
+
+    def rows_for(self, profile):
+        """
+        The profile's home rows in display order: one read by key, plus one for
+        its favourite genres' rows. Rows not built yet are left out.
+        """
+        from .models import HomeRow
+
+        continue_key = profile_row_key(profile.id, 'continue_watching')
+        recommended_key = profile_row_key(profile.id, 'recommended')
+        rows = {row.key: row for row in HomeRow.objects.filter(
+            key__in=[continue_key, recommended_key, 'popular', 'new_releases']
+        )}
+        genre_keys = []
+        if recommended_key in rows:
+            genre_keys = [genre_row_key(genre_id) for genre_id in rows[recommended_key].context.get('genres', [])]
+            if genre_keys:
+                rows.update((row.key, row) for row in HomeRow.objects.filter(key__in=genre_keys))
+        if continue_key in rows:
+            rows[continue_key].items = self.overlay_progress(profile, rows[continue_key].items)
+
+        order = [continue_key, recommended_key, 'popular', *genre_keys, 'new_releases']
+        return [rows[key] for key in order if key in rows and rows[key].items]
+
+    def overlay_progress(self, profile, items):
+        """Apply the profile's buffered, not yet written heartbeats to continue-watching ``items``."""
+        from .models import Episode
+
+        pending = sorted(playback_progress.pending(profile.id), key=lambda entry: entry.updated_at, reverse=True)
+        if not pending:
+            return items
+        items = {item['title']['id']: item for item in items}
+        missing = {entry.title_id for entry in pending if str(entry.title_id) not in items}
+        cards = self.cards(missing) if missing else {}
+        episodes = {
+            episode['id']: episode for episode in Episode.objects.filter(
+                id__in={entry.episode_id for entry in pending if entry.episode_id}
+            ).values('id', 'number', 'name', season_number=F('season__number'))
+        }
+
+        updated = {}
+        for entry in pending:
+            key = str(entry.title_id)
+            card = items[key]['title'] if key in items else cards.get(entry.title_id)
+            if key in updated or card is None:
+                continue
+            episode = episodes.get(entry.episode_id)
+            updated[key] = {'title': card, **self._progress(vars(entry), episode and {
+                'id': episode['id'], 'season': episode['season_number'],
+                'number': episode['number'], 'name': episode['name'],
+            })}
+        rest = [item for key, item in items.items() if key not in updated]
+        return (list(updated.values()) + rest)[:self.row_size]
+
+    def _save(self, rows):
+        from .models import HomeRow
+
+        with transaction.atomic():
+            HomeRow.objects.bulk_create(
+                rows, batch_size=500, update_conflicts=True, unique_fields=['key'],
+                update_fields=['kind', 'profile', 'genre', 'label', 'items', 'context', 'computed_at'],
+            )
+
+
+home_rows = HomeRowBuilder()
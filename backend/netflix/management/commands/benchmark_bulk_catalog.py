@@ -0,0 +1,106 @@
+"""
+Benchmark bulk catalog operations on a synthetic catalog: publish, tag,
+untag, unpublish and delete run over every title through the bulk engine,
+and each is checked for a complete audit trail (one entry per changed
+title). The previous single unaudited UPDATE is timed for reference. Test
+data is created in a transaction that is rolled back afterwards.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from netflix.bulk import bulk_catalog
+from netflix.models import ContentAuditLog, Episode, Genre, Season, Title
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure bulk publish/tag/delete throughput and audit completeness'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=50000)
+        parser.add_argument('--series-every', type=int, default=10, help='Every Nth title is a series with episodes')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write('Bulk tag operations update search vectors, which needs PostgreSQL')
+            return
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        user = User.objects.create(username='bench-bulk', email='bench-bulk@example.com')
+        genre = Genre.objects.create(name='Bench Bulk Genre')
+        started = time.perf_counter()
+        titles = Title.objects.bulk_create(
+            [
+                Title(type='SERIES' if index % options['series_every'] == 0 else 'MOVIE', name=f'Bulk Title {index}',
+                      synopsis='Bulk operation benchmark', release_year=2020, rating='PG', visibility='PRIVATE')
+                for index in range(options['titles'])
+            ],
+            batch_size=5000,
+        )
+        Title.genres.through.objects.bulk_create(
+            [Title.genres.through(title_id=title.pk, genre_id=genre.pk) for title in titles], batch_size=5000
+        )
+        seasons = Season.objects.bulk_create(
+            [Season(title=title, number=1) for title in titles if title.type == 'SERIES'], batch_size=5000
+        )
+        Episode.objects.bulk_create(
+            [
+                Episode(season=season, number=number, name=f'Episode {number}', synopsis='', runtime_minutes=40)
+                for season in seasons for number in range(1, 5)
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE netflix_title, netflix_title_genres, netflix_season, netflix_episode')
+        title_ids = [title.pk for title in titles]
+        self.stdout.write(
+            f"Created {len(titles):,} titles ({len(seasons):,} series, {len(seasons) * 4:,} episodes) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        sid = transaction.savepoint()
+        begin = time.perf_counter()
+        Title.objects.filter(id__in=title_ids).update(visibility='PUBLIC')
+        self.stdout.write(f"{'previous publish (unaudited UPDATE)':<40}{time.perf_counter() - begin:>8.2f}s")
+        transaction.savepoint_rollback(sid)
+
+        def report(done, total):
+            if done == total or done % (bulk_catalog.chunk_size * 10) == 0:
+                self.stdout.write(f"  {done:,}/{total:,}")
+
+        operations = [('publish', None), ('tag', ['bench-bulk']), ('untag', ['bench-bulk']), ('unpublish', None),
+                      ('delete', None)]
+        for action, tags in operations:
+            audited_before = ContentAuditLog.objects.filter(entity_type='title', actor_user=user).count()
+            statements = []
+
+            def count(execute, sql, params, many, context):
+                statements.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                result = bulk_catalog.run(action, title_ids, user=user, tags=tags, progress=report)
+            audited = ContentAuditLog.objects.filter(entity_type='title', actor_user=user).count() - audited_before
+            complete = audited == result['changed'] == len(title_ids)
+            style = self.style.SUCCESS if complete else self.style.ERROR
+            self.stdout.write(style(
+                f"{action:<40}{result['seconds']:>8.2f}s  {result['changed']:>7,} changed  {audited:>7,} audit entries  "
+                f"{len(statements):>6,} statements  {result['chunks']} chunks"
+            ))
+
+        remaining = Title.objects.filter(id__in=title_ids).count() + Episode.objects.filter(season__in=seasons).count()
+        self.stdout.write(f"Rows left after delete: {remaining}")
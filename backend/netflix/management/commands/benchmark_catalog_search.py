@@ -0,0 +1,118 @@
+"""
+Benchmark catalog search on a synthetic catalog. Titles with generated
+names, synopses, tags and regions are bulk-created and indexed, then
+typeahead, multi-word, misspelled and filtered searches are timed through
+the search service including list serialization, next to the previous
+``icontains`` search. Everything runs in a transaction that is rolled back
+afterwards. PostgreSQL with pg_trgm only.
+"""
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from netflix.models import Title
+from netflix.search import catalog_search
+from netflix.serializers import TitleListSerializer
+
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiou']
+TAGS = ['award-winning', 'binge-worthy', 'critically-acclaimed', 'dark', 'feel-good', 'based-on-book',
+        'true-story', 'cult', 'family', 'holiday', 'indie', 'romantic', 'suspenseful', 'witty', 'classic']
+REGIONS = ['US', 'CA', 'UK', 'IE', 'DE', 'FR', 'ES', 'IT', 'IN', 'JP', 'BR', 'MX']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure catalog search latency (p50/p95) on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200, help='Queries per query class')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write('Catalog search needs PostgreSQL')
+            return
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        words = sorted({
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + rng.choice(['', 'n', 'r', 's']) for _ in range(8000)
+        })
+        rng.shuffle(words)
+        # Zipf-Mandelbrot word frequencies: the most common word is in ~10% of synopses
+        cumulative = np.cumsum(1 / (np.arange(1, len(words) + 1) + 50)).tolist()
+        name_words, synopsis_words = (words[:2000], cumulative[:2000]), (words, cumulative)
+
+        def pick(vocabulary, count):
+            return rng.choices(vocabulary[0], cum_weights=vocabulary[1], k=count)
+
+        started = time.perf_counter()
+        titles = [
+            Title(
+                type=rng.choice(['MOVIE', 'SERIES', 'DOCUMENTARY']), name=' '.join(pick(name_words, rng.randint(1, 4))).title(),
+                synopsis=' '.join(pick(synopsis_words, rng.randint(15, 40))), release_year=rng.randint(1960, 2025),
+                rating=rng.choice(['G', 'PG', 'PG13', 'R']), tags=rng.sample(TAGS, rng.randint(0, 3)),
+                regions=rng.sample(REGIONS, rng.randint(1, 6)),
+            )
+            for _ in range(options['titles'])
+        ]
+        Title.objects.bulk_create(titles, batch_size=5000)
+        catalog_search.reindex([title.pk for title in titles])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE netflix_title')
+        self.stdout.write(f"Created and indexed {len(titles):,} titles in {time.perf_counter() - started:.1f}s")
+
+        def typo(word):
+            position = rng.randrange(len(word))
+            return word[:position] + rng.choice('aeiouxz') + word[position + 1:]
+
+        samples = [title.name.lower().split() for title in rng.sample(titles, options['queries'])]
+        classes = {
+            'typeahead': [(name[0][:rng.randint(3, 5)], {}) for name in samples],
+            'words': [(' '.join(name[:2] + ([name[2][:3]] if len(name) > 2 else [])), {}) for name in samples],
+            'typo': [(' '.join(typo(word) if len(word) > 4 else word for word in name[:2]), {}) for name in samples],
+            'filtered': [
+                (name[0], {'region': rng.choice(REGIONS), 'tag': rng.choice(TAGS), 'type': 'MOVIE'})
+                for name in samples
+            ],
+        }
+
+        timings = []
+        for label, queries in classes.items():
+            elapsed, hits = [], 0
+            for query, params in queries:
+                begin = time.perf_counter()
+                page, _ = catalog_search.search(query, params=params, page_size=20)
+                TitleListSerializer(page, many=True).data
+                elapsed.append((time.perf_counter() - begin) * 1000)
+                hits += bool(page)
+            timings.extend(elapsed)
+            self.stdout.write(
+                f"{label:<10} p50 {np.percentile(elapsed, 50):6.1f} ms  p95 {np.percentile(elapsed, 95):6.1f} ms  "
+                f"max {max(elapsed):6.1f} ms  {hits}/{len(queries)} with results"
+            )
+
+        legacy = []
+        for query, _ in classes['words'][:20]:
+            begin = time.perf_counter()
+            list(Title.objects.filter(Q(name__icontains=query) | Q(synopsis__icontains=query)).order_by('-created_at')[:20])
+            legacy.append((time.perf_counter() - begin) * 1000)
+        self.stdout.write(f"icontains  p50 {np.percentile(legacy, 50):6.1f} ms  p95 {np.percentile(legacy, 95):6.1f} ms")
+
+        p95 = np.percentile(timings, 95)
+        style = self.style.SUCCESS if p95 < 50 else self.style.WARNING
+        self.stdout.write(style(f"Overall p95 {p95:.1f} ms over {len(timings)} searches"))
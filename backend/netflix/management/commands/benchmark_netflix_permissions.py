@@ -0,0 +1,83 @@
+"""
+Benchmark Netflix permission checks: per-request role queries (the previous
+behaviour, equivalent to compiling on every check) against the cached
+compiled scopes. Test users and roles are created in a transaction that is
+rolled back afterwards.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from netflix.models import EnhancedRole, UserRoleAssignment
+from netflix.scopes import netflix_scopes
+
+User = get_user_model()
+
+CHECKS = [('content', 'read'), ('content', 'write'), ('assets', 'delete'), ('roles', 'write'), ('audit', 'read')]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure Netflix permission checks per second with and without the compiled scope cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--roles-per-user', type=int, default=3)
+        parser.add_argument('--checks', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        roles = [
+            EnhancedRole.objects.create(
+                name=f'bench-role-{index}', role_type='ADMIN_CUSTOM',
+                scopes={'content': ['read'], 'assets': ['read', 'write'], f'area{index}': ['all']},
+            )
+            for index in range(options['roles_per_user'])
+        ]
+        users = []
+        for index in range(options['users']):
+            user = User.objects.create(username=f'bench-perm-{index}', email=f'bench-perm-{index}@example.com')
+            UserRoleAssignment.objects.bulk_create(UserRoleAssignment(user=user, role=role) for role in roles)
+            users.append(user)
+
+        def uncached(user, resource, action):
+            scopes, _ = netflix_scopes.compile(user.pk)
+            return (resource, action) in scopes or (resource, 'all') in scopes
+
+        checks = options['checks']
+        results = {}
+        for label, check in (('per-request queries', uncached), ('compiled cache', netflix_scopes.allows)):
+            for user in users:
+                check(user, 'content', 'read')  # warm up
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_query):
+                started = time.perf_counter()
+                for index in range(checks):
+                    resource, action = CHECKS[index % len(CHECKS)]
+                    check(users[index % len(users)], resource, action)
+                elapsed = time.perf_counter() - started
+            results[label] = checks / elapsed
+            self.stdout.write(
+                f"{label:<22}{checks / elapsed:>12,.0f} checks/s  "
+                f"{elapsed / checks * 1e6:>8.1f} us/check  {len(queries) / checks:.2f} queries/check"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {results['compiled cache'] / results['per-request queries']:.0f}x"
+        ))
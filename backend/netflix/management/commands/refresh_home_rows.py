@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+import time
+
+from netflix.home_rows import home_rows
+
+
+class Command(BaseCommand):
+    help = 'Build the precomputed Netflix home rows (recommendations, continue watching, popular, new releases)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every profile, not only changed ones')
+        parser.add_argument('--continuous', action='store_true', help='Refresh periodically instead of once')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between runs (with --continuous)')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            summary = home_rows.run(full=full)
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Full' if summary['full'] else 'Incremental'} build: {summary['rows']} rows for "
+                f"{summary['profiles']} profiles in {summary['seconds']}s"
+            ))
+            if not options['continuous']:
+                break
+            full = False
+            time.sleep(options['interval'])
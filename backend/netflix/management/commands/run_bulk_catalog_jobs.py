@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from concurrent.futures import wait
+import time
+
+from netflix.bulk import bulk_catalog
+from netflix.models import BulkCatalogJob
+
+
+class Command(BaseCommand):
+    help = 'Run queued (and requeue stalled) bulk catalog jobs, e.g. after a server restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuous', action='store_true', help='Keep polling for queued jobs')
+        parser.add_argument('--interval', type=int, default=30, help='Polling interval in seconds (with --continuous)')
+
+    def handle(self, *args, **options):
+        while True:
+            bulk_catalog.recover_stale()
+            job_ids = list(BulkCatalogJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True))
+
+            if job_ids:
+                started = time.time()
+                futures = bulk_catalog.dispatch(job_ids)
+                wait(futures)
+                ran = sum(1 for future in futures if future.result())
+                failed = BulkCatalogJob.objects.filter(pk__in=job_ids, status='failed').count()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Ran {ran} of {len(job_ids)} jobs in {time.time() - started:.1f}s ({failed} failed)"
+                ))
+            elif not options['continuous']:
+                self.stdout.write('No queued bulk catalog jobs')
+
+            if not options['continuous']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,121 @@
+"""
+Simulate concurrent viewers sending playback heartbeats and compare the row
+writes of the previous inline get_or_create/save path with the coalescing
+buffer. Simulated time drives the buffer flushes (every
+NETFLIX_PROGRESS_FLUSH_SECONDS), so the run is fast and deterministic. Test
+data is created in a transaction that is rolled back afterwards.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from netflix.models import Episode, PlaybackHistory, Season, Title, UserProfile
+from netflix.progress import PlaybackProgressBuffer
+
+User = get_user_model()
+
+EPISODE_SECONDS = 45 * 60
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure database writes for playback heartbeats with and without write coalescing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--viewers', type=int, default=200)
+        parser.add_argument('--minutes', type=int, default=10, help='Simulated viewing time')
+        parser.add_argument('--heartbeat', type=int, default=5, help='Seconds between heartbeats')
+        parser.add_argument('--flush', type=float, default=None, help='Flush interval (default: setting)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        user = User.objects.create(username='bench-playback', email='bench-playback@example.com')
+        title = Title.objects.create(
+            type='SERIES', name='Bench Series', synopsis='Heartbeat simulation', release_year=2024, rating='PG13'
+        )
+        season = Season.objects.create(title=title, number=1)
+        episodes = [
+            Episode.objects.create(
+                season=season, number=number, name=f'Episode {number}', synopsis='', runtime_minutes=45
+            )
+            for number in range(1, 4)
+        ]
+        profiles = UserProfile.objects.bulk_create(
+            UserProfile(user=user, name=f'Viewer {index}') for index in range(options['viewers'])
+        )
+        heartbeat, duration = options['heartbeat'], options['minutes'] * 60
+
+        def events():
+            """(second, profile, episode, data) in time order; every viewer finishes its first episode."""
+            for second in range(0, duration + 1, heartbeat):
+                for index, profile in enumerate(profiles):
+                    # Viewers start at staggered offsets and finish near the end of the run
+                    position = min(EPISODE_SECONDS, EPISODE_SECONDS - duration + second + index % heartbeat)
+                    completed = second == duration
+                    yield second, profile, episodes[index % len(episodes)], {
+                        'position_seconds': EPISODE_SECONDS if completed else position,
+                        'duration_seconds': EPISODE_SECONDS,
+                        'completed_percent': 100.0 if completed else round(100 * position / EPISODE_SECONDS, 2),
+                        'completed': completed,
+                    }
+
+        def legacy(profile, episode, data):
+            history, created = PlaybackHistory.objects.get_or_create(
+                profile=profile, title=title, episode=episode, defaults=data
+            )
+            if not created:
+                for field, value in data.items():
+                    setattr(history, field, value)
+                history.save()
+
+        buffer = PlaybackProgressBuffer(background=False)
+        flush_every = options['flush'] or buffer.flush_seconds
+        results = {}
+        for label in ('inline writes', 'coalesced'):
+            PlaybackHistory.objects.filter(title=title).delete()
+            writes = []
+
+            def count_write(execute, sql, params, many, context):
+                if sql.lstrip().upper().startswith(('INSERT', 'UPDATE')):
+                    writes.append(sql)
+                return execute(sql, params, many, context)
+
+            heartbeats, next_flush = 0, flush_every
+            with connection.execute_wrapper(count_write):
+                started = time.perf_counter()
+                for second, profile, episode, data in events():
+                    if label == 'coalesced':
+                        if second >= next_flush:
+                            buffer.flush()
+                            next_flush += flush_every
+                        buffer.record(profile, title, episode, data)
+                    else:
+                        legacy(profile, episode, data)
+                    heartbeats += 1
+                buffer.flush()
+                elapsed = time.perf_counter() - started
+
+            stored = PlaybackHistory.objects.filter(title=title)
+            assert stored.count() == len(profiles), 'one row per viewer'
+            assert stored.filter(completed=True).count() == len(profiles), 'completions are stored'
+            results[label] = len(writes)
+            self.stdout.write(
+                f"{label:<15}{heartbeats:>9,} heartbeats  {len(writes):>8,} write statements  "
+                f"{heartbeats / elapsed:>10,.0f} heartbeats/s"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Write reduction: {results['inline writes'] / max(results['coalesced'], 1):.0f}x "
+            f"({options['viewers']} viewers, heartbeat {heartbeat}s, flush {flush_every}s)"
+        ))
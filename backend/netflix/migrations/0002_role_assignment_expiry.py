@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userroleassignment',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Assignment stops granting scopes at this time', null=True),
+        ),
+        migrations.AddField(
+            model_name='userroleassignment',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
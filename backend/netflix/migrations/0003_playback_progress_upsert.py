@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:57
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_progress(apps, schema_editor):
+    """Keep the most recently updated row of each (profile, title, episode)."""
+    PlaybackHistory = apps.get_model('netflix', 'PlaybackHistory')
+    duplicates = PlaybackHistory.objects.values('profile', 'title', 'episode').annotate(
+        rows=Count('id')
+    ).filter(rows__gt=1).order_by()
+    for group in duplicates:
+        ids = list(PlaybackHistory.objects.filter(
+            profile=group['profile'], title=group['title'], episode=group['episode']
+        ).order_by('-updated_at').values_list('id', flat=True))
+        PlaybackHistory.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0002_role_assignment_expiry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_progress, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='playbackhistory',
+            constraint=models.UniqueConstraint(fields=('profile', 'title', 'episode'), name='playback_history_unique_content', nulls_distinct=False),
+        ),
+    ]
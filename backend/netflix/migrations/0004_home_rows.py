@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0003_playback_progress_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('kind', models.CharField(choices=[('continue_watching', 'Continue Watching'), ('recommended', 'Recommended for You'), ('popular', 'Popular Now'), ('genre_popular', 'Popular in Genre'), ('new_releases', 'New Releases')], max_length=20)),
+                ('label', models.CharField(max_length=200)),
+                ('items', models.JSONField(default=list)),
+                ('context', models.JSONField(blank=True, default=dict)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HomeRowBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField()),
+                ('seconds', models.FloatField()),
+                ('profiles', models.PositiveIntegerField(default=0)),
+                ('rows', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='playbackhistory',
+            index=models.Index(fields=['updated_at'], name='netflix_pla_updated_e37342_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['updated_at'], name='netflix_rat_updated_cbf5ae_idx'),
+        ),
+        migrations.AddField(
+            model_name='homerow',
+            name='genre',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='home_rows', to='netflix.genre'),
+        ),
+        migrations.AddField(
+            model_name='homerow',
+            name='profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='home_rows', to='netflix.userprofile'),
+        ),
+    ]
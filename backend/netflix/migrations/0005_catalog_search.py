@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def populate_search_vectors(apps, schema_editor):
+    # Mirrors netflix.search.title_search_vector at the time of this migration
+    Title = apps.get_model('netflix', 'Title')
+    Episode = apps.get_model('netflix', 'Episode')
+    genre_names = Title.genres.through.objects.filter(title_id=OuterRef('pk')).values('title_id').annotate(
+        names=StringAgg('genre__name', ' ')
+    ).values('names')
+    episode_names = Episode.objects.filter(season__title_id=OuterRef('pk')).values('season__title_id').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+    Title.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='english')
+        + SearchVector(
+            Coalesce(Subquery(genre_names), Value(''), output_field=TextField()), Cast('tags', TextField()),
+            Coalesce(Subquery(episode_names), Value(''), output_field=TextField()), weight='B', config='english',
+        )
+        + SearchVector('synopsis', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0004_home_rows'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='title_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', config='english'), name='title_name_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='title_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['regions'], name='title_regions_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='title_tags_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0005_catalog_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contentauditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
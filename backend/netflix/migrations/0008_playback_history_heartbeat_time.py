@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netflix', '0007_bulk_catalog_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playbackhistory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='playbackhistory',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
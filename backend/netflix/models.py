@@ -3,6 +3,8 @@
 
 import uuid
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -66,12 +68,20 @@ class Title(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Weighted tsvector over name, genres/tags/episode names and synopsis (maintained by netflix/search.py)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['type', 'visibility']),
             models.Index(fields=['release_year']),
             models.Index(fields=['created_at']),
+            GinIndex(fields=['search_vector'], name='title_search_vector_gin'),
+            GinIndex(SearchVector('name', config='english'), name='title_name_search_gin'),
+            GinIndex(fields=['name'], name='title_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['regions'], name='title_regions_gin', opclasses=['jsonb_path_ops']),
+            GinIndex(fields=['tags'], name='title_tags_gin', opclasses=['jsonb_path_ops']),
         ]
     
     def __str__(self):
@@ -300,14 +310,24 @@ class PlaybackHistory(models.Model):
     device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Times of the first and latest heartbeat, set by the progress buffer rather
+    # than when its batch is written
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-updated_at']
         indexes = [
             models.Index(fields=['profile', 'updated_at']),
             models.Index(fields=['completed']),
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            # Conflict target of the progress upsert (netflix/progress.py); movies have no episode
+            models.UniqueConstraint(
+                fields=['profile', 'title', 'episode'], nulls_distinct=False,
+                name='playback_history_unique_content',
+            ),
         ]
     
     def __str__(self):
@@ -329,11 +349,55 @@ class Rating(models.Model):
     class Meta:
         unique_together = ('profile', 'title')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.profile.name} - {self.title.name} ({self.stars}★)"
 
 
+class HomeRow(models.Model):
+    """Precomputed, ready-to-serve home page row (built by netflix/home_rows.py)"""
+    ROW_KINDS = [
+        ('continue_watching', 'Continue Watching'),
+        ('recommended', 'Recommended for You'),
+        ('popular', 'Popular Now'),
+        ('genre_popular', 'Popular in Genre'),
+        ('new_releases', 'New Releases'),
+    ]
+    
+    key = models.CharField(max_length=100, unique=True)  # e.g. profile:<id>:recommended, genre:<id>:popular
+    kind = models.CharField(max_length=20, choices=ROW_KINDS)
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='home_rows')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, null=True, blank=True, related_name='home_rows')
+    label = models.CharField(max_length=200)
+    items = models.JSONField(default=list)  # [{'title': <TitleListSerializer data>, ...}] in display order
+    context = models.JSONField(default=dict, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} ({len(self.items)} items)"
+
+
+class HomeRowBuild(models.Model):
+    """One run of the home row builder; the latest run is the incremental watermark"""
+    full = models.BooleanField(default=False)
+    started_at = models.DateTimeField()
+    seconds = models.FloatField()
+    profiles = models.PositiveIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{'Full' if self.full else 'Incremental'} build at {self.started_at}"
+
+
 class ManualPayment(models.Model):
     """Manual payment recording system"""
     PAYMENT_METHODS = [
@@ -476,7 +540,8 @@ class ContentAuditLog(models.Model):
     user_agent = models.TextField(blank=True)
     request_path = models.CharField(max_length=500, blank=True)
     
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When the change happened; entries are written in batches (netflix/audit.py)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-timestamp']
@@ -491,6 +556,41 @@ class ContentAuditLog(models.Model):
         return f"{actor} {self.action} {self.entity_type} at {self.timestamp}"
 
 
+
+class BulkCatalogJob(models.Model):
+    """A bulk catalog operation running in the background (netflix/bulk.py), with per-chunk progress"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    action = models.CharField(max_length=20)
+    title_ids = models.JSONField(default=list)
+    tags = models.JSONField(default=list, blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='bulk_catalog_jobs')
+    request_context = models.JSONField(default=dict, blank=True)  # ip_address/user_agent/request_path for the audit entries
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)  # Titles in committed chunks
+    result = models.JSONField(default=dict, blank=True)  # changed/unchanged/missing counts
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Bulk {self.action} of {self.total} titles ({self.status})"
+
+
 # Enhanced Role and Permission System
 class EnhancedRole(models.Model):
     """Enhanced role system with hierarchical permissions"""
@@ -531,6 +631,8 @@ class UserRoleAssignment(models.Model):
     role = models.ForeignKey(EnhancedRole, on_delete=models.CASCADE, related_name='user_assignments')
     assigned_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='role_assignments_made')
     assigned_at = models.DateTimeField(auto_now_add=True)
+    is_active = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Assignment stops granting scopes at this time")
     
     class Meta:
         unique_together = ('user', 'role')
@@ -1,7 +1,7 @@
 # Netflix app permissions
 from rest_framework import permissions
 from django.contrib.auth import get_user_model
-from .models import UserRoleAssignment
+from .scopes import netflix_scopes
 
 User = get_user_model()
 
@@ -52,20 +52,8 @@ class NetflixPermissionMixin:
         
         scope, action = required_scope
         
-        # Check user's role assignments
-        assignments = UserRoleAssignment.objects.filter(
-            user=user,
-            is_active=True
-        ).select_related('role')
-        
-        for assignment in assignments:
-            role = assignment.role
-            if scope in role.scopes:
-                allowed_actions = role.scopes[scope]
-                if action in allowed_actions or 'all' in allowed_actions:
-                    return True
-        
-        return False
+        # Compiled from the user's role assignments and cached (see scopes.py)
+        return netflix_scopes.allows(user, scope, action)
 
 
 class IsOwnerOrStaff(permissions.BasePermission):
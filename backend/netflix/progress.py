@@ -0,0 +1,165 @@
+"""
+Write-coalescing playback progress.
+
+Players send a progress heartbeat every few seconds per stream. Heartbeats
+are kept in an in-process buffer keyed by (profile, title, episode) that
+holds only the latest position, and are written with one bulk upsert
+(``INSERT ... ON CONFLICT DO UPDATE`` on the playback_history_unique_content
+constraint) per batch: when NETFLIX_PROGRESS_BATCH_SIZE keys are pending,
+every NETFLIX_PROGRESS_FLUSH_SECONDS from a background thread, and at
+interpreter exit. A stream that heartbeats every 5 seconds therefore costs
+one row write per flush interval (60 seconds by default) instead of twelve,
+and a whole batch of streams costs one statement.
+
+Completion events bypass the buffer and are written at once, replacing any
+buffered position for the same content. Rows carry the times of their first
+and latest heartbeat (``created_at``, ``updated_at``), not the time their batch
+was written. Reads of a profile's progress call ``flush(profile_id)`` first
+(or overlay ``pending``), so they never lag the buffer. The buffer is per process: route a profile's heartbeats and reads to
+the same worker, or keep the flush interval short.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = ('position_seconds', 'duration_seconds', 'completed_percent', 'completed')
+
+
+class PlaybackProgressBuffer:
+    def __init__(self, background=True):
+        # background=False leaves flushing to the caller (simulations, one-off scripts)
+        self.background = background
+        self.batch_size = getattr(settings, 'NETFLIX_PROGRESS_BATCH_SIZE', 500)
+        self.flush_seconds = getattr(settings, 'NETFLIX_PROGRESS_FLUSH_SECONDS', 60.0)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.heartbeats = 0
+        self.rows_written = 0
+        atexit.register(self.flush)
+
+    @staticmethod
+    def key(profile_id, title_id, episode_id):
+        return (profile_id, title_id, episode_id)
+
+    def _ensure_thread(self):
+        if self.background and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name='playback-progress', daemon=True)
+            self._thread.start()
+
+    def _entry(self, profile, title, episode, data):
+        from .models import PlaybackHistory
+        now = timezone.now()
+        return PlaybackHistory(
+            profile=profile, title=title, episode=episode, created_at=now, updated_at=now,
+            **{field: data[field] for field in PROGRESS_FIELDS if field in data}
+        )
+
+    def _identify(self, key, entry):
+        """Give ``entry`` the id and created_at of the row it will update, if there is one."""
+        from .models import PlaybackHistory
+        with self._lock:
+            previous = self._pending.get(key)
+        if previous is not None:
+            known = (previous.pk, previous.created_at)
+        else:
+            known = PlaybackHistory.objects.filter(
+                profile_id=entry.profile_id, title_id=entry.title_id, episode_id=entry.episode_id
+            ).values_list('id', 'created_at').first()
+        if known:
+            entry.id, entry.created_at = known
+
+    def record(self, profile, title, episode, data):
+        """
+        Accept one progress update (validated PlaybackProgressSerializer data)
+        and return ``(entry, buffered)``: the PlaybackHistory row as it will be
+        stored, and whether it was buffered. Completions are written
+        immediately.
+        """
+        entry = self._entry(profile, title, episode, data)
+        key = self.key(entry.profile_id, entry.title_id, entry.episode_id)
+        self._identify(key, entry)
+        if entry.completed:
+            with self._flush_lock:
+                with self._lock:
+                    self._pending.pop(key, None)
+                self._write([entry])
+            return entry, False
+
+        with self._lock:
+            self._pending[key] = entry
+            self.heartbeats += 1
+            full = len(self._pending) >= self.batch_size
+            self._ensure_thread()
+        if full:
+            self._wakeup.set()
+        return entry, True
+
+    def pending(self, profile_id):
+        """Buffered, not yet written entries of one profile."""
+        with self._lock:
+            return [entry for key, entry in self._pending.items() if key[0] == profile_id]
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self, profile_id=None):
+        """Write buffered progress (of one profile, or all); returns the number of rows upserted."""
+        with self._flush_lock:
+            with self._lock:
+                if profile_id is None:
+                    entries, self._pending = list(self._pending.values()), {}
+                else:
+                    keys = [key for key in self._pending if key[0] == profile_id]
+                    entries = [self._pending.pop(key) for key in keys]
+            if not entries:
+                return 0
+            try:
+                self._write(entries)
+                return len(entries)
+            except Exception as e:
+                # Keep the positions for the next flush unless newer ones arrived meanwhile
+                logger.error(f"Failed to write {len(entries)} playback progress rows: {str(e)}")
+                with self._lock:
+                    for entry in entries:
+                        self._pending.setdefault(self.key(entry.profile_id, entry.title_id, entry.episode_id), entry)
+                return 0
+
+    def _write(self, entries):
+        from .models import PlaybackHistory
+        with transaction.atomic():
+            if connection.features.supports_nulls_distinct_unique_constraints:
+                PlaybackHistory.objects.bulk_create(
+                    entries,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['profile', 'title', 'episode'],
+                    update_fields=[*PROGRESS_FIELDS, 'updated_at'],
+                )
+            else:
+                # Without NULLS NOT DISTINCT (PostgreSQL < 15, SQLite) the constraint is not
+                # created, so there is nothing to conflict on; upsert row by row instead
+                for entry in entries:
+                    defaults = {field: getattr(entry, field) for field in (*PROGRESS_FIELDS, 'updated_at')}
+                    PlaybackHistory.objects.update_or_create(
+                        profile_id=entry.profile_id, title_id=entry.title_id, episode_id=entry.episode_id,
+                        defaults=defaults, create_defaults={**defaults, 'id': entry.id, 'created_at': entry.created_at},
+                    )
+        self.rows_written += len(entries)
+
+
+playback_progress = PlaybackProgressBuffer()
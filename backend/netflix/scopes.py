@@ -0,0 +1,100 @@
+"""
+Compiled Netflix permission scopes.
+
+A user's active, unexpired role assignments are compiled into one frozenset
+of (resource, action) pairs and cached under two version stamps:
+
+- a per-user stamp, replaced when one of the user's assignments changes
+- a global roles stamp, replaced when any EnhancedRole changes
+
+Stamps are random tokens rather than counters, so a stamp evicted from the
+cache can never come back with an old value. A warm check is a single
+``get_many`` (both stamps plus the compiled entry) and no database query. A
+compiled entry also lapses at the earliest ``expires_at`` among the
+assignments it was built from.
+
+Signals in netflix/signals.py replace the stamps; queryset ``update()`` calls
+bypass them, so call ``invalidate_user``/``invalidate_roles`` after bulk
+changes. With a per-process cache (the default locmem alias) other workers
+only notice changes once NETFLIX_SCOPE_CACHE_SECONDS pass; point
+NETFLIX_SCOPE_CACHE_ALIAS at a shared cache when running several workers.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+
+ROLES_STAMP_KEY = 'netflix_scopes:roles'
+
+
+def _user_stamp_key(user_id):
+    return f'netflix_scopes:user:{user_id}'
+
+
+def _compiled_key(user_id):
+    return f'netflix_scopes:compiled:{user_id}'
+
+
+class ScopeResolver:
+    def __init__(self):
+        self.cache_alias = getattr(settings, 'NETFLIX_SCOPE_CACHE_ALIAS', 'default')
+        self.timeout = getattr(settings, 'NETFLIX_SCOPE_CACHE_SECONDS', 300)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def compile(self, user_id, now=None):
+        """(frozenset of (resource, action), valid_until) from the user's current assignments."""
+        from .models import UserRoleAssignment
+
+        now = now or timezone.now()
+        scopes, valid_until = set(), None
+        for role_scopes, expires_at in UserRoleAssignment.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now), user_id=user_id, is_active=True
+        ).values_list('role__scopes', 'expires_at'):
+            for resource, actions in (role_scopes or {}).items():
+                scopes.update((resource, action) for action in actions)
+            if expires_at and (valid_until is None or expires_at < valid_until):
+                valid_until = expires_at
+        return frozenset(scopes), valid_until
+
+    def _stamp(self, key, cached):
+        if cached:
+            return cached
+        stamp = uuid.uuid4().hex
+        # add() so concurrent workers settle on one stamp
+        if not self.cache.add(key, stamp, None):
+            stamp = self.cache.get(key) or stamp
+        return stamp
+
+    def scopes(self, user_id):
+        """The compiled (resource, action) pairs granted to ``user_id``."""
+        user_key, compiled_key = _user_stamp_key(user_id), _compiled_key(user_id)
+        values = self.cache.get_many([ROLES_STAMP_KEY, user_key, compiled_key])
+        stamps = (self._stamp(ROLES_STAMP_KEY, values.get(ROLES_STAMP_KEY)), self._stamp(user_key, values.get(user_key)))
+        now = timezone.now()
+
+        entry = values.get(compiled_key)
+        if entry and entry[0] == stamps and (entry[2] is None or entry[2] > now):
+            return entry[1]
+
+        # Stamps were read first, so a change committed while compiling leaves this entry stale
+        scopes, valid_until = self.compile(user_id, now)
+        self.cache.set(compiled_key, (stamps, scopes, valid_until), self.timeout)
+        return scopes
+
+    def allows(self, user, resource, action):
+        scopes = self.scopes(user.pk)
+        return (resource, action) in scopes or (resource, 'all') in scopes
+
+    def invalidate_user(self, user_id):
+        self.cache.set(_user_stamp_key(user_id), uuid.uuid4().hex, None)
+
+    def invalidate_roles(self):
+        self.cache.set(ROLES_STAMP_KEY, uuid.uuid4().hex, None)
+
+
+netflix_scopes = ScopeResolver()
@@ -0,0 +1,239 @@
+"""
+Catalog search over Netflix titles.
+
+Each title carries a ``search_vector`` ('english' configuration) weighted
+name (A) > genre names, tags and episode names (B) > synopsis (C), so a
+search for an episode finds its series. It is recomputed in SQL from the
+title and its relations by ``reindex`` (signals keep it current; bulk writes
+call it themselves).
+
+Queries run in two modes:
+
+- ``fts``: every typed word but stop words must match, the last one also as
+  a prefix of a name word for typeahead (GIN expression index on the name's vector);
+  ranked by ts_rank over the GIN-indexed vector
+- ``fuzzy``: when full-text finds nothing (typos), pg_trgm word similarity
+  (at least NETFLIX_SEARCH_FUZZY_THRESHOLD) against the trigram-indexed name
+
+Region and tag filters use JSONB containment (``@>``) on GIN-indexed
+columns. Results are keyset-paginated on (rank, id), or (created_at, id)
+without a query: the opaque cursor carries the mode and the last row's sort
+key, so deep pages cost the same as the first. A cursor is only accepted
+with a matching request: a browse cursor without a query, a search cursor
+with one.
+"""
+import base64
+import json
+import math
+import re
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .models import Episode, Title
+
+SEARCH_CONFIG = 'english'
+WORD_RE = re.compile(r'[^\W_]+')
+FILTER_FIELDS = ('type', 'rating', 'visibility', 'release_year')
+# Same expression as the title_name_search_gin index
+NAME_VECTOR = SearchVector('name', config=SEARCH_CONFIG)
+
+
+def title_search_vector():
+    """SQL expression for a title's search vector, computed from its own row and relations."""
+    genre_names = Title.genres.through.objects.filter(title_id=OuterRef('pk')).values('title_id').annotate(
+        names=StringAgg('genre__name', ' ')
+    ).values('names')
+    episode_names = Episode.objects.filter(season__title_id=OuterRef('pk')).values('season__title_id').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(genre_names), Value(''), output_field=TextField()),
+            Cast('tags', TextField()),
+            Coalesce(Subquery(episode_names), Value(''), output_field=TextField()),
+            weight='B', config=SEARCH_CONFIG,
+        )
+        + SearchVector('synopsis', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CatalogSearchService:
+    def __init__(self):
+        self.max_page_size = getattr(settings, 'NETFLIX_SEARCH_MAX_PAGE_SIZE', 100)
+        self.fuzzy_threshold = getattr(settings, 'NETFLIX_SEARCH_FUZZY_THRESHOLD', 0.4)
+
+    # ----- maintenance -----
+
+    def reindex(self, title_ids=None):
+        """Recompute the search vectors of ``title_ids`` (all titles when None); returns rows updated."""
+        titles = Title.objects.all() if title_ids is None else Title.objects.filter(pk__in=title_ids)
+        return titles.update(search_vector=title_search_vector())
+
+    # ----- reads -----
+
+    def build_query(self, query_text):
+        """
+        (condition, ranking query) for ``query_text``; None when there is nothing
+        to search for. Every word but stop words must match; the last one is
+        matched whole anywhere, or as a prefix of a name word while it is still
+        being typed.
+        """
+        words = list(dict.fromkeys(WORD_RE.findall(query_text.lower())))
+        if not words:
+            return None
+        *complete, last = words
+        typed = ' & '.join(complete + [f"{last}:*"])
+        # All words go into one tsquery per condition, so Postgres drops stop
+        # words from it ("the office", "lord of the") instead of a stop word
+        # becoming an empty query on its own, which matches nothing. Prefixes
+        # also have to match the small name index: a short prefix matches a
+        # large part of all synopses, which would all have to be ranked
+        condition = Q(search_vector=self._raw(' & '.join(words))) | (
+            Q(search_vector=self._raw(typed)) & Q(name_vector=self._raw(f"{last}:*"))
+        )
+        return condition, self._raw(typed)
+
+    @staticmethod
+    def _raw(terms):
+        return SearchQuery(terms, search_type='raw', config=SEARCH_CONFIG)
+
+    def apply_filters(self, queryset, params):
+        """Exact-field, genre, region and tag filters from request query params."""
+        for field in FILTER_FIELDS:
+            if params.get(field):
+                queryset = queryset.filter(**{field: params[field]})
+        if params.get('genre'):
+            queryset = queryset.filter(genres__id=params['genre'])
+        # JSONB containment, served by the GIN indexes on regions and tags
+        if params.get('region'):
+            queryset = queryset.filter(regions__contains=[params['region']])
+        if params.get('tag'):
+            queryset = queryset.filter(tags__contains=[params['tag']])
+        return queryset
+
+    def rank(self, queryset, query_text, mode='fts'):
+        """``queryset`` matching ``query_text``, annotated with ``rank`` and ordered by it."""
+        if mode == 'fts':
+            built = self.build_query(query_text)
+            if built is None:
+                return queryset.none()
+            condition, search_query = built
+            queryset = queryset.alias(name_vector=NAME_VECTOR).filter(condition)
+            rank = SearchRank(F('search_vector'), search_query)
+        else:
+            queryset = queryset.filter(name__trigram_word_similar=query_text)
+            rank = TrigramWordSimilarity(query_text, 'name')
+        # ts_rank and word_similarity return real; as double precision the rank
+        # round-trips through the cursor exactly, so keyset comparisons hold
+        return queryset.annotate(rank=Cast(rank, FloatField())).order_by('-rank', 'id')
+
+    def rank_with_fallback(self, queryset, query_text):
+        """
+        ``rank`` in full-text mode, or in fuzzy mode when nothing matches as
+        typed. Call it, and evaluate the result, inside a transaction: the
+        fuzzy threshold is only set for the current one.
+        """
+        ranked = self.rank(queryset, query_text, 'fts')
+        if ranked.exists():
+            return ranked
+        self._set_fuzzy_threshold()
+        return self.rank(queryset, query_text, 'fuzzy')
+
+    def _page(self, queryset, mode, position, page_size):
+        if mode == 'browse':
+            queryset = queryset.order_by('-created_at', 'id')
+            if position:
+                created_at, title_id = position
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=title_id))
+        elif position:
+            queryset = queryset.filter(Q(rank__lt=position[0]) | Q(rank=position[0], id__gt=position[1]))
+
+        rows = list(queryset[:page_size + 1])
+        titles, more = rows[:page_size], len(rows) > page_size
+        next_cursor = None
+        if more:
+            last = titles[-1]
+            key = last.created_at.isoformat() if mode == 'browse' else last.rank
+            next_cursor = self.encode_cursor(mode, [key, str(last.id)])
+        return titles, next_cursor
+
+    def search(self, query_text='', params=None, cursor=None, page_size=20):
+        """
+        One page of titles and the cursor of the next page (None on the last).
+        Raises InvalidCursor for a cursor this service did not issue.
+        """
+        query_text = (query_text or '').strip()
+        page_size = min(max(int(page_size), 1), self.max_page_size)
+        mode, position = self.decode_cursor(cursor) if cursor else (None, None)
+        if mode is not None and (mode == 'browse') != (not query_text):
+            raise InvalidCursor('Cursor does not belong to this search; start again without it')
+        queryset = self.apply_filters(
+            Title.objects.defer('search_vector').prefetch_related('genres'), params or {}
+        )
+        if not query_text:
+            return self._page(queryset, 'browse', position, page_size)
+
+        if mode is None:
+            titles, next_cursor = self._page(self.rank(queryset, query_text, 'fts'), 'fts', None, page_size)
+            if titles:
+                return titles, next_cursor
+            # Nothing matches as typed: fall back to typo-tolerant name matching
+            mode = 'fuzzy'
+        if mode == 'fuzzy':
+            # The threshold is set for this transaction only, so it never leaks
+            # into other queries on a pooled connection
+            with transaction.atomic():
+                self._set_fuzzy_threshold()
+                return self._page(self.rank(queryset, query_text, mode), mode, position, page_size)
+        return self._page(self.rank(queryset, query_text, mode), mode, position, page_size)
+
+    def _set_fuzzy_threshold(self):
+        # pg_trgm's default (0.6) misses a single typo in most short words; the
+        # indexed %> operator reads the threshold from this setting
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(self.fuzzy_threshold)]
+            )
+
+    @staticmethod
+    def encode_cursor(mode, key):
+        return base64.urlsafe_b64encode(json.dumps({'m': mode, 'k': key}).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        (mode, (sort key, title id)) of a cursor: the sort key is a datetime
+        when browsing and a float rank when searching.
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            mode, (key, title_id) = payload['m'], payload['k']
+            title_id = uuid.UUID(title_id)
+            if mode == 'browse':
+                key = parse_datetime(key)
+                if key is None:
+                    raise ValueError('malformed timestamp')
+            elif mode in ('fts', 'fuzzy'):
+                if isinstance(key, bool) or not isinstance(key, (int, float)) or not math.isfinite(key):
+                    raise ValueError('malformed rank')
+                key = float(key)
+            else:
+                raise ValueError(f"unknown mode {mode!r}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise InvalidCursor(f"Invalid cursor: {str(e)}")
+        return mode, (key, title_id)
+
+
+catalog_search = CatalogSearchService()
@@ -1,10 +1,11 @@
 # Netflix app serializers
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import models
 from .models import (
     Genre, Title, Season, Episode, Asset, UserProfile, UserEntitlements,
     Device, Watchlist, PlaybackHistory, Rating, ManualPayment, Invoice,
-    ContentAuditLog, EnhancedRole, UserRoleAssignment
+    ContentAuditLog, EnhancedRole, UserRoleAssignment, BulkCatalogJob
 )
 
 User = get_user_model()
@@ -49,6 +50,24 @@ class SeasonSerializer(serializers.ModelSerializer):
         ]
 
 
+def title_artwork(title_ids):
+    """{(title_id, kind): file_url} of the oldest poster and backdrop of each title, in one query"""
+    artwork = {}
+    for title_id, kind, url in Asset.objects.filter(
+        title_id__in=title_ids, kind__in=['POSTER', 'BACKDROP']
+    ).order_by('created_at').values_list('title_id', 'kind', 'file_url'):
+        artwork.setdefault((title_id, kind), url)
+    return artwork
+
+
+class TitleCardListSerializer(serializers.ListSerializer):
+    """Loads the artwork of the whole list at once instead of two asset queries per title"""
+    def to_representation(self, data):
+        titles = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.artwork = title_artwork([title.pk for title in titles])
+        return super().to_representation(titles)
+
+
 class TitleListSerializer(serializers.ModelSerializer):
     """Simplified serializer for title lists"""
     genres = GenreSerializer(many=True, read_only=True)
@@ -62,14 +81,20 @@ class TitleListSerializer(serializers.ModelSerializer):
             'genres', 'tags', 'regions', 'visibility', 'duration_minutes',
             'poster_url', 'backdrop_url', 'created_at'
         ]
+        list_serializer_class = TitleCardListSerializer
+    
+    def _artwork_url(self, obj, kind):
+        artwork = getattr(self, 'artwork', None)
+        if artwork is not None:
+            return artwork.get((obj.id, kind))
+        asset = obj.assets.filter(kind=kind).first()
+        return asset.file_url if asset else None
     
     def get_poster_url(self, obj):
-        poster = obj.assets.filter(kind='POSTER').first()
-        return poster.file_url if poster else None
+        return self._artwork_url(obj, 'POSTER')
     
     def get_backdrop_url(self, obj):
-        backdrop = obj.assets.filter(kind='BACKDROP').first()
-        return backdrop.file_url if backdrop else None
+        return self._artwork_url(obj, 'BACKDROP')
 
 
 class TitleDetailSerializer(serializers.ModelSerializer):
@@ -221,6 +246,8 @@ class PlaybackProgressSerializer(serializers.ModelSerializer):
             'profile', 'title', 'episode', 'position_seconds',
             'duration_seconds', 'completed_percent', 'completed'
         ]
+        # Progress is upserted on (profile, title, episode); repeats are the point
+        validators = []
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -319,7 +346,8 @@ class UserRoleAssignmentSerializer(serializers.ModelSerializer):
         model = UserRoleAssignment
         fields = [
             'id', 'user', 'user_email', 'user_name', 'role',
-            'role_name', 'assigned_by', 'assigned_by_name', 'assigned_at'
+            'role_name', 'assigned_by', 'assigned_by_name', 'assigned_at',
+            'is_active', 'expires_at'
         ]
 
 
@@ -344,11 +372,27 @@ class UserSerializer(serializers.ModelSerializer):
 class BulkTitleUpdateSerializer(serializers.Serializer):
     """Serializer for bulk title operations"""
     title_ids = serializers.ListField(child=serializers.UUIDField())
-    action = serializers.ChoiceField(choices=['publish', 'unpublish', 'delete'])
+    action = serializers.ChoiceField(choices=['publish', 'unpublish', 'delete', 'tag', 'untag'])
     visibility = serializers.ChoiceField(
         choices=Title.VISIBILITY_CHOICES,
         required=False
     )
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    
+    def validate(self, data):
+        if data['action'] in ('tag', 'untag') and not data.get('tags'):
+            raise serializers.ValidationError({'tags': f"Required for {data['action']}."})
+        return data
+
+
+class BulkCatalogJobSerializer(serializers.ModelSerializer):
+    """Status and progress of a background bulk operation"""
+    
+    class Meta:
+        model = BulkCatalogJob
+        fields = ['id', 'action', 'tags', 'status', 'total', 'processed', 'result', 'error',
+                  'created_at', 'started_at', 'finished_at', 'updated_at']
+        read_only_fields = fields
 
 
 class ContentImportSerializer(serializers.Serializer):
@@ -1,11 +1,16 @@
 # Signal handlers for Netflix app
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from .models import (
-    ContentAuditLog, UserEntitlements, EnhancedRole, 
-    UserRoleAssignment, Title, Episode, Asset, ManualPayment
+    UserEntitlements, EnhancedRole, 
+    UserRoleAssignment, Title, Genre, Episode, Asset, ManualPayment
 )
+from .audit import content_audit_log
+from .bulk import bulk_catalog
+from .scopes import netflix_scopes
+from .search import catalog_search
 
 User = get_user_model()
 
@@ -32,7 +37,7 @@ def create_user_entitlements(sender, instance, created, **kwargs):
 def log_title_changes(sender, instance, created, **kwargs):
     """Log title creation/updates"""
     action = 'CREATE' if created else 'UPDATE'
-    ContentAuditLog.objects.create(
+    content_audit_log.record(
         actor_user=getattr(instance, 'updated_by', None) or getattr(instance, 'created_by', None),
         action=action,
         entity_type='title',
@@ -50,7 +55,7 @@ def log_title_changes(sender, instance, created, **kwargs):
 def log_episode_changes(sender, instance, created, **kwargs):
     """Log episode creation/updates"""
     action = 'CREATE' if created else 'UPDATE'
-    ContentAuditLog.objects.create(
+    content_audit_log.record(
         action=action,
         entity_type='episode',
         entity_id=str(instance.id),
@@ -67,7 +72,7 @@ def log_episode_changes(sender, instance, created, **kwargs):
 def log_asset_changes(sender, instance, created, **kwargs):
     """Log asset uploads/changes"""
     action = 'UPLOAD' if created else 'UPDATE'
-    ContentAuditLog.objects.create(
+    content_audit_log.record(
         action=action,
         entity_type='asset',
         entity_id=str(instance.id),
@@ -84,7 +89,7 @@ def log_asset_changes(sender, instance, created, **kwargs):
 def log_payment_recording(sender, instance, created, **kwargs):
     """Log manual payment recordings"""
     if created:
-        ContentAuditLog.objects.create(
+        content_audit_log.record(
             actor_user=instance.recorded_by,
             action='PAYMENT',
             entity_type='payment',
@@ -104,7 +109,7 @@ def log_payment_recording(sender, instance, created, **kwargs):
 def log_entitlement_changes(sender, instance, created, **kwargs):
     """Log entitlement modifications"""
     if not created:  # Only log updates, not creation
-        ContentAuditLog.objects.create(
+        content_audit_log.record(
             actor_user=instance.last_modified_by,
             action='ENTITLEMENT_CHANGE',
             entity_type='entitlement',
@@ -125,7 +130,9 @@ def log_entitlement_changes(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=Title)
 def log_title_deletion(sender, instance, **kwargs):
     """Log title deletions"""
-    ContentAuditLog.objects.create(
+    if bulk_catalog.active():
+        return  # Bulk deletes audit their titles themselves
+    content_audit_log.record(
         action='DELETE',
         entity_type='title',
         entity_id=str(instance.id),
@@ -136,3 +143,61 @@ def log_title_deletion(sender, instance, **kwargs):
             'visibility': instance.visibility,
         }
     )
+
+
+@receiver([post_save, post_delete], sender=UserRoleAssignment)
+def invalidate_assignment_scopes(sender, instance, **kwargs):
+    """Recompile the user's permission scopes on their next request"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: netflix_scopes.invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=EnhancedRole)
+def invalidate_role_scopes(sender, instance, **kwargs):
+    """A role's scopes changed: every user's compiled scopes are stale"""
+    transaction.on_commit(netflix_scopes.invalidate_roles)
+
+
+@receiver(post_save, sender=Title)
+def refresh_title_search_vector(sender, instance, raw=False, **kwargs):
+    """Keep the title's search vector in step with edits"""
+    if not raw:
+        catalog_search.reindex([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genres.through)
+def refresh_genre_search_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    """Genre names are part of the search vector of the titles they are attached to"""
+    if reverse and action == 'pre_clear':
+        instance._cleared_title_ids = list(instance.titles.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            catalog_search.reindex([instance.pk])
+        else:
+            catalog_search.reindex(pk_set if pk_set is not None else instance.__dict__.pop('_cleared_title_ids', []))
+
+
+@receiver(post_save, sender=Genre)
+def refresh_renamed_genre_search_vectors(sender, instance, created, raw=False, **kwargs):
+    """A renamed genre changes the search vector of every title it is attached to"""
+    if not created and not raw:
+        catalog_search.reindex(instance.titles.values('pk'))
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_deleted_genre_titles(sender, instance, **kwargs):
+    # The cascade removes the title links without m2m_changed
+    instance._deleted_title_ids = list(instance.titles.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def refresh_deleted_genre_search_vectors(sender, instance, **kwargs):
+    catalog_search.reindex(instance.__dict__.pop('_deleted_title_ids', []))
+
+
+@receiver([post_save, post_delete], sender=Episode)
+def refresh_episode_title_search_vector(sender, instance, **kwargs):
+    """Episode names are part of their series' search vector"""
+    if bulk_catalog.active():
+        return  # Only bulk deletes cascade to episodes, and their series go too
+    catalog_search.reindex(Title.objects.filter(seasons__id=instance.season_id).values('pk'))
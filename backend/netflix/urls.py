@@ -10,6 +10,7 @@ urlpatterns = [
     # Content Management
     path('genres/', views.GenreListCreateView.as_view(), name='genre-list'),
     path('titles/', views.TitleListCreateView.as_view(), name='title-list'),
+    path('search/', views.CatalogSearchView.as_view(), name='catalog-search'),
     path('titles/<int:pk>/', views.TitleDetailView.as_view(), name='title-detail'),
     path('titles/<int:title_id>/seasons/', views.SeasonListCreateView.as_view(), name='season-list'),
     path('seasons/<int:season_id>/episodes/', views.EpisodeListCreateView.as_view(), name='episode-list'),
@@ -22,9 +23,10 @@ urlpatterns = [
     path('devices/', views.DeviceListCreateView.as_view(), name='device-list'),
     
     # User Activity
-    path('profiles/<int:profile_id>/watchlist/', views.WatchlistView.as_view(), name='watchlist'),
-    path('profiles/<int:profile_id>/history/', views.PlaybackHistoryView.as_view(), name='playback-history'),
-    path('profiles/<int:profile_id>/ratings/', views.RatingListCreateView.as_view(), name='rating-list'),
+    path('profiles/<uuid:profile_id>/watchlist/', views.WatchlistView.as_view(), name='watchlist'),
+    path('profiles/<uuid:profile_id>/history/', views.PlaybackHistoryView.as_view(), name='playback-history'),
+    path('profiles/<uuid:profile_id>/ratings/', views.RatingListCreateView.as_view(), name='rating-list'),
+    path('profiles/<uuid:profile_id>/home/', views.profile_home, name='profile-home'),
     path('playback/progress/', views.update_playback_progress, name='update-progress'),
     
     # Finance Management
@@ -42,5 +44,6 @@ urlpatterns = [
     
     # Utility Endpoints
     path('bulk-operations/titles/', views.bulk_title_operations, name='bulk-title-operations'),
+    path('bulk-operations/jobs/<uuid:job_id>/', views.bulk_job_detail, name='bulk-job-detail'),
     path('recommendations/', views.content_recommendations, name='content-recommendations'),
 ]
@@ -5,6 +5,8 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.db import transaction
 from django.db.models import Q, Avg, Count, Sum
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -12,7 +14,7 @@ from django.core.exceptions import ValidationError
 from .models import (
     Genre, Title, Season, Episode, Asset, UserProfile, UserEntitlements,
     Device, Watchlist, PlaybackHistory, Rating, ManualPayment, Invoice,
-    ContentAuditLog, EnhancedRole, UserRoleAssignment
+    ContentAuditLog, EnhancedRole, UserRoleAssignment, HomeRow, BulkCatalogJob
 )
 from .serializers import (
     GenreSerializer, TitleListSerializer, TitleDetailSerializer,
@@ -21,9 +23,15 @@ from .serializers import (
     DeviceSerializer, WatchlistSerializer, PlaybackHistorySerializer,
     PlaybackProgressSerializer, RatingSerializer, ManualPaymentSerializer,
     InvoiceSerializer, ContentAuditLogSerializer, EnhancedRoleSerializer,
-    UserRoleAssignmentSerializer, UserSerializer, BulkTitleUpdateSerializer
+    UserRoleAssignmentSerializer, UserSerializer, BulkTitleUpdateSerializer,
+    BulkCatalogJobSerializer
 )
 from .permissions import NetflixPermissionMixin
+from .progress import playback_progress
+from .audit import request_context
+from .bulk import bulk_catalog
+from .home_rows import home_rows, profile_row_key
+from .search import catalog_search
 
 User = get_user_model()
 
@@ -47,34 +55,39 @@ class TitleListCreateView(NetflixPermissionMixin, generics.ListCreateAPIView):
     serializer_class = TitleListSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['type', 'rating', 'visibility', 'release_year']
-    search_fields = ['name', 'synopsis']
     ordering_fields = ['name', 'release_year', 'created_at']
-    ordering = ['-created_at']
     required_scope = ('content', 'read')
     required_scope_write = ('content', 'write')
     
+    @property
+    def ordering(self):
+        # Search results keep their relevance order unless ?ordering= is given
+        return None if self.request.query_params.get('search', '').strip() else ['-created_at']
+    
     def get_queryset(self):
-        queryset = Title.objects.select_related('created_by').prefetch_related('genres', 'assets')
-        
-        # Filter by genre
-        genre_id = self.request.query_params.get('genre')
-        if genre_id:
-            queryset = queryset.filter(genres__id=genre_id)
+        # Artwork is loaded per page by the list serializer, not by prefetching every asset
+        queryset = Title.objects.defer('search_vector').prefetch_related('genres')
         
-        # Filter by region access
-        region = self.request.query_params.get('region')
-        if region:
-            queryset = queryset.filter(regions__contains=[region])
+        # Genre, region and tag filters (region/tag use the GIN-indexed JSONB containment)
+        queryset = catalog_search.apply_filters(queryset, {
+            key: self.request.query_params.get(key) for key in ('genre', 'region', 'tag')
+        })
         
-        # Filter by tags
-        tag = self.request.query_params.get('tag')
-        if tag:
-            queryset = queryset.filter(tags__contains=[tag])
+        # Relevance-ranked full-text search, typo-tolerant when nothing matches
+        # as typed; an explicit ?ordering= still wins
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = catalog_search.rank_with_fallback(queryset, search)
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        # The page is read inside the transaction the fuzzy threshold is set for
+        with transaction.atomic():
+            return super().list(request, *args, **kwargs)
+    
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return TitleCreateUpdateSerializer
@@ -84,6 +97,28 @@ class TitleListCreateView(NetflixPermissionMixin, generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
+class CatalogSearchView(NetflixPermissionMixin, generics.GenericAPIView):
+    """Relevance-ranked, typo-tolerant title search with keyset (cursor) pagination"""
+    permission_classes = [permissions.IsAuthenticated]
+    required_scope = ('content', 'read')
+    
+    def get(self, request):
+        try:
+            titles, next_cursor = catalog_search.search(
+                request.query_params.get('q', ''),
+                params=request.query_params,
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size', 20),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'results': TitleListSerializer(titles, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+
 class TitleDetailView(NetflixPermissionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Title.objects.select_related('created_by', 'updated_by').prefetch_related(
         'genres', 'seasons__episodes', 'assets', 'ratings'
@@ -260,6 +295,8 @@ class PlaybackHistoryView(NetflixPermissionMixin, generics.ListAPIView):
     def get_queryset(self):
         profile_id = self.kwargs.get('profile_id')
         profile = get_object_or_404(UserProfile, id=profile_id, user=self.request.user)
+        # Write this profile's buffered heartbeats so the history is never behind them
+        playback_progress.flush(profile_id=profile.id)
         return PlaybackHistory.objects.filter(profile=profile).select_related(
             'title', 'episode__season', 'device'
         ).order_by('-updated_at')
@@ -279,20 +316,10 @@ def update_playback_progress(request):
         if profile.user != request.user:
             return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        history, created = PlaybackHistory.objects.get_or_create(
-            profile=profile,
-            title=data['title'],
-            episode=data.get('episode'),
-            defaults=data
-        )
-        
-        if not created:
-            # Update existing record
-            for field, value in data.items():
-                setattr(history, field, value)
-            history.save()
+        # Heartbeats are coalesced and upserted in batches; completions are written at once
+        history, buffered = playback_progress.record(profile, data['title'], data.get('episode'), data)
         
-        return Response(PlaybackHistorySerializer(history).data)
+        return Response({**PlaybackHistorySerializer(history).data, 'buffered': buffered})
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -435,26 +462,34 @@ def dashboard_stats(request):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def bulk_title_operations(request):
-    """Perform bulk operations on titles"""
+    """
+    Queue a bulk operation on titles; it runs in the background in chunked,
+    audited transactions (netflix/bulk.py). Poll the returned status_url.
+    """
     serializer = BulkTitleUpdateSerializer(data=request.data)
     if serializer.is_valid():
-        title_ids = serializer.validated_data['title_ids']
-        action = serializer.validated_data['action']
-        
-        titles = Title.objects.filter(id__in=title_ids)
-        
-        if action == 'publish':
-            titles.update(visibility='PUBLIC', updated_by=request.user)
-        elif action == 'unpublish':
-            titles.update(visibility='PRIVATE', updated_by=request.user)
-        elif action == 'delete':
-            titles.delete()
-        
-        return Response({'message': f'{action} completed for {len(title_ids)} titles'})
+        job = bulk_catalog.submit(
+            serializer.validated_data['action'], serializer.validated_data['title_ids'],
+            user=request.user, tags=serializer.validated_data.get('tags'), context=request_context(request),
+        )
+        data = dict(BulkCatalogJobSerializer(job).data)
+        data['status_url'] = reverse('netflix:bulk-job-detail', args=[job.pk])
+        return Response(data, status=status.HTTP_202_ACCEPTED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_job_detail(request, job_id):
+    """Status and progress of a bulk operation"""
+    jobs = BulkCatalogJob.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(requested_by=request.user)
+    job = get_object_or_404(jobs, pk=job_id)
+    return Response(BulkCatalogJobSerializer(job).data)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def content_recommendations(request):
@@ -473,43 +508,24 @@ def content_recommendations(request):
         if not profile:
             return Response({'recommendations': []})
     
-    # Simple recommendation algorithm based on:
-    # 1. User's ratings
-    # 2. Popular content
-    # 3. Recently added content
-    
-    # Get user's highly rated content genres
-    user_genres = Rating.objects.filter(
-        profile=profile, 
-        stars__gte=4
-    ).values_list('title__genres', flat=True)
-    
-    # Get popular content in those genres
-    recommendations = Title.objects.filter(
-        visibility='PUBLIC',
-        genres__in=user_genres
-    ).annotate(
-        avg_rating=Avg('ratings__stars'),
-        rating_count=Count('ratings')
-    ).filter(
-        rating_count__gte=5,  # At least 5 ratings
-        avg_rating__gte=3.5   # Good average rating
-    ).order_by('-avg_rating', '-rating_count')[:20]
-    
-    # Add recently added content
-    recent_content = Title.objects.filter(
-        visibility='PUBLIC'
-    ).order_by('-created_at')[:10]
-    
-    # Combine and serialize
-    all_recommendations = list(recommendations) + list(recent_content)
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_recommendations = []
-    for title in all_recommendations:
-        if title.id not in seen:
-            unique_recommendations.append(title)
-            seen.add(title.id)
-    
-    serializer = TitleListSerializer(unique_recommendations[:30], many=True)
-    return Response({'recommendations': serializer.data})
+    # Served from the precomputed rows (refresh_home_rows); popular titles until the profile's row is built
+    rows = {row.key: row for row in HomeRow.objects.filter(
+        key__in=[profile_row_key(profile.id, 'recommended'), 'popular']
+    )}
+    row = rows.get(profile_row_key(profile.id, 'recommended')) or rows.get('popular')
+    return Response({'recommendations': [item['title'] for item in row.items] if row else []})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def profile_home(request, profile_id):
+    """Precomputed home page rows for a profile"""
+    profile = get_object_or_404(UserProfile, id=profile_id, user=request.user)
+    rows = home_rows.rows_for(profile)
+    return Response({
+        'profile': str(profile.id),
+        'rows': [
+            {'kind': row.kind, 'label': row.label, 'items': row.items, 'computed_at': row.computed_at}
+            for row in rows
+        ],
+    })
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pathology.models import DigitalSlide
+from pathology.services.slide_tiler import slide_tiler
+
+
+class Command(BaseCommand):
+    help = 'Generate Deep Zoom tile pyramids for digital pathology slides'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slide-id', help='Only tile this slide')
+        parser.add_argument('--missing', action='store_true', help='Only tile slides without a ready pyramid')
+
+    def handle(self, *args, **options):
+        slides = DigitalSlide.objects.all()
+        if options['slide_id']:
+            slides = slides.filter(slide_id=options['slide_id'])
+            if not slides.exists():
+                raise CommandError(f"Slide not found: {options['slide_id']}")
+        if options['missing']:
+            slides = slides.exclude(tile_status='ready')
+
+        failed = 0
+        for slide in slides.iterator():
+            try:
+                manifest = slide_tiler.tile_slide(slide)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{slide.slide_id}: {str(e)}")
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"{slide.slide_id}: {manifest['width']}x{manifest['height']}, "
+                f"{manifest['levels']} levels, {manifest['tiles']} tiles in {manifest['duration_seconds']}s"
+            ))
+
+        if failed:
+            raise CommandError(f"{failed} slide(s) failed to tile")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pathology', '0004_add_s3_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digitalslide',
+            name='tile_manifest',
+            field=models.JSONField(blank=True, default=dict, help_text='Deep Zoom tile pyramid location and geometry'),
+        ),
+        migrations.AddField(
+            model_name='digitalslide',
+            name='tile_status',
+            field=models.CharField(choices=[('none', 'Not Tiled'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=20),
+        ),
+    ]
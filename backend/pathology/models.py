@@ -332,6 +332,14 @@ class PathologyReport(models.Model):
 
 class DigitalSlide(models.Model):
     """Digital Microscopy Slides"""
+    TILE_STATUS_CHOICES = [
+        ('none', 'Not Tiled'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     slide_id = models.CharField(max_length=50, unique=True, default=uuid.uuid4)
     report = models.ForeignKey(PathologyReport, on_delete=models.CASCADE, related_name='slides')
     title = models.CharField(max_length=200)
@@ -344,6 +352,8 @@ class DigitalSlide(models.Model):
     format = models.CharField(max_length=20, blank=True)
     annotations = models.JSONField(default=list, help_text="Image annotations and markings")
     ai_analysis = models.JSONField(default=dict, help_text="AI-assisted analysis results")
+    tile_status = models.CharField(max_length=20, choices=TILE_STATUS_CHOICES, default='none')
+    tile_manifest = models.JSONField(default=dict, blank=True, help_text="Deep Zoom tile pyramid location and geometry")
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -93,7 +93,7 @@ class DigitalSlideSerializer(serializers.ModelSerializer):
     class Meta:
         model = DigitalSlide
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at', 'slide_id']
+        read_only_fields = ['created_at', 'updated_at', 'slide_id', 'tile_status', 'tile_manifest']
 
 
 class PathologyReportSerializer(serializers.ModelSerializer):
@@ -8,8 +8,8 @@ import json
 from typing import Dict, List, Optional
 from django.conf import settings
 from django.core.files.storage import default_storage
-from PIL import Image
-import hashlib
+
+from backend import imaging
 
 
 class DigitalSlideProcessor:
@@ -49,10 +49,8 @@ class DigitalSlideProcessor:
     def generate_thumbnail(self, image_path: str, output_path: str) -> bool:
         """Generate thumbnail for digital slide"""
         try:
-            with Image.open(image_path) as img:
-                img.thumbnail(self.thumbnail_size, Image.LANCZOS)
-                img.save(output_path, 'JPEG', quality=85)
-                return True
+            imaging.save_thumbnail(image_path, output_path, self.thumbnail_size, 'JPEG', quality=85)
+            return True
         except Exception as e:
             print(f"Error generating thumbnail: {e}")
             return False
@@ -69,14 +67,16 @@ class DigitalSlideProcessor:
         }
         
         try:
-            with Image.open(image_path) as img:
-                metadata['format'] = img.format
-                metadata['size'] = img.size
-                metadata['color_mode'] = img.mode
-                
-                # Get DPI if available
-                if hasattr(img, 'info') and 'dpi' in img.info:
-                    metadata['resolution'] = img.info['dpi']
+            # Header only; slides are never decoded for metadata
+            info = imaging.probe(image_path)
+            metadata['format'] = info.format
+            metadata['size'] = (info.width, info.height)
+            metadata['color_mode'] = info.mode
+            metadata['compression'] = info.compression
+            
+            # Get DPI if available
+            if info.dpi:
+                metadata['resolution'] = info.dpi
             
             metadata['file_size'] = os.path.getsize(image_path)
             
@@ -86,13 +86,9 @@ class DigitalSlideProcessor:
         return metadata
     
     def calculate_file_hash(self, file_path: str) -> str:
-        """Calculate MD5 hash of file for integrity checking"""
-        hash_md5 = hashlib.md5()
+        """SHA-256 of the file for integrity checking (the digest StoredBlob records)"""
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            return imaging.content_hash(file_path, 'sha256')
         except Exception as e:
             print(f"Error calculating hash: {e}")
             return ""
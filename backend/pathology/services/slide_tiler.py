@@ -0,0 +1,448 @@
+"""
+Deep Zoom (DZI) tile pyramids for digital slides.
+
+The pyramid is rendered block by block so no process ever holds the full
+resolution slide:
+
+1. The slide is cut into blocks of ``tile_size * 2**block_levels`` pixels.
+   Each block is read as a region, cut into tiles, halved, cut again, and so
+   on for ``block_levels`` levels, in a spawn process pool.
+2. What remains of each block after the last halving is written into an
+   on-disk ``.npy`` memmap holding the next, smaller level.
+3. That raster becomes the source of the next pass, until the remaining
+   level fits in a single block and the last levels down to 1x1 are rendered
+   at once.
+
+Regions are read with OpenSlide when it is installed (svs, ndpi, mrxs, ...).
+Uncompressed TIFF/PPM images are memory-mapped directly. Anything else (PNG,
+compressed TIFF, ...) is decoded once, up to PATHOLOGY_TILER_MAX_DECODE_PIXELS,
+into an ``.npy`` raster that the block tasks then read regions from.
+
+Tiles use the DZI layout (``slide_files/<level>/<col>_<row>.<fmt>``, no
+overlap) and are written to default storage under a per-run generation
+prefix. A regenerated pyramid never overwrites tiles a viewer may have cached.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+try:
+    import openslide
+    OPENSLIDE_AVAILABLE = True
+except ImportError:
+    openslide = None
+    OPENSLIDE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RASTER_BANDS = {'L': 1, 'RGB': 3}
+TILE_FORMATS = {'jpeg': 'JPEG', 'png': 'PNG'}
+# Decoded slides are converted and copied into their raster this many pixels at a time
+DECODE_STRIP_PIXELS = 16 * 1024 * 1024
+
+
+class SlideTilingError(Exception):
+    pass
+
+
+# ----- region sources -----
+
+class RasterSource:
+    """Region reads from an (h, w, bands) uint8 array, usually a memmap."""
+
+    def __init__(self, array):
+        self.array = array
+
+    @property
+    def dimensions(self):
+        return self.array.shape[1], self.array.shape[0]
+
+    @property
+    def bands(self):
+        return self.array.shape[2]
+
+    def read_region(self, x, y, width, height):
+        return np.array(self.array[y:y + height, x:x + width])
+
+
+class OpenSlideSource:
+    def __init__(self, path):
+        self.slide = openslide.OpenSlide(path)
+        self.bands = 3
+
+    @property
+    def dimensions(self):
+        return self.slide.dimensions
+
+    def read_region(self, x, y, width, height):
+        region = self.slide.read_region((x, y), 0, (width, height)).convert('RGB')
+        return np.asarray(region)
+
+
+def _raw_raster(path, img):
+    """Memory-map an uncompressed, top-down, contiguous image; None if it is not one."""
+    bands = RASTER_BANDS.get(img.mode)
+    if bands is None or not img.tile:
+        return None
+    row_bytes = img.width * bands
+    tiles = sorted(img.tile, key=lambda tile: tile.extents[1])
+    for tile in tiles:
+        args = tile.args if isinstance(tile.args, tuple) else (tile.args,)
+        if (tile.codec_name != 'raw' or args[0] != img.mode
+                or (len(args) > 1 and args[1] not in (0, row_bytes))
+                or (len(args) > 2 and args[2] != 1)
+                or tile.extents[0] != 0 or tile.extents[2] != img.width
+                or tile.offset != tiles[0].offset + tile.extents[1] * row_bytes):
+            return None
+    return np.memmap(path, dtype=np.uint8, mode='r', offset=tiles[0].offset,
+                     shape=(img.height, img.width, bands))
+
+
+def open_source(spec):
+    """
+    Region reader for ``('slide', path)`` (OpenSlide or an uncompressed image)
+    or ``('raster', npy_path)``; None for a slide that has to be decoded first.
+    """
+    kind, path = spec
+    if kind == 'raster':
+        return RasterSource(np.load(path, mmap_mode='r'))
+    if OPENSLIDE_AVAILABLE and openslide.OpenSlide.detect_format(path):
+        return OpenSlideSource(path)
+    with Image.open(path) as img:
+        raster = _raw_raster(path, img)
+    return RasterSource(raster) if raster is not None else None
+
+
+def decode_to_raster(path, output):
+    """Decode a compressed image once into an ``.npy`` raster at ``output``."""
+    with Image.open(path) as img:
+        max_pixels = getattr(settings, 'PATHOLOGY_TILER_MAX_DECODE_PIXELS', 100_000_000)
+        if img.width * img.height > max_pixels:
+            raise SlideTilingError(
+                f"{img.width}x{img.height} {img.format} slide is too large to decode without OpenSlide"
+            )
+        mode = 'L' if img.mode in ('1', 'L', 'I;16', 'I') else 'RGB'
+        raster = np.lib.format.open_memmap(output, mode='w+', dtype=np.uint8,
+                                           shape=(img.height, img.width, RASTER_BANDS[mode]))
+        img.load()
+        # Converting strip by strip avoids a second full-size copy
+        rows = max(1, DECODE_STRIP_PIXELS // img.width)
+        for top in range(0, img.height, rows):
+            strip = img.crop((0, top, img.width, min(top + rows, img.height))).convert(mode)
+            raster[top:top + strip.height] = np.asarray(strip).reshape(strip.height, strip.width, -1)
+        raster.flush()
+    return ('raster', output)
+
+
+# ----- pyramid layout -----
+
+def max_level(width, height):
+    return int(math.ceil(math.log2(max(width, height, 1))))
+
+
+def dzi_descriptor(width, height, tile_size, tile_format):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{tile_format}" '
+        f'Overlap="0" TileSize="{tile_size}">\n'
+        f'  <Size Width="{width}" Height="{height}"/>\n'
+        '</Image>\n'
+    )
+
+
+def tile_name(prefix, level, col, row, tile_format):
+    return f"{prefix}/slide_files/{level}/{col}_{row}.{tile_format}"
+
+
+def _save(name, payload):
+    saved = default_storage.save(name, ContentFile(payload))
+    if saved != name:
+        # Generation prefixes are fresh, so the name was only taken if a failed
+        # attempt left a tile behind on a storage that does not overwrite
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(payload))
+        default_storage.delete(saved)
+
+
+def _init_worker():
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    # Whole-slide images are far beyond PIL's decompression bomb limit; in these
+    # dedicated workers PATHOLOGY_TILER_MAX_DECODE_PIXELS is the guard instead
+    Image.MAX_IMAGE_PIXELS = None
+
+
+def prepare_source(path, work_dir):
+    """
+    Process pool entry point: (spec, width, height, bands) of a slide, where
+    ``spec`` is what the block tasks read regions from - the slide itself, or
+    the raster it was decoded into under ``work_dir``.
+    """
+    spec = ('slide', path)
+    source = open_source(spec)
+    if source is None:
+        spec = decode_to_raster(path, os.path.join(work_dir, 'decoded.npy'))
+        source = open_source(spec)
+    width, height = source.dimensions
+    return spec, width, height, source.bands
+
+
+def render_block(task):
+    """
+    Process pool entry point: render ``task['levels']`` pyramid levels for one
+    block and optionally write the next level's pixels into the shared raster.
+    """
+    tile_size = task['tile_size']
+    tile_format = task['format']
+    x, y = task['x'], task['y']
+    region = open_source(task['source']).read_region(x, y, task['width'], task['height'])
+    img = Image.fromarray(region[:, :, 0] if region.shape[2] == 1 else region)
+
+    written = 0
+    level = task['top_level']
+    for step in range(task['levels']):
+        origin_col, origin_row = (x >> step) // tile_size, (y >> step) // tile_size
+        for top in range(0, img.height, tile_size):
+            for left in range(0, img.width, tile_size):
+                tile = img.crop((left, top, min(left + tile_size, img.width), min(top + tile_size, img.height)))
+                buffer = BytesIO()
+                tile.save(buffer, TILE_FORMATS[tile_format], quality=task['quality'])
+                _save(tile_name(task['prefix'], level, origin_col + left // tile_size,
+                                origin_row + top // tile_size, tile_format), buffer.getvalue())
+                written += 1
+        if step < task['levels'] - 1 or task.get('output'):
+            img = img.reduce(2)
+        level -= 1
+
+    if task.get('output'):
+        shift = task['levels']
+        raster = np.load(task['output'], mmap_mode='r+')
+        pixels = np.asarray(img).reshape(img.height, img.width, -1)
+        raster[y >> shift:(y >> shift) + img.height, x >> shift:(x >> shift) + img.width] = pixels
+        raster.flush()
+    return written
+
+
+# ----- tile cache -----
+
+class TileCache:
+    """Thread-safe LRU of encoded tiles bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._items.get(key)
+            if payload is not None:
+                self._items.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._items[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+# ----- service -----
+
+class SlideTilingService:
+    def __init__(self):
+        self.tile_size = getattr(settings, 'PATHOLOGY_TILE_SIZE', 256)
+        self.tile_format = getattr(settings, 'PATHOLOGY_TILE_FORMAT', 'jpeg')
+        self.quality = getattr(settings, 'PATHOLOGY_TILE_QUALITY', 85)
+        self.block_levels = getattr(settings, 'PATHOLOGY_TILER_BLOCK_LEVELS', 3)
+        self.max_workers = getattr(settings, 'PATHOLOGY_TILER_WORKERS', min(4, os.cpu_count() or 1))
+        self.prefix = getattr(settings, 'PATHOLOGY_TILE_PREFIX', 'pathology_tiles')
+        self.cache = TileCache(getattr(settings, 'PATHOLOGY_TILE_CACHE_MB', 128) * 1024 * 1024)
+        self._executor = None
+        self._background = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already holds DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _get_background(self):
+        with self._lock:
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slide-tiler')
+            return self._background
+
+    def generate(self, path, prefix):
+        """Render the full pyramid of the slide at ``path`` under ``prefix``; returns the manifest."""
+        tile_size = self.tile_size
+        block = tile_size << self.block_levels
+        tiles = 0
+        work_dir = tempfile.mkdtemp(prefix='slide-tiler-')
+        try:
+            spec, width, height, bands = self._get_executor().submit(prepare_source, path, work_dir).result()
+            level = max_level(width, height)
+            level_width, level_height = width, height
+            while True:
+                final = level_width <= block and level_height <= block
+                levels = level + 1 if final else self.block_levels
+                output = None
+                if not final:
+                    output = os.path.join(work_dir, f"level-{level - levels}.npy")
+                    np.lib.format.open_memmap(output, mode='w+', dtype=np.uint8, shape=(
+                        -(-level_height >> levels), -(-level_width >> levels), bands,
+                    ))
+                tasks = [{
+                    'source': spec, 'x': x, 'y': y,
+                    'width': min(block, level_width - x), 'height': min(block, level_height - y),
+                    'top_level': level, 'levels': levels, 'tile_size': tile_size,
+                    'format': self.tile_format, 'quality': self.quality,
+                    'prefix': prefix, 'output': output,
+                } for y in range(0, level_height, block) for x in range(0, level_width, block)]
+
+                executor = self._get_executor()
+                tiles += sum(executor.map(render_block, tasks))
+                if final:
+                    break
+                if spec[0] == 'raster':
+                    os.unlink(spec[1])
+                spec = ('raster', output)
+                level -= levels
+                level_width, level_height = -(-level_width >> levels), -(-level_height >> levels)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        _save(f"{prefix}/slide.dzi", dzi_descriptor(width, height, tile_size, self.tile_format).encode('utf-8'))
+        return {
+            'prefix': prefix,
+            'width': width,
+            'height': height,
+            'tile_size': tile_size,
+            'overlap': 0,
+            'format': self.tile_format,
+            'levels': max_level(width, height) + 1,
+            'tiles': tiles,
+        }
+
+    def _local_path(self, slide):
+        """The slide as a local file: the path itself, the storage path, or a temp copy."""
+        if os.path.exists(slide.image_path):
+            return slide.image_path, False
+        try:
+            return default_storage.path(slide.image_path), False
+        except NotImplementedError:
+            suffix = os.path.splitext(slide.image_path)[1]
+            fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+            with os.fdopen(fd, 'wb') as tmp_file, default_storage.open(slide.image_path, 'rb') as stored:
+                shutil.copyfileobj(stored, tmp_file, 1024 * 1024)
+            return tmp_path, True
+
+    def tile_slide(self, slide):
+        """Generate the pyramid for a DigitalSlide and record it on the slide."""
+        from ..models import DigitalSlide
+
+        previous = slide.tile_manifest.get('prefix') if slide.tile_status == 'ready' else None
+        generation = uuid.uuid4().hex[:12]
+        prefix = f"{self.prefix}/{slide.slide_id}/{generation}"
+        DigitalSlide.objects.filter(pk=slide.pk).update(tile_status='processing')
+        started = timezone.now()
+        tmp_path = None
+        try:
+            path, is_temp = self._local_path(slide)
+            tmp_path = path if is_temp else None
+            manifest = self.generate(path, prefix)
+            manifest.update({
+                'generation': generation,
+                'generated_at': timezone.now().isoformat(),
+                'duration_seconds': round((timezone.now() - started).total_seconds(), 2),
+            })
+            DigitalSlide.objects.filter(pk=slide.pk).update(tile_status='ready', tile_manifest=manifest)
+            slide.tile_status, slide.tile_manifest = 'ready', manifest
+            logger.info(f"Tiled slide {slide.slide_id}: {manifest['tiles']} tiles in {manifest['duration_seconds']}s")
+            if previous:
+                self.delete_tiles(previous)
+            return manifest
+        except Exception as e:
+            logger.error(f"Tiling failed for slide {slide.slide_id}: {str(e)}")
+            DigitalSlide.objects.filter(pk=slide.pk).update(tile_status='failed', tile_manifest={'error': str(e)})
+            self.delete_tiles(prefix)
+            raise
+        finally:
+            if tmp_path:
+                os.unlink(tmp_path)
+
+    def submit(self, slide):
+        """Queue pyramid generation in the background."""
+        from django.db import close_old_connections
+        from ..models import DigitalSlide
+
+        DigitalSlide.objects.filter(pk=slide.pk).update(tile_status='pending')
+
+        def run():
+            try:
+                self.tile_slide(DigitalSlide.objects.get(pk=slide.pk))
+            except Exception:
+                pass  # logged and recorded on the slide by tile_slide
+            finally:
+                close_old_connections()
+
+        return self._get_background().submit(run)
+
+    def delete_tiles(self, prefix):
+        def walk(path):
+            try:
+                dirs, files = default_storage.listdir(path)
+            except (FileNotFoundError, OSError):
+                return
+            for name in files:
+                default_storage.delete(f"{path}/{name}")
+            for name in dirs:
+                walk(f"{path}/{name}")
+        walk(prefix)
+
+    def read_tile(self, prefix, level, col, row, tile_format):
+        """Encoded tile bytes through the LRU cache; None if the tile does not exist."""
+        name = tile_name(prefix, level, col, row, tile_format)
+        payload = self.cache.get(name)
+        if payload is None:
+            try:
+                with default_storage.open(name, 'rb') as stored:
+                    payload = stored.read()
+            except (FileNotFoundError, OSError):
+                return None
+            self.cache.put(name, payload)
+        return payload
+
+
+slide_tiler = SlideTilingService()
@@ -23,6 +23,11 @@ router.register(r's3-analyses', views.PathologyAnalysisViewSet)
 app_name = 'pathology'
 
 urlpatterns = [
+    # Deep Zoom tile pyramids (no trailing slash: viewers build these URLs from the .dzi location)
+    path('slides/<int:pk>/dzi/<str:generation>/slide.dzi', views.slide_dzi, name='slide_dzi'),
+    path('slides/<int:pk>/dzi/<str:generation>/slide_files/<int:level>/<int:col>_<int:row>.<str:ext>',
+         views.slide_tile, name='slide_tile'),
+    
     # ViewSet routes
     path('', include(router.urls)),
     
@@ -3,7 +3,10 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Count, Q, Avg
+from django.http import HttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from datetime import timedelta, datetime
 from django.db.models.functions import TruncMonth, TruncDay
 import json
@@ -19,6 +22,10 @@ from .serializers import (
     PathologyReportSerializer, DigitalSlideSerializer, PathologyQualityControlSerializer,
     PathologyDashboardSerializer, TestStatisticsSerializer, PathologyAnalyticsSerializer
 )
+from .services.slide_tiler import slide_tiler, dzi_descriptor
+
+# Tile URLs embed the pyramid generation, so responses never change
+TILE_CACHE_SECONDS = 365 * 24 * 3600
 
 
 class PathologyDepartmentViewSet(viewsets.ModelViewSet):
@@ -305,6 +312,28 @@ class DigitalSlideViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(slide)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def generate_tiles(self, request, pk=None):
+        """Queue Deep Zoom tile pyramid generation for the slide"""
+        slide = self.get_object()
+        if slide.tile_status in ('pending', 'processing'):
+            return Response({'tile_status': slide.tile_status}, status=status.HTTP_409_CONFLICT)
+        
+        slide_tiler.submit(slide)
+        return Response({'tile_status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def tiles(self, request, pk=None):
+        """Tile pyramid status and the DZI URL for the viewer"""
+        slide = self.get_object()
+        manifest = slide.tile_manifest
+        data = {'tile_status': slide.tile_status, 'manifest': manifest}
+        if slide.tile_status == 'ready':
+            data['dzi_url'] = request.build_absolute_uri(
+                reverse('pathology:slide_dzi', args=[slide.pk, manifest['generation']])
+            )
+        return Response(data)
+
 
 class PathologyQualityControlViewSet(viewsets.ModelViewSet):
     """Quality Control management"""
@@ -329,6 +358,49 @@ class PathologyQualityControlViewSet(viewsets.ModelViewSet):
 
 
 # Dashboard and Analytics Views
+def _ready_tile_manifest(pk, generation):
+    manifest = DigitalSlide.objects.filter(pk=pk, tile_status='ready').values_list('tile_manifest', flat=True).first()
+    if not manifest or manifest.get('generation') != generation:
+        return None
+    return manifest
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slide_dzi(request, pk, generation):
+    """DZI descriptor of a slide's tile pyramid (generation-specific, so immutable)"""
+    manifest = _ready_tile_manifest(pk, generation)
+    if manifest is None:
+        return Response({'error': 'Tile pyramid not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = HttpResponse(
+        dzi_descriptor(manifest['width'], manifest['height'], manifest['tile_size'], manifest['format']),
+        content_type='application/xml'
+    )
+    patch_cache_control(response, private=True, max_age=TILE_CACHE_SECONDS, immutable=True)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slide_tile(request, pk, generation, level, col, row, ext):
+    """One Deep Zoom tile, served through the in-process tile cache"""
+    etag = f'"{generation}-{level}-{col}-{row}"'
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponse(status=304)
+    else:
+        manifest = _ready_tile_manifest(pk, generation)
+        payload = None
+        if manifest is not None and ext == manifest['format']:
+            payload = slide_tiler.read_tile(manifest['prefix'], level, col, row, ext)
+        if payload is None:
+            return HttpResponse(status=404)
+        response = HttpResponse(payload, content_type=f"image/{ext}")
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=TILE_CACHE_SECONDS, immutable=True)
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def pathology_dashboard(request):
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Patient, MedicalHistory, Appointment, VitalSigns, LabResult
+from .advanced_models import Ward
 
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
@@ -59,3 +60,10 @@ class LabResultAdmin(admin.ModelAdmin):
     list_filter = ['status', 'result_status', 'test_category', 'ordered_date']
     search_fields = ['patient__first_name', 'patient__last_name', 'test_name', 'test_code']
     date_hierarchy = 'ordered_date'
+
+@admin.register(Ward)
+class WardAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'department', 'bed_count', 'is_active']
+    list_filter = ['department', 'is_active']
+    search_fields = ['code', 'name', 'department']
+    ordering = ['department', 'code']
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from patients.models import Patient, Appointment
 import json
+import uuid
 
 class PatientAdmission(models.Model):
     """
@@ -106,6 +107,17 @@ class PatientAdmission(models.Model):
     def __str__(self):
         return f"{self.patient.full_name} - {self.admission_id}"
     
+    def save(self, *args, **kwargs):
+        """Save and apply the change to the census counters in the same transaction"""
+        from .census import admission_census
+        with transaction.atomic():
+            previous = admission_census.snapshot(self.pk) if self.pk else None
+            super().save(*args, **kwargs)
+            update_fields = kwargs.get('update_fields')
+            admission_census.apply(previous, admission_census.contribution(
+                self, previous, set(update_fields) if update_fields is not None else None
+            ))
+    
     @property
     def length_of_stay(self):
         """Calculate current length of stay in days"""
@@ -117,6 +129,114 @@ class PatientAdmission(models.Model):
     def is_discharged(self):
         return self.current_status == 'discharged' and self.discharge_date is not None
 
+class Ward(models.Model):
+    """
+    Inpatient ward and its bed capacity (the census capacity source)
+    """
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    department = models.CharField(max_length=100, db_index=True)  # Matches PatientAdmission.department
+    bed_count = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['department', 'code']
+    
+    def __str__(self):
+        return f"{self.name} ({self.department}, {self.bed_count} beds)"
+
+class AdmissionCensus(models.Model):
+    """
+    Live census of active admissions, one counter per dimension value
+    Maintained by PatientAdmission.save/delete; rebuilt by rebuild_admission_census
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('department', 'Department'),
+        ('status', 'Status'),
+        ('priority', 'Priority'),
+        ('risk_band', 'Risk Band'),
+    ]
+    
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    # Sum of admission timestamps (epoch seconds): average stay = now - sum / count
+    admitted_at_sum = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['dimension', 'key']
+        ordering = ['dimension', 'key']
+    
+    def __str__(self):
+        return f"{self.dimension}={self.key}: {self.count}"
+
+class AdmissionDailyRollup(models.Model):
+    """
+    Admissions and discharges per day and department
+    """
+    date = models.DateField()
+    department = models.CharField(max_length=100)
+    admissions = models.IntegerField(default=0)
+    discharges = models.IntegerField(default=0)
+    # Total length of stay of the day's discharges, in seconds
+    discharged_stay_seconds = models.FloatField(default=0.0)
+    
+    class Meta:
+        unique_together = ['date', 'department']
+        ordering = ['-date', 'department']
+    
+    def __str__(self):
+        return f"{self.date} {self.department}: +{self.admissions} / -{self.discharges}"
+
+class AdmissionForecast(models.Model):
+    """
+    Forecast of a daily admission metric, written offline by run_admission_forecasts
+    """
+    METRIC_CHOICES = [
+        ('admissions', 'Admissions'),
+        ('discharges', 'Discharges'),
+        ('occupancy', 'Occupancy'),
+    ]
+    
+    department = models.CharField(max_length=100, blank=True)  # Blank for hospital-wide
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    date = models.DateField()
+    predicted = models.FloatField()
+    lower = models.FloatField()  # 95% band
+    upper = models.FloatField()
+    generated_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['department', 'metric', 'date']
+        ordering = ['department', 'metric', 'date']
+    
+    def __str__(self):
+        return f"{self.department or 'All'} {self.metric} {self.date}: {self.predicted:.1f}"
+
+class ForecastRun(models.Model):
+    """
+    Model selected and fitted for one forecast series in the latest run
+    """
+    department = models.CharField(max_length=100, blank=True)
+    metric = models.CharField(max_length=20, choices=AdmissionForecast.METRIC_CHOICES)
+    model = models.CharField(max_length=30)
+    parameters = models.JSONField(default=dict, blank=True)
+    holdout_mae = models.FloatField(blank=True, null=True)
+    fit_seconds = models.FloatField()
+    trained_from = models.DateField()
+    trained_through = models.DateField()
+    generated_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['department', 'metric']
+    
+    def __str__(self):
+        return f"{self.department or 'All'} {self.metric}: {self.model}"
+
 class PatientJourney(models.Model):
     """
     Track complete patient journey from admission to discharge
@@ -284,6 +404,7 @@ class PatientReport(models.Model):
     file_path = models.CharField(max_length=500, blank=True, null=True)
     file_size = models.PositiveIntegerField(blank=True, null=True)  # in bytes
     file_format = models.CharField(max_length=10, default='PDF')
+    source_version = models.CharField(max_length=64, blank=True, help_text="Version of the source data the file was rendered from")
     
     # Generation Details
     generated_by = models.ForeignKey(
@@ -295,9 +416,8 @@ class PatientReport(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='generating')
     
-    # Access and Security
+    # Access and Security (accesses are recorded in PatientReportAccess)
     is_confidential = models.BooleanField(default=True)
-    access_log = models.JSONField(default=list)  # Track who accessed the report
     
     class Meta:
         ordering = ['-generated_at']
@@ -310,19 +430,40 @@ class PatientReport(models.Model):
     def __str__(self):
         return f"{self.title} - {self.patient.full_name}"
     
-    def log_access(self, user, action='viewed'):
-        """Log report access for audit trail"""
-        access_entry = {
-            'user_id': user.id,
-            'user_name': user.full_name,
-            'action': action,
-            'timestamp': timezone.now().isoformat(),
-            'ip_address': getattr(user, '_ip_address', None)
-        }
-        if not isinstance(self.access_log, list):
-            self.access_log = []
-        self.access_log.append(access_entry)
-        self.save(update_fields=['access_log'])
+    def log_access(self, user, action='viewed', ip_address=None):
+        """Log report access for audit trail (buffered, appended in batches)"""
+        from .audit import report_access_log
+        report_access_log.record(
+            self, user, action, ip_address=ip_address or getattr(user, '_ip_address', None)
+        )
+
+class PatientReportAccess(models.Model):
+    """
+    Append-only audit trail of report accesses
+    """
+    # Set when the event is recorded: identifies it across a journal replay
+    event_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    report = models.ForeignKey(PatientReport, on_delete=models.CASCADE, related_name='access_events')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='report_accesses'
+    )
+    user_name = models.CharField(max_length=200, blank=True)  # As it was at access time
+    action = models.CharField(max_length=30)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['report', 'timestamp'], name='report_access_report_ts_idx'),
+            models.Index(fields=['user', 'timestamp'], name='report_access_user_ts_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_name} {self.action} {self.report_id} at {self.timestamp}"
 
 class PatientMetrics(models.Model):
     """
@@ -5,3 +5,7 @@ class PatientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'patients'
     verbose_name = 'Patient Management'
+    
+    def ready(self):
+        # Import signal handlers
+        import patients.signals  # noqa: F401
@@ -0,0 +1,64 @@
+"""
+Buffered writer for the report access audit trail.
+
+Accesses are appended to PatientReportAccess rather than rewritten into a
+JSON column, so recording one costs the same however long the history is, and
+concurrent accesses cannot overwrite each other. Events are written in
+batches of REPORT_ACCESS_LOG_BATCH_SIZE, at least every
+REPORT_ACCESS_LOG_FLUSH_SECONDS, through the journaled buffered writer in
+backend/buffered_writes.py. Each event carries a UUID ``event_id`` set when
+it is recorded, so a journal replayed after its batch was written adds no
+duplicates.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from backend.buffered_writes import BufferedBulkWriter
+
+logger = logging.getLogger(__name__)
+
+
+class ReportAccessLogWriter(BufferedBulkWriter):
+    name = 'report-access-log'
+    replay_key = 'event_id'
+
+    def __init__(self):
+        super().__init__(
+            batch_size=getattr(settings, 'REPORT_ACCESS_LOG_BATCH_SIZE', 100),
+            flush_seconds=getattr(settings, 'REPORT_ACCESS_LOG_FLUSH_SECONDS', 2.0),
+            max_buffered=getattr(settings, 'REPORT_ACCESS_LOG_MAX_BUFFERED', 50000),
+        )
+
+    def get_model(self):
+        from .advanced_models import PatientReportAccess
+        return PatientReportAccess
+
+    def record(self, report, user, action, ip_address=None):
+        """Queue one access event; written with the next batch."""
+        user_id = getattr(user, 'pk', None)
+        self.queue(self.get_model()(
+            report_id=report.pk,
+            user_id=user_id,
+            user_name=(getattr(user, 'full_name', '') or str(user)) if user_id else '',
+            action=action,
+            ip_address=ip_address,
+            timestamp=timezone.now(),
+        ))
+
+    def write_one(self, event):
+        # A report deleted since its access was recorded fails the whole batch
+        try:
+            with transaction.atomic():
+                event.save(force_insert=True)
+            return True
+        except IntegrityError:
+            if self.replayed(event):
+                return False  # Replayed from a journal after it was written
+            logger.warning(f"Dropped access event for missing report {event.report_id}")
+            return False
+
+
+report_access_log = ReportAccessLogWriter()
@@ -0,0 +1,212 @@
+"""
+Live admission census.
+
+Every admission contributes to a few counters: while active, one each for
+its department, status, priority and AI risk band (AdmissionCensus); and one
+admission on its admission day plus, once discharged, one discharge with its
+length of stay on its discharge day (AdmissionDailyRollup). PatientAdmission
+saves, and the delete signals in patients/signals.py (which also fire for
+cascaded and queryset deletes), apply the difference between the old and new
+contribution inside the same transaction, so the counters always match the
+committed rows and the dashboard reads a handful of small rows instead of
+scanning admissions. The old contribution is read with the admission row locked, so
+concurrent saves of one admission apply their differences one after another
+instead of both starting from the same old values.
+
+Average length of stay is kept as an interval aggregate: each census row
+also sums the admission timestamps, so the mean stay of active patients is
+``now - admitted_at_sum / count``, and discharges sum their stay in seconds.
+
+Queryset ``update()`` calls bypass ``save``; run ``rebuild_admission_census``
+after bulk changes.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+CENSUS_FIELDS = (
+    'is_active', 'department', 'current_status', 'priority_level', 'ai_risk_score',
+    'admission_date', 'discharge_date',
+)
+
+
+def risk_band(score):
+    if score >= 7.0:
+        return 'high'
+    if score >= 4.0:
+        return 'medium'
+    return 'low'
+
+
+def _day(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def contribution_of(values):
+    """
+    The counters one admission (a dict of CENSUS_FIELDS) contributes to:
+    ({(dimension, key): (count, admitted_at)}, {(date, department): (admissions, discharges, stay_seconds)})
+    """
+    census, daily = {}, defaultdict(lambda: (0, 0, 0.0))
+    if values is None:
+        return census, {}
+    admitted_at = values['admission_date'].timestamp()
+    if values['is_active']:
+        for dimension, key in (
+            ('total', 'all'),
+            ('department', values['department']),
+            ('status', values['current_status']),
+            ('priority', values['priority_level']),
+            ('risk_band', risk_band(values['ai_risk_score'] or 0.0)),
+        ):
+            census[(dimension, key)] = (1, admitted_at)
+
+    department = values['department']
+    admissions, discharges, stay = daily[(_day(values['admission_date']), department)]
+    daily[(_day(values['admission_date']), department)] = (admissions + 1, discharges, stay)
+    if values['discharge_date']:
+        stay_seconds = max((values['discharge_date'] - values['admission_date']).total_seconds(), 0.0)
+        key = (_day(values['discharge_date']), department)
+        admissions, discharges, stay = daily[key]
+        daily[key] = (admissions, discharges + 1, stay + stay_seconds)
+    return census, dict(daily)
+
+
+def _bump(model, lookup, deltas):
+    """Add ``deltas`` to the counter row identified by ``lookup``, creating it if needed."""
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently since the update above
+        model.objects.filter(**lookup).update(**increments)
+
+
+class AdmissionCensusService:
+    def snapshot(self, pk):
+        """
+        The census-relevant fields of an admission as stored, or None. Locks
+        the row until the surrounding transaction ends.
+        """
+        from .advanced_models import PatientAdmission
+        return PatientAdmission.objects.select_for_update().filter(pk=pk).values(*CENSUS_FIELDS).first()
+
+    def contribution(self, admission, previous=None, update_fields=None):
+        """
+        The census fields an admission has after saving it: with
+        ``update_fields``, only those are taken from the instance and the rest
+        keep their stored ``previous`` values.
+        """
+        if previous is None or update_fields is None:
+            return {field: getattr(admission, field) for field in CENSUS_FIELDS}
+        return {
+            field: getattr(admission, field) if field in update_fields else previous[field]
+            for field in CENSUS_FIELDS
+        }
+
+    def apply(self, previous, current):
+        """Move the counters from the ``previous`` to the ``current`` field values (either may be None)."""
+        from .advanced_models import AdmissionCensus, AdmissionDailyRollup
+
+        old_census, old_daily = contribution_of(previous)
+        new_census, new_daily = contribution_of(current)
+
+        # Sorted so concurrent transactions lock counter rows in the same order
+        for dimension, key in sorted(set(old_census) | set(new_census)):
+            old_count, old_at = old_census.get((dimension, key), (0, 0.0))
+            new_count, new_at = new_census.get((dimension, key), (0, 0.0))
+            if (old_count, old_at) != (new_count, new_at):
+                _bump(AdmissionCensus, {'dimension': dimension, 'key': key},
+                      {'count': new_count - old_count, 'admitted_at_sum': new_at - old_at})
+
+        for date, department in sorted(set(old_daily) | set(new_daily)):
+            old = old_daily.get((date, department), (0, 0, 0.0))
+            new = new_daily.get((date, department), (0, 0, 0.0))
+            if old != new:
+                _bump(AdmissionDailyRollup, {'date': date, 'department': department}, {
+                    'admissions': new[0] - old[0],
+                    'discharges': new[1] - old[1],
+                    'discharged_stay_seconds': new[2] - old[2],
+                })
+
+    def rebuild(self, admission_model=None, census_model=None, daily_model=None):
+        """
+        Recompute every counter from the admissions table. Model arguments
+        allow running from a data migration with historical models.
+        """
+        from .advanced_models import PatientAdmission, AdmissionCensus, AdmissionDailyRollup
+        admission_model = admission_model or PatientAdmission
+        census_model = census_model or AdmissionCensus
+        daily_model = daily_model or AdmissionDailyRollup
+
+        census = defaultdict(lambda: [0, 0.0])
+        daily = defaultdict(lambda: [0, 0, 0.0])
+        for values in admission_model.objects.values(*CENSUS_FIELDS).iterator(chunk_size=2000):
+            admission_census, admission_daily = contribution_of(values)
+            for key, (count, admitted_at) in admission_census.items():
+                census[key][0] += count
+                census[key][1] += admitted_at
+            for key, (admissions, discharges, stay) in admission_daily.items():
+                daily[key][0] += admissions
+                daily[key][1] += discharges
+                daily[key][2] += stay
+
+        with transaction.atomic():
+            census_model.objects.all().delete()
+            daily_model.objects.all().delete()
+            census_model.objects.bulk_create([
+                census_model(dimension=dimension, key=key, count=count, admitted_at_sum=admitted_at)
+                for (dimension, key), (count, admitted_at) in census.items()
+            ], batch_size=1000)
+            daily_model.objects.bulk_create([
+                daily_model(date=date, department=department, admissions=admissions,
+                            discharges=discharges, discharged_stay_seconds=stay)
+                for (date, department), (admissions, discharges, stay) in daily.items()
+            ], batch_size=1000)
+        return len(census), len(daily)
+
+    def dashboard(self):
+        """
+        Current census: {dimension: {key: {'count', 'avg_length_of_stay'}}},
+        today's admissions/discharges and bed capacity per department.
+        """
+        from .advanced_models import AdmissionCensus, AdmissionDailyRollup, Ward
+
+        now = timezone.now()
+        census = defaultdict(dict)
+        for dimension, key, count, admitted_at_sum in AdmissionCensus.objects.filter(
+            count__gt=0
+        ).values_list('dimension', 'key', 'count', 'admitted_at_sum'):
+            census[dimension][key] = {
+                'count': count,
+                'avg_length_of_stay': round((now.timestamp() - admitted_at_sum / count) / 86400, 1),
+            }
+
+        today = AdmissionDailyRollup.objects.filter(date=_day(now)).aggregate(
+            admissions=Sum('admissions'), discharges=Sum('discharges'), stay=Sum('discharged_stay_seconds')
+        )
+        capacity = dict(Ward.objects.filter(is_active=True).values('department').annotate(
+            beds=Sum('bed_count')
+        ).values_list('department', 'beds'))
+        if not capacity:
+            # No wards configured yet
+            capacity = {None: getattr(settings, 'HOSPITAL_BED_CAPACITY', 200)}
+
+        return {
+            'census': census,
+            'todays_admissions': today['admissions'] or 0,
+            'todays_discharges': today['discharges'] or 0,
+            'todays_avg_discharged_length_of_stay': round(
+                today['stay'] / today['discharges'] / 86400, 1
+            ) if today['discharges'] else None,
+            'capacity': capacity,
+        }
+
+
+admission_census = AdmissionCensusService()
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+import time
+
+import numpy as np
+
+from patients.forecasting import HoltWinters, SeasonalNaive, select_and_forecast
+
+
+def synthetic_admissions(days, base, seed):
+    """Poisson daily admissions with trend, weekly and yearly seasonality."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    weekly = np.array([1.15, 1.1, 1.0, 1.0, 0.95, 0.8, 0.75])[t % 7]
+    yearly = 1 + 0.15 * np.cos(2 * np.pi * t / 365.25)
+    trend = 1 + 0.0004 * t
+    return rng.poisson(base * weekly * yearly * trend).astype(float)
+
+
+class Command(BaseCommand):
+    help = 'Rolling-origin backtest of the admission forecasting models on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=730, help='Length of each synthetic series')
+        parser.add_argument('--series', type=int, default=5, help='Number of synthetic series (departments)')
+        parser.add_argument('--horizon', type=int, default=14)
+        parser.add_argument('--origins', type=int, default=12, help='Forecast origins, one week apart')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        horizon = options['horizon']
+        results = {'holt_winters': [], 'seasonal_naive': [], 'selected': []}
+        fit_times = {name: [] for name in results}
+        covered = []
+
+        for index in range(options['series']):
+            base = 5 + 10 * index
+            y = synthetic_admissions(options['days'], base, options['seed'] + index)
+            for origin in range(options['origins']):
+                cut = len(y) - horizon - 7 * origin
+                train, actual = y[:cut], y[cut:cut + horizon]
+                for model_class in (HoltWinters, SeasonalNaive):
+                    started = time.perf_counter()
+                    mean, _ = model_class().fit(train).forecast(horizon)
+                    fit_times[model_class.name].append(time.perf_counter() - started)
+                    results[model_class.name].append((np.clip(mean, 0, None), actual))
+
+                _, mean, lower, upper, _, seconds = select_and_forecast(train, horizon)
+                fit_times['selected'].append(seconds)
+                results['selected'].append((mean, actual))
+                covered.append(((actual >= lower) & (actual <= upper)).mean())
+
+        self.stdout.write(f"{options['series']} series x {options['origins']} origins, horizon {horizon} days")
+        self.stdout.write(f"{'model':<16}{'MAE':>8}{'MAPE %':>9}{'fit ms':>9}")
+        for name, pairs in results.items():
+            errors = np.concatenate([predicted - actual for predicted, actual in pairs])
+            actuals = np.concatenate([actual for _, actual in pairs])
+            mae = np.abs(errors).mean()
+            mape = (np.abs(errors) / np.maximum(actuals, 1)).mean() * 100
+            self.stdout.write(f"{name:<16}{mae:>8.2f}{mape:>9.1f}{np.mean(fit_times[name]) * 1000:>9.1f}")
+        self.stdout.write(f"95% band coverage (selected): {np.mean(covered) * 100:.1f}% (nominal 95%)")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from patients.census import admission_census
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admission census and daily rollups from the admissions table'
+
+    def handle(self, *args, **options):
+        counters, days = admission_census.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {counters} census counters and {days} daily rollups"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from concurrent.futures import wait
+from datetime import timedelta
+from django.utils import timezone
+
+from patients.advanced_models import PatientReport
+from backend.report_rendering import report_renderer
+
+
+class Command(BaseCommand):
+    help = 'Render patient reports left in "generating" (e.g. queued before a server restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10,
+                            help='Only reports queued at least this many minutes ago')
+        parser.add_argument('--retry-failed', action='store_true', help='Also re-render reports in "error"')
+
+    def handle(self, *args, **options):
+        statuses = ['generating', 'error'] if options['retry_failed'] else ['generating']
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        report_ids = list(PatientReport.objects.filter(
+            status__in=statuses, generated_at__lte=cutoff
+        ).values_list('pk', flat=True))
+        if not report_ids:
+            self.stdout.write('No pending reports')
+            return
+
+        futures = [
+            report_renderer.submit(f"patient_report:{pk}", 'patients.report_generator.render_patient_report', pk)
+            for pk in report_ids
+        ]
+        wait(futures)
+        failed = PatientReport.objects.filter(pk__in=report_ids).exclude(status='completed').count()
+        self.stdout.write(self.style.SUCCESS(f"Rendered {len(report_ids) - failed} reports ({failed} failed)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+import time
+
+from patients.forecasting import admission_forecaster
+
+
+class Command(BaseCommand):
+    help = 'Fit admission/discharge/occupancy forecasts per department and store them for the analytics API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuous', action='store_true', help='Refit periodically instead of once')
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between runs (with --continuous)')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = admission_forecaster.run()
+            self.stdout.write(self.style.SUCCESS(
+                f"Forecast {summary['series']} series for {summary['departments']} departments "
+                f"in {summary['seconds']}s"
+            ))
+            if not options['continuous']:
+                break
+            time.sleep(options['interval'])
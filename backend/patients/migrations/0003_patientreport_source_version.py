@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_patientadmission_patientmetrics_aipatientinsights_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientreport',
+            name='source_version',
+            field=models.CharField(blank=True, help_text='Version of the source data the file was rendered from', max_length=64),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils import timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def copy_access_log(apps, schema_editor):
+    """Move the entries of PatientReport.access_log into PatientReportAccess"""
+    PatientReport = apps.get_model('patients', 'PatientReport')
+    PatientReportAccess = apps.get_model('patients', 'PatientReportAccess')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    user_ids = set(User.objects.values_list('pk', flat=True))
+
+    events = []
+    reports = PatientReport.objects.exclude(access_log=[]).values_list('pk', 'access_log', 'generated_at')
+    for report_pk, access_log, generated_at in reports.iterator(chunk_size=500):
+        for entry in access_log if isinstance(access_log, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            timestamp = parse_datetime(entry.get('timestamp') or '') or generated_at
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            events.append(PatientReportAccess(
+                report_id=report_pk,
+                user_id=entry.get('user_id') if entry.get('user_id') in user_ids else None,
+                user_name=(entry.get('user_name') or '')[:200],
+                action=(entry.get('action') or 'viewed')[:30],
+                ip_address=entry.get('ip_address') or None,
+                timestamp=timestamp,
+            ))
+            if len(events) >= 1000:
+                PatientReportAccess.objects.bulk_create(events)
+                events = []
+    PatientReportAccess.objects.bulk_create(events)
+
+
+def restore_access_log(apps, schema_editor):
+    """Copy PatientReportAccess rows back into PatientReport.access_log, oldest first"""
+    PatientReport = apps.get_model('patients', 'PatientReport')
+    PatientReportAccess = apps.get_model('patients', 'PatientReportAccess')
+
+    def save(report_pk, entries):
+        PatientReport.objects.filter(pk=report_pk).update(access_log=entries)
+
+    current, entries = None, []
+    events = PatientReportAccess.objects.order_by('report_id', 'timestamp', 'id').values_list(
+        'report_id', 'user_id', 'user_name', 'action', 'timestamp', 'ip_address'
+    )
+    for report_pk, user_id, user_name, action, timestamp, ip_address in events.iterator(chunk_size=2000):
+        if report_pk != current:
+            if current is not None:
+                save(current, entries)
+            current, entries = report_pk, []
+        entries.append({
+            'user_id': user_id,
+            'user_name': user_name,
+            'action': action,
+            'timestamp': timestamp.isoformat(),
+            'ip_address': ip_address,
+        })
+    if current is not None:
+        save(current, entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_patientreport_source_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientReportAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_name', models.CharField(blank=True, max_length=200)),
+                ('action', models.CharField(max_length=30)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_events', to='patients.patientreport')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_accesses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['report', 'timestamp'], name='report_access_report_ts_idx'), models.Index(fields=['user', 'timestamp'], name='report_access_user_ts_idx')],
+            },
+        ),
+        migrations.RunPython(copy_access_log, restore_access_log),
+        migrations.RemoveField(
+            model_name='patientreport',
+            name='access_log',
+        ),
+    ]
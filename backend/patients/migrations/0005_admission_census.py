@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+
+def build_census(apps, schema_editor):
+    from patients.census import admission_census
+    admission_census.rebuild(
+        apps.get_model('patients', 'PatientAdmission'),
+        apps.get_model('patients', 'AdmissionCensus'),
+        apps.get_model('patients', 'AdmissionDailyRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0004_patientreportaccess'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('department', models.CharField(db_index=True, max_length=100)),
+                ('bed_count', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['department', 'code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AdmissionCensus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('department', 'Department'), ('status', 'Status'), ('priority', 'Priority'), ('risk_band', 'Risk Band')], max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('admitted_at_sum', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['dimension', 'key'],
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AdmissionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('admissions', models.IntegerField(default=0)),
+                ('discharges', models.IntegerField(default=0)),
+                ('discharged_stay_seconds', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['-date', 'department'],
+                'unique_together': {('date', 'department')},
+            },
+        ),
+        migrations.RunPython(build_census, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0005_admission_census'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('metric', models.CharField(choices=[('admissions', 'Admissions'), ('discharges', 'Discharges'), ('occupancy', 'Occupancy')], max_length=20)),
+                ('model', models.CharField(max_length=30)),
+                ('parameters', models.JSONField(blank=True, default=dict)),
+                ('holdout_mae', models.FloatField(blank=True, null=True)),
+                ('fit_seconds', models.FloatField()),
+                ('trained_from', models.DateField()),
+                ('trained_through', models.DateField()),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['department', 'metric'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AdmissionForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('metric', models.CharField(choices=[('admissions', 'Admissions'), ('discharges', 'Discharges'), ('occupancy', 'Occupancy')], max_length=20)),
+                ('date', models.DateField()),
+                ('predicted', models.FloatField()),
+                ('lower', models.FloatField()),
+                ('upper', models.FloatField()),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['department', 'metric', 'date'],
+                'unique_together': {('department', 'metric', 'date')},
+            },
+        ),
+    ]
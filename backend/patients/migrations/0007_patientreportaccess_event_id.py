@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_event_ids(apps, schema_editor):
+    """Give every existing access event its own event_id"""
+    PatientReportAccess = apps.get_model('patients', 'PatientReportAccess')
+    events = []
+    for event in PatientReportAccess.objects.only('pk').iterator(chunk_size=2000):
+        event.event_id = uuid.uuid4()
+        events.append(event)
+        if len(events) >= 2000:
+            PatientReportAccess.objects.bulk_update(events, ['event_id'])
+            events = []
+    PatientReportAccess.objects.bulk_update(events, ['event_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_admission_forecasts'),
+    ]
+
+    operations = [
+        # Added nullable and filled per row first: a default is evaluated once
+        # for all existing rows, which would break the unique constraint
+        migrations.AddField(
+            model_name='patientreportaccess',
+            name='event_id',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_event_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patientreportaccess',
+            name='event_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -2,12 +2,26 @@
 Patient Report Generation Service
 Generate comprehensive patient reports with AI analysis
 """
+import io
 import json
+import logging
 from datetime import datetime
+from xml.sax.saxutils import escape
+from django.db.models import Count, Max
 from django.utils import timezone
 from django.template.loader import render_to_string
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from backend.report_rendering import report_renderer, artifact_key, store_artifact
 from .advanced_models import PatientReport
 
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered layout changes so existing artifacts are re-rendered
+ARTIFACT_VERSION = '1'
+
 class PatientReportGenerator:
     """
     Service for generating various types of patient reports
@@ -21,6 +35,74 @@ class PatientReportGenerator:
             'clinical_summary': 'reports/clinical_summary.html'
         }
     
+    def generate(self, report_type, admission):
+        """
+        Generate report content of the given type
+        """
+        if report_type == 'comprehensive':
+            return self.generate_comprehensive_report(admission)
+        elif report_type == 'discharge_summary':
+            return self.generate_discharge_summary(admission)
+        elif report_type == 'ai_analysis':
+            return self.generate_ai_analysis_report(admission)
+        return self.generate_basic_report(admission)
+    
+    def render_pdf(self, title, content):
+        """
+        Render report content as a PDF: summary first, then one table per section
+        """
+        styles = getSampleStyleSheet()
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=54, leftMargin=54, topMargin=54, bottomMargin=36)
+        story = [
+            Paragraph(escape(title), styles['Title']),
+            Paragraph(f"Generated: {escape(str(content.get('generated_at', '')))}", styles['Normal']),
+            Spacer(1, 12),
+        ]
+        if content.get('summary'):
+            story.append(Paragraph('Summary', styles['Heading2']))
+            story.append(Paragraph(escape(str(content['summary'])), styles['Normal']))
+        
+        for section, value in content.items():
+            if section in ('summary', 'generated_at', 'report_type'):
+                continue
+            story.append(Paragraph(escape(section.replace('_', ' ').title()), styles['Heading2']))
+            rows = [
+                [Paragraph(escape(label), styles['Normal']), Paragraph(escape(text), styles['Normal'])]
+                for label, text in self._flatten_section(value)
+            ]
+            if not rows:
+                story.append(Paragraph('No data recorded.', styles['Normal']))
+                continue
+            table = Table(rows, colWidths=[2.2 * inch, 4.3 * inch])
+            table.setStyle(TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('GRID', (0, 0), (-1, -1), 0.25, '#999999'),
+            ]))
+            story.append(table)
+        
+        doc.build(story)
+        return buffer.getvalue()
+    
+    def _flatten_section(self, value, label=''):
+        """
+        (label, text) rows for a nested section value
+        """
+        if isinstance(value, dict):
+            rows = []
+            for key, item in value.items():
+                name = key.replace('_', ' ').title()
+                rows.extend(self._flatten_section(item, f"{label} / {name}" if label else name))
+            return rows
+        if isinstance(value, list):
+            if all(not isinstance(item, (dict, list)) for item in value):
+                return [(label or 'Items', ', '.join(str(item) for item in value))] if value else []
+            rows = []
+            for index, item in enumerate(value, 1):
+                rows.extend(self._flatten_section(item, f"{label} #{index}" if label else f"#{index}"))
+            return rows
+        return [(label or 'Value', '' if value is None else str(value))]
+    
     def generate_comprehensive_report(self, admission):
         """
         Generate comprehensive patient report including all data
@@ -158,7 +240,7 @@ class PatientReportGenerator:
             'gender': patient.gender,
             'phone': patient.phone_number,
             'email': patient.email,
-            'address': patient.address,
+            'address': ', '.join(part for part in (patient.address_line1, patient.address_line2, patient.city, patient.state, patient.postal_code) if part),
             'emergency_contact': patient.emergency_contact_name,
             'emergency_phone': patient.emergency_contact_phone,
             'insurance': {
@@ -527,3 +609,64 @@ class PatientReportGenerator:
         summary += f"Current risk score: {admission.ai_risk_score}/10."
         
         return summary
+
+
+def source_version(admission):
+    """
+    Version of the data a report of this admission is built from: changes
+    whenever the admission, patient, journey, AI insights or metrics change.
+    """
+    journey = admission.journey_events.aggregate(count=Count('id'), last=Max('created_at'))
+    insights = admission.ai_insights.aggregate(count=Count('id'), last=Max('generated_at'))
+    metrics = getattr(admission, 'metrics', None)
+    return artifact_key(
+        admission.updated_at.isoformat(), admission.patient.updated_at.isoformat(),
+        journey['count'], journey['last'], insights['count'], insights['last'],
+        metrics.last_updated.isoformat() if metrics else None,
+    )
+
+
+def render_patient_report(report_pk):
+    """
+    Render task for a PatientReport (runs in a render worker): build the
+    content, write the PDF/JSON artifact and mark the report completed, or
+    mark it failed with the error. A report whose artifact already matches the
+    current source data is left as is.
+    """
+    report = PatientReport.objects.select_related('admission', 'admission__patient').get(pk=report_pk)
+    admission = report.admission
+    version = source_version(admission)
+    extension = 'json' if report.file_format.upper() == 'JSON' else 'pdf'
+    name = report_renderer.artifact_name(
+        'patient_reports', artifact_key(report.report_id, version, ARTIFACT_VERSION), extension
+    )
+    if report.status == 'completed' and report.file_path == name and report_renderer.exists(name):
+        return name
+    
+    generator = PatientReportGenerator()
+    try:
+        content = generator.generate(report.report_type, admission)
+        if 'error' in content:
+            raise ValueError(content['error'])
+        
+        if extension == 'json':
+            payload = json.dumps(content, indent=2, default=str).encode('utf-8')
+        else:
+            payload = generator.render_pdf(report.title, content)
+        size = store_artifact(name, payload)
+        
+        PatientReport.objects.filter(pk=report.pk).update(
+            content=content,
+            summary=content.get('summary', ''),
+            file_path=name,
+            file_size=size,
+            source_version=version,
+            status='completed',
+        )
+    except Exception as e:
+        # Leaving the report 'generating' would have downloads re-queue it forever
+        PatientReport.objects.filter(pk=report.pk).update(status='error', content={'error': str(e)})
+        logger.error(f"Report {report.report_id} generation failed: {str(e)}")
+        return None
+    logger.info(f"Rendered report {report.report_id} ({size} bytes)")
+    return name
@@ -2,9 +2,10 @@ from rest_framework import serializers
 from .models import Patient, MedicalHistory, Appointment, VitalSigns, LabResult
 from .advanced_models import (
     PatientAdmission, PatientJourney, AIPatientInsights, 
-    PatientReport, PatientMetrics
+    PatientReport, PatientReportAccess, PatientMetrics
 )
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
 User = get_user_model()
 
@@ -245,9 +246,10 @@ class PatientReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'admission', 'admission_details', 'patient', 'patient_details',
             'report_id', 'report_type', 'report_type_display', 'title',
-            'summary', 'file_format', 'generated_by', 'generated_by_details',
+            'summary', 'file_format', 'file_size', 'generated_by', 'generated_by_details',
             'generated_at', 'status', 'download_url'
         ]
+        read_only_fields = ['file_size']
     
     def get_admission_details(self, obj):
         return {
@@ -258,9 +260,18 @@ class PatientReportSerializer(serializers.ModelSerializer):
     
     def get_download_url(self, obj):
         if obj.status == 'completed':
-            return f"/api/reports/{obj.report_id}/download/"
+            return reverse('patients:report-download', args=[obj.pk])
         return None
 
+class PatientReportAccessSerializer(serializers.ModelSerializer):
+    """Report access audit event Serializer"""
+    report_id = serializers.CharField(source='report.report_id', read_only=True)
+    
+    class Meta:
+        model = PatientReportAccess
+        fields = ['id', 'report', 'report_id', 'user', 'user_name', 'action', 'ip_address', 'timestamp']
+        read_only_fields = fields
+
 class PatientMetricsSerializer(serializers.ModelSerializer):
     """Patient Care Metrics Serializer"""
     admission_details = serializers.SerializerMethodField()
@@ -0,0 +1,23 @@
+# Signal handlers for the patients app
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from .advanced_models import PatientAdmission
+from .census import admission_census
+
+
+@receiver(pre_delete, sender=PatientAdmission)
+def remember_admission_census(sender, instance, **kwargs):
+    """Read (and lock) the stored census fields of an admission about to be deleted"""
+    instance._census_previous = admission_census.snapshot(instance.pk)
+
+
+@receiver(post_delete, sender=PatientAdmission)
+def remove_admission_from_census(sender, instance, **kwargs):
+    """
+    Take a deleted admission out of the census counters. Runs for cascaded
+    and queryset deletes too, inside the deletion's transaction.
+    """
+    previous = instance.__dict__.pop('_census_previous', None)
+    if previous is not None:
+        admission_census.apply(previous, None)
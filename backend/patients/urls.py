@@ -11,7 +11,7 @@ from .views import (
 )
 from .advanced_views import (
     PatientAdmissionViewSet, PatientJourneyViewSet, PatientReportViewSet,
-    AIPatientInsightsViewSet, PatientAnalyticsViewSet
+    AIPatientInsightsViewSet, PatientAnalyticsViewSet, ReportAccessAuditViewSet
 )
 
 # Create router for advanced patient management APIs
@@ -19,6 +19,7 @@ router = DefaultRouter()
 router.register(r'admissions', PatientAdmissionViewSet, basename='admission')
 router.register(r'journey', PatientJourneyViewSet, basename='journey')
 router.register(r'reports', PatientReportViewSet, basename='report')
+router.register(r'report-access', ReportAccessAuditViewSet, basename='report-access')
 router.register(r'ai-insights', AIPatientInsightsViewSet, basename='ai-insights')
 router.register(r'analytics', PatientAnalyticsViewSet, basename='analytics')
 
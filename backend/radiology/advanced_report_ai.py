@@ -7,6 +7,8 @@ import time
 from datetime import datetime
 import re
 
+from .services.terminology_engine import terminology_engine
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -192,19 +194,21 @@ class AdvancedReportProcessor:
             return corrected_text, corrections
         
         if correction_type == 'terminology':
-            for rule in config.get('rules', []):
-                pattern = rule['pattern']
-                replacement = rule['replacement']
-                category = rule['category']
-                
-                matches = re.findall(pattern, corrected_text, re.IGNORECASE)
-                if matches:
-                    corrected_text = re.sub(pattern, replacement, corrected_text, flags=re.IGNORECASE)
+            # All rules are applied in one pass over the report
+            rule_set = terminology_engine.compile(config.get('rules', []))
+            corrected_text, spans = rule_set.apply(corrected_text)
+            spans_by_phrase = {}
+            for span in spans:
+                spans_by_phrase.setdefault(span['original'].lower(), []).append(span)
+            for rule in rule_set.rules:
+                rule_spans = spans_by_phrase.get(rule.phrase.lower())
+                if rule_spans:
                     corrections.append({
                         "type": "Terminology",
-                        "category": category,
-                        "count": len(matches),
-                        "description": f"Standardized {pattern} to {replacement}"
+                        "category": rule.category,
+                        "count": len(rule_spans),
+                        "description": f"Standardized {rule.phrase} to {rule.replacement}",
+                        "spans": [(span['start'], span['end']) for span in rule_spans]
                     })
         
         elif correction_type == 'structure':
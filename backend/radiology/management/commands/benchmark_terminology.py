@@ -0,0 +1,110 @@
+"""
+Benchmark dictation terminology processing on long reports.
+
+Compares the single-pass terminology engine against the previous approach of
+compiling and applying one regular expression per rule, on a synthetic CT
+report of the requested length, and checks both produce the same text.
+"""
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from radiology.voice_recognition_views import VoiceRecognitionProcessor
+
+DICTATION_SENTENCES = [
+    "the lungs demonstrate scattered ground glass opacities with no new monia",
+    "there is a small left pleural fusion with adjacent atelectasiss",
+    "heart size shows mild cardio megaly without pericardial effusion",
+    "a hypo dense lesion in the right hepatic lobe measures 12 mm",
+    "hyper dense material in the gallbladder likely represents sludge",
+    "no acute bleed or midline shift is identified",
+    "T2 weighted images show a hyperintense focus with diffusion restriction",
+    "post surgical changes of the right hemithorax are stable",
+    "a 9 mm pulmonary nodule in the right upper lobe is unchanged",
+    "degenerative changes of the lumbar spine without fracture",
+    "radio opaque density projects over the left upper quadrant",
+    "no free air, obstruction or perforation",
+    "fluid attenuated inversion recovery images show no acute infarct",
+    "findings are compatible with chronic changes",
+    "impression stable exam without mass effect",
+]
+
+
+def legacy_correct(text):
+    for incorrect, correct in VoiceRecognitionProcessor.MEDICAL_CORRECTIONS.items():
+        text = re.compile(re.escape(incorrect), re.IGNORECASE).sub(correct, text)
+    return text
+
+
+def legacy_highlight(text):
+    for finding in VoiceRecognitionProcessor.CRITICAL_FINDINGS:
+        text = re.compile(f'\\b{re.escape(finding)}\\b', re.IGNORECASE).sub(f'**{finding.upper()}**', text)
+    return text
+
+
+def legacy_template(text, template_key):
+    for section in VoiceRecognitionProcessor.REPORT_TEMPLATES[template_key]['sections']:
+        section_name = section.replace(':', '').strip()
+        text = re.compile(f'\\b{re.escape(section_name)}\\b', re.IGNORECASE).sub(f'\n\n{section}\n', text)
+    return text
+
+
+def legacy_findings(text):
+    return [finding for finding in VoiceRecognitionProcessor.CRITICAL_FINDINGS
+            if re.search(f'\\b{finding}\\b', text, re.IGNORECASE)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark radiology dictation terminology correction on long reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=5000, help='Approximate report length in words')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed runs per implementation')
+        parser.add_argument('--template', default='ct', help='Report template to apply')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def _time(self, func, report, iterations):
+        func(report)  # warm up compiled patterns
+        started = time.perf_counter()
+        for _ in range(iterations):
+            result = func(report)
+        return (time.perf_counter() - started) * 1000 / iterations, result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        template = options['template']
+        sentences = []
+        words = 0
+        while words < options['words']:
+            sentence = rng.choice(DICTATION_SENTENCES)
+            sentences.append(sentence)
+            words += len(sentence.split())
+        report = '. '.join(sentences) + '.'
+
+        processor = VoiceRecognitionProcessor
+
+        def legacy(text):
+            text = legacy_template(legacy_correct(text), template)
+            text = legacy_highlight(text)
+            return text, legacy_findings(text)
+
+        def engine(text):
+            text = processor.format_with_template(processor.correct_medical_terms(text), template)
+            text = processor.highlight_critical_findings(text)
+            return text, processor.validate_clinical_content(text)['critical_findings']
+
+        iterations = options['iterations']
+        legacy_ms, legacy_result = self._time(legacy, report, iterations)
+        engine_ms, engine_result = self._time(engine, report, iterations)
+        _, spans = processor.correct_medical_terms_with_spans(report)
+
+        self.stdout.write(f"Report: {words} words, {len(report)} characters, template '{template}'")
+        self.stdout.write(f"Terminology corrections: {len(spans)}")
+        self.stdout.write(f"Per-rule regexes: {legacy_ms:8.2f} ms/report")
+        self.stdout.write(f"Single-pass engine: {engine_ms:8.2f} ms/report ({legacy_ms / engine_ms:.1f}x)")
+        if legacy_result == engine_result:
+            self.stdout.write(self.style.SUCCESS('Outputs identical'))
+        else:
+            self.stdout.write(self.style.WARNING('Outputs differ between implementations'))
@@ -0,0 +1,274 @@
+"""
+Incremental dictation sessions for radiology voice reports.
+
+The client sends each recognised utterance as a segment instead of resending
+the whole transcript. A session keeps the enhanced text of completed sentences
+("committed") and the raw text of the sentence still being dictated ("tail").
+Each segment only runs the enhancement pipeline (terminology correction, smart
+punctuation, template structuring, critical finding highlighting) over the
+tail: sentences that become complete are committed once and never processed
+again, so the cost of a segment does not grow with the length of the report.
+
+Every update returns a splice against the previously returned enhanced text
+(``offset``, ``delete``, ``insert``) plus the critical findings that were not
+reported before.
+
+Segments are numbered 1, 2, 3, ... per session. One that arrives ahead of a
+missing predecessor waits in the session until the gap is filled, and only a
+number that was seen before is dropped as a retry. Updates of a session are
+serialised with a lock in the cache (``cache.add``), so concurrent posts to
+the same session cannot overwrite each other.
+"""
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# A sentence is complete once it ends with terminal punctuation or a line break
+SENTENCE_END_RE = re.compile(r'[.!?](?=\s)|\n')
+
+
+def split_completed(raw_text):
+    """Split raw dictation into (completed sentences, incomplete tail)."""
+    last_end = None
+    for last_end in SENTENCE_END_RE.finditer(raw_text):
+        pass
+    if last_end is None:
+        return '', raw_text
+    return raw_text[:last_end.end()], raw_text[last_end.end():]
+
+
+def join_text(head, tail):
+    if not head:
+        return tail
+    if not tail:
+        return head
+    return f"{head} {tail}"
+
+
+def common_prefix_length(first, second):
+    limit = min(len(first), len(second))
+    index = 0
+    while index < limit and first[index] == second[index]:
+        index += 1
+    return index
+
+
+class DictationSessionNotFound(Exception):
+    pass
+
+
+class DictationSessionBusy(Exception):
+    pass
+
+
+class DictationSessionService:
+    def __init__(self, processor=None):
+        self._processor = processor
+        self.cache_alias = getattr(settings, 'RADIOLOGY_DICTATION_CACHE_ALIAS', 'default')
+        self.ttl = getattr(settings, 'RADIOLOGY_DICTATION_SESSION_TTL_SECONDS', 3600)
+        self.lock_ttl = getattr(settings, 'RADIOLOGY_DICTATION_LOCK_TTL_SECONDS', 30)
+        self.lock_wait = getattr(settings, 'RADIOLOGY_DICTATION_LOCK_WAIT_SECONDS', 10)
+
+    @property
+    def processor(self):
+        if self._processor is None:
+            from ..voice_recognition_views import VoiceRecognitionProcessor
+            self._processor = VoiceRecognitionProcessor
+        return self._processor
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, session_id):
+        return f"radiology:dictation:{session_id}"
+
+    def _save(self, session):
+        self.cache.set(self._key(session['id']), session, self.ttl)
+
+    def get_session(self, session_id):
+        session = self.cache.get(self._key(session_id))
+        if session is not None:
+            # Sessions stored before segments were buffered have no 'pending'
+            session.setdefault('pending', {})
+        return session
+
+    def delete_session(self, session_id):
+        self.cache.delete(self._key(session_id))
+
+    def _load(self, session_id):
+        session = self.get_session(session_id)
+        if session is None:
+            raise DictationSessionNotFound(f"Dictation session {session_id} not found or expired")
+        return session
+
+    @contextmanager
+    def _locked(self, session_id):
+        """Hold the update lock of a session, across threads and processes."""
+        key = f"{self._key(session_id)}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(key, token, self.lock_ttl):
+            if time.monotonic() >= deadline:
+                raise DictationSessionBusy(f"Dictation session {session_id} is busy")
+            time.sleep(0.02)
+        try:
+            yield
+        finally:
+            # The lock may have expired and been taken by another update
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    # ----- pipeline -----
+
+    def enhance(self, text, session):
+        """Run the enabled enhancements over a piece of dictation."""
+        processor = self.processor
+        enhancements = session['enhancements']
+        if not text.strip():
+            return '', []
+        corrections = []
+        if enhancements.get('medical_term_correction', True):
+            text, corrections = processor.correct_medical_terms_with_spans(text)
+        if enhancements.get('smart_punctuation', True):
+            text = processor.add_smart_punctuation(text)
+        if enhancements.get('template_structuring', True):
+            text = processor.format_with_template(text, session['template'])
+        if enhancements.get('clinical_validation', True):
+            text = processor.highlight_critical_findings(text)
+        return text, corrections
+
+    def enhanced_text(self, session):
+        return join_text(session['committed'], session['tail_enhanced'])
+
+    # ----- session lifecycle -----
+
+    def start(self, user_id=None, template='general', enhancements=None):
+        session = {
+            'id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'template': template,
+            'enhancements': enhancements or {},
+            'committed': '',
+            'raw_tail': '',
+            'tail_enhanced': '',
+            'reported_findings': [],
+            'corrections': 0,
+            'sequence': 0,
+            'pending': {},
+            'started_at': timezone.now().isoformat(),
+        }
+        self._save(session)
+        return session
+
+    def append(self, session_id, segment, sequence=None):
+        """
+        Add a transcript segment and return the update for the client. A
+        segment without a ``sequence`` follows the highest number seen; one
+        ahead of a missing number is buffered, and one whose number was seen
+        before is a retry and is not applied twice.
+        """
+        with self._locked(session_id):
+            session = self._load(session_id)
+            previous = self.enhanced_text(session)
+            stable = len(session['committed'])
+            pending = session['pending']
+            if sequence is None:
+                sequence = max([session['sequence'], *pending]) + 1
+            if sequence <= session['sequence'] or sequence in pending:
+                return self._update(session, previous, [], [])
+
+            pending[sequence] = segment
+            corrections = []
+            while session['sequence'] + 1 in pending:
+                session['sequence'] += 1
+                corrections += self._apply(session, pending.pop(session['sequence']))
+            if session['sequence'] < sequence:
+                # Waiting for an earlier segment; nothing to show yet
+                self._save(session)
+                return self._update(session, previous, [], [])
+            session['tail_enhanced'], _ = self.enhance(session['raw_tail'], session)
+
+            # Committed text never changes, so only the region after it is compared
+            # and searched for findings
+            current = self.enhanced_text(session)
+            offset = stable + common_prefix_length(previous[stable:], current[stable:])
+            changed = current[max(0, offset - 64):]
+            new_findings = []
+            for finding in self.processor.validate_clinical_content(changed)['critical_findings']:
+                if finding not in session['reported_findings']:
+                    session['reported_findings'].append(finding)
+                    new_findings.append(finding)
+
+            self._save(session)
+            return self._update(session, previous, corrections, new_findings, current=current, offset=offset)
+
+    def _apply(self, session, segment):
+        """Add one segment's raw text, committing the sentences it completes."""
+        raw = join_text(session['raw_tail'], segment.strip()) if segment.strip() else session['raw_tail']
+        completed, tail = split_completed(raw)
+        corrections = []
+        if completed.strip():
+            committed_text, committed_corrections = self.enhance(completed, session)
+            session['committed'] = join_text(session['committed'], committed_text)
+            session['corrections'] += len(committed_corrections)
+            # Only corrections in committed sentences are final; the tail is redone next time
+            corrections = [{
+                'original': correction['original'],
+                'replacement': correction['replacement'],
+                'category': correction['category'],
+            } for correction in committed_corrections]
+        session['raw_tail'] = tail.lstrip()
+        return corrections
+
+    def _update(self, session, previous, corrections, new_findings, current=None, offset=None):
+        if current is None:
+            current = previous
+            offset = len(previous)
+        return {
+            'session_id': session['id'],
+            'sequence': session['sequence'],
+            'diff': {
+                'offset': offset,
+                'delete': len(previous) - offset,
+                'insert': current[offset:],
+            },
+            'length': len(current),
+            'committed_length': len(session['committed']),
+            'new_critical_findings': new_findings,
+            'term_corrections': corrections,
+            'pending_sequences': sorted(session['pending']),
+        }
+
+    def finish(self, session_id):
+        """
+        Final enhanced text and validation of a session. Segments still waiting
+        for a missing one are applied in order. The session is kept: the caller
+        deletes it once the report has been stored.
+        """
+        with self._locked(session_id):
+            session = self._load(session_id)
+            pending = session['pending']
+            if pending:
+                logger.warning(
+                    f"Dictation session {session_id} finished with segments "
+                    f"{sorted(pending)} missing a predecessor after {session['sequence']}"
+                )
+                for sequence in sorted(pending):
+                    self._apply(session, pending.pop(sequence))
+                    session['sequence'] = sequence
+                session['tail_enhanced'], _ = self.enhance(session['raw_tail'], session)
+                self._save(session)
+            text = self.enhanced_text(session)
+        return text, self.processor.validate_clinical_content(text)
+
+
+dictation_sessions = DictationSessionService()
@@ -0,0 +1,263 @@
+"""
+Single-pass terminology correction for radiology dictation.
+
+A rule set compiles all of its phrases into one regular expression shaped like
+a trie (shared prefixes are factored out, longer phrases win), so a report is
+scanned once no matter how many rules there are. Each match is resolved to its
+rule through a case-insensitive lookup table, and every replacement is reported
+with its span in both the original and the corrected text for the audit trail.
+
+Built-in rule sets are registered by the modules that own them. Sites can add
+or override phrases with a JSON file (``RADIOLOGY_TERMINOLOGY_RULES_FILE``)
+which is reloaded automatically when it changes::
+
+    {
+        "medical_corrections": {"plural fusion": "pleural effusion"},
+        "critical_findings": ["tension pneumothorax"]
+    }
+
+A set's entry may be a ``{phrase: replacement}`` mapping, a list of phrases
+(replacement = phrase) or a list of ``{"pattern", "replacement", "category"}``
+rule dicts.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TermRule = namedtuple('TermRule', ['phrase', 'replacement', 'category'])
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _trie_pattern(phrases):
+    """Regex source matching any of ``phrases``, preferring the longest match."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if terminal:
+            # Greedy optional: try the longer phrase first, fall back to the shorter one
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+def normalize_rules(entries, category='terminology'):
+    """Accept the mapping / phrase list / rule dict forms and return TermRules."""
+    if isinstance(entries, dict):
+        return [TermRule(phrase, replacement, category) for phrase, replacement in entries.items()]
+    rules = []
+    for entry in entries or []:
+        if isinstance(entry, str):
+            rules.append(TermRule(entry, entry, category))
+        elif isinstance(entry, TermRule):
+            rules.append(entry)
+        else:
+            rules.append(TermRule(entry['pattern'], entry.get('replacement', entry['pattern']),
+                                  entry.get('category', category)))
+    return rules
+
+
+class TerminologyRuleSet:
+    """An immutable, compiled set of phrase rules."""
+
+    def __init__(self, rules, word_boundaries=False, version=0):
+        self.word_boundaries = word_boundaries
+        self.version = version
+        # Later rules override earlier ones for the same phrase (custom over built-in)
+        self.lookup = {}
+        for rule in rules:
+            if rule.phrase:
+                self.lookup[rule.phrase.lower()] = rule
+        self.rules = list(self.lookup.values())
+
+        if self.rules:
+            source = _trie_pattern(self.lookup.keys())
+            # Matching runs on lower-cased text without IGNORECASE and without a
+            # leading \b so the regex engine can skip ahead on the first character;
+            # the left word boundary is checked on each candidate instead.
+            suffix = r'(?!\w)' if word_boundaries else ''
+            self.pattern = re.compile(source + suffix)
+            self.fallback_pattern = re.compile(
+                rf"\b(?:{source})\b" if word_boundaries else source, re.IGNORECASE
+            )
+        else:
+            self.pattern = None
+
+    def finditer(self, text):
+        """Yield ``(start, end, rule)`` for every non-overlapping match, left to right."""
+        if self.pattern is None or not text:
+            return
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Lower-casing changed offsets (rare non-ASCII input)
+            for match in self.fallback_pattern.finditer(text):
+                yield match.start(), match.end(), self.lookup[match.group().lower()]
+            return
+
+        search = self.pattern.search
+        position = 0
+        while True:
+            match = search(lowered, position)
+            if match is None:
+                return
+            start, end = match.span()
+            if self.word_boundaries and start and _WORD_CHAR.match(lowered, start - 1):
+                # Inside a word; a shorter phrase may still start further on
+                position = start + 1
+                continue
+            yield start, end, self.lookup[match.group()]
+            position = end if end > start else end + 1
+
+    def find(self, text):
+        """Distinct rules matched in ``text``, in rule order."""
+        found = {rule.phrase for _, _, rule in self.finditer(text)}
+        return [rule for rule in self.rules if rule.phrase in found]
+
+    def apply(self, text, replacement=None):
+        """
+        Replace every match in one pass. ``replacement`` optionally maps a rule
+        to its output text (defaults to the rule's replacement). Returns the new
+        text and a list of spans for the matches that changed the text.
+        """
+        pieces = []
+        spans = []
+        last = 0
+        shift = 0
+        for start, end, rule in self.finditer(text):
+            original = text[start:end]
+            output = replacement(rule) if replacement else rule.replacement
+            pieces.append(text[last:start])
+            pieces.append(output)
+            last = end
+            if output != original:
+                spans.append({
+                    'start': start,
+                    'end': end,
+                    'corrected_start': start + shift,
+                    'corrected_end': start + shift + len(output),
+                    'original': original,
+                    'replacement': output,
+                    'category': rule.category,
+                })
+            shift += len(output) - len(original)
+        if not pieces:
+            return text, spans
+        pieces.append(text[last:])
+        return ''.join(pieces), spans
+
+
+class TerminologyEngine:
+    """Registry of named rule sets with hot reload of site-specific custom rules."""
+
+    reload_check_interval = 5
+
+    def __init__(self, rules_file=None):
+        self.rules_file = rules_file
+        self.version = 0
+        self._builtin = {}
+        self._custom = {}
+        self._compiled = {}
+        self._custom_mtime = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def _rules_file(self):
+        if self.rules_file is None:
+            self.rules_file = getattr(settings, 'RADIOLOGY_TERMINOLOGY_RULES_FILE', '') or ''
+        return self.rules_file
+
+    def register(self, name, rules, word_boundaries=False, category='terminology'):
+        """Register (or replace) a built-in rule set."""
+        with self._lock:
+            self._builtin[name] = (normalize_rules(rules, category), word_boundaries, category)
+            self._compiled.pop(name, None)
+
+    def get(self, name):
+        """Compiled rule set for ``name``; picks up custom rule file changes."""
+        self._maybe_reload()
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(name)
+                if compiled is None:
+                    rules, word_boundaries, category = self._builtin[name]
+                    custom = normalize_rules(self._custom.get(name, []), category)
+                    compiled = TerminologyRuleSet(rules + custom, word_boundaries, self.version)
+                    self._compiled[name] = compiled
+        return compiled
+
+    def compile(self, rules, word_boundaries=False):
+        """Compile an ad-hoc (e.g. config supplied) rule set, cached by content."""
+        rules = normalize_rules(rules)
+        key = ('adhoc', word_boundaries, tuple(rules))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = TerminologyRuleSet(rules, word_boundaries, self.version)
+            self._compiled[key] = compiled
+        return compiled
+
+    def load_custom_rules(self, custom):
+        """Install a custom rule mapping (``{set name: entries}``) and recompile."""
+        with self._lock:
+            self._custom = custom or {}
+            self._compiled = {}
+            self.version += 1
+        logger.info(f"Loaded custom terminology rules (version {self.version}): "
+                    f"{', '.join(sorted(self._custom)) or 'none'}")
+
+    def reload(self, force=False):
+        """Re-read the custom rules file if it changed (or unconditionally with ``force``)."""
+        path = self._rules_file()
+        if not path:
+            return False
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            if self._custom_mtime is not None:
+                logger.warning(f"Terminology rules file {path} disappeared; using built-in rules")
+                self._custom_mtime = None
+                self.load_custom_rules({})
+                return True
+            return False
+        if not force and mtime == self._custom_mtime:
+            return False
+        try:
+            with open(path, encoding='utf-8') as rules_file:
+                custom = json.load(rules_file)
+        except (OSError, ValueError) as e:
+            # Keep serving the last good rules
+            logger.error(f"Could not load terminology rules from {path}: {e}")
+            self._custom_mtime = mtime
+            return False
+        self._custom_mtime = mtime
+        self.load_custom_rules(custom)
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_check_interval
+        self.reload()
+
+
+terminology_engine = TerminologyEngine()
@@ -20,6 +20,9 @@ import logging
 from typing import Dict, List, Tuple
 from datetime import datetime
 
+from .services.dictation_session import DictationSessionBusy, DictationSessionNotFound, dictation_sessions
+from .services.terminology_engine import terminology_engine
+
 logger = logging.getLogger(__name__)
 
 class VoiceRecognitionProcessor:
@@ -113,19 +116,23 @@ class VoiceRecognitionProcessor:
         }
     }
 
+    # Sections every report is expected to contain
+    REQUIRED_SECTIONS = ['findings', 'impression']
+
     @classmethod
     def correct_medical_terms(cls, text: str) -> str:
         """
         Correct common speech recognition errors in medical terminology
         """
-        corrected_text = text
-        
-        for incorrect, correct in cls.MEDICAL_CORRECTIONS.items():
-            # Case-insensitive replacement
-            pattern = re.compile(re.escape(incorrect), re.IGNORECASE)
-            corrected_text = pattern.sub(correct, corrected_text)
-        
-        return corrected_text
+        return cls.correct_medical_terms_with_spans(text)[0]
+
+    @classmethod
+    def correct_medical_terms_with_spans(cls, text: str) -> Tuple[str, List[Dict]]:
+        """
+        Correct terminology in a single pass, returning the corrected text and
+        the span of every correction for the audit trail
+        """
+        return terminology_engine.get('medical_corrections').apply(text)
 
     @classmethod
     def add_smart_punctuation(cls, text: str) -> str:
@@ -149,13 +156,8 @@ class VoiceRecognitionProcessor:
         """
         Highlight critical findings in the report
         """
-        highlighted_text = text
-        
-        for finding in cls.CRITICAL_FINDINGS:
-            pattern = re.compile(f'\\b{re.escape(finding)}\\b', re.IGNORECASE)
-            highlighted_text = pattern.sub(f'**{finding.upper()}**', highlighted_text)
-        
-        return highlighted_text
+        rule_set = terminology_engine.get('critical_findings')
+        return rule_set.apply(text, replacement=lambda rule: f'**{rule.phrase.upper()}**')[0]
 
     @classmethod
     def format_with_template(cls, text: str, template_key: str) -> str:
@@ -165,18 +167,8 @@ class VoiceRecognitionProcessor:
         if template_key not in cls.REPORT_TEMPLATES:
             return text
         
-        template = cls.REPORT_TEMPLATES[template_key]
-        sections = template['sections']
-        
-        formatted_text = text
-        
         # Add template structure
-        for section in sections:
-            section_name = section.replace(':', '').strip()
-            pattern = re.compile(f'\\b{re.escape(section_name)}\\b', re.IGNORECASE)
-            formatted_text = pattern.sub(f'\n\n{section}\n', formatted_text)
-        
-        return formatted_text
+        return terminology_engine.get(f'template:{template_key}').apply(text)[0]
 
     @classmethod
     def validate_clinical_content(cls, text: str) -> Dict:
@@ -191,15 +183,15 @@ class VoiceRecognitionProcessor:
         }
         
         # Check for critical findings
-        for finding in cls.CRITICAL_FINDINGS:
-            if re.search(f'\\b{finding}\\b', text, re.IGNORECASE):
-                validation_results['critical_findings'].append(finding)
+        validation_results['critical_findings'] = [
+            rule.phrase for rule in terminology_engine.get('critical_findings').find(text)
+        ]
         
         # Check for standard sections
-        required_sections = ['findings', 'impression']
-        for section in required_sections:
-            if not re.search(f'\\b{section}\\b', text, re.IGNORECASE):
-                validation_results['missing_sections'].append(section)
+        present_sections = {rule.phrase for rule in terminology_engine.get('required_sections').find(text)}
+        validation_results['missing_sections'] = [
+            section for section in cls.REQUIRED_SECTIONS if section not in present_sections
+        ]
         
         # Generate suggestions
         if validation_results['critical_findings']:
@@ -216,6 +208,21 @@ class VoiceRecognitionProcessor:
         return validation_results
 
 
+# Compile the processor's rule lists once; custom site rules are merged in by the engine
+terminology_engine.register('medical_corrections', VoiceRecognitionProcessor.MEDICAL_CORRECTIONS)
+terminology_engine.register('critical_findings', VoiceRecognitionProcessor.CRITICAL_FINDINGS,
+                            word_boundaries=True, category='critical_finding')
+terminology_engine.register('required_sections', VoiceRecognitionProcessor.REQUIRED_SECTIONS,
+                            word_boundaries=True, category='section')
+for _template_key, _template in VoiceRecognitionProcessor.REPORT_TEMPLATES.items():
+    terminology_engine.register(
+        f'template:{_template_key}',
+        {section.replace(':', '').strip(): f'\n\n{section}\n' for section in _template['sections']},
+        word_boundaries=True,
+        category='section',
+    )
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class VoiceRecognitionAPI(View):
     """
@@ -237,10 +244,11 @@ class VoiceRecognitionAPI(View):
             
             processor = VoiceRecognitionProcessor()
             enhanced_text = text
+            term_corrections = []
             
             # Apply enhancements based on user settings
             if enhancements.get('medical_term_correction', True):
-                enhanced_text = processor.correct_medical_terms(enhanced_text)
+                enhanced_text, term_corrections = processor.correct_medical_terms_with_spans(enhanced_text)
             
             if enhancements.get('smart_punctuation', True):
                 enhanced_text = processor.add_smart_punctuation(enhanced_text)
@@ -260,6 +268,7 @@ class VoiceRecognitionAPI(View):
                 'enhanced_text': enhanced_text,
                 'template_used': template,
                 'validation': validation,
+                'term_corrections': term_corrections,
                 'timestamp': datetime.now().isoformat(),
                 'enhancements_applied': enhancements
             }
@@ -282,6 +291,144 @@ class VoiceRecognitionAPI(View):
             }, status=500)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class DictationSessionAPI(View):
+    """
+    Incremental dictation: start a session, then send each utterance as a segment.
+    Only the sentence still being dictated is reprocessed; responses carry a diff
+    of the enhanced text and newly detected critical findings.
+    """
+    
+    def _get_session(self, request, session_id):
+        session = dictation_sessions.get_session(session_id)
+        if session is None:
+            return None, JsonResponse({
+                'error': 'Dictation session not found or expired',
+                'status': 'error'
+            }, status=404)
+        user_id = request.user.id if request.user.is_authenticated else None
+        if session['user_id'] != user_id:
+            return None, JsonResponse({
+                'error': 'Dictation session not found or expired',
+                'status': 'error'
+            }, status=404)
+        return session, None
+    
+    def get(self, request, session_id=None, action=None):
+        """Current enhanced text of a session (e.g. after a client reconnect)"""
+        if session_id is None:
+            return JsonResponse({
+                'error': 'Session id is required',
+                'status': 'error'
+            }, status=400)
+        session, error = self._get_session(request, session_id)
+        if error:
+            return error
+        return JsonResponse({
+            'status': 'success',
+            'session_id': session['id'],
+            'sequence': session['sequence'],
+            'template': session['template'],
+            'enhanced_text': dictation_sessions.enhanced_text(session),
+            'critical_findings': session['reported_findings'],
+            'pending_sequences': sorted(session['pending']),
+        })
+    
+    def post(self, request, session_id=None, action=None):
+        try:
+            data = json.loads(request.body or b'{}')
+            
+            if session_id is None:
+                template = data.get('template', 'general')
+                if template not in VoiceRecognitionProcessor.REPORT_TEMPLATES:
+                    return JsonResponse({
+                        'error': 'Invalid template key',
+                        'status': 'error'
+                    }, status=400)
+                session = dictation_sessions.start(
+                    user_id=request.user.id if request.user.is_authenticated else None,
+                    template=template,
+                    enhancements=data.get('enhancements', {}),
+                )
+                return JsonResponse({
+                    'status': 'success',
+                    'session_id': session['id'],
+                    'template': session['template'],
+                    'expires_in': dictation_sessions.ttl
+                }, status=201)
+            
+            session, error = self._get_session(request, session_id)
+            if error:
+                return error
+            
+            sequence = data.get('sequence')
+            if sequence is not None and (not isinstance(sequence, int) or isinstance(sequence, bool) or sequence < 1):
+                return JsonResponse({
+                    'error': 'Segment sequence must be a positive integer',
+                    'status': 'error'
+                }, status=400)
+            segment = data.get('text', '')
+            if not isinstance(segment, str):
+                return JsonResponse({
+                    'error': 'Segment text must be a string',
+                    'status': 'error'
+                }, status=400)
+            
+            if action == 'finish':
+                if segment:
+                    # Flush any final segment before closing
+                    dictation_sessions.append(session_id, segment, sequence)
+                content, validation = dictation_sessions.finish(session_id)
+                if not content:
+                    return JsonResponse({
+                        'error': 'Report content is required',
+                        'status': 'error'
+                    }, status=400)
+                report_data = persist_voice_report(
+                    content,
+                    session['template'],
+                    data.get('confidence', validation['confidence_score']),
+                    method='voice_dictation_session'
+                )
+                # Only discarded once the report is stored, so a failed finish can be retried
+                dictation_sessions.delete_session(session_id)
+                return JsonResponse({
+                    'status': 'success',
+                    'message': 'Report saved successfully',
+                    'report': report_data,
+                    'validation': validation
+                })
+            
+            update = dictation_sessions.append(session_id, segment, sequence)
+            update['status'] = 'success'
+            return JsonResponse(update)
+            
+        except DictationSessionNotFound:
+            return JsonResponse({
+                'error': 'Dictation session not found or expired',
+                'status': 'error'
+            }, status=404)
+            
+        except DictationSessionBusy:
+            return JsonResponse({
+                'error': 'Dictation session is busy, retry the segment',
+                'status': 'error'
+            }, status=409)
+            
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'error': 'Invalid JSON data',
+                'status': 'error'
+            }, status=400)
+            
+        except Exception as e:
+            logger.error(f"Dictation session error: {str(e)}")
+            return JsonResponse({
+                'error': f'Processing failed: {str(e)}',
+                'status': 'error'
+            }, status=500)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ReportTemplateAPI(View):
     """
@@ -343,6 +490,26 @@ class ReportTemplateAPI(View):
             }, status=500)
 
 
+def persist_voice_report(report_content, template_used, confidence_score, method='voice_recognition'):
+    """
+    Save a voice-generated report. Shared by save_voice_report and dictation sessions.
+    """
+    # Here you would typically save to your Report model
+    # For now, we'll return the saved report data
+    
+    report_data = {
+        'id': f"voice_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        'content': report_content,
+        'template': template_used,
+        'confidence': confidence_score,
+        'created_at': datetime.now().isoformat(),
+        'method': method
+    }
+    
+    logger.info(f"Voice report saved with ID: {report_data['id']}")
+    return report_data
+
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def save_voice_report(request):
@@ -361,19 +528,7 @@ def save_voice_report(request):
                 'status': 'error'
             }, status=400)
         
-        # Here you would typically save to your Report model
-        # For now, we'll return a success response
-        
-        report_data = {
-            'id': f"voice_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'content': report_content,
-            'template': template_used,
-            'confidence': confidence_score,
-            'created_at': datetime.now().isoformat(),
-            'method': 'voice_recognition'
-        }
-        
-        logger.info(f"Voice report saved with ID: {report_data['id']}")
+        report_data = persist_voice_report(report_content, template_used, confidence_score)
         
         return JsonResponse({
             'status': 'success',
@@ -16,6 +16,21 @@ urlpatterns = [
          voice_recognition_views.VoiceRecognitionAPI.as_view(), 
          name='voice_process'),
     
+    # Incremental dictation sessions
+    path('api/voice/sessions/', 
+         voice_recognition_views.DictationSessionAPI.as_view(), 
+         name='dictation_session_start'),
+    path('api/voice/sessions/<str:session_id>/', 
+         voice_recognition_views.DictationSessionAPI.as_view(), 
+         name='dictation_session'),
+    path('api/voice/sessions/<str:session_id>/segments/', 
+         voice_recognition_views.DictationSessionAPI.as_view(), 
+         name='dictation_session_segment'),
+    path('api/voice/sessions/<str:session_id>/finish/', 
+         voice_recognition_views.DictationSessionAPI.as_view(), 
+         {'action': 'finish'},
+         name='dictation_session_finish'),
+    
     # Report Templates
     path('api/voice/templates/', 
          voice_recognition_views.ReportTemplateAPI.as_view(), 
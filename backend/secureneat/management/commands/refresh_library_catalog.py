@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+import logging
+
+from secureneat.services.library_catalog import library_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Crawl the S3 medical library and refresh the searchable book catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-text',
+            action='store_true',
+            help='Only refresh metadata; do not extract book text for the content index',
+        )
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help='Keep catalog rows whose S3 objects no longer exist',
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep crawling at a fixed interval',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between crawls in continuous mode',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.time()
+            try:
+                stats = library_catalog.refresh(
+                    extract_text=not options['skip_text'],
+                    prune=not options['no_prune'],
+                )
+            except Exception as e:
+                if not options['continuous']:
+                    raise CommandError(f'Catalog refresh failed: {e}')
+                logger.error(f"Catalog refresh failed: {e}")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Catalog refreshed in {time.time() - started:.1f}s: "
+                    f"{stats['created']} new, {stats['updated']} changed, "
+                    f"{stats['reindexed']} reindexed, {stats['removed']} removed"
+                ))
+
+            if not options['continuous']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secureneat', '0003_patientfolder_alter_mcqgenerationhistory_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='etag',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='extracted_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='last_indexed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='s3_last_modified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='s3librarybook',
+            name='text_etag',
+            field=models.CharField(blank=True, default='', help_text='ETag the extracted text was built from', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='s3librarybook',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='library_book_search_gin'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import RegexValidator
@@ -62,12 +64,21 @@ class S3LibraryBook(models.Model):
     mcq_generation_count = models.IntegerField(default=0)
     last_mcq_generated = models.DateTimeField(null=True, blank=True)
     
+    # Catalog / full-text search (maintained by services.library_catalog)
+    etag = models.CharField(max_length=100, blank=True, default='')
+    s3_last_modified = models.DateTimeField(null=True, blank=True)
+    extracted_text = models.TextField(blank=True, default='')
+    text_etag = models.CharField(max_length=100, blank=True, default='', help_text="ETag the extracted text was built from")
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    last_indexed = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-date_added']
         indexes = [
             models.Index(fields=['category', 'subcategory']),
             models.Index(fields=['tags']),
             models.Index(fields=['-last_accessed']),
+            GinIndex(fields=['search_vector'], name='library_book_search_gin'),
         ]
     
     def __str__(self):
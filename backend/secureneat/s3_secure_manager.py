@@ -290,8 +290,8 @@ class SecureS3Manager:
 
     def upload_patient_file(self, user: User, patient_id: str, file_data: bytes,
                           filename: str, file_type: str, module: str,
-                          metadata: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Upload file to patient's folder with encryption"""
+                          metadata: Dict[str, Any] = None, checksum: str = None) -> Dict[str, Any]:
+        """Upload file to patient's folder with encryption; ``checksum`` is the SHA-256 if already known"""
         try:
             # Verify permissions
             if not self._check_patient_access(user, patient_id, module, 'write'):
@@ -322,7 +322,7 @@ class SecureS3Manager:
                 'module': module,
                 'file_type': file_type,
                 'upload_time': datetime.now().isoformat(),
-                'checksum': hashlib.sha256(file_data).hexdigest(),
+                'checksum': checksum or hashlib.sha256(file_data).hexdigest(),
                 'encrypted': 'true',
                 'access_level': 'hipaa_protected'
             }
@@ -0,0 +1,360 @@
+"""
+Chat session storage for the Dr. Max chatbot server.
+
+Rooms keep a capped window of compact message records and are evicted once
+idle (LRU + TTL). Three backends are available:
+
+- ``memory``: per-process store, the default for local development
+- ``sqlite``: a local stand-in for a shared backend; several chatbot processes
+  on one host share the same file and history survives restarts
+- ``redis``: shared store for multi-host deployments behind a load balancer
+
+Every backend exposes room-level pub/sub so that a message appended by one
+chatbot process is delivered to clients connected to another process.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Compact on-the-wire/at-rest layout of a message: [id, sender, content, timestamp]
+_ID, _SENDER, _CONTENT, _TIMESTAMP = range(4)
+
+
+def pack_message(message_id: str, sender: str, content: str, timestamp: float) -> str:
+    """Serialize a message into its compact record form."""
+    return json.dumps([message_id, sender, content, round(timestamp, 3)],
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+def unpack_message(record: str) -> Dict:
+    """Expand a compact record into the dict shape the frontend expects."""
+    fields = json.loads(record)
+    return {
+        "id": fields[_ID],
+        "sender": fields[_SENDER],
+        "content": fields[_CONTENT],
+        "timestamp": fields[_TIMESTAMP],
+    }
+
+
+class ChatSessionStore:
+    """
+    Interface shared by all chat session backends.
+
+    ``append_message`` assigns a per-room sequence number so message ids stay
+    unique even after older messages have been trimmed from the room.
+    """
+
+    def __init__(self, max_messages_per_room=200, max_rooms=1000, room_ttl_seconds=86400):
+        self.max_messages_per_room = max_messages_per_room
+        self.max_rooms = max_rooms
+        self.room_ttl_seconds = room_ttl_seconds
+        self.node_id = uuid.uuid4().hex[:12]
+
+    async def get_history(self, room_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+    async def append_message(self, room_id: str, sender: str, content: str,
+                             origin: Optional[str] = None, message_id: Optional[str] = None) -> Dict:
+        raise NotImplementedError
+
+    async def clear_room(self, room_id: str) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, room_id: str) -> AsyncIterator[Dict]:
+        """
+        Yield events published to ``room_id``; each event is a dict with
+        ``origin`` (the publishing client id, if any) and ``message``.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        return None
+
+
+class InMemoryChatSessionStore(ChatSessionStore):
+    """Per-process store with bounded rooms and in-process pub/sub."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # room_id -> (deque of packed records, next sequence number)
+        self._rooms: "OrderedDict[str, list]" = OrderedDict()
+        self._last_active: Dict[str, float] = {}
+        self._subscribers: Dict[str, set] = {}
+
+    def _touch(self, room_id):
+        now = time.monotonic()
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = [deque(maxlen=self.max_messages_per_room), 0]
+            self._rooms[room_id] = room
+        self._rooms.move_to_end(room_id)
+        self._last_active[room_id] = now
+        self._evict(now)
+        return room
+
+    def _evict(self, now):
+        # Oldest rooms sit at the front of the OrderedDict
+        while self._rooms:
+            oldest = next(iter(self._rooms))
+            idle = now - self._last_active.get(oldest, now)
+            if len(self._rooms) <= self.max_rooms and idle <= self.room_ttl_seconds:
+                break
+            self._rooms.pop(oldest)
+            self._last_active.pop(oldest, None)
+            logger.debug(f"Evicted idle chat room {oldest}")
+
+    async def get_history(self, room_id):
+        if room_id not in self._rooms:
+            return []
+        room = self._touch(room_id)
+        return [unpack_message(record) for record in room[0]]
+
+    async def append_message(self, room_id, sender, content, origin=None, message_id=None):
+        room = self._touch(room_id)
+        message_id = message_id or f"{sender}_{room[1]}"
+        room[1] += 1
+        record = pack_message(message_id, sender, content, time.time())
+        room[0].append(record)
+        message = unpack_message(record)
+        for queue in self._subscribers.get(room_id, ()):
+            queue.put_nowait({"origin": origin, "message": message})
+        return message
+
+    async def clear_room(self, room_id):
+        self._rooms.pop(room_id, None)
+        self._last_active.pop(room_id, None)
+
+    async def subscribe(self, room_id):
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(room_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(room_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[room_id]
+
+
+class SQLiteChatSessionStore(ChatSessionStore):
+    """
+    Local stand-in for a shared backend. All processes pointing at the same
+    database file share rooms; subscribers poll for rows newer than the last
+    sequence they delivered.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_room (
+                room_id TEXT PRIMARY KEY,
+                next_seq INTEGER NOT NULL DEFAULT 0,
+                last_active REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chat_message (
+                room_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                origin TEXT,
+                record TEXT NOT NULL,
+                PRIMARY KEY (room_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS chat_room_last_active ON chat_room (last_active);
+        """)
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _get_history_sync(self, room_id):
+        rows = self._conn.execute(
+            "SELECT record FROM chat_message WHERE room_id = ? ORDER BY seq DESC LIMIT ?",
+            (room_id, self.max_messages_per_room),
+        ).fetchall()
+        if rows:
+            self._conn.execute("UPDATE chat_room SET last_active = ? WHERE room_id = ?",
+                               (time.time(), room_id))
+        return [unpack_message(row[0]) for row in reversed(rows)]
+
+    def _append_sync(self, room_id, sender, content, origin, message_id):
+        now = time.time()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO chat_room (room_id, next_seq, last_active) VALUES (?, 0, ?) "
+                "ON CONFLICT(room_id) DO UPDATE SET last_active = excluded.last_active",
+                (room_id, now),
+            )
+            seq = conn.execute("SELECT next_seq FROM chat_room WHERE room_id = ?",
+                               (room_id,)).fetchone()[0]
+            conn.execute("UPDATE chat_room SET next_seq = ? WHERE room_id = ?", (seq + 1, room_id))
+            record = pack_message(message_id or f"{sender}_{seq}", sender, content, now)
+            conn.execute("INSERT INTO chat_message (room_id, seq, origin, record) VALUES (?, ?, ?, ?)",
+                         (room_id, seq, origin, record))
+            # Keep a second window of rows so polling subscribers never miss a burst
+            conn.execute("DELETE FROM chat_message WHERE room_id = ? AND seq <= ?",
+                         (room_id, seq - 2 * self.max_messages_per_room))
+            self._evict_sync(now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return unpack_message(record)
+
+    def _evict_sync(self, now):
+        conn = self._conn
+        stale = [row[0] for row in conn.execute(
+            "SELECT room_id FROM chat_room WHERE last_active < ?", (now - self.room_ttl_seconds,)
+        )]
+        overflow = conn.execute("SELECT COUNT(*) FROM chat_room").fetchone()[0] - self.max_rooms
+        if overflow > 0:
+            stale.extend(row[0] for row in conn.execute(
+                "SELECT room_id FROM chat_room ORDER BY last_active LIMIT ?", (overflow,)
+            ))
+        for room_id in set(stale):
+            self._clear_sync(room_id)
+
+    def _clear_sync(self, room_id):
+        self._conn.execute("DELETE FROM chat_message WHERE room_id = ?", (room_id,))
+        self._conn.execute("DELETE FROM chat_room WHERE room_id = ?", (room_id,))
+
+    def _poll_sync(self, room_id, after_seq):
+        return self._conn.execute(
+            "SELECT seq, origin, record FROM chat_message WHERE room_id = ? AND seq > ? ORDER BY seq",
+            (room_id, after_seq),
+        ).fetchall()
+
+    def _last_seq_sync(self, room_id):
+        row = self._conn.execute("SELECT next_seq FROM chat_room WHERE room_id = ?",
+                                 (room_id,)).fetchone()
+        return (row[0] - 1) if row else -1
+
+    async def get_history(self, room_id):
+        return await self._run(self._get_history_sync, room_id)
+
+    async def append_message(self, room_id, sender, content, origin=None, message_id=None):
+        return await self._run(self._append_sync, room_id, sender, content, origin, message_id)
+
+    async def clear_room(self, room_id):
+        await self._run(self._clear_sync, room_id)
+
+    async def subscribe(self, room_id):
+        last_seq = await self._run(self._last_seq_sync, room_id)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            rows = await self._run(self._poll_sync, room_id, last_seq)
+            if not rows and await self._run(self._last_seq_sync, room_id) < last_seq:
+                # Room was cleared or evicted; sequence numbers restart at zero
+                last_seq = -1
+            for seq, origin, record in rows:
+                last_seq = seq
+                yield {"origin": origin, "message": unpack_message(record)}
+
+    async def close(self):
+        self._conn.close()
+
+
+class RedisChatSessionStore(ChatSessionStore):
+    """
+    Shared store backed by Redis. Each room is a capped list plus a sequence
+    counter, both expiring after ``room_ttl_seconds`` of inactivity; new
+    messages are fanned out over a per-room pub/sub channel.
+    """
+
+    key_prefix = "drmax:chat"
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        import redis.asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    def _keys(self, room_id):
+        base = f"{self.key_prefix}:{room_id}"
+        return f"{base}:messages", f"{base}:seq", f"{base}:events"
+
+    async def get_history(self, room_id):
+        messages_key, seq_key, _ = self._keys(room_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(messages_key, 0, -1)
+            pipe.expire(messages_key, self.room_ttl_seconds)
+            pipe.expire(seq_key, self.room_ttl_seconds)
+            records, _, _ = await pipe.execute()
+        return [unpack_message(record) for record in records]
+
+    async def append_message(self, room_id, sender, content, origin=None, message_id=None):
+        messages_key, seq_key, events_key = self._keys(room_id)
+        seq = await self._redis.incr(seq_key) - 1
+        record = pack_message(message_id or f"{sender}_{seq}", sender, content, time.time())
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(messages_key, record)
+            pipe.ltrim(messages_key, -self.max_messages_per_room, -1)
+            pipe.expire(messages_key, self.room_ttl_seconds)
+            pipe.expire(seq_key, self.room_ttl_seconds)
+            pipe.publish(events_key, json.dumps({"origin": origin, "record": record}))
+            await pipe.execute()
+        return unpack_message(record)
+
+    async def clear_room(self, room_id):
+        messages_key, seq_key, _ = self._keys(room_id)
+        await self._redis.delete(messages_key, seq_key)
+
+    async def subscribe(self, room_id):
+        _, _, events_key = self._keys(room_id)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(events_key)
+        try:
+            async for event in pubsub.listen():
+                if event.get("type") != "message":
+                    continue
+                payload = json.loads(event["data"])
+                yield {"origin": payload.get("origin"), "message": unpack_message(payload["record"])}
+        finally:
+            await pubsub.unsubscribe(events_key)
+            await pubsub.aclose()
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def get_chat_session_store() -> ChatSessionStore:
+    """Build the session store configured by the ``CHATBOT_SESSION_*`` settings."""
+    backend = getattr(settings, 'CHATBOT_SESSION_STORE', 'memory')
+    options = {
+        'max_messages_per_room': getattr(settings, 'CHATBOT_MAX_MESSAGES_PER_ROOM', 200),
+        'max_rooms': getattr(settings, 'CHATBOT_MAX_ROOMS', 1000),
+        'room_ttl_seconds': getattr(settings, 'CHATBOT_ROOM_TTL_SECONDS', 86400),
+    }
+
+    if backend == 'redis':
+        url = getattr(settings, 'CHATBOT_REDIS_URL', '')
+        if url:
+            try:
+                return RedisChatSessionStore(url, **options)
+            except ImportError:
+                logger.warning("redis package not installed. Falling back to in-memory chat sessions.")
+        else:
+            logger.warning("CHATBOT_REDIS_URL not set. Falling back to in-memory chat sessions.")
+    elif backend == 'sqlite':
+        path = getattr(settings, 'CHATBOT_SQLITE_PATH', '') or os.path.join(settings.BASE_DIR, 'chat_sessions.sqlite3')
+        return SQLiteChatSessionStore(path, **options)
+
+    return InMemoryChatSessionStore(**options)
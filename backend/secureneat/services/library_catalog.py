@@ -0,0 +1,211 @@
+"""
+Database-backed catalog of the S3 medical library.
+
+``S3LibraryBook`` rows mirror the objects under the library prefixes and carry
+the book's extracted text plus a weighted full-text ``search_vector``. Listing
+and search read only the catalog; S3 is touched when a book is uploaded and by
+the periodic ``refresh_library_catalog`` crawler.
+"""
+import logging
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Q, TextField, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import S3LibraryBook
+from .s3_library_service import BookDownloadError, s3_library_service
+
+logger = logging.getLogger(__name__)
+
+EXTRACTED_TEXT_SUFFIX = '.extracted.txt.gz'
+
+
+def _book_search_vector():
+    return (
+        SearchVector('title', weight='A')
+        + SearchVector(Coalesce('author', Value('')), Coalesce('tags', Value('')), weight='B')
+        + SearchVector(Coalesce('description', Value(''), output_field=TextField()), 'filename', weight='C')
+        + SearchVector('extracted_text', weight='D')
+    )
+
+
+class LibraryCatalogService:
+    def __init__(self, library=None):
+        self.library = library or s3_library_service
+        # Postgres caps a tsvector at 1 MB; index the leading part of very long books
+        self.max_indexed_chars = getattr(settings, 'LIBRARY_CATALOG_MAX_INDEXED_CHARS', 500000)
+
+    # ----- maintenance -----
+
+    @staticmethod
+    def needs_text(book):
+        """A PDF whose extracted text is missing or was built from another version."""
+        return book.filename.lower().endswith('.pdf') and (not book.text_etag or book.text_etag != book.etag)
+
+    def index_book(self, book, extract_text=True):
+        """Refresh a book's extracted text (when its ETag changed) and search vector."""
+        if extract_text and self.needs_text(book):
+            try:
+                text, error = self.library.get_book_text(book.s3_key)
+            except BookDownloadError as e:
+                text, error = None, str(e)
+            if error:
+                logger.warning(f"Catalog could not extract text for {book.s3_key}: {error}")
+            else:
+                book.extracted_text = text[:self.max_indexed_chars]
+                book.text_etag = book.etag
+                book.save(update_fields=['extracted_text', 'text_etag'])
+
+        S3LibraryBook.objects.filter(pk=book.pk).update(
+            search_vector=_book_search_vector(), last_indexed=timezone.now()
+        )
+
+    def register_upload(self, book, extract_text=True):
+        """Called after a book is uploaded so it is searchable immediately."""
+        metadata = self.library.get_book_metadata(book.s3_key)
+        if metadata:
+            book.etag = metadata['etag']
+            book.s3_last_modified = metadata['last_modified']
+            book.save(update_fields=['etag', 's3_last_modified'])
+        self.index_book(book, extract_text=extract_text)
+
+    def refresh(self, extract_text=True, prune=True):
+        """
+        Crawl every library prefix and reconcile the catalog with S3. Books
+        whose text extraction failed before are retried even if their ETag is
+        unchanged. Returns counts of created, updated, reindexed and removed
+        books.
+        """
+        stats = {'created': 0, 'updated': 0, 'reindexed': 0, 'removed': 0}
+        existing = {book.s3_key: book for book in S3LibraryBook.objects.all()}
+        seen = set()
+        paginator = self.library.s3_client.get_paginator('list_objects_v2')
+
+        for category, prefix in self.library.library_prefixes.items():
+            for page in paginator.paginate(Bucket=self.library.bucket_name, Prefix=prefix):
+                for obj in page.get('Contents', []):
+                    key = obj['Key']
+                    if key.endswith('/') or key.endswith(EXTRACTED_TEXT_SUFFIX):
+                        continue
+                    seen.add(key)
+                    etag = obj['ETag'].strip('"')
+                    book = existing.get(key)
+                    if book is None:
+                        filename = os.path.basename(key)
+                        relative = key[len(prefix):]
+                        subcategory = relative.split('/', 1)[0] if '/' in relative else None
+                        book = S3LibraryBook.objects.create(
+                            title=os.path.splitext(filename)[0],
+                            s3_key=key,
+                            category=category,
+                            subcategory=subcategory,
+                            filename=filename,
+                            file_size=obj['Size'],
+                            content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                            etag=etag,
+                            s3_last_modified=obj['LastModified'],
+                        )
+                        stats['created'] += 1
+                    elif book.etag != etag:
+                        book.etag = etag
+                        book.file_size = obj['Size']
+                        book.s3_last_modified = obj['LastModified']
+                        book.save(update_fields=['etag', 'file_size', 's3_last_modified'])
+                        stats['updated'] += 1
+                    elif not (extract_text and self.needs_text(book)):
+                        # Unchanged, unless an earlier extraction failed and is retried here
+                        continue
+                    self.index_book(book, extract_text=extract_text)
+                    stats['reindexed'] += 1
+
+        if prune:
+            missing = [key for key in existing if key not in seen]
+            if missing:
+                stats['removed'], _ = S3LibraryBook.objects.filter(s3_key__in=missing).delete()
+        return stats
+
+    # ----- reads -----
+
+    def to_dict(self, book):
+        file_extension = os.path.splitext(book.filename)[1].lower()
+        return {
+            'id': book.id,
+            'title': book.title,
+            'author': book.author,
+            'filename': book.filename,
+            'key': book.s3_key,
+            'size': book.file_size,
+            'size_mb': book.size_mb,
+            'last_modified': (book.s3_last_modified or book.date_added).isoformat(),
+            'mime_type': book.content_type,
+            'extension': file_extension,
+            'category': book.category,
+            'subcategory': book.subcategory,
+            # Presigning is a local signature computation, not an S3 request
+            'download_url': self.library.generate_download_url(book.s3_key),
+            'rank': round(float(getattr(book, 'rank', 0) or 0), 4),
+        }
+
+    def list_categories(self):
+        counts = {row['category']: row['file_count'] for row in
+                  S3LibraryBook.objects.values('category').annotate(file_count=Count('id'))}
+        subcategories = {}
+        for category, subcategory in (S3LibraryBook.objects.exclude(subcategory__isnull=True)
+                                      .exclude(subcategory='')
+                                      .values_list('category', 'subcategory').distinct()):
+            subcategories.setdefault(category, []).append(subcategory)
+
+        return [{
+            'name': category_name.replace('_', ' ').title(),
+            'key': category_name,
+            'prefix': prefix,
+            'file_count': counts.get(category_name, 0),
+            'subcategories': sorted(subcategories.get(category_name, [])),
+        } for category_name, prefix in self.library.library_prefixes.items()]
+
+    def _paginate(self, queryset, page, page_size):
+        paginator = Paginator(queryset, page_size)
+        page_obj = paginator.get_page(page)
+        return {
+            'books': [self.to_dict(book) for book in page_obj],
+            'pagination': {
+                'current_page': page_obj.number,
+                'total_pages': paginator.num_pages,
+                'total_count': paginator.count,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous(),
+            },
+        }
+
+    def _base_queryset(self):
+        # Never ship extracted text or the tsvector to list views
+        return S3LibraryBook.objects.defer('extracted_text', 'search_vector')
+
+    def list_books(self, category=None, subcategory=None, page=1, page_size=20):
+        queryset = self._base_queryset()
+        if category:
+            queryset = queryset.filter(category=category)
+        if subcategory:
+            queryset = queryset.filter(subcategory=subcategory)
+        return self._paginate(queryset.order_by(F('s3_last_modified').desc(nulls_last=True), '-date_added'),
+                              page, page_size)
+
+    def search(self, search_term, categories=None, page=1, page_size=20):
+        """Ranked full-text search over titles, metadata and book content."""
+        query = SearchQuery(search_term, search_type='websearch')
+        queryset = self._base_queryset().annotate(rank=SearchRank(F('search_vector'), query))
+        # Titles/filenames match as substrings too, so partially typed names still hit
+        queryset = queryset.filter(
+            Q(search_vector=query) | Q(title__icontains=search_term) | Q(filename__icontains=search_term)
+        )
+        if categories:
+            queryset = queryset.filter(category__in=categories)
+        return self._paginate(queryset.order_by('-rank', '-date_added'), page, page_size)
+
+
+library_catalog = LibraryCatalogService()
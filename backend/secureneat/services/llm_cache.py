@@ -0,0 +1,140 @@
+"""
+Response cache for OpenAI chat completions.
+
+Completions are keyed by a normalized form of the prompt together with the
+model and sampling parameters, and stored in the Django cache configured under
+``LLM_CACHE_ALIAS`` (a bounded local-memory cache by default, Redis when
+``REDIS_URL`` is set). Identical requests that arrive while a completion is
+still in flight wait for that call instead of issuing their own.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+STATS_KEYS = ('hits', 'misses', 'coalesced', 'prompt_tokens_saved', 'completion_tokens_saved')
+
+
+def normalize_prompt_text(text):
+    """Collapse whitespace so prompts differing only in spacing share a key; case is significant."""
+    return _WHITESPACE_RE.sub(' ', str(text or '')).strip()
+
+
+class _InFlight:
+    __slots__ = ('event', 'result')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class LLMResponseCache:
+    # v2: keys no longer fold case, so entries stored under case-folded keys are not reused
+    key_prefix = 'llm:completion:v2:'
+    stats_prefix = 'llm:stats:'
+
+    def __init__(self, alias=None, timeout=None, wait_timeout=120):
+        self.alias = alias or getattr(settings, 'LLM_CACHE_ALIAS', 'default')
+        self.timeout = timeout if timeout is not None else getattr(settings, 'LLM_CACHE_TTL_SECONDS', 86400)
+        self.wait_timeout = wait_timeout
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, messages, model, **params):
+        payload = {
+            'model': model,
+            'messages': [(m.get('role'), normalize_prompt_text(m.get('content'))) for m in messages],
+            'params': {k: v for k, v in sorted(params.items()) if v is not None},
+        }
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        ).hexdigest()
+        return f"{self.key_prefix}{digest}"
+
+    def get_or_compute(self, key, compute):
+        """
+        Return ``(content, error)`` for ``key``, calling ``compute`` at most once
+        per process for concurrent identical requests. ``compute`` must return
+        ``(content, error, usage)``; only successful results are cached.
+        """
+        entry = self._safe_get(key)
+        if entry is not None:
+            self._record_hit(entry.get('usage'))
+            return entry['content'], None
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _InFlight()
+
+        if not leader:
+            if inflight.event.wait(self.wait_timeout) and inflight.result is not None:
+                content, error, usage = inflight.result
+                if error is None:
+                    self._incr('coalesced')
+                    self._record_hit(usage)
+                return content, error
+            # The leader timed out or crashed; fall through to our own request
+            content, error, _ = compute()
+            return content, error
+
+        try:
+            self._incr('misses')
+            inflight.result = compute()
+            content, error, usage = inflight.result
+            if error is None and content:
+                self._safe_set(key, {'content': content, 'usage': usage or {}})
+            return content, error
+        finally:
+            inflight.event.set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _record_hit(self, usage):
+        self._incr('hits')
+        usage = usage or {}
+        self._incr('prompt_tokens_saved', usage.get('prompt_tokens', 0))
+        self._incr('completion_tokens_saved', usage.get('completion_tokens', 0))
+
+    def _safe_get(self, key):
+        try:
+            return self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def _safe_set(self, key, value):
+        try:
+            self.cache.set(key, value, self.timeout)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _incr(self, name, amount=1):
+        if not amount:
+            return
+        key = f"{self.stats_prefix}{name}"
+        try:
+            self.cache.add(key, 0, None)
+            self.cache.incr(key, amount)
+        except Exception as e:
+            logger.debug(f"LLM cache stats update failed for {name}: {e}")
+
+    def get_stats(self):
+        values = self.cache.get_many([f"{self.stats_prefix}{name}" for name in STATS_KEYS])
+        return {name: values.get(f"{self.stats_prefix}{name}", 0) for name in STATS_KEYS}
+
+
+llm_response_cache = LLMResponseCache()
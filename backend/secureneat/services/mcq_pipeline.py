@@ -0,0 +1,265 @@
+"""
+Map-reduce MCQ generation over whole documents.
+
+The extracted text is split on chapter/section headings and packed into
+chunks that fit a per-request token budget. The requested question count is
+shared between chunks in proportion to their size, chunk requests run
+concurrently under a requests-per-minute limit, and the per-chunk results are
+merged, de-duplicated and cached by (document hash, chunk, parameters).
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .llm_cache import normalize_prompt_text
+from .openai_service import openai_service
+
+logger = logging.getLogger(__name__)
+
+# Lines such as "Chapter 3: Renal Physiology", "SECTION II", "Part 4 - Pharmacology" or "12.3 Acid-base balance"
+HEADING_RE = re.compile(
+    r'^[ \t]*(?:(?:chapter|section|part|unit|module|lesson)\s+(?:\d+|[ivxlcdm]+)\b[^\n]{0,100}'
+    r'|\d{1,2}(?:\.\d{1,2}){0,2}\.?[ \t]+[A-Z][^\n]{2,80})[ \t]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Rough token estimate used for budgeting (about four characters per token)."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def split_sections(text):
+    """Split text into ``(title, body)`` pairs on chapter/section headings."""
+    matches = list(HEADING_RE.finditer(text))
+    if not matches:
+        return [("Main Content", text)]
+
+    sections = []
+    preamble = text[:matches[0].start()]
+    if preamble.strip():
+        sections.append(("Introduction", preamble))
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        sections.append((match.group(0).strip(), text[match.start():end]))
+    return sections
+
+
+def _split_oversized(body, max_chars):
+    """Break a section that exceeds the chunk budget on paragraph boundaries."""
+    parts, current = [], ""
+    for paragraph in re.split(r'\n\s*\n', body):
+        while len(paragraph) > max_chars:
+            parts.append(current + paragraph[:max_chars - len(current)])
+            paragraph = paragraph[max_chars - len(current):]
+            current = ""
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+def build_chunks(text, max_chunk_tokens):
+    """
+    Pack consecutive sections into chunks of at most ``max_chunk_tokens``.
+    Each chunk keeps the title of the section it starts with.
+    """
+    max_chars = max_chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    title, buffer = None, ""
+    for section_title, body in split_sections(text):
+        pieces = _split_oversized(body, max_chars) if len(body) > max_chars else [body]
+        for piece in pieces:
+            if not piece.strip():
+                continue
+            if buffer and len(buffer) + len(piece) > max_chars:
+                chunks.append({"title": title, "text": buffer})
+                buffer = ""
+            if not buffer:
+                title = section_title
+            buffer += piece
+    if buffer.strip():
+        chunks.append({"title": title, "text": buffer})
+    return chunks
+
+
+def allocate_quotas(weights, total):
+    """Largest-remainder apportionment of ``total`` questions across ``weights``."""
+    weight_sum = float(sum(weights)) or 1.0
+    exact = [total * w / weight_sum for w in weights]
+    quotas = [int(math.floor(x)) for x in exact]
+    remaining = total - sum(quotas)
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - quotas[i], reverse=True)
+    for i in by_remainder[:remaining]:
+        quotas[i] += 1
+    return quotas
+
+
+class RequestRateLimiter:
+    """Spaces out request starts so that at most ``requests_per_minute`` begin per minute."""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def back_off(self, seconds):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+class MCQGenerationPipeline:
+    cache_prefix = 'mcq:chunk:'
+
+    def __init__(self, service=None):
+        self.service = service or openai_service
+        self.max_chunk_tokens = getattr(settings, 'MCQ_PIPELINE_CHUNK_TOKENS', 3000)
+        self.max_questions_per_request = getattr(settings, 'MCQ_PIPELINE_QUESTIONS_PER_REQUEST', 6)
+        self.max_workers = getattr(settings, 'MCQ_PIPELINE_MAX_WORKERS', 4)
+        self.max_retries = getattr(settings, 'MCQ_PIPELINE_MAX_RETRIES', 3)
+        self.cache_timeout = getattr(settings, 'MCQ_PIPELINE_CACHE_TTL_SECONDS', 7 * 86400)
+        self.rate_limiter = RequestRateLimiter(getattr(settings, 'MCQ_PIPELINE_REQUESTS_PER_MINUTE', 60))
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'LLM_CACHE_ALIAS', 'default')]
+
+    def plan(self, text, num_questions):
+        """
+        Chunk the document and assign each chunk its share of questions. Chunk
+        size shrinks when needed so no single request exceeds the
+        per-request question cap. Returns one entry per chunk request.
+        """
+        total_tokens = estimate_tokens(text)
+        min_chunks = math.ceil(num_questions / self.max_questions_per_request)
+        chunk_tokens = min(self.max_chunk_tokens, max(500, math.ceil(total_tokens / min_chunks)))
+        chunks = build_chunks(text, chunk_tokens)
+        quotas = allocate_quotas([estimate_tokens(c["text"]) for c in chunks], num_questions)
+        # Short documents can still leave a chunk with more questions than one
+        # request should carry; split those into several requests over the same text
+        requests = []
+        for index, (chunk, quota) in enumerate(zip(chunks, quotas)):
+            part = 0
+            while quota > 0:
+                share = min(quota, self.max_questions_per_request)
+                requests.append(dict(chunk, index=index, part=part, quota=share))
+                quota -= share
+                part += 1
+        return requests
+
+    def _chunk_cache_key(self, document_hash, chunk, topic_title_hint):
+        params = json.dumps([chunk["index"], chunk["part"], chunk["quota"], topic_title_hint,
+                             self.max_chunk_tokens, hashlib.sha256(chunk["text"].encode('utf-8')).hexdigest()])
+        return f"{self.cache_prefix}{document_hash}:{hashlib.sha256(params.encode('utf-8')).hexdigest()[:32]}"
+
+    def _is_rate_limited(self, error):
+        error = str(error).lower()
+        return '429' in error or 'rate limit' in error
+
+    def _generate_chunk(self, document_hash, chunk, topic_title_hint):
+        cache_key = self._chunk_cache_key(document_hash, chunk, topic_title_hint)
+        try:
+            cached = self.cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"MCQ chunk cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached, None
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            result, error = self.service.generate_mcqs_from_text(
+                chunk["text"], chunk["quota"], topic_title_hint, "full_book_wise"
+            )
+            if not error:
+                questions = result.get("questions", [])
+                try:
+                    self.cache.set(cache_key, questions, self.cache_timeout)
+                except Exception as e:
+                    logger.warning(f"MCQ chunk cache write failed: {e}")
+                return questions, None
+            if not self._is_rate_limited(error) or attempt == self.max_retries:
+                break
+            delay = 2 ** attempt
+            logger.info(f"Rate limited on MCQ chunk {chunk['index']}; retrying in {delay}s")
+            self.rate_limiter.back_off(delay)
+        return [], error
+
+    def generate(self, text_content, num_questions, topic_title_hint="Generated MCQs", generation_type="full_book_wise"):
+        """
+        Drop-in replacement for ``OpenAIService.generate_mcqs_from_text`` that
+        covers the whole document. Returns ``(mcq_json, error)``.
+        """
+        if not self.service.client:
+            logger.error("OpenAI client not initialized. Cannot generate MCQs.")
+            return None, "OpenAI client not initialized."
+
+        document_hash = hashlib.sha256(text_content.encode('utf-8')).hexdigest()
+        chunks = self.plan(text_content, num_questions)
+        logger.info(f"MCQ pipeline: {len(chunks)} chunk request(s) for {num_questions} questions "
+                    f"over {len(text_content)} characters")
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks)) or 1) as executor:
+            results = list(executor.map(
+                lambda chunk: self._generate_chunk(document_hash, chunk, topic_title_hint), chunks
+            ))
+
+        errors = [error for _, error in results if error]
+        if len(errors) == len(results):
+            return None, errors[0] if errors else "No content available for MCQ generation."
+        if errors:
+            logger.warning(f"MCQ pipeline: {len(errors)} of {len(results)} chunk request(s) failed: {errors[0]}")
+
+        seen = set()
+        chapters = []
+        for chunk, (questions, _) in zip(chunks, results):
+            unique = []
+            for question in questions:
+                key = normalize_prompt_text(question.get("question")).casefold()
+                if key and key not in seen:
+                    seen.add(key)
+                    unique.append(question)
+            if unique:
+                if chapters and chapters[-1]["chapter_title"] == chunk["title"]:
+                    chapters[-1]["questions"].extend(unique)
+                else:
+                    chapters.append({"chapter_title": chunk["title"], "questions": unique})
+
+        if generation_type == "chapter_wise":
+            return {
+                "document_title": topic_title_hint,
+                "mcq_type": "chapter_wise",
+                "chapters": chapters,
+            }, None
+        return {
+            "document_title": topic_title_hint,
+            "mcq_type": "full_book_wise",
+            "questions": [q for chapter in chapters for q in chapter["questions"]][:num_questions],
+        }, None
+
+
+mcq_pipeline = MCQGenerationPipeline()
@@ -3,6 +3,8 @@ from django.conf import settings
 import logging
 import json
 
+from .llm_cache import llm_response_cache
+
 logger = logging.getLogger(__name__)
 
 class OpenAIService:
@@ -17,9 +19,23 @@ class OpenAIService:
                 logger.error(f"Failed to initialize OpenAI client: {e}")
                 self.client = None
 
-    def _make_chat_completion_request(self, messages, model="gpt-3.5-turbo", max_tokens=150, temperature=0.7, response_format=None):
+    def _make_chat_completion_request(self, messages, model="gpt-3.5-turbo", max_tokens=150, temperature=0.7, response_format=None, use_cache=False):
         if not self.client:
             return "OpenAI API key not configured.", None
+        if not use_cache:
+            content, error, _ = self._request_chat_completion(messages, model, max_tokens, temperature, response_format)
+            return content, error
+
+        cache_key = llm_response_cache.make_key(
+            messages, model,
+            max_tokens=max_tokens, temperature=temperature, response_format=response_format
+        )
+        return llm_response_cache.get_or_compute(
+            cache_key,
+            lambda: self._request_chat_completion(messages, model, max_tokens, temperature, response_format)
+        )
+
+    def _request_chat_completion(self, messages, model, max_tokens, temperature, response_format):
         try:
             params = {
                 "model": model,
@@ -32,16 +48,21 @@ class OpenAIService:
             
             response = self.client.chat.completions.create(**params)
             content = response.choices[0].message.content
-            return content.strip(), None
+            usage = getattr(response, "usage", None)
+            usage = {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            }
+            return content.strip(), None, usage
         except openai.APIError as e:
             logger.error(f"OpenAI API Error: {e}")
             error_message = f"OpenAI API error: {e.status_code} - {getattr(e, 'message', str(e))}"
             if hasattr(e, 'body') and e.body and 'message' in e.body:
                  error_message = f"OpenAI API error: {e.status_code} - {e.body['message']}"
-            return None, error_message
+            return None, error_message, None
         except Exception as e:
             logger.error(f"Unexpected error calling OpenAI: {e}")
-            return None, f"An unexpected error occurred with AI service: {str(e)}"
+            return None, f"An unexpected error occurred with AI service: {str(e)}", None
 
     def generate_mcqs_from_text(self, text_content, num_questions, topic_title_hint="Generated MCQs", generation_type="full_book_wise"):
         if not self.client:
@@ -240,7 +261,7 @@ Required Analysis:
 Format your response with clear headings for each section."""
         
         messages = [{"role": "user", "content": prompt}]
-        analysis, error = self._make_chat_completion_request(messages, model="gpt-4-turbo", max_tokens=4000, temperature=0.2)
+        analysis, error = self._make_chat_completion_request(messages, model="gpt-4-turbo", max_tokens=4000, temperature=0.2, use_cache=True)
         if error:
             return f"Document analysis failed: {error}", None
         return analysis, None
@@ -248,7 +269,7 @@ Format your response with clear headings for each section."""
     def summarize_analysis(self, analysis_text):
         prompt = f"Summarize this medical analysis in 2-3 sentences for a quick overview:\n\n{analysis_text}"
         messages = [{"role": "user", "content": prompt}]
-        summary, error = self._make_chat_completion_request(messages, model="gpt-4-turbo", max_tokens=200)
+        summary, error = self._make_chat_completion_request(messages, model="gpt-4-turbo", max_tokens=200, use_cache=True)
         if error:
             return f"Summary generation failed: {error}"
         return summary or "Could not generate summary."
@@ -299,7 +320,7 @@ Always provide educational value and encourage critical thinking. If uncertain a
             messages.append({"role": "system", "content": system_prompt_content})
             messages.append({"role": "user", "content": user_message})
         
-        response_content, error = self._make_chat_completion_request(messages, model=model, max_tokens=2000)
+        response_content, error = self._make_chat_completion_request(messages, model=model, max_tokens=2000, use_cache=True)
 
         if error:
             return f"🔧 **Technical Issue**: I apologize, but I'm experiencing technical difficulties right now. Please try again in a moment, or rephrase your question. If the issue persists, please contact technical support.\n\nError details: {error}"
@@ -313,7 +334,7 @@ Always provide educational value and encourage critical thinking. If uncertain a
                     {"role": "system", "content": system_prompt_content},
                     {"role": "user", "content": user_message}
                 ]
-                general_response_content, general_error = self._make_chat_completion_request(messages, model=model, max_tokens=2000)
+                general_response_content, general_error = self._make_chat_completion_request(messages, model=model, max_tokens=2000, use_cache=True)
                 if general_error:
                      return f"🔧 **Technical Issue**: I apologize, but I'm experiencing technical difficulties right now. Please try again in a moment.\n\nError details: {general_error}"
                 return "🧠 **Medical Knowledge Base**:\n\n" + (general_response_content or "No information available at this time.")
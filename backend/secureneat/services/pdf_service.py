@@ -1,20 +1,172 @@
 import fitz # PyMuPDF
+import gzip
+import hashlib
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+
+def _extract_page_range(file_path, start, stop):
+    """Worker entry point: extract pages [start, stop) from a PDF on disk."""
+    doc = fitz.open(file_path)
+    try:
+        return [doc.load_page(page_num).get_text("text") for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
+
 class PDFService:
-    def extract_text_from_pdf_buffer(self, pdf_buffer, max_chars=None):
+    def __init__(self):
+        self.cache_dir = getattr(settings, 'PDF_TEXT_CACHE_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'pdf_text_cache')
+        self.parallel_page_threshold = getattr(settings, 'PDF_PARALLEL_PAGE_THRESHOLD', 100)
+        self.max_workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', min(4, os.cpu_count() or 1))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @staticmethod
+    def _read_bytes(pdf_buffer):
+        if isinstance(pdf_buffer, (bytes, bytearray)):
+            return bytes(pdf_buffer)
+        if hasattr(pdf_buffer, 'getvalue'):
+            return pdf_buffer.getvalue()
+        pdf_buffer.seek(0)
+        return pdf_buffer.read()
+
+    @staticmethod
+    def content_hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already holds DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drop a broken pool (e.g. a worker was killed) so the next call starts a fresh one."""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----- text cache -----
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.txt.gz")
+
+    def get_cached_text(self, digest):
+        path = self._cache_path(digest)
         try:
-            doc = fitz.open(stream=pdf_buffer, filetype="pdf")
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text") + "\n"
-            
-            if max_chars and len(text) > max_chars:
-                text = text[:max_chars]
-            return text.strip()
+            with gzip.open(path, 'rt', encoding='utf-8') as cached:
+                return cached.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read cached PDF text {path}: {e}")
+            return None
+
+    def store_cached_text(self, digest, text):
+        path = self._cache_path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as cached:
+                cached.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not cache PDF text {path}: {e}")
+
+    # ----- extraction -----
+
+    def iter_pages(self, doc, max_chars=None):
+        """
+        Yield page texts in order. When ``max_chars`` is given, stop as soon as
+        enough text has been produced instead of extracting every page.
+        """
+        produced = 0
+        for page_num in range(len(doc)):
+            page_text = doc.load_page(page_num).get_text("text") + "\n"
+            if max_chars and produced + len(page_text) >= max_chars:
+                yield page_text[:max_chars - produced]
+                return
+            produced += len(page_text)
+            yield page_text
+
+    def iter_pages_from_buffer(self, pdf_buffer, max_chars=None):
+        """Generator over page texts for streaming consumers."""
+        doc = fitz.open(stream=self._read_bytes(pdf_buffer), filetype="pdf")
+        try:
+            yield from self.iter_pages(doc, max_chars)
+        finally:
+            doc.close()
+
+    def _extract_parallel(self, pdf_bytes, page_count):
+        step = -(-page_count // (self.max_workers * 4))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            tmp.write(pdf_bytes)
+            tmp_path = tmp.name
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    futures = [executor.submit(_extract_page_range, tmp_path, start, stop) for start, stop in ranges]
+                    pages = []
+                    for future in futures:
+                        pages.extend(page + "\n" for page in future.result())
+                    return pages
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    if attempt:
+                        raise
+                    logger.warning("PDF extraction pool broke (worker died); retrying on a new pool")
+        finally:
+            os.unlink(tmp_path)
+
+    def extract_text_from_pdf_buffer(self, pdf_buffer, max_chars=None, use_cache=True):
+        try:
+            # Uploads arrive already hashed (backend/uploads.py), so a cache hit never reads the PDF
+            digest = getattr(pdf_buffer, 'sha256', None) if use_cache else None
+            pdf_bytes = None if digest else self._read_bytes(pdf_buffer)
+            if use_cache and not digest:
+                digest = self.content_hash(pdf_bytes)
+            if digest:
+                cached = self.get_cached_text(digest)
+                if cached is not None:
+                    logger.info(f"Using cached PDF text for {digest[:12]}")
+                    return cached[:max_chars].strip() if max_chars else cached
+            if pdf_bytes is None:
+                pdf_bytes = self._read_bytes(pdf_buffer)
+
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            try:
+                if max_chars:
+                    # Partial extractions are not cached
+                    return "".join(self.iter_pages(doc, max_chars)).strip()
+                page_count = len(doc)
+                if page_count >= self.parallel_page_threshold and self.max_workers > 1:
+                    pages = self._extract_parallel(pdf_bytes, page_count)
+                else:
+                    pages = list(self.iter_pages(doc))
+            finally:
+                doc.close()
+
+            text = "".join(pages).strip()
+            if digest:
+                self.store_cached_text(digest, text)
+            return text
         except Exception as e:
             logger.error(f"Error extracting text from PDF buffer: {e}")
             # Consider re-raising or returning a specific error message
@@ -24,16 +176,13 @@ class PDFService:
     def extract_text_from_pdf_filepath(self, file_path, max_chars=None):
         try:
             doc = fitz.open(file_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text") + "\n"
-
-            if max_chars and len(text) > max_chars:
-                text = text[:max_chars]
+            try:
+                text = "".join(self.iter_pages(doc, max_chars))
+            finally:
+                doc.close()
             return text.strip()
         except Exception as e:
             logger.error(f"Error extracting text from PDF file {file_path}: {e}")
             raise ValueError(f"Could not process PDF file: {e}")
 
-pdf_service = PDFService()
\ No newline at end of file
+pdf_service = PDFService()
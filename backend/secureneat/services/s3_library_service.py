@@ -1,6 +1,7 @@
 import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
+import gzip
 import logging
 import os
 from typing import List, Dict, Optional, Tuple
@@ -9,6 +10,10 @@ import mimetypes
 logger = logging.getLogger(__name__)
 
 
+class BookDownloadError(Exception):
+    """The book could not be downloaded from S3 (a server-side failure, unlike a bad PDF)."""
+
+
 class S3LibraryService:
     """
     Service for managing book collections and notes in AWS S3.
@@ -95,8 +100,8 @@ class S3LibraryService:
             
             books = []
             for obj in response.get('Contents', []):
-                # Skip folder markers
-                if obj['Key'].endswith('/'):
+                # Skip folder markers and cached extracted text
+                if obj['Key'].endswith('/') or obj['Key'].endswith('.extracted.txt.gz'):
                     continue
                     
                 filename = os.path.basename(obj['Key'])
@@ -177,6 +182,58 @@ class S3LibraryService:
             logger.error(error_msg)
             return None, error_msg
 
+    def extracted_text_key(self, s3_key: str) -> str:
+        """Key of the cached extracted-text object stored alongside a book."""
+        return f"{s3_key}.extracted.txt.gz"
+
+    def get_book_text(self, s3_key: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns the extracted text of a PDF book, reusing the gzipped text
+        stored next to the book in S3 when it was produced from the same
+        object version (matched by ETag). On a miss the book is downloaded,
+        extracted and the text cached for the next request.
+        
+        Returns:
+            Tuple of (text, error_message); error_message covers extraction
+            failures only. Raises BookDownloadError when the download fails.
+        """
+        from .pdf_service import pdf_service
+
+        metadata = self.get_book_metadata(s3_key)
+        etag = metadata['etag'] if metadata else None
+        if etag:
+            try:
+                cached = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.extracted_text_key(s3_key))
+                if cached.get('Metadata', {}).get('source-etag') == etag:
+                    logger.info(f"Using cached extracted text for {s3_key}")
+                    return gzip.decompress(cached['Body'].read()).decode('utf-8'), None
+            except ClientError:
+                pass  # No cached text yet
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cached text for {s3_key}: {e}")
+
+        content, error = self.get_book_content(s3_key)
+        if error:
+            raise BookDownloadError(error)
+        try:
+            text = pdf_service.extract_text_from_pdf_buffer(content)
+        except ValueError as e:
+            return None, str(e)
+
+        if etag:
+            try:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=self.extracted_text_key(s3_key),
+                    Body=gzip.compress(text.encode('utf-8')),
+                    ContentType='text/plain',
+                    ContentEncoding='gzip',
+                    Metadata={'source-etag': etag},
+                )
+            except ClientError as e:
+                logger.warning(f"Could not cache extracted text for {s3_key}: {e}")
+        return text, None
+
     def generate_download_url(self, s3_key: str, expires_in: int = 3600) -> str:
         """
         Generates a presigned URL for downloading a book.
@@ -17,6 +17,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .s3_secure_manager import secure_s3_manager
+from backend.uploads import upload_sha256
 from .models import UserWorkspace, PatientFolder, S3FileRecord, S3AuditLog, AccessPermission
 import base64
 from io import BytesIO
@@ -245,7 +246,8 @@ class UploadPatientFileView(SecureS3BaseView):
                 filename=uploaded_file.name,
                 file_type=file_type,
                 module=module,
-                metadata=metadata
+                metadata=metadata,
+                checksum=upload_sha256(uploaded_file)
             )
             
             if result['success']:
@@ -7,6 +7,7 @@ import time
 import os
 from django.conf import settings
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 import uuid
 
 from .models import S3UploadedFile, S3LibraryBook, MCQGenerationHistory
@@ -15,9 +16,11 @@ from .serializers import (
     DocumentProcessResponseSerializer
 )
 from .services.openai_service import openai_service
+from .services.mcq_pipeline import mcq_pipeline
 from .services.pdf_service import pdf_service
 from .services.aws_s3_service import s3_service
-from .services.s3_library_service import s3_library_service
+from .services.s3_library_service import BookDownloadError, s3_library_service
+from .services.library_catalog import library_catalog
 from subscriptions.decorators import require_subscription, track_usage
 
 logger = logging.getLogger(__name__)
@@ -66,11 +69,7 @@ class GenerateMCQView(views.APIView):
 
         try:
             
-            uploaded_file.seek(0)
-            pdf_content_buffer = uploaded_file.read()
-
-            
-            extracted_text = pdf_service.extract_text_from_pdf_buffer(pdf_content_buffer)
+            extracted_text = pdf_service.extract_text_from_pdf_buffer(uploaded_file)
 
             if not extracted_text or len(extracted_text.strip()) < 50:
                  return Response({"error": "Could not extract sufficient text from the PDF or PDF content is too short."}, status=status.HTTP_400_BAD_REQUEST)
@@ -80,7 +79,7 @@ class GenerateMCQView(views.APIView):
 
             logger.info(f"Attempting to generate {num_questions} MCQs ({generation_type}) for file: {uploaded_file.name}, text length: {len(extracted_text)}")
 
-            mcq_json, error = openai_service.generate_mcqs_from_text(
+            mcq_json, error = mcq_pipeline.generate(
                 extracted_text,
                 num_questions,
                 topic_title_hint,
@@ -239,17 +238,19 @@ class DocumentProcessView(views.APIView):
 
 class S3LibraryCategoriesView(views.APIView):
     """
-    Lists all available book categories in the S3 library.
+    Lists all available book categories in the S3 library (served from the catalog).
     """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         try:
-            categories = s3_library_service.list_book_categories()
-            return Response({
+            categories = library_catalog.list_categories()
+            response = Response({
                 "success": True,
                 "categories": categories
             }, status=status.HTTP_200_OK)
+            patch_cache_control(response, private=True, max_age=300)
+            return response
         except Exception as e:
             logger.error(f"Error listing S3 library categories: {e}")
             return Response({
@@ -259,7 +260,8 @@ class S3LibraryCategoriesView(views.APIView):
 
 class S3LibraryBooksView(views.APIView):
     """
-    Lists books in a specific category or searches across categories.
+    Lists books in a specific category or searches titles and content across categories.
+    Results come from the library catalog and are paginated.
     """
     permission_classes = [IsAuthenticated]
     
@@ -268,26 +270,25 @@ class S3LibraryBooksView(views.APIView):
         subcategory = request.query_params.get('subcategory')
         search = request.query_params.get('search')
         
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
             if search:
                 # Search across categories
                 search_categories = request.query_params.getlist('categories') if request.query_params.get('categories') else None
-                books = s3_library_service.search_books(search, search_categories)
-            elif category:
-                # List books in specific category
-                books = s3_library_service.list_books_in_category(category, subcategory)
+                result = library_catalog.search(search, search_categories, page, page_size)
             else:
-                # List all books (limit for performance)
-                books = []
-                categories = s3_library_service.list_book_categories()
-                for cat in categories[:3]:  # Limit to first 3 categories
-                    cat_books = s3_library_service.list_books_in_category(cat['key'])
-                    books.extend(cat_books[:10])  # Limit to 10 books per category
+                result = library_catalog.list_books(category, subcategory, page, page_size)
             
             return Response({
                 "success": True,
-                "books": books,
-                "count": len(books)
+                "books": result['books'],
+                "count": len(result['books']),
+                "pagination": result['pagination']
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -346,30 +347,35 @@ class S3LibraryMCQGenerateView(views.APIView):
         )
         
         try:
-            # Download file content from S3
-            file_content, error = s3_library_service.get_book_content(s3_key)
-            if error:
-                history.error_message = f"Failed to download file: {error}"
-                history.save()
-                return Response({
-                    "error": "Failed to access book from library",
-                    "details": error
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Extract text from PDF
+            # Extract text from PDF (served from the cached text next to the book when available)
             if filename.lower().endswith('.pdf'):
                 try:
-                    from io import BytesIO
-                    pdf_buffer = BytesIO(file_content)
-                    extracted_text = pdf_service.extract_text_from_pdf_buffer(pdf_buffer)
-                except Exception as e:
-                    history.error_message = f"PDF processing failed: {str(e)}"
+                    extracted_text, error = s3_library_service.get_book_text(s3_key)
+                except BookDownloadError as e:
+                    history.error_message = f"Failed to download file: {str(e)}"
                     history.save()
                     return Response({
-                        "error": "Failed to process PDF file",
+                        "error": "Failed to access book from library",
                         "details": str(e)
+                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                if error:
+                    history.error_message = f"PDF processing failed: {error}"
+                    history.save()
+                    return Response({
+                        "error": "Failed to process PDF file",
+                        "details": error
                     }, status=status.HTTP_400_BAD_REQUEST)
             else:
+                # Download file content from S3
+                file_content, error = s3_library_service.get_book_content(s3_key)
+                if error:
+                    history.error_message = f"Failed to download file: {error}"
+                    history.save()
+                    return Response({
+                        "error": "Failed to access book from library",
+                        "details": error
+                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
                 # For text files, decode content
                 try:
                     extracted_text = file_content.decode('utf-8')
@@ -394,7 +400,7 @@ class S3LibraryMCQGenerateView(views.APIView):
             
             # Generate MCQs using OpenAI
             topic_title_hint = os.path.splitext(filename)[0]
-            mcq_json, error = openai_service.generate_mcqs_from_text(
+            mcq_json, error = mcq_pipeline.generate(
                 extracted_text,
                 num_questions,
                 topic_title_hint,
@@ -501,21 +507,29 @@ class S3LibraryUploadView(views.APIView):
                     "details": error
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Create library book record
-            library_book = S3LibraryBook.objects.create(
-                title=title or os.path.splitext(file_obj.name)[0],
+            # Create library book record (the catalog crawler may already have picked up the key)
+            library_book, _ = S3LibraryBook.objects.update_or_create(
                 s3_key=s3_key,
-                category=category,
-                subcategory=subcategory,
-                filename=file_obj.name,
-                file_size=file_obj.size,
-                content_type=file_obj.content_type,
-                author=author,
-                description=description,
-                tags=tags,
-                added_by=request.user
+                defaults={
+                    'title': title or os.path.splitext(file_obj.name)[0],
+                    'category': category,
+                    'subcategory': subcategory,
+                    'filename': file_obj.name,
+                    'file_size': file_obj.size,
+                    'content_type': file_obj.content_type,
+                    'author': author,
+                    'description': description,
+                    'tags': tags,
+                    'added_by': request.user
+                }
             )
             
+            # Make the new book searchable by title and content right away
+            try:
+                library_catalog.register_upload(library_book)
+            except Exception as e:
+                logger.warning(f"Catalog indexing failed for {s3_key}; the crawler will retry: {e}")
+            
             return Response({
                 "success": True,
                 "message": "Book uploaded successfully",